@@ -5,6 +5,7 @@ MindLink 认证 API 路由
 - 用户注册
 - 用户登录
 - 令牌刷新
+- 用户统计
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status
@@ -12,8 +13,9 @@ from sqlalchemy.orm import Session
 
 from app.core.database import get_db
 from app.models.user import UserCreate, UserLogin, UserOut, Token, UserUpdate
-from app.models.common import SuccessResponse, ErrorResponse
+from app.models.common import SuccessResponse, ErrorResponse, StatisticsResponse
 from app.services.user_service import UserService
+from app.services.stats_service import StatsService
 from app.utils.auth import get_current_user, User
 
 # 创建认证路由器
@@ -129,6 +131,33 @@ async def get_current_user_info(
         data=UserOut.from_orm(current_user)
     )
 
+@router.get("/me/stats", response_model=StatisticsResponse, tags=["认证"])
+async def get_current_user_stats(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    获取当前用户的统计信息
+    
+    包括笔记数量、文件数量、文件总大小和各标签的使用次数
+    """
+    try:
+        stats = StatsService.get_user_stats(db, current_user.id)
+        
+        return StatisticsResponse(
+            code=200,
+            message="获取统计信息成功",
+            data=stats.dict()
+        )
+        
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="获取统计信息失败"
+        )
+
 @router.post("/logout", response_model=SuccessResponse, tags=["认证"])
 async def logout_user(
     current_user: User = Depends(get_current_user)
@@ -9,7 +9,7 @@ MindLink 文件上传/下载 API 路由
 - 文件删除
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query, Header, Response
 from fastapi.responses import FileResponse as FastAPIFileResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
@@ -21,6 +21,7 @@ from app.models.common import SuccessResponse
 from app.services.file_service import FileService
 from app.services.permission_service import PermissionService
 from app.utils.auth import get_current_user, User
+from app.utils.etag import not_modified, set_etag
 from app.api.files import files_router
 
 @files_router.post("/upload", response_model=SuccessResponse, tags=["文件"])
@@ -135,8 +136,13 @@ async def download_file(
 
 @files_router.get("/", response_model=SuccessResponse, tags=["文件"])
 async def get_files(
+    response: Response,
     skip: int = 0,
-    limit: int = 20,
+    limit: int = Query(20, ge=1, le=100),
+    sort: str = Query("created_at", pattern="^(created_at|updated_at|title)$", description="排序字段"),
+    order: str = Query("desc", pattern="^(desc|asc)$", description="排序方向"),
+    cursor: Optional[str] = Query(None, description="分页游标"),
+    if_none_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -145,12 +151,24 @@ async def get_files(
     
     - **skip**: 跳过的记录数
     - **limit**: 返回的最大记录数
+    - **sort**: 排序字段（created_at、updated_at、title）
+    - **order**: 排序方向（desc、asc）
+    - **cursor**: 上一页返回的 next_cursor（可选，提供时使用游标分页并忽略 skip）
     
-    返回当前用户的所有文件
+    返回当前用户的所有文件。响应带有 ETag，文件未变化时对 If-None-Match 返回 304。
     """
     try:
+        # 先按文件代数校验，未修改时不查询文件表
+        etag = FileService.get_files_etag(db, current_user.id)
+        cached = not_modified(if_none_match, etag)
+        if cached is not None:
+            return cached
+        set_etag(response, etag)
+        
         # 获取文件列表
-        files = FileService.get_user_files(db, current_user.id, skip, limit)
+        files, next_cursor = FileService.get_user_files(
+            db, current_user.id, skip, limit, sort, order, cursor
+        )
         
         # 构建响应数据 - 使用字典转换确保正确设置download_url
         response_data = []
@@ -173,10 +191,13 @@ async def get_files(
                 "files": response_data,
                 "total": len(response_data),
                 "skip": skip,
-                "limit": limit
+                "limit": limit,
+                "next_cursor": next_cursor
             }
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -186,7 +207,10 @@ async def get_files(
 @files_router.get("/public", response_model=SuccessResponse, tags=["文件"])
 async def get_public_files(
     skip: int = 0,
-    limit: int = 20,
+    limit: int = Query(20, ge=1, le=100),
+    sort: str = Query("created_at", pattern="^(created_at|updated_at|title)$", description="排序字段"),
+    order: str = Query("desc", pattern="^(desc|asc)$", description="排序方向"),
+    cursor: Optional[str] = Query(None, description="分页游标"),
     db: Session = Depends(get_db)
 ):
     """
@@ -194,12 +218,17 @@ async def get_public_files(
     
     - **skip**: 跳过的记录数
     - **limit**: 返回的最大记录数
+    - **sort**: 排序字段（created_at、updated_at、title）
+    - **order**: 排序方向（desc、asc）
+    - **cursor**: 上一页返回的 next_cursor（可选，提供时使用游标分页并忽略 skip）
     
     不需要认证即可访问
     """
     try:
         # 获取公开文件列表
-        files = FileService.get_public_files(db, skip, limit)
+        files, next_cursor = FileService.get_public_files(
+            db, skip, limit, sort, order, cursor
+        )
         
         # 构建响应数据 - 使用字典转换确保正确设置download_url
         response_data = []
@@ -222,10 +251,13 @@ async def get_public_files(
                 "files": response_data,
                 "total": len(response_data),
                 "skip": skip,
-                "limit": limit
+                "limit": limit,
+                "next_cursor": next_cursor
             }
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -9,21 +9,29 @@ MindLink 笔记 API 路由
 """
 
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Response
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
 from app.models.note import (
-    NoteCreate, NoteUpdate, NoteTagUpdate, NoteOut, NoteVersionOut,
-    NoteQueryParams, PaginatedResponse
+    NoteCreate, NoteUpdate, NotePatch, NoteTagUpdate, NoteOut, NoteListItemOut, NoteVersionOut,
+    NoteQueryParams, PaginatedResponse, NoteBatchRequest
 )
-from app.models.common import SuccessResponse
+from app.models.common import SuccessResponse, BatchOperationResponse, ResponseStatus
 from app.services.note_service import NoteService
 from app.utils.auth import get_current_user, User
+from app.services.render_cache import get_render_cache
+from app.utils.etag import not_modified, set_etag, variant_etag
 
 # 创建笔记路由器
 router = APIRouter()
 
+def _split_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """解析逗号分隔的 fields 参数"""
+    if not fields:
+        return None
+    return [name.strip() for name in fields.split(",") if name.strip()]
+
 @router.post("/", response_model=SuccessResponse, tags=["笔记"])
 async def create_note(
     note_create: NoteCreate,
@@ -60,8 +68,13 @@ async def get_notes(
     page: int = Query(1, ge=1, description="页码"),
     size: int = Query(20, ge=1, le=100, description="每页大小"),
     tags: Optional[List[str]] = Query(None, description="标签筛选"),
+    tag_mode: str = Query("any", pattern="^(any|all)$", description="标签匹配方式"),
     search: Optional[str] = Query(None, description="搜索关键词"),
     user_id: Optional[int] = Query(None, description="用户ID筛选"),
+    sort: str = Query("updated_at", pattern="^(updated_at|created_at|title)$", description="排序字段"),
+    order: str = Query("desc", pattern="^(desc|asc)$", description="排序方向"),
+    cursor: Optional[str] = Query(None, description="分页游标"),
+    fields: Optional[str] = Query(None, description="返回字段（逗号分隔）"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -71,8 +84,13 @@ async def get_notes(
     - **page**: 页码（从1开始）
     - **size**: 每页大小（1-100）
     - **tags**: 标签筛选（可选）
+    - **tag_mode**: 标签匹配方式（any 包含任一标签，all 包含全部标签）
     - **search**: 搜索关键词（可选）
     - **user_id**: 用户ID筛选（可选，仅超级用户可用）
+    - **sort**: 排序字段（updated_at、created_at、title）
+    - **order**: 排序方向（desc、asc）
+    - **cursor**: 上一页返回的 next_cursor（可选，提供时使用游标分页并忽略 page）
+    - **fields**: 返回字段，逗号分隔（可选，如 id,title,content；默认返回不含正文的列表视图）
     """
     try:
         # 构建查询参数
@@ -80,8 +98,13 @@ async def get_notes(
             page=page,
             size=size,
             tags=tags,
+            tag_mode=tag_mode,
             search=search,
-            user_id=user_id
+            user_id=user_id,
+            sort=sort,
+            order=order,
+            cursor=cursor,
+            fields=_split_fields(fields)
         )
         
         # 获取笔记列表
@@ -101,9 +124,172 @@ async def get_notes(
             detail="获取笔记列表失败"
         )
 
+# 注意：固定路径的路由必须注册在 /{note_id} 之前，否则会被当作笔记ID匹配
+@router.post("/batch", response_model=BatchOperationResponse, tags=["笔记"])
+async def batch_notes(
+    batch: NoteBatchRequest,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    批量创建/更新笔记
+    
+    - **items**: 操作列表，每项为 `{"op": "create", "title", "content", "tags"}`
+      或 `{"op": "update", "note_id", "title"?, "content"?, "tags"?, "change_description"?}`
+    - **atomic**: 为 true 时任一项无效则不执行任何操作（返回 400）
+    
+    有效项在同一事务中写入，`data.results` 按请求顺序给出每项的笔记ID和版本号，
+    `data.failed_items` 给出无效项的序号和原因。AI 摘要在后台生成。
+    """
+    try:
+        result = NoteService.batch_notes(db, batch, current_user)
+        
+        if result["failed"] and not result["success"]:
+            response.status_code = status.HTTP_400_BAD_REQUEST
+            return BatchOperationResponse(
+                code=400,
+                message="批量操作未执行：存在无效项" if batch.atomic else "批量操作全部失败",
+                status=ResponseStatus.ERROR,
+                data=result
+            )
+        if result["failed"]:
+            return BatchOperationResponse(
+                code=200,
+                message="批量操作部分成功",
+                status=ResponseStatus.WARNING,
+                data=result
+            )
+        return BatchOperationResponse(
+            code=200,
+            message="批量操作成功",
+            data=result
+        )
+        
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="批量操作失败"
+        )
+
+@router.get("/search", response_model=SuccessResponse, tags=["笔记"])
+async def search_notes(
+    query: str = Query(..., description="搜索关键词"),
+    tags: Optional[List[str]] = Query(None, description="标签筛选"),
+    tag_mode: str = Query("any", pattern="^(any|all)$", description="标签匹配方式"),
+    limit: int = Query(50, ge=1, le=200, description="限制返回数量"),
+    fields: Optional[str] = Query(None, description="返回字段（逗号分隔）"),
+    snippets: int = Query(2, ge=0, le=5, description="每条结果的正文摘录数量，0 表示不生成摘录"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    搜索笔记
+    
+    - **query**: 搜索关键词
+    - **tags**: 标签筛选（可选）
+    - **tag_mode**: 标签匹配方式（any 包含任一标签，all 包含全部标签）
+    - **limit**: 限制返回数量（1-200）
+    - **fields**: 返回字段，逗号分隔（可选，默认返回不含正文的列表视图）
+    - **snippets**: 每条结果的正文摘录数量（0-5，默认 2）；结果附带 title_highlights 和 snippets，
+      高亮区间为 [起始, 结束)，按字符计算
+    """
+    try:
+        # 搜索笔记
+        notes = NoteService.search_notes(
+            db, current_user, query, tags, limit, tag_mode, _split_fields(fields), snippets
+        )
+        
+        return SuccessResponse(
+            code=200,
+            message="搜索完成",
+            data={
+                "query": query,
+                "tags": tags,
+                "total_results": len(notes),
+                "results": notes
+            }
+        )
+        
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="搜索失败"
+        )
+
+@router.get("/suggest", response_model=SuccessResponse, tags=["笔记"])
+async def suggest_notes(
+    prefix: str = Query(..., min_length=1, max_length=200, description="标题或标签前缀"),
+    limit: int = Query(10, ge=1, le=50, description="笔记和标签各自最多返回的数量"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    按前缀补全笔记标题和标签（用于快速切换器，每次按键调用）
+    
+    - **prefix**: 前缀，不区分大小写；匹配标题开头或标题中任一单词的开头
+    - **limit**: 笔记和标签各自最多返回的数量（1-50）
+    """
+    try:
+        suggestions = NoteService.suggest_notes(db, current_user, prefix, limit)
+        
+        return SuccessResponse(
+            code=200,
+            message="获取补全成功",
+            data={"prefix": prefix, **suggestions}
+        )
+        
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="获取补全失败"
+        )
+
+@router.get("/duplicates", response_model=SuccessResponse, tags=["笔记"])
+async def get_duplicate_groups(
+    threshold: Optional[float] = Query(None, ge=0, le=1, description="相似度阈值（默认使用服务端配置）"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    查找当前用户所有近似重复的笔记组
+    
+    - **threshold**: 相似度阈值（0-1，正文特征集合的估计 Jaccard 相似度）
+    
+    只比较近似重复索引中至少有一段桶值相同的笔记对，不需要两两比较全部笔记。
+    """
+    try:
+        groups = NoteService.get_duplicate_groups(db, current_user, threshold)
+        
+        return SuccessResponse(
+            code=200,
+            message="查找重复笔记完成",
+            data={
+                "total_groups": len(groups),
+                "groups": groups
+            }
+        )
+        
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="查找重复笔记失败"
+        )
+
 @router.get("/{note_id}", response_model=SuccessResponse, tags=["笔记"])
 async def get_note(
     note_id: int,
+    response: Response,
+    format: str = Query("markdown", pattern="^(markdown|html)$", description="内容格式：markdown（原文）、html（附带服务端渲染的 HTML）"),
+    if_none_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -111,15 +297,28 @@ async def get_note(
     获取笔记详情
     
     - **note_id**: 笔记ID
+    - **format**: html 时在 content_html 中返回渲染后的 HTML（按内容哈希缓存）
+    
+    响应带有 ETag；请求携带 If-None-Match 且笔记未修改时返回 304，不加载笔记内容。
     """
     try:
-        # 获取笔记
-        note = NoteService.get_note_by_id(db, note_id, current_user)
+        # 先按行版本校验，未修改时直接返回 304
+        etag = NoteService.get_note_etag(db, note_id, current_user)
+        cached = not_modified(if_none_match, variant_etag(etag, "html") if format == "html" else etag)
+        if cached is not None:
+            return cached
+        
+        # 获取笔记（优先读取对象缓存）
+        note, etag = NoteService.get_note_out(db, note_id, current_user)
+        if format == "html":
+            note.content_html = await get_render_cache().render_async(note.content)
+            etag = variant_etag(etag, "html")
+        set_etag(response, etag)
         
         return SuccessResponse(
             code=200,
             message="获取笔记详情成功",
-            data=NoteOut.from_orm(note)
+            data=note
         )
         
     except HTTPException as e:
@@ -134,6 +333,8 @@ async def get_note(
 async def update_note(
     note_id: int,
     note_update: NoteUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -145,10 +346,15 @@ async def update_note(
     - **content**: 新内容（可选）
     - **tags**: 新标签列表（可选）
     - **change_description**: 变更描述（可选）
+    - **base_version**: 修改所基于的版本号（可选，也可以通过 If-Match 请求头携带笔记的 ETag）
+    
+    提供 base_version 或 If-Match 且笔记已被修改时，与此后的修改三方合并（互不重叠的修改），
+    无法合并时返回 412。响应带有更新后的 ETag。
     """
     try:
         # 更新笔记
-        note = NoteService.update_note(db, note_id, note_update, current_user)
+        note = NoteService.update_note(db, note_id, note_update, current_user, if_match)
+        set_etag(response, NoteService.note_etag(note))
         
         return SuccessResponse(
             code=200,
@@ -164,6 +370,45 @@ async def update_note(
             detail="笔记更新失败"
         )
 
+@router.patch("/{note_id}", response_model=SuccessResponse, tags=["笔记"])
+async def patch_note(
+    note_id: int,
+    note_patch: NotePatch,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    按补丁更新笔记（用于大笔记的自动保存，请求和响应都不包含完整内容）
+    
+    - **note_id**: 笔记ID
+    - **base_version**: 补丁所基于的版本号（笔记的 current_version）；笔记此后被修改时与当前内容三方合并，无法合并返回 412
+    - **ops**: 编辑操作列表，每项 {offset, delete, insert}，位置为基准内容中的字符位置，按升序且互不重叠（可选）
+    - **diff**: 统一格式差异（可选，与 ops 二选一）
+    - **title**: 新标题（可选）
+    - **tags**: 新标签列表（可选）
+    - **change_description**: 变更描述（可选）
+    
+    补丁无法应用时返回 422。成功时返回不含正文的笔记信息，其中 current_version 可作为下一个补丁的 base_version。
+    """
+    try:
+        note = NoteService.patch_note(db, note_id, note_patch, current_user)
+        set_etag(response, NoteService.note_etag(note))
+        
+        return SuccessResponse(
+            code=200,
+            message="笔记更新成功",
+            data=NoteListItemOut.from_orm(note)
+        )
+        
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="笔记更新失败"
+        )
+
 @router.delete("/{note_id}", response_model=SuccessResponse, tags=["笔记"])
 async def delete_note(
     note_id: int,
@@ -201,6 +446,8 @@ async def delete_note(
 async def update_note_tags(
     note_id: int,
     tag_update: NoteTagUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -209,10 +456,14 @@ async def update_note_tags(
     
     - **note_id**: 笔记ID
     - **tags**: 新的标签列表
+    - **base_version**: 修改所基于的版本号（可选，也可以通过 If-Match 请求头携带笔记的 ETag）
+    
+    笔记已被修改时，标签按集合与当前标签合并。响应带有更新后的 ETag。
     """
     try:
         # 更新标签
-        note = NoteService.update_note_tags(db, note_id, tag_update, current_user)
+        note = NoteService.update_note_tags(db, note_id, tag_update, current_user, if_match)
+        set_etag(response, NoteService.note_etag(note))
         
         return SuccessResponse(
             code=200,
@@ -228,20 +479,165 @@ async def update_note_tags(
             detail="标签更新失败"
         )
 
+@router.get("/{note_id}/duplicates", response_model=SuccessResponse, tags=["笔记"])
+async def get_note_duplicates(
+    note_id: int,
+    threshold: Optional[float] = Query(None, ge=0, le=1, description="相似度阈值（默认使用服务端配置）"),
+    limit: int = Query(20, ge=1, le=100, description="限制返回数量"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    查找与指定笔记近似重复的笔记
+    
+    - **note_id**: 笔记ID
+    - **threshold**: 相似度阈值（0-1，正文特征集合的估计 Jaccard 相似度）
+    - **limit**: 限制返回数量（1-100）
+    """
+    try:
+        duplicates = NoteService.get_note_duplicates(db, note_id, current_user, threshold, limit)
+        
+        return SuccessResponse(
+            code=200,
+            message="查找重复笔记完成",
+            data={
+                "note_id": note_id,
+                "total_results": len(duplicates),
+                "results": duplicates
+            }
+        )
+        
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="查找重复笔记失败"
+        )
+
+@router.get("/{note_id}/related", response_model=SuccessResponse, tags=["笔记"])
+async def get_related_notes(
+    note_id: int,
+    limit: int = Query(10, ge=1, le=50, description="限制返回数量"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    查找内容相关的笔记
+    
+    - **note_id**: 笔记ID
+    - **limit**: 限制返回数量（1-50）
+    
+    基于本地向量索引计算余弦相似度，不依赖外部服务。
+    """
+    try:
+        related = NoteService.get_related_notes(db, note_id, current_user, limit)
+        
+        return SuccessResponse(
+            code=200,
+            message="获取相关笔记成功",
+            data={
+                "note_id": note_id,
+                "total_results": len(related),
+                "results": related
+            }
+        )
+        
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="获取相关笔记失败"
+        )
+
+@router.get("/{note_id}/backlinks", response_model=SuccessResponse, tags=["笔记"])
+async def get_backlinks(
+    note_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    获取反向链接（内容中通过 [[标题]] 链接到该笔记的笔记）
+    
+    - **note_id**: 笔记ID
+    """
+    try:
+        backlinks = NoteService.get_backlinks(db, note_id, current_user)
+        
+        return SuccessResponse(
+            code=200,
+            message="获取反向链接成功",
+            data={
+                "note_id": note_id,
+                "total_results": len(backlinks),
+                "results": backlinks
+            }
+        )
+        
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="获取反向链接失败"
+        )
+
+@router.get("/{note_id}/graph", response_model=SuccessResponse, tags=["笔记"])
+async def get_link_graph(
+    note_id: int,
+    depth: int = Query(1, ge=1, le=3, description="扩展层数"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    获取笔记周围的链接关系图
+    
+    - **note_id**: 笔记ID
+    - **depth**: 沿出链和反向链接扩展的层数（1-3）
+    
+    返回图中的笔记（nodes）、笔记之间的链接（edges）以及该笔记链接到的不存在的标题（missing）。
+    """
+    try:
+        graph = NoteService.get_link_graph(db, note_id, current_user, depth)
+        
+        return SuccessResponse(
+            code=200,
+            message="获取链接关系图成功",
+            data={"note_id": note_id, **graph}
+        )
+        
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="获取链接关系图失败"
+        )
+
 @router.get("/{note_id}/versions", response_model=SuccessResponse, tags=["笔记"])
 async def get_note_versions(
     note_id: int,
+    page: int = Query(1, ge=1, description="页码"),
+    size: int = Query(20, ge=1, le=100, description="每页大小"),
+    cursor: Optional[str] = Query(None, description="分页游标"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
-    获取笔记版本历史
+    获取笔记版本历史（按版本号倒序，只返回元数据）
     
     - **note_id**: 笔记ID
+    - **page**: 页码（从1开始）
+    - **size**: 每页大小（1-100）
+    - **cursor**: 上一页返回的 next_cursor（可选，提供时使用游标分页并忽略 page）
+    
+    每个版本包含版本号、变更描述、创建时间、内容大小和增删行数，
+    完整内容通过 `GET /notes/{note_id}/versions/{version_number}` 获取。
     """
     try:
         # 获取版本历史
-        versions = NoteService.get_note_versions(db, note_id, current_user)
+        versions = NoteService.get_note_versions(db, note_id, current_user, page, size, cursor)
         
         return SuccessResponse(
             code=200,
@@ -261,6 +657,7 @@ async def get_note_versions(
 async def get_note_version(
     note_id: int,
     version_number: int,
+    format: str = Query("markdown", pattern="^(markdown|html)$", description="内容格式：markdown（原文）、html（附带服务端渲染的 HTML）"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -269,15 +666,18 @@ async def get_note_version(
     
     - **note_id**: 笔记ID
     - **version_number**: 版本号
+    - **format**: html 时在 content_html 中返回渲染后的 HTML（与内容相同的笔记共享缓存）
     """
     try:
         # 获取指定版本
-        version = NoteService.get_note_version(db, note_id, version_number, current_user)
+        version = NoteVersionOut.from_orm(NoteService.get_note_version(db, note_id, version_number, current_user))
+        if format == "html":
+            version.content_html = await get_render_cache().render_async(version.content)
         
         return SuccessResponse(
             code=200,
             message="获取指定版本成功",
-            data=NoteVersionOut.from_orm(version)
+            data=version
         )
         
     except HTTPException as e:
@@ -288,10 +688,51 @@ async def get_note_version(
             detail="获取指定版本失败"
         )
 
+@router.get("/{note_id}/versions/{from_version}/diff/{to_version}", response_model=SuccessResponse, tags=["笔记"])
+async def get_version_diff(
+    note_id: int,
+    from_version: int,
+    to_version: int,
+    mode: str = Query("line", pattern="^(line|word)$", description="差异粒度：line（按行）、word（按单词）"),
+    context: int = Query(3, ge=0, le=20, description="每个差异块的上下文行数"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    比较两个版本的内容
+
+    - **note_id**: 笔记ID
+    - **from_version**: 原版本号
+    - **to_version**: 新版本号
+    - **mode**: line 返回统一格式差异行，word 在变更行内按单词给出增删片段
+    - **context**: 上下文行数（0-20）
+
+    响应只包含变更部分及其上下文，大小与改动量成正比。
+    """
+    try:
+        diff = NoteService.get_version_diff(db, note_id, from_version, to_version, current_user, mode, context)
+
+        return SuccessResponse(
+            code=200,
+            message="获取版本差异成功",
+            data=diff
+        )
+
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="获取版本差异失败"
+        )
+
 @router.post("/{note_id}/versions/{version_number}/restore", response_model=SuccessResponse, tags=["笔记"])
 async def restore_note_version(
     note_id: int,
     version_number: int,
+    response: Response,
+    base_version: Optional[int] = Query(None, ge=0, description="要求笔记当前的版本号"),
+    if_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -300,12 +741,16 @@ async def restore_note_version(
     
     - **note_id**: 笔记ID
     - **version_number**: 要恢复的版本号
+    - **base_version**: 要求笔记当前的版本号（可选，也可以通过 If-Match 请求头携带笔记的 ETag），不符时返回 412
     
     注意：此操作将创建一个新的版本记录
     """
     try:
         # 恢复版本
-        note = NoteService.restore_note_version(db, note_id, version_number, current_user)
+        note = NoteService.restore_note_version(
+            db, note_id, version_number, current_user, if_match, base_version
+        )
+        set_etag(response, NoteService.note_etag(note))
         
         return SuccessResponse(
             code=200,
@@ -323,15 +768,25 @@ async def restore_note_version(
 
 @router.get("/tags/all", response_model=SuccessResponse, tags=["笔记"])
 async def get_user_tags(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     获取用户的所有标签
+    
+    响应带有 ETag；标签未变化时对 If-None-Match 返回 304。
     """
     try:
+        etag = NoteService.get_tags_etag(db, current_user)
+        cached = not_modified(if_none_match, etag)
+        if cached is not None:
+            return cached
+        
         # 获取用户标签
         tags = NoteService.get_user_tags(db, current_user)
+        set_etag(response, etag)
         
         return SuccessResponse(
             code=200,
@@ -347,34 +802,31 @@ async def get_user_tags(
             detail="获取标签列表失败"
         )
 
-@router.get("/search", response_model=SuccessResponse, tags=["笔记"])
-async def search_notes(
-    query: str = Query(..., description="搜索关键词"),
-    tags: Optional[List[str]] = Query(None, description="标签筛选"),
-    limit: int = Query(50, ge=1, le=200, description="限制返回数量"),
+@router.get("/tags/counts", response_model=SuccessResponse, tags=["笔记"])
+async def get_user_tag_counts(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
-    搜索笔记
+    获取用户每个标签的笔记数量（按数量降序）
     
-    - **query**: 搜索关键词
-    - **tags**: 标签筛选（可选）
-    - **limit**: 限制返回数量（1-200）
+    响应带有 ETag；标签计数未变化时对 If-None-Match 返回 304。
     """
     try:
-        # 搜索笔记
-        notes = NoteService.search_notes(db, current_user, query, tags, limit)
+        etag = NoteService.get_tags_etag(db, current_user, "tag-counts")
+        cached = not_modified(if_none_match, etag)
+        if cached is not None:
+            return cached
+        
+        tag_counts = NoteService.get_user_tag_counts(db, current_user)
+        set_etag(response, etag)
         
         return SuccessResponse(
             code=200,
-            message="搜索完成",
-            data={
-                "query": query,
-                "tags": tags,
-                "total_results": len(notes),
-                "results": notes
-            }
+            message="获取标签统计成功",
+            data=tag_counts
         )
         
     except HTTPException as e:
@@ -382,5 +834,5 @@ async def search_notes(
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="搜索失败"
-        ) 
\ No newline at end of file
+            detail="获取标签统计失败"
+        )
@@ -85,6 +85,60 @@ class Settings(BaseSettings):
     
     # 缓存配置
     CACHE_TTL: int = 3600  # 缓存生存时间（秒）
+    CACHE_ENABLED: bool = True                 # 是否启用笔记/用户/标签/文件对象缓存（需要 Redis）
+    CACHE_LOCAL_SIZE: int = 4096               # 每个进程本地 LRU 层的条目数（0 表示只使用 Redis 层）
+    CACHE_LOCAL_TTL: int = 60                  # 本地层过期时间（秒），限制错过失效广播时的不一致时长
+    
+    # 全文搜索配置
+    SEARCH_INDEX_ENABLED: bool = True          # 是否启用笔记全文倒排索引
+    SEARCH_INDEX_DIR: str = "./search_index"   # 索引段和增量日志目录（所有工作进程共享）
+    SEARCH_INDEX_COMPACT_LOG_BYTES: int = 64 * 1024 * 1024  # 增量日志超过该大小时自动合并为新段（0 表示不按大小合并）
+    SEARCH_INDEX_COMPACT_LOG_ENTRIES: int = 50000  # 增量日志超过该条目数时自动合并为新段（0 表示不按条目数合并）
+    SEARCH_BACKEND: str = "auto"               # 索引未就绪时的检索方式：auto（按数据库方言使用原生全文检索）、like
+    SEARCH_PG_TS_CONFIG: str = "simple"        # PostgreSQL 全文检索配置（中文可使用 zhparser 等分词配置）
+    SEARCH_SNIPPET_LENGTH: int = 160           # 搜索结果摘录片段的长度（字符）
+    SEARCH_SNIPPET_SCAN_CHARS: int = 20000     # 生成摘录时最多扫描正文的前多少个字符
+    
+    # 相关笔记向量索引配置（需要 NumPy）
+    RELATED_INDEX_ENABLED: bool = True         # 是否启用相关笔记向量索引（需要 NumPy）
+    RELATED_INDEX_DIR: str = "./related_index" # 各用户向量文件目录（所有工作进程共享）
+    
+    # 标题和标签前缀补全配置
+    SUGGEST_MAX_USERS: int = 1000              # 每个进程在内存中保留补全索引的用户数
+    SUGGEST_TTL: int = 60                      # 用户补全索引重新从数据库加载的间隔（秒），限制其他进程写入的可见延迟
+    
+    # Markdown 渲染缓存配置
+    RENDER_CACHE_DIR: str = "./render_cache"   # 渲染结果磁盘缓存目录（为空表示只使用内存层）
+    RENDER_CACHE_SIZE: int = 256               # 每个进程内存 LRU 层的条目数
+    RENDER_WORKERS: int = 2                    # 渲染进程数（0 表示在线程池中渲染）
+    
+    # 近似重复检测配置
+    DUPLICATE_THRESHOLD: float = 0.8           # 正文特征集合的估计 Jaccard 相似度达到多少视为近似重复（LSH 分段对 0.7 以上的相似度召回较好）
+    
+    # AI 摘要任务队列配置
+    SUMMARY_ASYNC_ENABLED: bool = True         # 是否由后台任务生成摘要（关闭时在请求中同步生成）
+    SUMMARY_WORKERS: int = 2                   # 每个应用进程启动的摘要工作线程数（0 表示只由 manage.py summary-worker 处理）
+    SUMMARY_POLL_INTERVAL: float = 2.0         # 队列为空时的轮询间隔（秒），也是失败重试退避的基数
+    SUMMARY_JOB_LEASE_SECONDS: int = 300       # 任务处理租约（秒），超时未完成的任务会被重新领取
+    SUMMARY_MAX_ATTEMPTS: int = 3              # 任务最大尝试次数
+    SUMMARY_CHANGE_THRESHOLD: int = 8          # 标题和内容的 SimHash 指纹相对上次生成摘要时至少变化多少位（0-64）才重新生成摘要，0 表示每次修改都重新生成
+    
+    # AI 摘要缓存配置
+    SUMMARY_CACHE_ENABLED: bool = True         # 是否缓存大模型生成的摘要
+    SUMMARY_CACHE_SIZE: int = 1024             # 进程内 LRU 缓存条目数
+    SUMMARY_CACHE_PERSISTENT: bool = True      # 是否使用数据库持久层（summary_cache 表）
+    
+    # 笔记版本存储配置
+    NOTE_VERSION_SNAPSHOT_INTERVAL: int = 20   # 每隔多少个版本保存一次完整快照，其余版本保存相对快照的增量（1 表示全部保存快照）
+    NOTE_BATCH_MAX_ITEMS: int = 500            # /notes/batch 单次请求最多包含的操作数
+    NOTE_AUTO_MERGE: bool = True               # 带 If-Match/base_version 的修改基于旧版本时，是否尝试三方合并互不重叠的修改（否则直接返回 412）
+    
+    # 笔记版本保留策略（最新版本和最近的快照始终保留）
+    VERSION_KEEP_ALL_DAYS: int = 7             # 最近多少天内的版本全部保留
+    VERSION_KEEP_HOURLY_DAYS: int = 30         # 此后到多少天内每小时只保留最后一个版本，更早的每天只保留最后一个版本
+    VERSION_COMPACT_INTERVAL: int = 3600       # 后台清理间隔（秒），0 表示不在应用进程中清理（可用 manage.py compact-versions）
+    VERSION_COMPACT_BATCH: int = 100           # 每批扫描的笔记数
+    VERSION_COMPACT_LEASE_SECONDS: int = 600   # 清理租约时长（秒），每批续期；多个进程中同时只有一个在清理
     
     @validator("ENVIRONMENT")
     def validate_environment(cls, v):
@@ -101,6 +155,14 @@ class Settings(BaseSettings):
             raise ValueError("生产环境不能启用调试模式")
         return v
     
+    @validator("SEARCH_BACKEND")
+    def validate_search_backend(cls, v):
+        """验证检索后端配置"""
+        allowed = ["auto", "like"]
+        if v not in allowed:
+            raise ValueError("SEARCH_BACKEND 必须是 auto 或 like 之一")
+        return v
+    
     @validator("CORS_ORIGINS", pre=True)
     def validate_cors_origins(cls, v):
         """验证 CORS 源配置"""
@@ -11,9 +11,11 @@ MindLink 数据库配置模块
 import os
 from typing import Generator
 from sqlalchemy import create_engine, MetaData, text
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool
+from sqlalchemy.sql import functions
 import logging
 
 # 配置日志
@@ -58,6 +60,17 @@ else:
     )
     logger.info("使用 PostgreSQL 数据库")
 
+# SQLite 以文本保存时间：CURRENT_TIMESTAMP 不带微秒，而 SQLAlchemy 写入的值带微秒，
+# 两种格式混在一起时按文本比较和排序会出错。这里让 func.now() 生成与 SQLAlchemy 相同的
+# "YYYY-MM-DD HH:MM:SS.ffffff" 格式，排序列可以直接使用 (user_id, 排序键, id) 复合索引。
+SQLITE_TIMESTAMP_LENGTH = 26
+
+
+@compiles(functions.now, "sqlite")
+def _sqlite_now(element, compiler, **kw):
+    return "strftime('%Y-%m-%d %H:%M:%f000', 'now')"
+
+
 # 创建数据库会话工厂
 # 这是创建数据库会话的标准方式
 SessionLocal = sessionmaker(
@@ -101,6 +114,62 @@ def get_db() -> Generator[Session, None, None]:
         logger.debug("关闭数据库会话")
         db.close()
 
+def _add_missing_columns():
+    """
+    为已存在的表补齐模型中新增的列
+    
+    只处理可空或带服务端默认值的列，已有数据行会得到默认值。
+    """
+    from sqlalchemy import inspect
+    
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_columns = {col["name"] for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            if not column.nullable and column.server_default is None:
+                logger.warning(f"无法自动添加非空且无默认值的列: {table.name}.{column.name}")
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+            if column.server_default is not None:
+                default = column.server_default.arg
+                ddl += " DEFAULT '{}'".format(default) if isinstance(default, str) else " DEFAULT {}".format(default)
+            if not column.nullable:
+                ddl += " NOT NULL"
+            with engine.begin() as connection:
+                connection.execute(text(ddl))
+            logger.info(f"已添加列: {table.name}.{column.name}")
+
+def _normalize_sqlite_timestamps(bind=None):
+    """
+    把 SQLite 中不带微秒的历史时间值补齐为带微秒的格式
+    
+    早期数据由 CURRENT_TIMESTAMP 生成，格式与 SQLAlchemy 写入的值不同。
+    
+    Args:
+        bind: 数据库引擎（默认使用全局引擎）
+    """
+    from sqlalchemy import DateTime, inspect
+    
+    bind = bind if bind is not None else engine
+    existing_tables = set(inspect(bind).get_table_names())
+    with bind.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            for column in table.columns:
+                if not isinstance(column.type, DateTime):
+                    continue
+                connection.execute(text(
+                    f"UPDATE {table.name} SET {column.name} = substr({column.name} || '.000000', 1, :length) "
+                    f"WHERE length({column.name}) < :length"
+                ), {"length": SQLITE_TIMESTAMP_LENGTH})
+
 def init_db():
     """
     初始化数据库
@@ -111,6 +180,24 @@ def init_db():
         logger.info("开始初始化数据库...")
         # 创建所有表
         Base.metadata.create_all(bind=engine)
+        
+        # create_all 不会修改已存在的表，这里补齐新增的列和索引
+        _add_missing_columns()
+        if engine.dialect.name == "sqlite":
+            _normalize_sqlite_timestamps()
+        
+        # 逐个补建索引（如分页用的复合索引）
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                try:
+                    index.create(bind=engine, checkfirst=True)
+                except Exception as e:
+                    # 唯一索引可能因历史重复数据无法创建，不阻止启动
+                    logger.warning(f"创建索引 {index.name} 失败，请先修复重复数据: {str(e)}")
+        
+        # 创建数据库原生全文检索对象（依赖已创建的表）
+        from app.services.search_backends import setup_search_backends
+        setup_search_backends(engine)
         logger.info("数据库初始化完成")
     except Exception as e:
         logger.error(f"数据库初始化失败: {str(e)}")
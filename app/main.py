@@ -24,6 +24,13 @@ from datetime import datetime
 from app.api.auth import auth_router
 from app.api.notes import notes_router
 from app.api.files import files_router
+from app.services.summary_queue import start_summary_workers, stop_summary_workers
+from app.services.summary_cache import get_summary_cache
+from app.services.object_cache import get_object_cache, stop_object_cache
+from app.services.version_service import start_version_compactor, stop_version_compactor
+from app.services.render_cache import stop_render_workers
+from app.services.search_index import get_search_index
+from app.utils.metrics import get_metrics
 
 # 配置日志
 logging.basicConfig(
@@ -120,6 +127,15 @@ async def health_check():
         "version": "1.0.0"
     }
 
+# 运行指标端点
+@app.get("/metrics", tags=["系统"])
+async def get_runtime_metrics():
+    """当前进程的运行指标（缓存命中率等）"""
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "metrics": get_metrics().snapshot()
+    }
+
 # 根路径
 @app.get("/", tags=["系统"])
 async def root():
@@ -143,6 +159,26 @@ async def startup_event():
     """应用启动时执行的操作"""
     logger.info("MindLink 应用正在启动...")
     # 这里可以添加数据库连接、Redis 连接等初始化代码
+    
+    # 初始化 AI 摘要缓存（注册缓存指标）
+    get_summary_cache()
+    
+    # 连接对象缓存并订阅失效广播（Redis 不可用时不启用）
+    get_object_cache()
+    
+    # 启动 AI 摘要工作线程
+    start_summary_workers()
+    
+    # 启动历史版本清理线程
+    start_version_compactor()
+
+    # 全文索引尚未生成时提示运维执行重建，此前搜索会降级为数据库查询
+    search_index = get_search_index()
+    if search_index is not None and not search_index.is_ready():
+        logger.warning(
+            "全文索引尚未生成（{}），搜索将降级为数据库全文检索或模糊匹配，"
+            "请执行 python manage.py reindex-search".format(search_index.index_dir)
+        )
 
 # 应用关闭事件
 @app.on_event("shutdown")
@@ -150,6 +186,18 @@ async def shutdown_event():
     """应用关闭时执行的操作"""
     logger.info("MindLink 应用正在关闭...")
     # 这里可以添加资源清理代码
+    
+    # 停止 AI 摘要工作线程（等待当前任务完成）
+    stop_summary_workers()
+    
+    # 停止历史版本清理线程
+    stop_version_compactor()
+    
+    # 停止对象缓存的失效订阅
+    stop_object_cache()
+    
+    # 停止 Markdown 渲染进程
+    stop_render_workers()
 
 if __name__ == "__main__":
     # 开发环境直接运行
@@ -11,13 +11,24 @@ from .user import (
 )
 
 from .note import (
-    Note, NoteVersion, NoteCreate, NoteUpdate, NoteTagUpdate,
-    NoteOut, NoteWithUser, NoteVersionOut, NoteQueryParams
+    Note, NoteVersion, NoteCreate, NoteUpdate, NotePatch, NotePatchOp, NoteTagUpdate,
+    NoteBatchItem, NoteBatchRequest, NoteOut, NoteListItemOut, NoteSearchItemOut, SearchSnippet, NoteWithUser, NoteVersionOut, NoteVersionMetaOut,
+    NoteVersionDiffOut, DiffHunk, DiffSegment, NoteQueryParams
 )
 
+from .note_tag import NoteTag
+from .note_link import NoteLink
+from .note_minhash import NoteMinHash, NoteLSHBucket
+
+from .stats import UserStats, UserStatsOut
+
+from .summary_job import SummaryJob
+from .summary_cache import SummaryCacheEntry
+from .job_lease import JobLease
+
 from .common import (
     BaseResponse, SuccessResponse, ErrorResponse, ResponseStatus,
-    PaginationInfo, PaginatedResponse, HealthCheckResponse,
+    PaginationInfo, PaginatedResponse, CursorPaginatedResponse, HealthCheckResponse,
     StatisticsResponse, BatchOperationResponse, FileUploadResponse,
     SearchResponse
 )
@@ -29,12 +40,24 @@ __all__ = [
     "UserLogin", "Token", "TokenData",
     
     # 笔记相关模型
-    "Note", "NoteVersion", "NoteCreate", "NoteUpdate", "NoteTagUpdate",
-    "NoteOut", "NoteWithUser", "NoteVersionOut", "NoteQueryParams",
+    "Note", "NoteVersion", "NoteCreate", "NoteUpdate", "NotePatch", "NotePatchOp", "NoteTagUpdate",
+    "NoteBatchItem", "NoteBatchRequest",
+    "NoteOut", "NoteListItemOut", "NoteSearchItemOut", "SearchSnippet", "NoteWithUser", "NoteVersionOut", "NoteVersionMetaOut",
+    "NoteVersionDiffOut", "DiffHunk", "DiffSegment", "NoteQueryParams",
+    "NoteTag", "NoteLink", "NoteMinHash", "NoteLSHBucket",
+    
+    # 统计相关模型
+    "UserStats", "UserStatsOut",
+    
+    # 摘要任务模型
+    "SummaryJob", "SummaryCacheEntry",
+    
+    # 后台任务租约
+    "JobLease",
     
     # 通用模型
     "BaseResponse", "SuccessResponse", "ErrorResponse", "ResponseStatus",
-    "PaginationInfo", "PaginatedResponse", "HealthCheckResponse",
+    "PaginationInfo", "PaginatedResponse", "CursorPaginatedResponse", "HealthCheckResponse",
     "StatisticsResponse", "BatchOperationResponse", "FileUploadResponse",
     "SearchResponse"
 ] 
\ No newline at end of file
@@ -62,6 +62,7 @@ class PaginationInfo(BaseModel):
     size: int = Field(..., description="每页大小")
     total: int = Field(..., description="总记录数")
     pages: int = Field(..., description="总页数")
+    next_cursor: Optional[str] = Field(None, description="下一页游标（可用于切换到游标分页）")
     
     @property
     def has_next(self) -> bool:
@@ -99,6 +100,23 @@ class PaginatedResponse(BaseModel, Generic[T]):
             }
         }
 
+class CursorPaginatedResponse(BaseModel, Generic[T]):
+    """游标分页响应模型"""
+    items: list[T] = Field(..., description="数据列表")
+    size: int = Field(..., description="每页大小")
+    next_cursor: Optional[str] = Field(None, description="下一页游标，为空表示没有更多数据")
+    has_more: bool = Field(..., description="是否还有更多数据")
+    
+    class Config:
+        json_schema_extra  = {
+            "example": {
+                "items": [],
+                "size": 20,
+                "next_cursor": "eyJzIjoidXBkYXRlZF9hdCIsIm8iOiJkZXNjIiwiayI6eyJkdCI6IjIwMjQtMDEtMDFUMDA6MDA6MDAifSwiaWQiOjQyfQ",
+                "has_more": True
+            }
+        }
+
 # 健康检查响应模型
 class HealthCheckResponse(BaseResponse):
     """健康检查响应模型"""
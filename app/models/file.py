@@ -7,7 +7,7 @@ MindLink 文件数据模型
 - 文件相关的数据验证
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from pydantic import BaseModel, Field
@@ -30,8 +30,18 @@ class File(Base):
     file_hash = Column(String(64), nullable=True, index=True, comment="文件哈希值，用于去重")
     description = Column(Text, nullable=True, comment="文件描述")
     is_public = Column(Boolean, default=False, comment="是否公开")
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="创建时间")
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), comment="更新时间")
+    created_at = Column(DateTime(timezone=True), default=func.now(), server_default=func.now(), comment="创建时间")
+    updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now(), comment="更新时间")
+    
+    # 列表排序使用的复合索引（支持键集分页）
+    __table_args__ = (
+        Index("ix_files_user_created_id", "user_id", "created_at", "id"),
+        Index("ix_files_user_updated_id", "user_id", "updated_at", "id"),
+        Index("ix_files_user_filename_id", "user_id", "filename", "id"),
+        Index("ix_files_public_created_id", "is_public", "created_at", "id"),
+        Index("ix_files_public_updated_id", "is_public", "updated_at", "id"),
+        Index("ix_files_public_filename_id", "is_public", "filename", "id"),
+    )
     
     # 关联关系
     user = relationship("User", backref="files")
@@ -0,0 +1,28 @@
+"""
+MindLink 后台任务租约数据模型
+
+包含：
+- SQLAlchemy 数据库模型（JobLease）
+
+每个需要全局单实例运行的后台任务（如版本清理）对应一行租约记录。
+多个应用进程（uvicorn 工作进程、定时任务）通过条件 UPDATE 争用租约，
+同一时间只有持有未过期租约的进程执行任务；进程崩溃后租约过期，由其他进程接管。
+"""
+
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+# SQLAlchemy 数据库模型
+class JobLease(Base):
+    """后台任务租约模型"""
+    __tablename__ = "job_leases"
+
+    name = Column(String(50), primary_key=True, comment="任务名称")
+    holder = Column(String(100), nullable=True, comment="持有租约的进程标识")
+    expires_at = Column(DateTime, nullable=True, comment="租约到期时间（UTC）")
+    updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now(), comment="更新时间")
+
+    def __repr__(self):
+        return f"<JobLease(name='{self.name}', holder='{self.holder}', expires_at={self.expires_at})>"
@@ -7,14 +7,19 @@ MindLink 笔记数据模型
 - 笔记相关的数据验证
 """
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, ARRAY, JSON
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, ForeignKey, ARRAY, JSON, Index, LargeBinary
+from sqlalchemy.dialects.mysql import LONGBLOB
+from sqlalchemy.sql import func, text
 from sqlalchemy.orm import relationship
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Annotated, Optional, List
 from datetime import datetime
 
 from app.core.database import Base
+from app.models.note_tag import MAX_TAG_LENGTH
+
+# 标签（长度受 note_tags 倒排表的列宽限制）
+TagName = Annotated[str, Field(max_length=MAX_TAG_LENGTH)]
 
 # SQLAlchemy 数据库模型
 class Note(Base):
@@ -25,10 +30,21 @@ class Note(Base):
     title = Column(String(200), nullable=False, comment="笔记标题")
     content = Column(Text, nullable=False, comment="笔记内容（Markdown格式）")
     summary = Column(Text, nullable=True, comment="AI生成的摘要")
+    summary_status = Column(String(20), nullable=False, default="ready", server_default="ready", comment="摘要状态：pending、ready、failed")
+    summary_fingerprint = Column(BigInteger, nullable=True, comment="最近一次请求生成摘要时标题和内容的 SimHash 指纹")
     tags = Column(JSON, default=list, comment="标签列表")
+    current_version = Column(Integer, nullable=False, default=0, server_default="0", comment="最新版本号（随版本创建原子递增）")
+    row_version = Column(Integer, nullable=False, default=1, server_default="1", onupdate=text("row_version + 1"), comment="行版本（任何修改都递增，用于 ETag）")
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, comment="作者ID")
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="创建时间")
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), comment="更新时间")
+    created_at = Column(DateTime(timezone=True), default=func.now(), server_default=func.now(), comment="创建时间")
+    updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now(), comment="更新时间")
+    
+    # 列表排序使用的复合索引（支持键集分页）
+    __table_args__ = (
+        Index("ix_notes_user_updated_id", "user_id", "updated_at", "id"),
+        Index("ix_notes_user_created_id", "user_id", "created_at", "id"),
+        Index("ix_notes_user_title_id", "user_id", "title", "id"),
+    )
     
     # 关联关系
     user = relationship("User", back_populates="notes")
@@ -44,12 +60,23 @@ class NoteVersion(Base):
     id = Column(Integer, primary_key=True, index=True, comment="版本ID")
     note_id = Column(Integer, ForeignKey("notes.id"), nullable=False, comment="笔记ID")
     title = Column(String(200), nullable=False, comment="版本标题")
-    content = Column(Text, nullable=False, comment="版本内容")
+    content = Column(Text, nullable=False, comment="版本内容（仅 storage=full 的历史数据使用，压缩存储时为空字符串）")
     summary = Column(Text, nullable=True, comment="版本摘要")
     tags = Column(JSON, default=list, comment="版本标签")
     version_number = Column(Integer, nullable=False, comment="版本号")
     change_description = Column(String(500), nullable=True, comment="变更描述")
     created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="版本创建时间")
+    storage = Column(String(10), nullable=False, default="full", server_default="full", comment="存储方式：full（原文）、snapshot（压缩快照）、delta（相对快照的压缩增量）")
+    base_version = Column(Integer, nullable=True, comment="增量的基准快照版本号")
+    payload = Column(LargeBinary().with_variant(LONGBLOB, "mysql"), nullable=True, comment="压缩后的快照或增量")
+    content_size = Column(Integer, nullable=True, comment="版本内容大小（字节）")
+    lines_added = Column(Integer, nullable=True, comment="相对上一版本新增的行数")
+    lines_removed = Column(Integer, nullable=True, comment="相对上一版本删除的行数")
+    
+    # 同一笔记的版本号唯一，并发写入不会产生重复版本
+    __table_args__ = (
+        Index("ux_note_versions_note_version", "note_id", "version_number", unique=True),
+    )
     
     # 关联关系
     note = relationship("Note", back_populates="versions")
@@ -62,7 +89,7 @@ class NoteCreate(BaseModel):
     """笔记创建请求模型"""
     title: str = Field(..., min_length=1, max_length=200, description="笔记标题")
     content: str = Field(..., description="笔记内容")  # 移除min_length限制以更好地支持特殊字符
-    tags: Optional[List[str]] = Field(default=[], description="标签列表")
+    tags: Optional[List[TagName]] = Field(default=[], description="标签列表")
     
     class Config:
         json_schema_extra = {
@@ -82,8 +109,9 @@ class NoteUpdate(BaseModel):
     """笔记更新请求模型"""
     title: Optional[str] = Field(None, min_length=1, max_length=200, description="笔记标题")
     content: Optional[str] = Field(None, description="笔记内容")  # 移除min_length限制以更好地支持特殊字符
-    tags: Optional[List[str]] = Field(None, description="标签列表")
+    tags: Optional[List[TagName]] = Field(None, description="标签列表")
     change_description: Optional[str] = Field(None, max_length=500, description="变更描述")
+    base_version: Optional[int] = Field(None, ge=0, description="修改所基于的笔记版本号（current_version），不是最新版本时尝试合并或返回 412")
     
     class Config:
         json_schema_extra = {
@@ -100,9 +128,34 @@ class NoteUpdate(BaseModel):
             str: lambda v: v  # 确保字符串直接传递，不进行额外编码处理
         }
 
+class NotePatchOp(BaseModel):
+    """文本编辑操作：删除基准内容 offset 处的 delete 个字符，再插入 insert"""
+    offset: int = Field(..., ge=0, description="基准内容中的位置（字符）")
+    delete: int = Field(0, ge=0, description="删除的字符数")
+    insert: str = Field("", description="插入的文本")
+
+class NotePatch(BaseModel):
+    """笔记补丁更新请求模型（只提交变化部分，ops 和 diff 二选一）"""
+    base_version: int = Field(..., ge=0, description="补丁所基于的笔记版本号（current_version），不是最新版本时尝试合并或返回 412")
+    ops: Optional[List[NotePatchOp]] = Field(None, description="按位置升序、互不重叠的编辑操作")
+    diff: Optional[str] = Field(None, description="统一格式差异（unified diff）")
+    title: Optional[str] = Field(None, min_length=1, max_length=200, description="笔记标题")
+    tags: Optional[List[TagName]] = Field(None, description="标签列表")
+    change_description: Optional[str] = Field(None, max_length=500, description="变更描述")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "base_version": 3,
+                "ops": [{"offset": 120, "delete": 5, "insert": "新的文字"}],
+                "change_description": "自动保存"
+            }
+        }
+
 class NoteTagUpdate(BaseModel):
     """笔记标签更新请求模型"""
-    tags: List[str] = Field(..., description="新的标签列表")
+    tags: List[TagName] = Field(..., description="新的标签列表")
+    base_version: Optional[int] = Field(None, ge=0, description="修改所基于的笔记版本号（current_version），不是最新版本时合并标签或返回 412")
     
     class Config:
         json_schema_extra  = {
@@ -111,6 +164,31 @@ class NoteTagUpdate(BaseModel):
             }
         }
 
+class NoteBatchItem(BaseModel):
+    """批量操作中的单项（创建或更新）"""
+    op: str = Field(..., pattern="^(create|update)$", description="操作类型：create、update")
+    note_id: Optional[int] = Field(None, description="要更新的笔记ID（update 必填）")
+    title: Optional[str] = Field(None, min_length=1, max_length=200, description="笔记标题（create 必填）")
+    content: Optional[str] = Field(None, description="笔记内容（create 必填）")
+    tags: Optional[List[TagName]] = Field(None, description="标签列表")
+    change_description: Optional[str] = Field(None, max_length=500, description="变更描述")
+
+class NoteBatchRequest(BaseModel):
+    """笔记批量创建/更新请求模型"""
+    items: List[NoteBatchItem] = Field(..., min_length=1, description="操作列表（按顺序执行）")
+    atomic: bool = Field(False, description="为 true 时任一项无效则不执行任何操作")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "items": [
+                    {"op": "create", "title": "导入的笔记", "content": "# 内容", "tags": ["导入"]},
+                    {"op": "update", "note_id": 1, "content": "# 离线修改的内容"}
+                ],
+                "atomic": False
+            }
+        }
+
 # Pydantic 响应模型
 class NoteOut(BaseModel):
     """笔记信息响应模型"""
@@ -118,10 +196,13 @@ class NoteOut(BaseModel):
     title: str
     content: str
     summary: Optional[str] = None
+    summary_status: str = "ready"
     tags: List[str]
+    current_version: int = 0
     user_id: int
     created_at: datetime
     updated_at: Optional[datetime] = None
+    content_html: Optional[str] = Field(None, description="渲染后的 HTML（format=html 时返回）")
     
     class Config:
         from_attributes = True
@@ -131,13 +212,58 @@ class NoteOut(BaseModel):
                 "title": "我的第一篇笔记",
                 "content": "# 欢迎使用 MindLink\n\n这是一个支持 Markdown 的笔记系统。",
                 "summary": "介绍 MindLink 笔记系统",
+                "summary_status": "ready",
                 "tags": ["介绍", "Markdown"],
+                "current_version": 1,
                 "user_id": 1,
                 "created_at": "2024-01-01T00:00:00Z",
                 "updated_at": "2024-01-01T00:00:00Z"
             }
         }
 
+class NoteListItemOut(BaseModel):
+    """笔记列表项响应模型（列表和搜索的默认视图，不含正文）"""
+    id: int
+    title: str
+    summary: Optional[str] = None
+    summary_status: str = "ready"
+    tags: List[str]
+    current_version: int = 0
+    user_id: int
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+        json_schema_extra  = {
+            "example": {
+                "id": 1,
+                "title": "我的第一篇笔记",
+                "summary": "介绍 MindLink 笔记系统",
+                "summary_status": "ready",
+                "tags": ["介绍", "Markdown"],
+                "current_version": 1,
+                "user_id": 1,
+                "created_at": "2024-01-01T00:00:00Z",
+                "updated_at": "2024-01-01T00:00:00Z"
+            }
+        }
+
+class SearchSnippet(BaseModel):
+    """搜索结果正文摘录"""
+    text: str = Field(..., description="摘录文本（换行替换为空格）")
+    offset: int = Field(..., description="摘录在正文中的起始位置（字符）")
+    highlights: List[List[int]] = Field(default_factory=list, description="命中区间 [起始, 结束)，相对摘录文本")
+
+class NoteSearchItemOut(NoteListItemOut):
+    """搜索结果项响应模型（列表视图加上标题高亮和正文摘录）"""
+    title_highlights: List[List[int]] = Field(default_factory=list, description="标题中的命中区间 [起始, 结束)")
+    snippets: List[SearchSnippet] = Field(default_factory=list, description="按位置排列的正文摘录")
+
+# 列表默认返回的字段；fields 参数可从 NoteOut 的数据库字段中选择（content_html 只在详情中渲染）
+NOTE_LIST_FIELDS = tuple(NoteListItemOut.model_fields)
+NOTE_SELECTABLE_FIELDS = tuple(name for name in NoteOut.model_fields if name != "content_html")
+
 class NoteWithUser(NoteOut):
     """包含用户信息的笔记响应模型"""
     user: dict  # 用户基本信息
@@ -156,6 +282,7 @@ class NoteVersionOut(BaseModel):
     version_number: int
     change_description: Optional[str] = None
     created_at: datetime
+    content_html: Optional[str] = Field(None, description="渲染后的 HTML（format=html 时返回）")
     
     class Config:
         from_attributes = True
@@ -173,14 +300,81 @@ class NoteVersionOut(BaseModel):
             }
         }
 
+class NoteVersionMetaOut(BaseModel):
+    """笔记版本元数据响应模型（版本历史列表，不含内容）"""
+    version_number: int
+    change_description: Optional[str] = None
+    created_at: datetime
+    size: Optional[int] = Field(None, description="版本内容大小（字节）")
+    lines_added: Optional[int] = Field(None, description="相对上一版本新增的行数")
+    lines_removed: Optional[int] = Field(None, description="相对上一版本删除的行数")
+    diff_summary: Optional[str] = Field(None, description="简短的变更摘要")
+    
+    class Config:
+        from_attributes = True
+        json_schema_extra  = {
+            "example": {
+                "version_number": 2,
+                "change_description": "更新笔记",
+                "created_at": "2024-01-01T00:00:00Z",
+                "size": 2048,
+                "lines_added": 3,
+                "lines_removed": 1,
+                "diff_summary": "+3 -1 行"
+            }
+        }
+
+class DiffSegment(BaseModel):
+    """单词级差异片段"""
+    op: str = Field(..., description="片段类型：equal、delete、insert")
+    text: str = Field(..., description="片段文本")
+
+class DiffHunk(BaseModel):
+    """统一格式差异块"""
+    header: str = Field(..., description="差异块头，如 @@ -1,3 +1,4 @@")
+    lines: Optional[List[str]] = Field(None, description="按行模式：带 ' '、'-'、'+' 前缀的行")
+    segments: Optional[List[DiffSegment]] = Field(None, description="按单词模式：行内增删片段")
+
+class NoteVersionDiffOut(BaseModel):
+    """笔记版本差异响应模型"""
+    note_id: int
+    from_version: int
+    to_version: int
+    mode: str = Field(..., description="差异粒度：line 或 word")
+    lines_added: int = Field(..., description="新增行数")
+    lines_removed: int = Field(..., description="删除行数")
+    title_changed: bool = Field(False, description="标题是否变化")
+    hunks: List[DiffHunk] = Field(default_factory=list, description="差异块，内容相同时为空")
+
+    class Config:
+        json_schema_extra  = {
+            "example": {
+                "note_id": 1,
+                "from_version": 1,
+                "to_version": 2,
+                "mode": "line",
+                "lines_added": 1,
+                "lines_removed": 1,
+                "title_changed": False,
+                "hunks": [
+                    {"header": "@@ -1,2 +1,2 @@", "lines": [" # 标题\n", "-旧内容\n", "+新内容\n"]}
+                ]
+            }
+        }
+
 # 查询参数模型
 class NoteQueryParams(BaseModel):
     """笔记查询参数模型"""
     page: int = Field(default=1, ge=1, description="页码")
     size: int = Field(default=20, ge=1, le=100, description="每页大小")
     tags: Optional[List[str]] = Field(default=None, description="标签筛选")
+    tag_mode: str = Field(default="any", pattern="^(any|all)$", description="标签匹配方式：any（任一）、all（全部）")
     search: Optional[str] = Field(default=None, description="搜索关键词")
     user_id: Optional[int] = Field(default=None, description="用户ID筛选")
+    sort: str = Field(default="updated_at", pattern="^(updated_at|created_at|title)$", description="排序字段")
+    order: str = Field(default="desc", pattern="^(desc|asc)$", description="排序方向")
+    cursor: Optional[str] = Field(default=None, description="分页游标（提供时使用游标分页，忽略页码）")
+    fields: Optional[List[str]] = Field(default=None, description="返回字段（为空时返回不含正文的列表视图）")
     
     class Config:
         json_schema_extra  = {
@@ -188,8 +382,13 @@ class NoteQueryParams(BaseModel):
                 "page": 1,
                 "size": 20,
                 "tags": ["技术", "Python"],
+                "tag_mode": "any",
                 "search": "FastAPI",
-                "user_id": 1
+                "user_id": 1,
+                "sort": "updated_at",
+                "order": "desc",
+                "cursor": None,
+                "fields": None
             }
         }
 
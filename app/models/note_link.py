@@ -0,0 +1,35 @@
+"""
+MindLink 笔记链接数据模型
+
+包含：
+- SQLAlchemy 数据库模型（NoteLink）
+
+笔记内容中的每个 [[标题]] 链接保存为一行 (源笔记, 目标标题)，在写入内容的操作中
+按链接集合的差异同步维护。链接按标题保存，目标笔记改名或稍后才创建时同样能解析。
+反向链接由 (user_id, dst_title) 索引直接查出，不需要扫描笔记内容。
+"""
+
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
+from sqlalchemy.orm import relationship, backref
+
+from app.core.database import Base
+
+# SQLAlchemy 数据库模型
+class NoteLink(Base):
+    """笔记链接模型"""
+    __tablename__ = "note_links"
+
+    src_note_id = Column(Integer, ForeignKey("notes.id"), primary_key=True, comment="源笔记ID")
+    dst_title = Column(String(200), primary_key=True, comment="目标笔记标题")
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, comment="用户ID")
+
+    # 主键 (src_note_id, dst_title) 支持查找出链，(user_id, dst_title) 索引支持查找反向链接
+    __table_args__ = (
+        Index("ix_note_links_user_dst", "user_id", "dst_title", "src_note_id"),
+    )
+
+    # 关联关系（删除笔记时一并删除出链）
+    note = relationship("Note", backref=backref("outgoing_links", cascade="all, delete-orphan"))
+
+    def __repr__(self):
+        return f"<NoteLink(src_note_id={self.src_note_id}, dst_title='{self.dst_title}')>"
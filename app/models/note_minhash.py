@@ -0,0 +1,51 @@
+"""
+MindLink 近似重复索引数据模型
+
+包含：
+- SQLAlchemy 数据库模型（NoteMinHash、NoteLSHBucket）
+
+每篇笔记保存一条正文的 MinHash 签名，并按 LSH 分段为每段写入一行桶记录，
+在创建、更新、恢复笔记时同步维护。查找重复时先由 (用户, 段号, 桶值) 主键索引
+取出候选笔记，再比较候选的签名，不需要和用户的全部笔记逐一比较。
+"""
+
+from sqlalchemy import Column, Integer, SmallInteger, BigInteger, LargeBinary, ForeignKey, Index
+from sqlalchemy.orm import relationship, backref
+
+from app.core.database import Base
+
+# SQLAlchemy 数据库模型
+class NoteMinHash(Base):
+    """笔记 MinHash 签名模型"""
+    __tablename__ = "note_minhashes"
+
+    note_id = Column(Integer, ForeignKey("notes.id"), primary_key=True, comment="笔记ID")
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True, comment="用户ID")
+    signature = Column(LargeBinary, nullable=False, comment="MinHash 签名（每个值 4 字节，大端序）")
+
+    # 关联关系（删除笔记时一并删除签名）
+    note = relationship("Note", backref=backref("minhash", uselist=False, cascade="all, delete-orphan"))
+
+    def __repr__(self):
+        return f"<NoteMinHash(note_id={self.note_id}, user_id={self.user_id})>"
+
+
+class NoteLSHBucket(Base):
+    """笔记 LSH 桶记录模型"""
+    __tablename__ = "note_lsh_buckets"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True, comment="用户ID")
+    band = Column(SmallInteger, primary_key=True, comment="签名段号")
+    bucket = Column(BigInteger, primary_key=True, comment="该段签名的哈希")
+    note_id = Column(Integer, ForeignKey("notes.id"), primary_key=True, comment="笔记ID")
+
+    # 主键 (user_id, band, bucket, note_id) 支持按桶查找候选，按笔记删除时使用 note_id 索引
+    __table_args__ = (
+        Index("ix_note_lsh_buckets_note_id", "note_id"),
+    )
+
+    # 关联关系（删除笔记时一并删除桶记录）
+    note = relationship("Note", backref=backref("lsh_buckets", cascade="all, delete-orphan"))
+
+    def __repr__(self):
+        return f"<NoteLSHBucket(user_id={self.user_id}, band={self.band}, note_id={self.note_id})>"
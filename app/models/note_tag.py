@@ -0,0 +1,38 @@
+"""
+MindLink 笔记标签索引数据模型
+
+包含：
+- SQLAlchemy 数据库模型（NoteTag）
+
+笔记的 tags JSON 列之外，每个 (用户, 标签, 笔记) 额外保存一行倒排记录，
+在所有写入标签的操作中同步维护。按标签筛选（任一/全部匹配）由主键索引完成，
+不依赖 PostgreSQL 的数组运算符，SQLite 和 MySQL 上同样可用。
+"""
+
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
+from sqlalchemy.orm import relationship, backref
+
+from app.core.database import Base
+
+# 单个标签的最大长度（请求模型按此校验）
+MAX_TAG_LENGTH = 100
+
+# SQLAlchemy 数据库模型
+class NoteTag(Base):
+    """笔记标签倒排记录模型"""
+    __tablename__ = "note_tags"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True, comment="用户ID")
+    tag = Column(String(MAX_TAG_LENGTH), primary_key=True, comment="标签")
+    note_id = Column(Integer, ForeignKey("notes.id"), primary_key=True, comment="笔记ID")
+
+    # 主键 (user_id, tag, note_id) 支持按标签查找笔记，按笔记删除时使用 note_id 索引
+    __table_args__ = (
+        Index("ix_note_tags_note_id", "note_id"),
+    )
+
+    # 关联关系（删除笔记时一并删除倒排记录）
+    note = relationship("Note", backref=backref("tag_postings", cascade="all, delete-orphan"))
+
+    def __repr__(self):
+        return f"<NoteTag(user_id={self.user_id}, tag='{self.tag}', note_id={self.note_id})>"
@@ -0,0 +1,62 @@
+"""
+MindLink 用户统计数据模型
+
+包含：
+- SQLAlchemy 数据库模型（UserStats）
+- Pydantic 响应模型
+
+统计计数在创建、删除笔记和文件的同一事务中维护，
+分页总数、配额检查和统计接口直接读取，不再对明细表执行 count()/sum()。
+集合代数随对应集合的修改递增，作为标签列表、文件列表的 ETag。
+"""
+
+from sqlalchemy import Column, Integer, BigInteger, DateTime, ForeignKey, JSON
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship, backref
+from pydantic import BaseModel, Field
+from typing import Dict, Optional
+from datetime import datetime
+
+from app.core.database import Base
+
+# SQLAlchemy 数据库模型
+class UserStats(Base):
+    """用户统计计数模型"""
+    __tablename__ = "user_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True, comment="用户ID")
+    note_count = Column(Integer, nullable=False, default=0, comment="笔记数量")
+    file_count = Column(Integer, nullable=False, default=0, comment="文件数量")
+    file_bytes = Column(BigInteger, nullable=False, default=0, comment="文件总大小（字节）")
+    tag_counts = Column(JSON, nullable=False, default=dict, comment="标签使用次数 {标签: 笔记数}")
+    tags_generation = Column(Integer, nullable=False, default=0, server_default="0", comment="标签集合代数（标签计数变化时递增，用于 ETag）")
+    files_generation = Column(Integer, nullable=False, default=0, server_default="0", comment="文件集合代数（文件增删改时递增，用于 ETag）")
+    updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now(), comment="更新时间")
+
+    # 关联关系
+    user = relationship("User", backref=backref("stats", uselist=False, cascade="all, delete-orphan"))
+
+    def __repr__(self):
+        return f"<UserStats(user_id={self.user_id}, notes={self.note_count}, files={self.file_count})>"
+
+# Pydantic 响应模型
+class UserStatsOut(BaseModel):
+    """用户统计响应模型"""
+    note_count: int = Field(..., description="笔记数量")
+    file_count: int = Field(..., description="文件数量")
+    file_bytes: int = Field(..., description="文件总大小（字节）")
+    tag_count: int = Field(..., description="标签数量")
+    tag_counts: Dict[str, int] = Field(..., description="标签使用次数")
+    updated_at: Optional[datetime] = Field(None, description="更新时间")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "note_count": 42,
+                "file_count": 7,
+                "file_bytes": 1048576,
+                "tag_count": 2,
+                "tag_counts": {"Python": 10, "读书笔记": 3},
+                "updated_at": "2024-01-01T00:00:00Z"
+            }
+        }
@@ -0,0 +1,27 @@
+"""
+MindLink AI 摘要缓存数据模型
+
+包含：
+- SQLAlchemy 数据库模型（SummaryCacheEntry）
+
+摘要缓存的持久层：键为 (模型, 提示词, 标题, 内容) 的哈希，
+进程重启或多进程部署时，已生成过的摘要不会再次调用大模型。
+"""
+
+from sqlalchemy import Column, String, Text, DateTime
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+# SQLAlchemy 数据库模型
+class SummaryCacheEntry(Base):
+    """AI 摘要缓存条目模型"""
+    __tablename__ = "summary_cache"
+
+    cache_key = Column(String(64), primary_key=True, comment="缓存键（SHA-256）")
+    model = Column(String(100), nullable=False, comment="生成摘要的模型")
+    summary = Column(Text, nullable=False, comment="摘要内容")
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True, comment="创建时间")
+
+    def __repr__(self):
+        return f"<SummaryCacheEntry(cache_key='{self.cache_key[:12]}', model='{self.model}')>"
@@ -0,0 +1,49 @@
+"""
+MindLink AI 摘要任务数据模型
+
+包含：
+- SQLAlchemy 数据库模型（SummaryJob）
+
+每篇笔记最多一条任务记录（note_id 唯一）：笔记再次修改时复用该记录并递增
+generation，工作线程处理时读取笔记的最新内容，因此只会为最新内容生成摘要。
+"""
+
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship, backref
+
+from app.core.database import Base
+
+# 任务优先级（数值越小越先处理）
+PRIORITY_INTERACTIVE = 0    # 用户编辑触发
+PRIORITY_BULK = 50          # 批量导入/同步
+PRIORITY_BACKFILL = 100     # 批量补齐
+
+# SQLAlchemy 数据库模型
+class SummaryJob(Base):
+    """AI 摘要任务模型"""
+    __tablename__ = "summary_jobs"
+
+    id = Column(Integer, primary_key=True, index=True, comment="任务ID")
+    note_id = Column(Integer, ForeignKey("notes.id"), nullable=False, unique=True, comment="笔记ID")
+    status = Column(String(20), nullable=False, default="queued", comment="任务状态：queued、running、done、failed")
+    priority = Column(Integer, nullable=False, default=PRIORITY_INTERACTIVE, comment="优先级（越小越优先）")
+    generation = Column(Integer, nullable=False, default=1, comment="入队次数，处理期间笔记再次修改时递增")
+    attempts = Column(Integer, nullable=False, default=0, comment="失败重试次数")
+    last_error = Column(Text, nullable=True, comment="最近一次错误信息")
+    run_after = Column(DateTime, nullable=False, comment="最早可执行时间（UTC）")
+    locked_by = Column(String(100), nullable=True, comment="处理中的工作线程标识")
+    locked_until = Column(DateTime, nullable=True, comment="处理租约到期时间（UTC），过期后可被其他工作线程接管")
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="创建时间")
+    updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now(), comment="更新时间")
+
+    # 工作线程按 (状态, 优先级, 可执行时间) 取任务
+    __table_args__ = (
+        Index("ix_summary_jobs_status_priority_run_after", "status", "priority", "run_after"),
+    )
+
+    # 关联关系（删除笔记时一并删除任务）
+    note = relationship("Note", backref=backref("summary_job", uselist=False, cascade="all, delete-orphan"))
+
+    def __repr__(self):
+        return f"<SummaryJob(id={self.id}, note_id={self.note_id}, status='{self.status}')>"
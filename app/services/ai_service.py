@@ -8,6 +8,7 @@ import logging
 from typing import Optional
 from openai import OpenAI
 from app.core.config import get_settings
+from app.services.summary_cache import get_summary_cache, make_cache_key
 import httpx
 import certifi  # 导入 Poetry 环境的 certifi 库
 
@@ -19,6 +20,12 @@ http_client = httpx.Client(verify=ssl_cert_path)
 
 logger = logging.getLogger(__name__)
 
+# 摘要生成参数（同时参与摘要缓存键的计算）
+SYSTEM_PROMPT = "你是一个专业的笔记摘要助手，能够准确提取笔记的核心要点。"
+SUMMARY_MAX_TOKENS = 300
+SUMMARY_TEMPERATURE = 0.3
+SUMMARY_TOP_P = 0.9
+
 
 class AIService:
     """AI 服务类，处理 OpenAI API 调用"""
@@ -57,34 +64,79 @@ class AIService:
             return self._get_default_summary(content, title)
         
         try:
-            # 构建提示词
-            prompt = self._build_summary_prompt(content, title)
-            
-            # 调用 OpenAI API
-            response = self.client.chat.completions.create(
-                model=self.settings.OPENAI_MODEL,
-                messages=[
-                    {"role": "system", "content": "你是一个专业的笔记摘要助手，能够准确提取笔记的核心要点。"},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=300,  # 控制输出长度
-                temperature=0.3,  # 降低随机性，提高一致性
-                top_p=0.9
-            )
-            
-            summary = response.choices[0].message.content.strip()
-            
-            # 验证摘要长度
-            if len(summary) > 200:
-                summary = summary[:197] + "..."
-            
-            logger.info("AI 摘要生成成功，长度: {} 字符".format(len(summary)))
-            return summary
-            
+            return self.request_note_summary(content, title)
         except Exception as e:
             logger.error("AI 摘要生成失败: {}".format(str(e)))
             return self._get_default_summary(content, title)
     
+    def request_note_summary(self, content: str, title: str = "") -> str:
+        """
+        通过摘要缓存调用大模型生成笔记摘要（失败时不回退到默认摘要）
+        
+        Args:
+            content: 笔记内容（Markdown 格式）
+            title: 笔记标题（可选）
+        
+        Returns:
+            str: 生成的摘要（≤200字）
+        
+        Raises:
+            RuntimeError: 未配置 OpenAI 客户端时抛出异常
+            Exception: API 调用失败时抛出异常
+        """
+        if not self.client:
+            raise RuntimeError("未配置 OPENAI_API_KEY，无法生成 AI 摘要")
+        
+        # 构建提示词
+        prompt = self._build_summary_prompt(content, title)
+        
+        summary_cache = get_summary_cache()
+        if summary_cache is None:
+            return self._request_summary(prompt)
+        
+        # 相同的模型、提示词和生成参数必然得到等价的摘要，可以复用
+        cache_key = make_cache_key(
+            self.settings.OPENAI_MODEL, SYSTEM_PROMPT, prompt,
+            SUMMARY_MAX_TOKENS, SUMMARY_TEMPERATURE, SUMMARY_TOP_P
+        )
+        return summary_cache.get_or_generate(
+            cache_key, self.settings.OPENAI_MODEL,
+            lambda: self._request_summary(prompt)
+        )
+    
+    def _request_summary(self, prompt: str) -> str:
+        """
+        调用 OpenAI API 生成摘要
+        
+        Args:
+            prompt: 提示词
+        
+        Returns:
+            str: 生成的摘要（≤200字）
+        
+        Raises:
+            Exception: API 调用失败时抛出异常
+        """
+        response = self.client.chat.completions.create(
+            model=self.settings.OPENAI_MODEL,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=SUMMARY_MAX_TOKENS,  # 控制输出长度
+            temperature=SUMMARY_TEMPERATURE,  # 降低随机性，提高一致性
+            top_p=SUMMARY_TOP_P
+        )
+        
+        summary = response.choices[0].message.content.strip()
+        
+        # 验证摘要长度
+        if len(summary) > 200:
+            summary = summary[:197] + "..."
+        
+        logger.info("AI 摘要生成成功，长度: {} 字符".format(len(summary)))
+        return summary
+    
     def _build_summary_prompt(self, content: str, title: str) -> str:
         """
         构建摘要生成的提示词
@@ -164,4 +216,32 @@ def generate_note_summary(content: str, title: str = "") -> str:
     Returns:
         str: 生成的摘要
     """
-    return ai_service.generate_note_summary(content, title) 
\ No newline at end of file
+    return ai_service.generate_note_summary(content, title)
+
+
+def request_note_summary(content: str, title: str = "") -> str:
+    """
+    便捷函数：调用大模型生成笔记摘要，失败时抛出异常
+    
+    Args:
+        content: 笔记内容
+        title: 笔记标题
+    
+    Returns:
+        str: 生成的摘要
+    """
+    return ai_service.request_note_summary(content, title)
+
+
+def default_note_summary(content: str, title: str = "") -> str:
+    """
+    便捷函数：按内容截取生成默认摘要（不调用大模型）
+    
+    Args:
+        content: 笔记内容
+        title: 笔记标题
+    
+    Returns:
+        str: 默认摘要
+    """
+    return ai_service._get_default_summary(content, title)
@@ -0,0 +1,240 @@
+"""
+MindLink 近似重复检测服务
+
+维护 note_minhashes 签名表和 note_lsh_buckets 桶表并基于它们查找近似重复的笔记：
+- 创建、更新正文、恢复笔记时重新计算签名和桶记录（随调用方事务提交）
+- 单篇查询：取出与笔记任一段桶值相同的候选，按签名估计相似度筛选
+- 全量查询：找出用户下桶值相同的笔记对，验证后按连通关系分组
+- 提供为缺少签名的笔记补建索引的维护操作
+"""
+
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.models.note import Note
+from app.models.note_minhash import NoteMinHash, NoteLSHBucket
+from app.utils.similarity import (
+    decode_signature, encode_signature, estimate_jaccard, lsh_buckets, minhash_signature
+)
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+
+class DuplicateService:
+    """近似重复检测服务类"""
+
+    @staticmethod
+    def index_notes(db: Session, notes: Iterable[Note]) -> None:
+        """
+        重新计算笔记的签名和桶记录（不提交）
+
+        正文没有任何特征（如空笔记）时只删除旧记录，不参与重复检测。
+
+        Args:
+            db: 数据库会话
+            notes: 笔记（需已分配ID）
+        """
+        notes = {note.id: note for note in notes}
+        if not notes:
+            return
+        note_ids = list(notes)
+        db.query(NoteLSHBucket).filter(NoteLSHBucket.note_id.in_(note_ids)).delete(synchronize_session=False)
+        existing = {
+            row.note_id: row for row in
+            db.query(NoteMinHash).filter(NoteMinHash.note_id.in_(note_ids)).all()
+        }
+
+        for note in notes.values():
+            signature = minhash_signature(note.content)
+            row = existing.get(note.id)
+            if signature is None:
+                if row is not None:
+                    db.delete(row)
+                continue
+            if row is None:
+                db.add(NoteMinHash(note_id=note.id, user_id=note.user_id, signature=encode_signature(signature)))
+            else:
+                row.signature = encode_signature(signature)
+            db.add_all([
+                NoteLSHBucket(user_id=note.user_id, band=band, bucket=bucket, note_id=note.id)
+                for band, bucket in lsh_buckets(signature)
+            ])
+
+    @staticmethod
+    def index_note(db: Session, note: Note) -> None:
+        """重新计算单篇笔记的签名和桶记录（不提交）"""
+        DuplicateService.index_notes(db, [note])
+
+    @staticmethod
+    def _signatures(db: Session, note_ids: Iterable[int]) -> Dict[int, List[int]]:
+        """批量读取笔记的签名 {笔记ID: 签名}"""
+        note_ids = list(note_ids)
+        if not note_ids:
+            return {}
+        rows = db.query(NoteMinHash.note_id, NoteMinHash.signature).filter(NoteMinHash.note_id.in_(note_ids)).all()
+        return {note_id: decode_signature(signature) for note_id, signature in rows}
+
+    @staticmethod
+    def find_similar(
+        db: Session,
+        note: Note,
+        threshold: Optional[float] = None,
+        limit: int = 20
+    ) -> List[Dict]:
+        """
+        查找与指定笔记近似重复的笔记（同一用户）
+
+        Args:
+            db: 数据库会话
+            note: 笔记
+            threshold: 相似度阈值（默认使用 DUPLICATE_THRESHOLD）
+            limit: 最多返回数量
+
+        Returns:
+            List[Dict]: [{"id", "title", "similarity"}]，按相似度从高到低排列
+        """
+        if threshold is None:
+            threshold = get_settings().DUPLICATE_THRESHOLD
+        stored = DuplicateService._signatures(db, [note.id])
+        signature = stored.get(note.id) or minhash_signature(note.content)
+        if signature is None:
+            return []
+
+        candidates = [
+            note_id for (note_id,) in
+            db.query(NoteLSHBucket.note_id)
+            .filter(
+                NoteLSHBucket.user_id == note.user_id,
+                or_(*[
+                    and_(NoteLSHBucket.band == band, NoteLSHBucket.bucket == bucket)
+                    for band, bucket in lsh_buckets(signature)
+                ]),
+                NoteLSHBucket.note_id != note.id
+            )
+            .distinct()
+            .all()
+        ]
+        scored = []
+        for note_id, other in DuplicateService._signatures(db, candidates).items():
+            similarity = estimate_jaccard(signature, other)
+            if similarity >= threshold:
+                scored.append((similarity, note_id))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        scored = scored[:limit]
+
+        titles = dict(db.query(Note.id, Note.title).filter(Note.id.in_([note_id for _, note_id in scored])).all()) if scored else {}
+        return [
+            {"id": note_id, "title": titles[note_id], "similarity": round(similarity, 3)}
+            for similarity, note_id in scored if note_id in titles
+        ]
+
+    @staticmethod
+    def find_user_duplicates(db: Session, user_id: int, threshold: Optional[float] = None) -> List[Dict]:
+        """
+        查找用户所有近似重复的笔记组
+
+        只比较至少有一段桶值相同的笔记对，验证相似度后按连通关系合并为组。
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            threshold: 相似度阈值（默认使用 DUPLICATE_THRESHOLD）
+
+        Returns:
+            List[Dict]: [{"notes": [{"id", "title"}], "similarity": 组内直接相连笔记对的最低相似度}]，
+            按组大小从大到小排列
+        """
+        if threshold is None:
+            threshold = get_settings().DUPLICATE_THRESHOLD
+        shared = db.query(NoteLSHBucket.band, NoteLSHBucket.bucket)\
+            .filter(NoteLSHBucket.user_id == user_id)\
+            .group_by(NoteLSHBucket.band, NoteLSHBucket.bucket)\
+            .having(func.count() > 1)\
+            .subquery()
+        rows = db.query(NoteLSHBucket.band, NoteLSHBucket.bucket, NoteLSHBucket.note_id)\
+            .join(shared, and_(NoteLSHBucket.band == shared.c.band, NoteLSHBucket.bucket == shared.c.bucket))\
+            .filter(NoteLSHBucket.user_id == user_id)\
+            .all()
+
+        buckets = defaultdict(list)
+        for band, bucket, note_id in rows:
+            buckets[(band, bucket)].append(note_id)
+        pairs = set()
+        for note_ids in buckets.values():
+            note_ids.sort()
+            pairs.update(
+                (a, b) for index, a in enumerate(note_ids) for b in note_ids[index + 1:]
+            )
+
+        signatures = DuplicateService._signatures(db, {note_id for pair in pairs for note_id in pair})
+        parent = {}
+
+        def find(note_id: int) -> int:
+            parent.setdefault(note_id, note_id)
+            while parent[note_id] != note_id:
+                parent[note_id] = parent[parent[note_id]]
+                note_id = parent[note_id]
+            return note_id
+
+        edges = []
+        for a, b in pairs:
+            if a in signatures and b in signatures:
+                similarity = estimate_jaccard(signatures[a], signatures[b])
+                if similarity >= threshold:
+                    edges.append((a, b, similarity))
+                    parent[find(a)] = find(b)
+
+        groups = defaultdict(lambda: {"note_ids": set(), "similarity": 1.0})
+        for a, b, similarity in edges:
+            group = groups[find(a)]
+            group["note_ids"].update((a, b))
+            group["similarity"] = min(group["similarity"], similarity)
+
+        note_ids = {note_id for group in groups.values() for note_id in group["note_ids"]}
+        titles = dict(db.query(Note.id, Note.title).filter(Note.id.in_(note_ids)).all()) if note_ids else {}
+        result = [
+            {
+                "notes": [{"id": note_id, "title": titles[note_id]} for note_id in sorted(group["note_ids"]) if note_id in titles],
+                "similarity": round(group["similarity"], 3)
+            }
+            for group in groups.values()
+        ]
+        result.sort(key=lambda group: (-len(group["notes"]), group["notes"][0]["id"] if group["notes"] else 0))
+        return result
+
+    @staticmethod
+    def backfill(db: Session, rebuild: bool = False, batch_size: int = 200) -> int:
+        """
+        为缺少签名的笔记补建近似重复索引
+
+        Args:
+            db: 数据库会话
+            rebuild: 为 True 时重新计算所有笔记（修改签名参数后使用）
+            batch_size: 每批提交的笔记数量
+
+        Returns:
+            int: 处理的笔记数
+        """
+        count = 0
+        last_id = 0
+        while True:
+            query = db.query(Note).filter(Note.id > last_id)
+            if not rebuild:
+                query = query.outerjoin(NoteMinHash, NoteMinHash.note_id == Note.id)\
+                    .filter(NoteMinHash.note_id.is_(None))
+            notes = query.order_by(Note.id).limit(batch_size).all()
+            if not notes:
+                break
+            DuplicateService.index_notes(db, notes)
+            db.commit()
+            count += len(notes)
+            last_id = notes[-1].id
+            db.expunge_all()
+        logger.info("近似重复索引补建完成，处理 {} 篇笔记".format(count))
+        return count
@@ -12,16 +12,19 @@ MindLink 文件处理服务
 import os
 import hashlib
 import uuid
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple
 from datetime import datetime
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from fastapi import HTTPException, status, UploadFile
 import logging
 
 from app.models.file import File, FileUploadRequest, FileUpdateRequest
 from app.models.user import User
 from app.core.config import get_settings
+from app.services.object_cache import CacheKind, dict_to_row, get_object_cache, invalidate_on_commit, row_to_dict
+from app.services.stats_service import StatsService
+from app.utils.etag import make_etag
+from app.utils.pagination import keyset_paginate, order_by_keyset, cursor_for_row
 
 # 获取配置
 settings = get_settings()
@@ -32,6 +35,13 @@ logger = logging.getLogger(__name__)
 # 从配置文件获取允许的文件扩展名
 ALLOWED_EXTENSIONS = set[str](settings.ALLOWED_FILE_EXTENSIONS.split(","))
 
+# 列表排序字段到数据库列的映射（title 对应文件名）
+FILE_SORT_COLUMNS = {
+    "created_at": "created_at",
+    "updated_at": "updated_at",
+    "title": "filename",
+}
+
 class FileService:
     """文件服务类"""
     
@@ -150,8 +160,11 @@ class FileService:
             # 保存文件
             file_info = await FileService.save_upload_file(file, filepath)
             
+            # 读取用户统计计数（加行锁，避免并发上传同时通过配额检查）
+            user_stats = StatsService.get_stats(db, user.id, for_update=True)
+            
             # 检查用户文件数量限制
-            user_file_count = db.query(File).filter(File.user_id == user.id).count()
+            user_file_count = user_stats.file_count
             if user_file_count >= settings.MAX_FILES_PER_USER:
                 # 删除临时文件
                 if os.path.exists(file_info["filepath"]):
@@ -162,7 +175,7 @@ class FileService:
                 )
             
             # 检查用户存储容量限制
-            user_total_size = db.query(func.sum(File.file_size)).filter(File.user_id == user.id).scalar() or 0
+            user_total_size = user_stats.file_bytes
             if user_total_size + file_info["file_size"] > settings.MAX_STORAGE_PER_USER:
                 # 删除临时文件
                 if os.path.exists(file_info["filepath"]):
@@ -195,6 +208,9 @@ class FileService:
                 is_public=file_request.is_public
             )
             
+            # 统计计数与文件记录在同一事务中提交
+            StatsService.adjust(db, user.id, files=1, file_bytes=db_file.file_size)
+            
             db.add(db_file)
             db.commit()
             db.refresh(db_file)
@@ -210,34 +226,100 @@ class FileService:
             raise
     
     @staticmethod
-    def get_user_files(db: Session, user_id: int, skip: int = 0, limit: int = 20) -> List[File]:
-        """获取用户的文件列表"""
+    def _paginate_files(
+        query,
+        skip: int,
+        limit: int,
+        sort: str,
+        order: str,
+        cursor: Optional[str]
+    ) -> Tuple[List[File], Optional[str]]:
+        """
+        文件列表分页
+        
+        提供 cursor 时使用键集分页（忽略 skip），否则沿用 skip/limit 分页。
+        
+        Returns:
+            Tuple[List[File], Optional[str]]: (文件列表, 下一页游标)
+        """
+        sort_column = getattr(File, FILE_SORT_COLUMNS[sort])
+        if cursor:
+            return keyset_paginate(query, sort_column, File.id, sort, order, limit, cursor)
+        
+        files = order_by_keyset(query, sort_column, File.id, order).offset(skip).limit(limit + 1).all()
+        next_cursor = None
+        if len(files) > limit:
+            files = files[:limit]
+            next_cursor = cursor_for_row(files[-1], sort_column, sort, order)
+        return files, next_cursor
+    
+    @staticmethod
+    def get_user_files(
+        db: Session,
+        user_id: int,
+        skip: int = 0,
+        limit: int = 20,
+        sort: str = "created_at",
+        order: str = "desc",
+        cursor: Optional[str] = None
+    ) -> Tuple[List[File], Optional[str]]:
+        """获取用户的文件列表，返回 (文件列表, 下一页游标)"""
         try:
-            files = db.query(File).filter(
-                File.user_id == user_id
-            ).order_by(File.created_at.desc()).offset(skip).limit(limit).all()
-            return files
+            query = db.query(File).filter(File.user_id == user_id)
+            return FileService._paginate_files(query, skip, limit, sort, order, cursor)
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"获取用户文件列表失败: {str(e)}")
             raise
     
     @staticmethod
-    def get_public_files(db: Session, skip: int = 0, limit: int = 20) -> List[File]:
-        """获取公开文件列表"""
+    def get_files_etag(db: Session, user_id: int) -> str:
+        """获取用户文件集合的 ETag（读取文件代数，不查询文件表）"""
+        return make_etag("files", user_id, StatsService.read_generation(db, user_id, "files"))
+    
+    @staticmethod
+    def get_public_files(
+        db: Session,
+        skip: int = 0,
+        limit: int = 20,
+        sort: str = "created_at",
+        order: str = "desc",
+        cursor: Optional[str] = None
+    ) -> Tuple[List[File], Optional[str]]:
+        """获取公开文件列表，返回 (文件列表, 下一页游标)"""
         try:
-            files = db.query(File).filter(
-                File.is_public == True
-            ).order_by(File.created_at.desc()).offset(skip).limit(limit).all()
-            return files
+            query = db.query(File).filter(File.is_public == True)
+            return FileService._paginate_files(query, skip, limit, sort, order, cursor)
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"获取公开文件列表失败: {str(e)}")
             raise
     
+    @staticmethod
+    def load_file(db: Session, file_id: int) -> Optional[File]:
+        """
+        读取文件信息（优先读取对象缓存）
+        
+        缓存命中时返回的文件对象不属于数据库会话，只能读取，不能修改后提交。
+        """
+        cache = get_object_cache()
+        if cache is None:
+            return db.query(File).filter(File.id == file_id).first()
+        
+        def load():
+            db_file = db.query(File).filter(File.id == file_id).first()
+            return row_to_dict(db_file) if db_file else None
+        
+        data = cache.get_or_load(CacheKind.FILE, file_id, load)
+        return dict_to_row(File, data) if data else None
+    
     @staticmethod
     def get_file_detail(db: Session, file_id: int, current_user: Optional[User]) -> File:
         """获取文件详情，包含权限检查"""
         # 获取文件
-        file = db.query(File).filter(File.id == file_id).first()
+        file = FileService.load_file(db, file_id)
         if not file:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -296,6 +378,8 @@ class FileService:
             setattr(file, field, value)
         
         file.updated_at = datetime.utcnow()
+        StatsService.bump_generation(db, file.user_id, "files")
+        invalidate_on_commit(db, CacheKind.FILE, file.id)
         
         db.commit()
         db.refresh(file)
@@ -325,7 +409,9 @@ class FileService:
         filepath = file.filepath
         
         # 从数据库中删除
+        StatsService.adjust(db, file.user_id, files=-1, file_bytes=-file.file_size)
         db.delete(file)
+        invalidate_on_commit(db, CacheKind.FILE, file.id)
         db.commit()
         
         # 从磁盘中删除文件
@@ -0,0 +1,70 @@
+"""
+MindLink 后台任务租约服务
+
+通过 job_leases 表保证后台任务在所有进程中同时只有一个实例运行：
+- 领取：租约空闲、已过期或已由自己持有时，用条件 UPDATE 写入持有者和到期时间
+- 续期：持有者在处理过程中再次领取，延长到期时间
+- 释放：任务结束后清空持有者，其他进程无需等待到期
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.job_lease import JobLease
+
+
+class LeaseService:
+    """后台任务租约服务类"""
+
+    @staticmethod
+    def acquire(db: Session, name: str, holder: str, seconds: int) -> bool:
+        """
+        领取或续期租约（立即提交）
+
+        Args:
+            db: 数据库会话
+            name: 任务名称
+            holder: 进程标识
+            seconds: 租约时长（秒）
+
+        Returns:
+            bool: 是否持有租约
+        """
+        now = datetime.utcnow()
+        if db.query(JobLease.name).filter(JobLease.name == name).scalar() is None:
+            try:
+                with db.begin_nested():
+                    db.add(JobLease(name=name))
+            except IntegrityError:
+                pass
+
+        acquired = db.query(JobLease)\
+            .filter(
+                JobLease.name == name,
+                or_(JobLease.holder.is_(None), JobLease.holder == holder, JobLease.expires_at < now)
+            )\
+            .update({
+                JobLease.holder: holder,
+                JobLease.expires_at: now + timedelta(seconds=seconds),
+            }, synchronize_session=False)
+        db.commit()
+        return acquired == 1
+
+    @staticmethod
+    def release(db: Session, name: str, holder: str) -> None:
+        """
+        释放自己持有的租约（立即提交）
+
+        Args:
+            db: 数据库会话
+            name: 任务名称
+            holder: 进程标识
+        """
+        db.rollback()
+        db.query(JobLease)\
+            .filter(JobLease.name == name, JobLease.holder == holder)\
+            .update({JobLease.holder: None, JobLease.expires_at: None}, synchronize_session=False)
+        db.commit()
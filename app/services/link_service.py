@@ -0,0 +1,211 @@
+"""
+MindLink 笔记链接服务
+
+维护 note_links 表并基于它提供反向链接和链接关系图：
+- 从内容中提取 [[标题]]、[[标题|显示文本]]、[[标题#小节]] 链接（忽略代码块和行内代码）
+- 创建、更新、恢复笔记时按链接集合的差异增删记录（随调用方事务提交）
+- 链接按标题精确匹配（去除首尾空白），同名笔记都视为链接目标
+- 提供按笔记内容重建链接表的维护操作
+"""
+
+import logging
+import re
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from app.models.note import Note
+from app.models.note_link import NoteLink
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 链接关系图最多包含的笔记数
+GRAPH_MAX_NODES = 200
+
+_LINK_PATTERN = re.compile(r"\[\[([^\[\]\n|#]+)(?:[|#][^\[\]\n]*)?\]\]")
+_CODE_PATTERN = re.compile(r"```.*?(?:```|\Z)|`[^`\n]*`", re.DOTALL)
+
+
+def extract_links(content: Optional[str]) -> List[str]:
+    """
+    提取内容中链接的目标标题
+
+    Args:
+        content: Markdown 内容
+
+    Returns:
+        List[str]: 去重后的目标标题（保持出现顺序）
+    """
+    if not content or "[[" not in content:
+        return []
+    text = _CODE_PATTERN.sub("", content)
+    titles = (match.group(1).strip() for match in _LINK_PATTERN.finditer(text))
+    return list(dict.fromkeys(
+        title for title in titles
+        if title and len(title) <= NoteLink.dst_title.type.length
+    ))
+
+
+class LinkService:
+    """笔记链接服务类"""
+
+    @staticmethod
+    def set_note_links(
+        db: Session,
+        note: Note,
+        old_content: Optional[str],
+        new_content: Optional[str]
+    ) -> None:
+        """
+        按链接集合的差异更新笔记的出链记录（不提交）
+
+        Args:
+            db: 数据库会话
+            note: 笔记（需已分配ID）
+            old_content: 修改前的内容
+            new_content: 修改后的内容
+        """
+        old_set, new_list = set(extract_links(old_content)), extract_links(new_content)
+        removed = old_set - set(new_list)
+        if removed:
+            db.query(NoteLink).filter(
+                NoteLink.src_note_id == note.id,
+                NoteLink.dst_title.in_(removed)
+            ).delete(synchronize_session=False)
+        db.add_all([
+            NoteLink(src_note_id=note.id, dst_title=title, user_id=note.user_id)
+            for title in new_list if title not in old_set
+        ])
+
+    @staticmethod
+    def backlinks(db: Session, note: Note) -> List[Dict]:
+        """
+        查找链接到笔记的其他笔记
+
+        Args:
+            db: 数据库会话
+            note: 目标笔记
+
+        Returns:
+            List[Dict]: [{"id", "title"}]，按标题排序
+        """
+        rows = db.query(Note.id, Note.title)\
+            .join(NoteLink, NoteLink.src_note_id == Note.id)\
+            .filter(NoteLink.user_id == note.user_id, NoteLink.dst_title == note.title, Note.id != note.id)\
+            .order_by(Note.title, Note.id)\
+            .all()
+        return [{"id": row.id, "title": row.title} for row in rows]
+
+    @staticmethod
+    def graph(db: Session, note: Note, depth: int = 1, max_nodes: int = GRAPH_MAX_NODES) -> Dict:
+        """
+        获取笔记周围的链接关系图（出链和反向链接，按层扩展）
+
+        Args:
+            db: 数据库会话
+            note: 中心笔记
+            depth: 扩展层数
+            max_nodes: 最多包含的笔记数（达到上限时停止扩展）
+
+        Returns:
+            Dict: {"nodes": [{"id", "title"}], "edges": [{"source", "target"}], "missing": [链接到的不存在的标题]}
+        """
+        nodes: Dict[int, str] = {note.id: note.title}
+        frontier = {note.id: note.title}
+        for _ in range(depth):
+            if not frontier or len(nodes) >= max_nodes:
+                break
+            found = LinkService._neighbours(db, note.user_id, frontier)
+            frontier = {}
+            for note_id, title in found.items():
+                if note_id not in nodes and len(nodes) < max_nodes:
+                    nodes[note_id] = frontier[note_id] = title
+
+        # 节点之间的边：源笔记的出链按标题解析到图中的笔记
+        ids_by_title: Dict[str, List[int]] = {}
+        for note_id, title in nodes.items():
+            ids_by_title.setdefault(title, []).append(note_id)
+        edges, missing = [], set()
+        links = db.query(NoteLink.src_note_id, NoteLink.dst_title)\
+            .filter(NoteLink.src_note_id.in_(list(nodes)))\
+            .all()
+        resolved = LinkService._existing_titles(db, note.user_id, {link.dst_title for link in links})
+        for src_note_id, dst_title in links:
+            if dst_title not in resolved:
+                if src_note_id == note.id:
+                    missing.add(dst_title)
+                continue
+            edges.extend(
+                {"source": src_note_id, "target": dst_note_id}
+                for dst_note_id in ids_by_title.get(dst_title, [])
+                if dst_note_id != src_note_id
+            )
+
+        return {
+            "nodes": [{"id": note_id, "title": title} for note_id, title in nodes.items()],
+            "edges": sorted(edges, key=lambda edge: (edge["source"], edge["target"])),
+            "missing": sorted(missing),
+        }
+
+    @staticmethod
+    def _neighbours(db: Session, user_id: int, notes: Dict[int, str]) -> Dict[int, str]:
+        """一组笔记的出链目标和反向链接来源（笔记ID -> 标题）"""
+        found: Dict[int, str] = {}
+        targets = [
+            title for (title,) in
+            db.query(NoteLink.dst_title).filter(NoteLink.src_note_id.in_(list(notes))).distinct()
+        ]
+        if targets:
+            found.update(db.query(Note.id, Note.title).filter(Note.user_id == user_id, Note.title.in_(targets)).all())
+        found.update(
+            db.query(Note.id, Note.title)
+            .join(NoteLink, NoteLink.src_note_id == Note.id)
+            .filter(NoteLink.user_id == user_id, NoteLink.dst_title.in_(set(notes.values())))
+            .all()
+        )
+        return found
+
+    @staticmethod
+    def _existing_titles(db: Session, user_id: int, titles: Iterable[str]) -> Set[str]:
+        """用户笔记中存在的标题"""
+        titles = list(titles)
+        if not titles:
+            return set()
+        rows = db.query(Note.title).filter(Note.user_id == user_id, Note.title.in_(titles)).distinct()
+        return {title for (title,) in rows}
+
+    @staticmethod
+    def rebuild(db: Session, batch_size: int = 500) -> Dict[str, int]:
+        """
+        按笔记内容重建链接表
+
+        Args:
+            db: 数据库会话
+            batch_size: 每批处理的笔记数量
+
+        Returns:
+            Dict[str, int]: {"notes": 处理的笔记数, "links": 写入的链接数}
+        """
+        db.query(NoteLink).delete(synchronize_session=False)
+        db.commit()
+
+        notes = links = 0
+        last_id = 0
+        while True:
+            rows = db.query(Note.id, Note.user_id, Note.content)\
+                .filter(Note.id > last_id)\
+                .order_by(Note.id)\
+                .limit(batch_size)\
+                .all()
+            if not rows:
+                break
+            for note_id, user_id, content in rows:
+                for title in extract_links(content):
+                    db.add(NoteLink(src_note_id=note_id, dst_title=title, user_id=user_id))
+                    links += 1
+            db.commit()
+            notes += len(rows)
+            last_id = rows[-1][0]
+        logger.info("链接表重建完成，共 {} 篇笔记、{} 条链接".format(notes, links))
+        return {"notes": notes, "links": links}
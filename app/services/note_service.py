@@ -8,22 +8,218 @@ MindLink 笔记业务逻辑服务
 - 权限验证
 """
 
-from typing import Optional, List, Tuple
+from collections import Counter
+from typing import Any, Dict, Optional, List, Tuple, Union
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
+from sqlalchemy import and_, func
+from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, status
 
 from app.models.note import (
-    Note, NoteVersion, NoteCreate, NoteUpdate, NoteTagUpdate,
-    NoteOut, NoteVersionOut, NoteQueryParams
+    Note, NoteVersion, NoteCreate, NoteUpdate, NotePatch, NoteTagUpdate, NoteBatchItem, NoteBatchRequest,
+    NoteOut, NoteListItemOut, NoteSearchItemOut, SearchSnippet, NoteVersionMetaOut, NoteVersionDiffOut, NoteQueryParams, NOTE_LIST_FIELDS, NOTE_SELECTABLE_FIELDS
 )
 from app.models.user import User
-from app.models.common import PaginationInfo, PaginatedResponse
+from app.models.common import PaginationInfo, PaginatedResponse, CursorPaginatedResponse
+from app.core.config import get_settings
 from app.services.ai_service import generate_note_summary
+from app.services.duplicate_service import DuplicateService
+from app.services.link_service import LinkService
+from app.services.object_cache import CacheKind, get_object_cache, invalidate_on_commit
+from app.services.related_index import get_related_index
+from app.services.search_index import get_search_index
+from app.services.search_backends import get_search_backend
+from app.services.stats_service import StatsService
+from app.services.suggest_index import get_suggest_index
+from app.models.summary_job import PRIORITY_BULK
+from app.services.summary_queue import SummaryQueue, notify_summary_workers
+from app.services.tag_service import TagService
+from app.services.version_service import VersionService, VERSION_ALLOCATE_ATTEMPTS
+from app.utils.etag import etag_parts, make_etag
+from app.utils.merge import merge_tags, merge_text, merge_value
+from app.utils.metrics import metrics
+from app.utils.pagination import keyset_paginate, order_by_keyset, cursor_for_row
+from app.utils.patch import PatchError, apply_ops, apply_unified_diff
+from app.utils.similarity import hamming_distance, note_fingerprint
+from app.utils.snippets import build_snippets, highlight, query_terms
 
 class NoteService:
     """笔记业务逻辑服务类"""
     
+    @staticmethod
+    def _index_note(note: Note) -> None:
+        """将笔记写入全文索引、相关笔记索引和补全索引（索引未启用时忽略）"""
+        get_suggest_index().index_note(note)
+        search_index = get_search_index()
+        if search_index is not None:
+            search_index.index_note(note.id, note.user_id, note.title, note.content)
+        related_index = get_related_index()
+        if related_index is not None:
+            related_index.index_note(note.id, note.user_id, note.title, note.content)
+    
+    @staticmethod
+    def _summary_outdated(note: Note) -> bool:
+        """
+        判断笔记的标题和内容相对上次请求摘要时是否有显著变化
+        
+        比较 SimHash 指纹的汉明距离，小于 SUMMARY_CHANGE_THRESHOLD 位的修改（如修改错字）
+        沿用原摘要；没有指纹（升级前的笔记）或摘要生成失败时总是重新生成。
+        """
+        if note.summary_fingerprint is None or note.summary_status == "failed":
+            return True
+        distance = hamming_distance(note.summary_fingerprint, note_fingerprint(note.title, note.content))
+        if distance >= get_settings().SUMMARY_CHANGE_THRESHOLD:
+            return True
+        metrics.incr("summary.skipped_minor_edits")
+        return False
+    
+    @staticmethod
+    def _request_summary(db: Session, note: Note) -> None:
+        """
+        为笔记安排摘要生成（需在提交前调用）
+        
+        启用异步摘要时只登记任务，笔记以 summary_status=pending 保存；
+        否则在请求中同步调用大模型。
+        """
+        note.summary_fingerprint = note_fingerprint(note.title, note.content)
+        if get_settings().SUMMARY_ASYNC_ENABLED:
+            SummaryQueue.enqueue(db, note)
+        else:
+            note.summary = generate_note_summary(note.content, note.title)
+            note.summary_status = "ready"
+    
+    @staticmethod
+    def _rank_search_matches(user_id: int, search: str) -> Optional[List[int]]:
+        """
+        使用全文索引检索笔记
+        
+        Args:
+            user_id: 用户ID
+            search: 搜索关键词
+            
+        Returns:
+            Optional[List[int]]: 按相关度排序的笔记ID列表；
+            索引不可用时返回 None，调用方应降级为模糊匹配
+        """
+        search_index = get_search_index()
+        if search_index is None:
+            return None
+        ranked = search_index.search(user_id, search)
+        if ranked is None:
+            return None
+        return [note_id for note_id, _ in ranked]
+    
+    @staticmethod
+    def _filter_ranked_ids(
+        db: Session,
+        user_id: int,
+        ranked_ids: List[int],
+        tags: Optional[List[str]],
+        tag_mode: str = "any"
+    ) -> List[int]:
+        """按标签过滤检索结果，保持相关度顺序"""
+        if not tags or not ranked_ids:
+            return ranked_ids
+        query = db.query(Note.id).filter(Note.id.in_(ranked_ids))
+        matched = {
+            row[0] for row in TagService.apply_filter(query, user_id, tags, tag_mode).all()
+        }
+        return [note_id for note_id in ranked_ids if note_id in matched]
+    
+    @staticmethod
+    def _load_notes_in_order(db: Session, note_ids: List[int], columns: Optional[List] = None) -> List:
+        """按给定ID顺序加载笔记（提供 columns 时只查询这些列）"""
+        if not note_ids:
+            return []
+        query = db.query(*columns) if columns else db.query(Note)
+        notes = query.filter(Note.id.in_(note_ids)).all()
+        notes_by_id = {note.id: note for note in notes}
+        return [notes_by_id[note_id] for note_id in note_ids if note_id in notes_by_id]
+    
+    @staticmethod
+    def _resolve_fields(fields: Optional[List[str]]) -> Optional[List[str]]:
+        """
+        校验列表返回字段
+        
+        Args:
+            fields: 请求的字段列表
+            
+        Returns:
+            Optional[List[str]]: 去重后的字段列表（总是包含 id）；None 表示使用默认列表视图
+            
+        Raises:
+            HTTPException: 包含不支持的字段时抛出异常
+        """
+        if not fields:
+            return None
+        unknown = [name for name in fields if name not in NOTE_SELECTABLE_FIELDS]
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="不支持的返回字段: {}".format(", ".join(unknown))
+            )
+        return list(dict.fromkeys(["id"] + fields))
+    
+    @staticmethod
+    def _list_columns(fields: Optional[List[str]], sort: Optional[str] = None) -> List:
+        """列表查询需要加载的列（排序字段用于生成游标，即使不返回也要查询）"""
+        names = list(fields or NOTE_LIST_FIELDS)
+        if sort and sort not in names:
+            names.append(sort)
+        return [getattr(Note, name) for name in names]
+    
+    @staticmethod
+    def _list_items(rows: List, fields: Optional[List[str]]) -> List[Union[NoteListItemOut, Dict[str, Any]]]:
+        """
+        把按列查询的结果转换为列表项
+        
+        数据直接来自数据库列，跳过 Pydantic 校验：默认视图构造 NoteListItemOut，
+        指定 fields 时返回只包含这些字段的字典。
+        """
+        if fields is None:
+            return [
+                NoteListItemOut.model_construct(**{name: getattr(row, name) for name in NOTE_LIST_FIELDS})
+                for row in rows
+            ]
+        return [{name: getattr(row, name) for name in fields} for row in rows]
+    
+    @staticmethod
+    def _search_items(
+        rows: List,
+        fields: Optional[List[str]],
+        query: str,
+        snippet_count: int
+    ) -> List[Union[NoteListItemOut, NoteSearchItemOut, Dict[str, Any]]]:
+        """
+        把搜索结果转换为列表项，需要时附加标题高亮和正文摘录
+        
+        摘录由分词器对每条结果的正文做一次有界扫描得到（索引不保存词元位置），
+        只处理本次返回的结果。
+        """
+        if not snippet_count:
+            return NoteService._list_items(rows, fields)
+        settings = get_settings()
+        terms = query_terms(query)
+        items = []
+        for row in rows:
+            title_highlights = highlight(row.title, terms, settings.SEARCH_SNIPPET_SCAN_CHARS)
+            snippets = build_snippets(
+                row.content, terms, snippet_count,
+                settings.SEARCH_SNIPPET_LENGTH, settings.SEARCH_SNIPPET_SCAN_CHARS
+            )
+            if fields is None:
+                items.append(NoteSearchItemOut.model_construct(
+                    **{name: getattr(row, name) for name in NOTE_LIST_FIELDS},
+                    title_highlights=title_highlights,
+                    snippets=[SearchSnippet.model_construct(**snippet) for snippet in snippets]
+                ))
+            else:
+                item = {name: getattr(row, name) for name in fields}
+                item["title_highlights"] = title_highlights
+                item["snippets"] = snippets
+                items.append(item)
+        return items
+    
     @staticmethod
     def create_note(db: Session, note_create: NoteCreate, current_user: User) -> Note:
         """
@@ -37,37 +233,255 @@ class NoteService:
         Returns:
             Note: 创建的笔记对象
         """
-        # 生成 AI 摘要
-        summary = generate_note_summary(note_create.content, note_create.title)
-        
         # 创建笔记
         db_note = Note(
             title=note_create.title,
             content=note_create.content,
-            summary=summary,
             tags=note_create.tags or [],
             user_id=current_user.id
         )
         
+        # 统计计数与笔记在同一事务中提交
+        StatsService.adjust(db, current_user.id, notes=1, tags_added=db_note.tags)
+        
         db.add(db_note)
+        db.flush()
+        TagService.set_note_tags(db, db_note, [], db_note.tags)
+        LinkService.set_note_links(db, db_note, "", db_note.content)
+        DuplicateService.index_note(db, db_note)
+        
+        # AI 摘要任务与笔记在同一事务中提交
+        NoteService._request_summary(db, db_note)
+        
         db.commit()
         db.refresh(db_note)
+        notify_summary_workers()
         
         # 创建初始版本
-        initial_version = NoteVersion(
-            note_id=db_note.id,
-            title=db_note.title,
-            content=db_note.content,
-            tags=db_note.tags,
-            version_number=1,
-            change_description="初始版本"
-        )
-        
-        db.add(initial_version)
+        VersionService.create_version(db, db_note, "初始版本")
         db.commit()
         
+        NoteService._index_note(db_note)
+        
         return db_note
     
+    @staticmethod
+    def batch_notes(db: Session, batch: NoteBatchRequest, current_user: User) -> Dict:
+        """
+        批量创建/更新笔记
+        
+        所有有效项在同一事务中写入：笔记和版本使用批量 INSERT，每篇被更新的笔记
+        只执行一次版本号分配，统计、标签索引和摘要任务各合并为少量语句。
+        摘要以批量优先级登记到任务队列，由后台工作线程生成。
+        没有实际变化的更新项不创建版本，结果中的 version_number 为 null。
+        
+        Args:
+            db: 数据库会话
+            batch: 批量操作请求
+            current_user: 当前用户
+            
+        Returns:
+            Dict: {"total", "success", "failed", "failed_items", "results"}
+            
+        Raises:
+            HTTPException: 操作数超过上限或多次重试仍冲突时抛出异常
+        """
+        max_items = get_settings().NOTE_BATCH_MAX_ITEMS
+        if len(batch.items) > max_items:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"批量操作最多包含 {max_items} 项"
+            )
+        
+        errors = NoteService._validate_batch_items(db, batch.items, current_user)
+        failed_items = [{"index": index, "error": error} for index, error in sorted(errors.items())]
+        valid = [(index, item) for index, item in enumerate(batch.items) if index not in errors]
+        if batch.atomic and errors:
+            valid = []
+        
+        results = []
+        if valid:
+            update_ids = {item.note_id for _, item in valid if item.op == "update"}
+            for _ in range(VERSION_ALLOCATE_ATTEMPTS):
+                try:
+                    results, changed = NoteService._apply_batch(db, valid, current_user)
+                    documents = [(note.id, note.user_id, note.title, note.content) for note in changed]
+                    suggestions = [(note.id, note.user_id, note.title, note.tags) for note in changed]
+                    invalidate_on_commit(db, CacheKind.NOTE, *update_ids)
+                    db.commit()
+                    break
+                except IntegrityError:
+                    # 版本计数器落后或并发创建了摘要任务，同步后整批重试
+                    db.rollback()
+                    if update_ids:
+                        VersionService.sync_counters(db, update_ids)
+                        db.commit()
+            else:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="批量写入冲突，请稍后重试"
+                )
+            
+            notify_summary_workers()
+            get_suggest_index().index_notes(suggestions)
+            search_index = get_search_index()
+            if search_index is not None:
+                search_index.index_notes(documents)
+            related_index = get_related_index()
+            if related_index is not None:
+                related_index.index_notes(documents)
+        
+        return {
+            "total": len(batch.items),
+            "success": len(results),
+            "failed": len(failed_items),
+            "failed_items": failed_items,
+            "results": results
+        }
+    
+    @staticmethod
+    def _validate_batch_items(db: Session, items: List[NoteBatchItem], current_user: User) -> Dict[int, str]:
+        """检查批量操作各项，返回 {序号: 错误信息}"""
+        update_ids = {item.note_id for item in items if item.op == "update" and item.note_id is not None}
+        owners = dict(db.query(Note.id, Note.user_id).filter(Note.id.in_(update_ids)).all()) if update_ids else {}
+        
+        errors = {}
+        for index, item in enumerate(items):
+            if item.op == "create":
+                if item.title is None or item.content is None:
+                    errors[index] = "创建笔记需要提供标题和内容"
+            elif item.note_id is None:
+                errors[index] = "更新笔记需要提供笔记ID"
+            elif item.note_id not in owners:
+                errors[index] = "笔记不存在"
+            elif owners[item.note_id] != current_user.id:
+                errors[index] = "权限不足，只能修改自己的笔记"
+            elif item.title is None and item.content is None and item.tags is None:
+                errors[index] = "没有需要更新的字段"
+        return errors
+    
+    @staticmethod
+    def _apply_batch(
+        db: Session,
+        items: List[Tuple[int, NoteBatchItem]],
+        current_user: User
+    ) -> Tuple[List[Dict], List[Note]]:
+        """在当前事务中执行批量操作（不提交），返回 (每项结果, 标题或内容有变化的笔记)"""
+        settings = get_settings()
+        interval = settings.NOTE_VERSION_SNAPSHOT_INTERVAL
+        
+        # 统计行需在插入笔记之前获取，避免懒初始化时重复计数
+        StatsService.get_stats(db, current_user.id, for_update=True)
+        
+        # 新笔记批量插入，初始版本号直接为 1
+        created = [
+            Note(
+                title=item.title,
+                content=item.content,
+                tags=item.tags or [],
+                user_id=current_user.id,
+                current_version=1
+            )
+            for _, item in items if item.op == "create"
+        ]
+        db.add_all(created)
+        db.flush()
+        
+        # 被更新的笔记一次加载，按顺序模拟各项更新，只保留实际变化的字段
+        update_ids = {item.note_id for _, item in items if item.op == "update"}
+        notes = {note.id: note for note in created}
+        if update_ids:
+            notes.update({
+                note.id: note for note in
+                db.query(Note).filter(Note.id.in_(list(update_ids))).all()
+            })
+        state = {
+            note_id: {field: getattr(notes[note_id], field) for field in ("title", "content", "tags")}
+            for note_id in update_ids
+        }
+        item_changes = {}
+        for index, item in items:
+            if item.op == "update":
+                current = state[item.note_id]
+                item_changes[index] = {
+                    field: getattr(item, field) for field in ("title", "content", "tags")
+                    if getattr(item, field) is not None and getattr(item, field) != current[field]
+                }
+                current.update(item_changes[index])
+        
+        # 每篇笔记一次原子递增分配本批需要的全部版本号（没有变化的项不占用版本号）
+        update_counts = Counter(item.note_id for index, item in items if item_changes.get(index))
+        next_numbers = {}
+        for note_id, count in update_counts.items():
+            last = VersionService.allocate_version_number(db, notes[note_id], count)
+            next_numbers[note_id] = last - count + 1
+        bases = VersionService.latest_bases(db, update_counts) if interval > 1 else {}
+        
+        results, versions = [], []
+        initial_tags = {note.id: [] for note in created}
+        initial_content = {note.id: "" for note in created}
+        changed = {}
+        created_notes = iter(created)
+        for index, item in items:
+            if item.op == "create":
+                note = next(created_notes)
+                previous, number, change, summary = "", 1, "初始版本", None
+                changed[note.id] = note
+            else:
+                note = notes[item.note_id]
+                fields = item_changes[index]
+                if not fields:
+                    metrics.incr("notes.noop_updates")
+                    results.append({"index": index, "op": item.op, "note_id": note.id, "version_number": None})
+                    continue
+                initial_tags.setdefault(note.id, list(note.tags or []))
+                initial_content.setdefault(note.id, note.content)
+                previous = note.content
+                for field, value in fields.items():
+                    setattr(note, field, value)
+                number = next_numbers[note.id]
+                next_numbers[note.id] += 1
+                change, summary = item.change_description or "更新笔记", note.summary
+                if "title" in fields or "content" in fields:
+                    changed[note.id] = note
+            
+            version = VersionService.build_version(
+                note, number, change, previous, bases.get(note.id), interval, summary
+            )
+            if version.storage == "snapshot":
+                bases[note.id] = (number, note.content)
+            versions.append(version)
+            results.append({"index": index, "op": item.op, "note_id": note.id, "version_number": number})
+        db.add_all(versions)
+        
+        # 标签索引和统计按每篇笔记的最终标签合并更新
+        tags_added, tags_removed = Counter(), Counter()
+        for note_id, old_tags in initial_tags.items():
+            note = notes[note_id]
+            TagService.set_note_tags(db, note, old_tags, note.tags)
+            tags_added.update(set(note.tags or []) - set(old_tags))
+            tags_removed.update(set(old_tags) - set(note.tags or []))
+        for note_id, old_content in initial_content.items():
+            if notes[note_id].content != old_content:
+                LinkService.set_note_links(db, notes[note_id], old_content, notes[note_id].content)
+        StatsService.adjust(
+            db, current_user.id, notes=len(created),
+            tags_added=tags_added, tags_removed=tags_removed
+        )
+        DuplicateService.index_notes(db, changed.values())
+        
+        # 变化显著的笔记延后到后台按批量优先级生成摘要
+        outdated = [note for note in changed.values() if NoteService._summary_outdated(note)]
+        if settings.SUMMARY_ASYNC_ENABLED:
+            for note in outdated:
+                note.summary_fingerprint = note_fingerprint(note.title, note.content)
+            SummaryQueue.enqueue_many(db, outdated, PRIORITY_BULK)
+        else:
+            for note in outdated:
+                NoteService._request_summary(db, note)
+        
+        return results, list(changed.values())
+    
     @staticmethod
     def get_note_by_id(db: Session, note_id: int, current_user: User) -> Note:
         """
@@ -85,62 +499,218 @@ class NoteService:
             HTTPException: 笔记不存在或权限不足时抛出异常
         """
         db_note = db.query(Note).filter(Note.id == note_id).first()
-        
-        if not db_note:
+        NoteService._check_owner(db_note, current_user)
+        return db_note
+    
+    @staticmethod
+    def _check_owner(note, current_user: User) -> None:
+        """检查笔记存在且属于当前用户（note 可以是笔记对象、查询行或缓存的字典）"""
+        if not note:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="笔记不存在"
             )
         
         # 检查权限：只能查看自己的笔记
-        if db_note.user_id != current_user.id:
+        user_id = note["user_id"] if isinstance(note, dict) else note.user_id
+        if user_id != current_user.id:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="权限不足，只能查看自己的笔记"
             )
+    
+    @staticmethod
+    def _note_entry(note: Note) -> Dict[str, Any]:
+        """笔记详情的缓存内容"""
+        return {
+            "note": NoteOut.from_orm(note).model_dump(mode="json"),
+            "user_id": note.user_id,
+            "row_version": note.row_version
+        }
+    
+    @staticmethod
+    def get_note_out(db: Session, note_id: int, current_user: User) -> Tuple[NoteOut, str]:
+        """
+        获取笔记详情和 ETag（优先读取对象缓存）
         
-        return db_note
+        Args:
+            db: 数据库会话
+            note_id: 笔记ID
+            current_user: 当前用户
+            
+        Returns:
+            Tuple[NoteOut, str]: (笔记详情, ETag)
+            
+        Raises:
+            HTTPException: 笔记不存在或权限不足时抛出异常
+        """
+        cache = get_object_cache()
+        if cache is None:
+            db_note = NoteService.get_note_by_id(db, note_id, current_user)
+            return NoteOut.from_orm(db_note), NoteService.note_etag(db_note)
+        
+        def load():
+            db_note = db.query(Note).filter(Note.id == note_id).first()
+            return NoteService._note_entry(db_note) if db_note else None
+        
+        entry = cache.get_or_load(CacheKind.NOTE, note_id, load)
+        NoteService._check_owner(entry, current_user)
+        return NoteOut.model_validate(entry["note"]), NoteService._entry_etag(note_id, entry)
+    
+    @staticmethod
+    def note_etag(note: Note) -> str:
+        """
+        根据版本号和行版本生成笔记的 ETag
+        
+        行版本在任何修改（包括后台生成摘要）后递增，用于 If-None-Match；
+        版本号部分用于 If-Match，只在用户修改标题、内容或标签时变化。
+        """
+        return make_etag("note", note.id, note.current_version, note.row_version)
+    
+    @staticmethod
+    def _entry_etag(note_id: int, entry: Dict[str, Any]) -> str:
+        """根据缓存的笔记详情生成 ETag"""
+        return make_etag("note", note_id, entry["note"]["current_version"], entry["row_version"])
+    
+    @staticmethod
+    def get_note_etag(db: Session, note_id: int, current_user: User) -> str:
+        """
+        获取笔记当前的 ETag（优先读取对象缓存，否则只查询版本号，不加载内容）
+        
+        Args:
+            db: 数据库会话
+            note_id: 笔记ID
+            current_user: 当前用户
+            
+        Returns:
+            str: 笔记的 ETag
+            
+        Raises:
+            HTTPException: 笔记不存在或权限不足时抛出异常
+        """
+        cache = get_object_cache()
+        entry = cache.get(CacheKind.NOTE, note_id) if cache is not None else None
+        if entry is not None:
+            NoteService._check_owner(entry, current_user)
+            return NoteService._entry_etag(note_id, entry)
+        
+        row = db.query(Note.id, Note.user_id, Note.current_version, Note.row_version).filter(Note.id == note_id).first()
+        NoteService._check_owner(row, current_user)
+        return NoteService.note_etag(row)
+    
+    @staticmethod
+    def get_tags_etag(db: Session, current_user: User, kind: str = "tags") -> str:
+        """
+        获取用户标签集合的 ETag（读取标签代数，优先读取对象缓存）
+        
+        Args:
+            db: 数据库会话
+            current_user: 当前用户
+            kind: 表示形式（标签列表和标签统计使用不同的 ETag）
+            
+        Returns:
+            str: 标签集合的 ETag
+        """
+        return make_etag(kind, current_user.id, StatsService.read_tags(db, current_user.id)["generation"])
     
     @staticmethod
     def get_notes(
         db: Session, 
         current_user: User,
         query_params: NoteQueryParams
-    ) -> PaginatedResponse[NoteOut]:
+    ) -> Union[PaginatedResponse, CursorPaginatedResponse]:
         """
         获取笔记列表（分页）
         
+        提供 cursor 时使用键集分页，每页代价与翻页深度无关；
+        否则沿用页码分页，并在响应中返回可切换到游标分页的 next_cursor。
+        只查询需要返回的列：默认不加载正文，fields 中包含 content 时才加载。
+        
         Args:
             db: 数据库会话
             current_user: 当前用户
             query_params: 查询参数
             
         Returns:
-            PaginatedResponse[NoteOut]: 分页的笔记列表
+            Union[PaginatedResponse, CursorPaginatedResponse]: 分页的笔记列表
+            
+        Raises:
+            HTTPException: 游标无效、返回字段不支持或游标与关键词搜索同时使用时抛出异常
         """
-        # 构建查询
-        query = db.query(Note).filter(Note.user_id == current_user.id)
+        if query_params.cursor and query_params.search:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="游标分页不支持与关键词搜索同时使用"
+            )
         
-        # 标签筛选
-        if query_params.tags:
-            query = query.filter(Note.tags.overlap(query_params.tags))
+        fields = NoteService._resolve_fields(query_params.fields)
+        columns = NoteService._list_columns(fields, query_params.sort)
+        item_type = NoteListItemOut if fields is None else Dict[str, Any]
         
-        # 关键词搜索
+        # 用户ID筛选（超级用户可以查看其他用户的笔记），其他用户只能查看自己的笔记
+        filter_user = bool(query_params.user_id and current_user.is_superuser)
+        owner_id = query_params.user_id if filter_user else current_user.id
+        
+        # 关键词搜索优先使用全文索引，按相关度分页
         if query_params.search:
-            search_term = f"%{query_params.search}%"
-            query = query.filter(
-                or_(
-                    Note.title.ilike(search_term),
-                    Note.content.ilike(search_term)
+            ranked_ids = NoteService._rank_search_matches(owner_id, query_params.search)
+            if ranked_ids is not None:
+                ranked_ids = NoteService._filter_ranked_ids(
+                    db, owner_id, ranked_ids, query_params.tags, query_params.tag_mode
+                )
+                total = len(ranked_ids)
+                offset = (query_params.page - 1) * query_params.size
+                notes = NoteService._load_notes_in_order(
+                    db, ranked_ids[offset:offset + query_params.size], columns
+                )
+                pages = (total + query_params.size - 1) // query_params.size
+                
+                return PaginatedResponse[item_type](
+                    items=NoteService._list_items(notes, fields),
+                    pagination=PaginationInfo(
+                        page=query_params.page,
+                        size=query_params.size,
+                        total=total,
+                        pages=pages
+                    )
                 )
+        
+        # 构建查询（只选择需要的列）
+        query = db.query(*columns).filter(Note.user_id == owner_id)
+        
+        # 标签筛选（使用 note_tags 倒排索引）
+        query = TagService.apply_filter(query, owner_id, query_params.tags, query_params.tag_mode)
+        
+        # 关键词搜索（索引不可用时由数据库检索并按相关度排序）
+        if query_params.search:
+            backend = get_search_backend(db, query_params.search)
+            query = backend.apply(query, query_params.search)
+        
+        sort_column = getattr(Note, query_params.sort)
+        
+        # 游标分页
+        if query_params.cursor:
+            notes, next_cursor = keyset_paginate(
+                query, sort_column, Note.id,
+                query_params.sort, query_params.order,
+                query_params.size, query_params.cursor
+            )
+            return CursorPaginatedResponse[item_type](
+                items=NoteService._list_items(notes, fields),
+                size=query_params.size,
+                next_cursor=next_cursor,
+                has_more=next_cursor is not None
             )
         
-        # 用户ID筛选（超级用户可以查看所有用户的笔记）
-        if query_params.user_id and current_user.is_superuser:
-            query = query.filter(Note.user_id == query_params.user_id)
+        # 获取总数：无筛选条件时直接读取统计计数，避免对笔记表执行 count()
+        if query_params.search or query_params.tags or filter_user:
+            total = query.count()
+        else:
+            total = StatsService.read_stats(db, current_user.id).note_count
         
-        # 获取总数
-        total = query.count()
+        # 排序（关键词搜索已按相关度排序）
+        if not query_params.search:
+            query = order_by_keyset(query, sort_column, Note.id, query_params.order)
         
         # 分页
         offset = (query_params.page - 1) * query_params.size
@@ -149,15 +719,20 @@ class NoteService:
         # 计算分页信息
         pages = (total + query_params.size - 1) // query_params.size
         
+        next_cursor = None
+        if notes and not query_params.search and query_params.page < pages:
+            next_cursor = cursor_for_row(notes[-1], sort_column, query_params.sort, query_params.order)
+        
         pagination_info = PaginationInfo(
             page=query_params.page,
             size=query_params.size,
             total=total,
-            pages=pages
+            pages=pages,
+            next_cursor=next_cursor
         )
         
-        return PaginatedResponse[NoteOut](
-            items=[NoteOut.from_orm(note) for note in notes],
+        return PaginatedResponse[item_type](
+            items=NoteService._list_items(notes, fields),
             pagination=pagination_info
         )
     
@@ -166,62 +741,229 @@ class NoteService:
         db: Session, 
         note_id: int, 
         note_update: NoteUpdate,
-        current_user: User
+        current_user: User,
+        if_match: Optional[str] = None
     ) -> Note:
         """
         更新笔记
         
+        提供 base_version 或 If-Match 时使用乐观并发控制：笔记已被修改时尝试三方合并，
+        无法合并返回 412；版本号的递增以笔记仍为合并时的版本为条件，不加锁。
+        
         Args:
             db: 数据库会话
             note_id: 笔记ID
             note_update: 笔记更新请求模型
             current_user: 当前用户
+            if_match: If-Match 请求头（可选）
             
         Returns:
             Note: 更新后的笔记对象
             
         Raises:
-            HTTPException: 笔记不存在或权限不足时抛出异常
+            HTTPException: 笔记不存在、权限不足或修改冲突时抛出异常
         """
         # 获取笔记
         db_note = NoteService.get_note_by_id(db, note_id, current_user)
         
-        # 获取当前版本号
-        current_version = db.query(func.max(NoteVersion.version_number))\
-            .filter(NoteVersion.note_id == note_id).scalar() or 0
-        
         # 更新笔记信息
         update_data = note_update.dict(exclude_unset=True)
         
         # 记录变更描述
         change_description = update_data.pop("change_description", "更新笔记")
         
+        # 基于旧版本的修改与此后的修改合并
+        expected_version = NoteService._expected_version(note_id, if_match, update_data.pop("base_version", None))
+        if expected_version is not None and expected_version != db_note.current_version:
+            update_data = NoteService._merge_update(db, db_note, expected_version, update_data)
+            expected_version = db_note.current_version
+        
+        # 只保留实际变化的字段；没有变化的更新（如自动保存相同内容）不写入，也不创建版本
+        update_data = {
+            field: value for field, value in update_data.items()
+            if getattr(db_note, field) != value
+        }
+        if not update_data:
+            metrics.incr("notes.noop_updates")
+            return db_note
+        
+        old_tags = list(db_note.tags or [])
+        old_content = db_note.content
+        
         # 执行更新
         for field, value in update_data.items():
             setattr(db_note, field, value)
         
-        # 如果内容或标题有更新，重新生成 AI 摘要
-        if 'content' in update_data or 'title' in update_data:
-            new_summary = generate_note_summary(db_note.content, db_note.title)
-            db_note.summary = new_summary
+        StatsService.note_tags_changed(db, db_note.user_id, old_tags, db_note.tags)
+        TagService.set_note_tags(db, db_note, old_tags, db_note.tags)
+        if 'content' in update_data:
+            LinkService.set_note_links(db, db_note, old_content, db_note.content)
+            DuplicateService.index_note(db, db_note)
+        
+        # 标题或内容变化显著时才重新生成 AI 摘要
+        if ('content' in update_data or 'title' in update_data) and NoteService._summary_outdated(db_note):
+            NoteService._request_summary(db, db_note)
         
         # 创建新版本
-        new_version = NoteVersion(
-            note_id=db_note.id,
-            title=db_note.title,
-            content=db_note.content,
-            summary=db_note.summary,
-            tags=db_note.tags,
-            version_number=current_version + 1,
-            change_description=change_description
+        VersionService.create_version(
+            db, db_note, change_description,
+            previous_content=old_content, summary=db_note.summary,
+            expected_version=expected_version
         )
-        
-        db.add(new_version)
+        invalidate_on_commit(db, CacheKind.NOTE, db_note.id)
         db.commit()
         db.refresh(db_note)
         
+        if 'content' in update_data or 'title' in update_data:
+            notify_summary_workers()
+            NoteService._index_note(db_note)
+        elif 'tags' in update_data:
+            get_suggest_index().index_note(db_note)
+        
         return db_note
     
+    @staticmethod
+    def _expected_version(note_id: int, if_match: Optional[str], base_version: Optional[int]) -> Optional[int]:
+        """
+        请求要求的笔记版本号：优先使用 base_version，否则从 If-Match 中该笔记的 ETag 解析
+        
+        Returns:
+            Optional[int]: 版本号；未提供条件或 If-Match 为 * 时返回 None
+            
+        Raises:
+            HTTPException: If-Match 中没有该笔记的 ETag 时抛出异常
+        """
+        if base_version is not None:
+            return base_version
+        if not if_match or if_match.strip() == "*":
+            return None
+        for candidate in if_match.split(","):
+            parts = etag_parts(candidate)
+            if len(parts) >= 4 and parts[:2] == ["note", str(note_id)] and parts[2].isdigit():
+                return int(parts[2])
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="If-Match 与笔记当前的 ETag 不匹配"
+        )
+    
+    @staticmethod
+    def _merge_update(db: Session, note: Note, base_version: int, update_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        把基于旧版本的修改与笔记当前内容三方合并
+        
+        只有本次修改过（与基准版本不同）的字段参与合并，没有修改的字段保留当前值；
+        内容按行合并，标签按集合合并，标题只有一方修改时取修改后的值。
+        
+        Args:
+            db: 数据库会话
+            note: 笔记（当前内容）
+            base_version: 修改所基于的版本号
+            update_data: 基于该版本的修改
+            
+        Returns:
+            Dict[str, Any]: 相对当前内容的修改
+            
+        Raises:
+            HTTPException: 未启用合并、基准版本已被清理或双方修改冲突时抛出异常
+        """
+        conflict = HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="笔记已更新到版本 {}，本次修改无法自动合并，请获取最新版本后重试".format(note.current_version)
+        )
+        base = None
+        if get_settings().NOTE_AUTO_MERGE and base_version < note.current_version:
+            base = db.query(NoteVersion).filter(
+                NoteVersion.note_id == note.id,
+                NoteVersion.version_number == base_version
+            ).first()
+        if base is None:
+            metrics.incr("notes.version_conflicts")
+            raise conflict
+        VersionService.load_content(db, base)
+        
+        merged = {}
+        for field, mine in update_data.items():
+            base_value, theirs = getattr(base, field), getattr(note, field)
+            if field == "tags":
+                ok, value = True, merge_tags(base_value, mine, theirs)
+            elif field == "content":
+                value = merge_text(base_value, mine, theirs)
+                ok = value is not None
+            else:
+                ok, value = merge_value(base_value, mine, theirs)
+            if not ok:
+                metrics.incr("notes.version_conflicts")
+                raise conflict
+            merged[field] = value
+        metrics.incr("notes.merged_updates")
+        return merged
+    
+    @staticmethod
+    def patch_note(
+        db: Session,
+        note_id: int,
+        note_patch: NotePatch,
+        current_user: User
+    ) -> Note:
+        """
+        按补丁更新笔记（客户端只提交变化部分）
+        
+        补丁应用到 base_version 对应的内容，再按带 base_version 的普通更新处理：
+        笔记此后被修改时与当前内容三方合并，无法合并返回 412
+        （没有变化时不创建版本，标签、链接、索引和摘要照常维护）。
+        
+        Args:
+            db: 数据库会话
+            note_id: 笔记ID
+            note_patch: 补丁请求模型
+            current_user: 当前用户
+            
+        Returns:
+            Note: 更新后的笔记对象
+            
+        Raises:
+            HTTPException: 笔记不存在、权限不足、修改冲突或补丁无法应用时抛出异常
+        """
+        if note_patch.ops is not None and note_patch.diff is not None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="ops 和 diff 只能提供一个"
+            )
+        
+        db_note = NoteService.get_note_by_id(db, note_id, current_user)
+        base_content = db_note.content
+        if note_patch.base_version != db_note.current_version and (note_patch.ops is not None or note_patch.diff is not None):
+            # 笔记已被修改：把补丁应用到基准版本，再按普通更新与当前内容合并
+            base = db.query(NoteVersion).filter(
+                NoteVersion.note_id == note_id,
+                NoteVersion.version_number == note_patch.base_version
+            ).first()
+            if base is None or not get_settings().NOTE_AUTO_MERGE:
+                metrics.incr("notes.version_conflicts")
+                raise HTTPException(
+                    status_code=status.HTTP_412_PRECONDITION_FAILED,
+                    detail="笔记已更新到版本 {}，请基于最新内容重新生成补丁".format(db_note.current_version)
+                )
+            base_content = VersionService.load_content(db, base).content
+        
+        update_data = note_patch.dict(
+            exclude_unset=True, include={"title", "tags", "change_description", "base_version"}
+        )
+        try:
+            if note_patch.ops is not None:
+                update_data["content"] = apply_ops(
+                    base_content, [(op.offset, op.delete, op.insert) for op in note_patch.ops]
+                )
+            elif note_patch.diff is not None:
+                update_data["content"] = apply_unified_diff(base_content, note_patch.diff)
+        except PatchError as e:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="补丁无法应用: {}".format(str(e))
+            )
+        
+        return NoteService.update_note(db, note_id, NoteUpdate(**update_data), current_user)
+    
     @staticmethod
     def delete_note(db: Session, note_id: int, current_user: User) -> bool:
         """
@@ -242,57 +984,81 @@ class NoteService:
         db_note = NoteService.get_note_by_id(db, note_id, current_user)
         
         try:
+            StatsService.adjust(db, db_note.user_id, notes=-1, tags_removed=db_note.tags or [])
             db.delete(db_note)
+            invalidate_on_commit(db, CacheKind.NOTE, db_note.id)
             db.commit()
-            return True
         except Exception:
             db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="笔记删除失败"
             )
+        
+        get_suggest_index().remove_note(note_id, current_user.id)
+        search_index = get_search_index()
+        if search_index is not None:
+            search_index.remove_note(note_id)
+        related_index = get_related_index()
+        if related_index is not None:
+            related_index.remove_note(note_id, current_user.id)
+        
+        return True
     
     @staticmethod
     def update_note_tags(
         db: Session, 
         note_id: int, 
         tag_update: NoteTagUpdate,
-        current_user: User
+        current_user: User,
+        if_match: Optional[str] = None
     ) -> Note:
         """
         更新笔记标签
         
+        提供 base_version 或 If-Match 且笔记已被修改时，标签按集合与当前标签合并。
+        
         Args:
             db: 数据库会话
             note_id: 笔记ID
             tag_update: 标签更新请求模型
             current_user: 当前用户
+            if_match: If-Match 请求头（可选）
             
         Returns:
             Note: 更新后的笔记对象
+            
+        Raises:
+            HTTPException: 笔记不存在、权限不足或修改冲突时抛出异常
         """
         # 获取笔记
         db_note = NoteService.get_note_by_id(db, note_id, current_user)
         
+        tags = tag_update.tags
+        expected_version = NoteService._expected_version(note_id, if_match, tag_update.base_version)
+        if expected_version is not None and expected_version != db_note.current_version:
+            tags = NoteService._merge_update(db, db_note, expected_version, {"tags": tags})["tags"]
+            expected_version = db_note.current_version
+        
+        # 标签没有变化时不写入，也不创建版本
+        if list(db_note.tags or []) == tags:
+            metrics.incr("notes.noop_updates")
+            return db_note
+        
         # 更新标签
-        db_note.tags = tag_update.tags
+        StatsService.note_tags_changed(db, db_note.user_id, db_note.tags, tags)
+        TagService.set_note_tags(db, db_note, db_note.tags, tags)
+        db_note.tags = tags
         
         # 创建新版本
-        current_version = db.query(func.max(NoteVersion.version_number))\
-            .filter(NoteVersion.note_id == note_id).scalar() or 0
-        
-        new_version = NoteVersion(
-            note_id=db_note.id,
-            title=db_note.title,
-            content=db_note.content,
-            tags=db_note.tags,
-            version_number=current_version + 1,
-            change_description="更新标签"
+        VersionService.create_version(
+            db, db_note, "更新标签", previous_content=db_note.content,
+            expected_version=expected_version
         )
-        
-        db.add(new_version)
+        invalidate_on_commit(db, CacheKind.NOTE, db_note.id)
         db.commit()
         db.refresh(db_note)
+        get_suggest_index().index_note(db_note)
         
         return db_note
     
@@ -300,29 +1066,85 @@ class NoteService:
     def get_note_versions(
         db: Session, 
         note_id: int, 
-        current_user: User
-    ) -> List[NoteVersionOut]:
+        current_user: User,
+        page: int = 1,
+        size: int = 20,
+        cursor: Optional[str] = None
+    ) -> Union[PaginatedResponse[NoteVersionMetaOut], CursorPaginatedResponse[NoteVersionMetaOut]]:
         """
-        获取笔记版本历史
+        获取笔记版本历史（分页，只返回元数据）
+        
+        只查询列表需要的列，不读取版本内容和摘要；完整内容通过 get_note_version 获取。
+        提供 cursor 时使用键集分页，否则使用页码分页。
         
         Args:
             db: 数据库会话
             note_id: 笔记ID
             current_user: 当前用户
+            page: 页码
+            size: 每页大小
+            cursor: 上一页返回的游标（可选）
             
         Returns:
-            List[NoteVersionOut]: 版本历史列表
+            Union[PaginatedResponse[NoteVersionMetaOut], CursorPaginatedResponse[NoteVersionMetaOut]]: 按版本号倒序的版本元数据
         """
         # 检查笔记权限
         NoteService.get_note_by_id(db, note_id, current_user)
         
-        # 获取版本历史
-        versions = db.query(NoteVersion)\
-            .filter(NoteVersion.note_id == note_id)\
-            .order_by(NoteVersion.version_number.desc())\
-            .all()
+        # 升级前的版本没有记录大小，由数据库计算原文长度（不传输内容）
+        query = db.query(
+            NoteVersion.id,
+            NoteVersion.version_number,
+            NoteVersion.change_description,
+            NoteVersion.created_at,
+            func.coalesce(NoteVersion.content_size, func.length(NoteVersion.content)).label("size"),
+            NoteVersion.lines_added,
+            NoteVersion.lines_removed
+        ).filter(NoteVersion.note_id == note_id)
+        
+        def to_meta(row) -> NoteVersionMetaOut:
+            return NoteVersionMetaOut(
+                version_number=row.version_number,
+                change_description=row.change_description,
+                created_at=row.created_at,
+                size=row.size,
+                lines_added=row.lines_added,
+                lines_removed=row.lines_removed,
+                diff_summary=VersionService.describe_diff(row.lines_added, row.lines_removed)
+            )
         
-        return [NoteVersionOut.from_orm(version) for version in versions]
+        if cursor:
+            rows, next_cursor = keyset_paginate(
+                query, NoteVersion.version_number, NoteVersion.id,
+                "version_number", "desc", size, cursor
+            )
+            return CursorPaginatedResponse[NoteVersionMetaOut](
+                items=[to_meta(row) for row in rows],
+                size=size,
+                next_cursor=next_cursor,
+                has_more=next_cursor is not None
+            )
+        
+        total = db.query(func.count(NoteVersion.id))\
+            .filter(NoteVersion.note_id == note_id).scalar()
+        rows = order_by_keyset(query, NoteVersion.version_number, NoteVersion.id, "desc")\
+            .offset((page - 1) * size).limit(size).all()
+        pages = (total + size - 1) // size
+        
+        next_cursor = None
+        if rows and page < pages:
+            next_cursor = cursor_for_row(rows[-1], NoteVersion.version_number, "version_number", "desc")
+        
+        return PaginatedResponse[NoteVersionMetaOut](
+            items=[to_meta(row) for row in rows],
+            pagination=PaginationInfo(
+                page=page,
+                size=size,
+                total=total,
+                pages=pages,
+                next_cursor=next_cursor
+            )
+        )
     
     @staticmethod
     def get_note_version(
@@ -364,54 +1186,228 @@ class NoteService:
                 detail="指定版本不存在"
             )
         
-        return version
-    
+        return VersionService.load_content(db, version)
+
+    @staticmethod
+    def get_version_diff(
+        db: Session,
+        note_id: int,
+        from_version: int,
+        to_version: int,
+        current_user: User,
+        mode: str = "line",
+        context: int = 3
+    ) -> NoteVersionDiffOut:
+        """
+        获取两个版本之间的差异
+
+        Args:
+            db: 数据库会话
+            note_id: 笔记ID
+            from_version: 原版本号
+            to_version: 新版本号
+            current_user: 当前用户
+            mode: line（按行）或 word（按单词）
+            context: 每个差异块的上下文行数
+
+        Returns:
+            NoteVersionDiffOut: 版本差异
+
+        Raises:
+            HTTPException: 笔记或版本不存在、无权限时抛出异常
+        """
+        # 检查笔记权限
+        NoteService.get_note_by_id(db, note_id, current_user)
+
+        diff = VersionService.diff_versions(db, note_id, from_version, to_version, mode, context)
+        return NoteVersionDiffOut.model_validate(diff)
+
+    @staticmethod
+    def get_note_duplicates(
+        db: Session,
+        note_id: int,
+        current_user: User,
+        threshold: Optional[float] = None,
+        limit: int = 20
+    ) -> List[Dict]:
+        """
+        查找与指定笔记近似重复的笔记
+
+        Args:
+            db: 数据库会话
+            note_id: 笔记ID
+            current_user: 当前用户
+            threshold: 相似度阈值（默认使用 DUPLICATE_THRESHOLD）
+            limit: 最多返回数量
+
+        Returns:
+            List[Dict]: [{"id", "title", "similarity"}]，按相似度从高到低排列
+
+        Raises:
+            HTTPException: 笔记不存在或权限不足时抛出异常
+        """
+        db_note = NoteService.get_note_by_id(db, note_id, current_user)
+        return DuplicateService.find_similar(db, db_note, threshold, limit)
+
+    @staticmethod
+    def get_backlinks(db: Session, note_id: int, current_user: User) -> List[Dict]:
+        """
+        查找通过 [[标题]] 链接到指定笔记的笔记
+
+        Args:
+            db: 数据库会话
+            note_id: 笔记ID
+            current_user: 当前用户
+
+        Returns:
+            List[Dict]: [{"id", "title"}]，按标题排序
+
+        Raises:
+            HTTPException: 笔记不存在或权限不足时抛出异常
+        """
+        db_note = NoteService.get_note_by_id(db, note_id, current_user)
+        return LinkService.backlinks(db, db_note)
+
+    @staticmethod
+    def get_link_graph(db: Session, note_id: int, current_user: User, depth: int = 1) -> Dict:
+        """
+        获取指定笔记周围的链接关系图
+
+        Args:
+            db: 数据库会话
+            note_id: 笔记ID
+            current_user: 当前用户
+            depth: 扩展层数
+
+        Returns:
+            Dict: {"nodes": [{"id", "title"}], "edges": [{"source", "target"}], "missing": [不存在的链接目标]}
+
+        Raises:
+            HTTPException: 笔记不存在或权限不足时抛出异常
+        """
+        db_note = NoteService.get_note_by_id(db, note_id, current_user)
+        return LinkService.graph(db, db_note, depth)
+
+    @staticmethod
+    def get_related_notes(db: Session, note_id: int, current_user: User, limit: int = 10) -> List[Dict]:
+        """
+        查找与指定笔记内容相关的笔记
+
+        Args:
+            db: 数据库会话
+            note_id: 笔记ID
+            current_user: 当前用户
+            limit: 最多返回数量
+
+        Returns:
+            List[Dict]: [{"id", "title", "score"}]，按相关度从高到低排列
+
+        Raises:
+            HTTPException: 笔记不存在、权限不足或相关笔记索引未启用时抛出异常
+        """
+        related_index = get_related_index()
+        if related_index is None:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="相关笔记索引未启用"
+            )
+        db_note = NoteService.get_note_by_id(db, note_id, current_user)
+        ranked = related_index.related(current_user.id, note_id, limit, text=(db_note.title, db_note.content))
+        if not ranked:
+            return []
+        
+        # 索引可能包含刚被其他进程删除的笔记，以数据库为准
+        titles = dict(
+            db.query(Note.id, Note.title)
+            .filter(Note.id.in_([related_id for related_id, _ in ranked]), Note.user_id == current_user.id)
+            .all()
+        )
+        return [
+            {"id": related_id, "title": titles[related_id], "score": round(score, 4)}
+            for related_id, score in ranked if related_id in titles
+        ]
+
+    @staticmethod
+    def get_duplicate_groups(db: Session, current_user: User, threshold: Optional[float] = None) -> List[Dict]:
+        """
+        查找当前用户所有近似重复的笔记组
+
+        Args:
+            db: 数据库会话
+            current_user: 当前用户
+            threshold: 相似度阈值（默认使用 DUPLICATE_THRESHOLD）
+
+        Returns:
+            List[Dict]: [{"notes": [{"id", "title"}], "similarity"}]
+        """
+        return DuplicateService.find_user_duplicates(db, current_user.id, threshold)
+
     @staticmethod
     def restore_note_version(
         db: Session, 
         note_id: int, 
         version_number: int,
-        current_user: User
+        current_user: User,
+        if_match: Optional[str] = None,
+        base_version: Optional[int] = None
     ) -> Note:
         """
         恢复笔记到指定版本
         
+        提供 base_version 或 If-Match 时，笔记已被修改则返回 412（恢复会覆盖全部内容，不做合并）。
+        
         Args:
             db: 数据库会话
             note_id: 笔记ID
             version_number: 要恢复的版本号
             current_user: 当前用户
+            if_match: If-Match 请求头（可选）
+            base_version: 要求笔记当前的版本号（可选）
             
         Returns:
             Note: 恢复后的笔记对象
+            
+        Raises:
+            HTTPException: 笔记或版本不存在、权限不足或笔记已被修改时抛出异常
         """
         # 获取指定版本
         version = NoteService.get_note_version(db, note_id, version_number, current_user)
         
         # 获取当前笔记
         db_note = NoteService.get_note_by_id(db, note_id, current_user)
+        expected_version = NoteService._expected_version(note_id, if_match, base_version)
+        if expected_version is not None and expected_version != db_note.current_version:
+            metrics.incr("notes.version_conflicts")
+            raise HTTPException(
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                detail="笔记已更新到版本 {}，请获取最新版本后重试".format(db_note.current_version)
+            )
         
         # 恢复内容
+        old_content = db_note.content
+        StatsService.note_tags_changed(db, db_note.user_id, db_note.tags, version.tags)
+        TagService.set_note_tags(db, db_note, db_note.tags, version.tags)
         db_note.title = version.title
         db_note.content = version.content
         db_note.tags = version.tags
+        LinkService.set_note_links(db, db_note, old_content, db_note.content)
+        DuplicateService.index_note(db, db_note)
         
         # 创建新版本
-        current_version = db.query(func.max(NoteVersion.version_number))\
-            .filter(NoteVersion.note_id == note_id).scalar() or 0
-        
-        new_version = NoteVersion(
-            note_id=db_note.id,
-            title=db_note.title,
-            content=db_note.content,
-            tags=db_note.tags,
-            version_number=current_version + 1,
-            change_description=f"恢复到版本 {version_number}"
+        VersionService.create_version(
+            db, db_note, f"恢复到版本 {version_number}",
+            previous_content=old_content, expected_version=expected_version
         )
         
-        db.add(new_version)
+        # 恢复后的内容需要重新生成摘要
+        NoteService._request_summary(db, db_note)
+        
+        invalidate_on_commit(db, CacheKind.NOTE, db_note.id)
         db.commit()
         db.refresh(db_note)
+        notify_summary_workers()
+        
+        NoteService._index_note(db_note)
         
         return db_note
     
@@ -427,18 +1423,23 @@ class NoteService:
         Returns:
             List[str]: 标签列表
         """
-        # 查询用户所有笔记的标签
-        result = db.query(Note.tags)\
-            .filter(Note.user_id == current_user.id)\
-            .all()
-        
-        # 合并所有标签并去重
-        all_tags = set()
-        for tags in result:
-            if tags[0]:  # tags[0] 是 ARRAY 字段
-                all_tags.update(tags[0])
+        # 标签计数由统计表维护（经对象缓存读取），无需扫描用户的所有笔记
+        return sorted(StatsService.read_tags(db, current_user.id)["tag_counts"])
+    
+    @staticmethod
+    def get_user_tag_counts(db: Session, current_user: User) -> Dict[str, int]:
+        """
+        获取用户每个标签的笔记数量
         
-        return sorted(list(all_tags))
+        Args:
+            db: 数据库会话
+            current_user: 当前用户
+            
+        Returns:
+            Dict[str, int]: {标签: 笔记数}，按笔记数降序、标签名升序排列
+        """
+        counts = StatsService.read_tags(db, current_user.id)["tag_counts"]
+        return dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
     
     @staticmethod
     def search_notes(
@@ -446,10 +1447,16 @@ class NoteService:
         current_user: User,
         query: str,
         tags: Optional[List[str]] = None,
-        limit: int = 50
-    ) -> List[NoteOut]:
+        limit: int = 50,
+        tag_mode: str = "any",
+        fields: Optional[List[str]] = None,
+        snippet_count: int = 0
+    ) -> List[Union[NoteListItemOut, NoteSearchItemOut, Dict[str, Any]]]:
         """
-        搜索笔记
+        搜索笔记（与列表相同，默认不返回正文）
+        
+        snippet_count 大于 0 时只为返回的结果读取正文，生成标题高亮和正文摘录，
+        正文本身仍不返回（除非在 fields 中指定）。
         
         Args:
             db: 数据库会话
@@ -457,28 +1464,59 @@ class NoteService:
             query: 搜索关键词
             tags: 标签筛选
             limit: 限制返回数量
+            tag_mode: 标签匹配方式（any 任一匹配，all 全部匹配）
+            fields: 返回字段（为空时返回默认列表视图）
+            snippet_count: 每条结果的正文摘录数量（0 表示不生成摘录）
             
         Returns:
-            List[NoteOut]: 搜索结果列表
+            List[Union[NoteListItemOut, NoteSearchItemOut, Dict[str, Any]]]: 搜索结果列表
+            
+        Raises:
+            HTTPException: 返回字段不支持时抛出异常
         """
-        # 构建搜索查询
-        search_query = db.query(Note).filter(Note.user_id == current_user.id)
+        fields = NoteService._resolve_fields(fields)
+        columns = NoteService._list_columns(fields)
+        snippet_count = snippet_count if query else 0
+        if snippet_count:
+            loaded = set(fields or NOTE_LIST_FIELDS)
+            columns += [getattr(Note, name) for name in ("title", "content") if name not in loaded]
+        
+        # 优先使用全文索引，按 BM25 相关度排序
+        if query:
+            ranked_ids = NoteService._rank_search_matches(current_user.id, query)
+            if ranked_ids is not None:
+                ranked_ids = NoteService._filter_ranked_ids(db, current_user.id, ranked_ids, tags, tag_mode)
+                notes = NoteService._load_notes_in_order(db, ranked_ids[:limit], columns)
+                return NoteService._search_items(notes, fields, query, snippet_count)
+        
+        # 构建搜索查询（索引不可用时使用数据库检索）
+        search_query = db.query(*columns).filter(Note.user_id == current_user.id)
         
         # 标签筛选
-        if tags:
-            search_query = search_query.filter(Note.tags.overlap(tags))
+        search_query = TagService.apply_filter(search_query, current_user.id, tags, tag_mode)
         
-        # 关键词搜索
+        # 关键词搜索：数据库原生全文检索按相关度排序，LIKE 降级时按更新时间排序
         if query:
-            search_term = f"%{query}%"
-            search_query = search_query.filter(
-                or_(
-                    Note.title.ilike(search_term),
-                    Note.content.ilike(search_term)
-                )
-            )
+            search_query = get_search_backend(db, query).apply(search_query, query)
+        else:
+            search_query = search_query.order_by(Note.updated_at.desc())
+        
+        notes = search_query.limit(limit).all()
         
-        # 按更新时间排序并限制数量
-        notes = search_query.order_by(Note.updated_at.desc()).limit(limit).all()
+        return NoteService._search_items(notes, fields, query, snippet_count)
+    
+    @staticmethod
+    def suggest_notes(db: Session, current_user: User, prefix: str, limit: int = 10) -> Dict[str, List[Dict]]:
+        """
+        按前缀补全笔记标题和标签（内存前缀索引，不查询正文）
         
-        return [NoteOut.from_orm(note) for note in notes] 
\ No newline at end of file
+        Args:
+            db: 数据库会话
+            current_user: 当前用户
+            prefix: 前缀（不区分大小写）
+            limit: 笔记和标签各自最多返回的数量
+            
+        Returns:
+            Dict[str, List[Dict]]: {"notes": [{"id", "title"}], "tags": [{"tag", "count"}]}
+        """
+        return get_suggest_index().suggest(db, current_user.id, prefix, limit)
\ No newline at end of file
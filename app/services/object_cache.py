@@ -0,0 +1,424 @@
+"""
+MindLink 对象缓存
+
+两级缓存笔记、用户、标签和文件的读取结果：
+- 本地层：进程内 LRU，命中时不访问网络
+- Redis 层：所有工作进程共享，按 CACHE_TTL 过期
+- 写入方在事务提交后失效对应的键，并通过 Redis pub/sub 广播，
+  其他工作进程收到后删除本地层的副本
+
+一致性约定：
+- 失效时在 Redis 中写入短期墓碑，回填使用 SET NX，
+  失效前读到旧数据的并发请求无法把旧数据写回缓存
+- 本地层只在订阅连接正常时使用，连接中断期间可能错过广播，重连后清空本地层
+- Redis 不可用时不启用缓存，所有读取直接访问数据库
+"""
+
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from enum import Enum
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import DateTime, event
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.utils.metrics import get_metrics
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# Redis 键前缀和失效广播频道
+KEY_PREFIX = "mindlink:cache"
+INVALIDATION_CHANNEL = "mindlink:cache:invalidate"
+
+# 失效墓碑的存活时间（秒），覆盖并发请求从读数据库到回填缓存之间的间隔
+TOMBSTONE_TTL = 5
+TOMBSTONE = ""
+
+# 会话中等待提交后失效的键
+_PENDING_KEY = "object_cache_pending"
+
+
+class CacheKind(str, Enum):
+    """缓存对象类型（决定键的命名空间）"""
+    NOTE = "note"    # 笔记详情，按笔记ID
+    USER = "user"    # 认证用户，按用户名
+    TAGS = "tags"    # 标签计数和标签代数，按用户ID
+    FILE = "file"    # 文件信息，按文件ID
+    DIFF = "diff"    # 版本差异，按笔记ID、版本记录ID和差异参数（版本不可变，无需失效）
+
+
+def row_to_dict(obj: Any, exclude: Iterable[str] = ()) -> Dict[str, Any]:
+    """把数据库模型的列值转换为可 JSON 序列化的字典"""
+    data = {}
+    for column in obj.__table__.columns:
+        if column.key in exclude:
+            continue
+        value = getattr(obj, column.key)
+        data[column.key] = value.isoformat() if isinstance(value, datetime) else value
+    return data
+
+
+def dict_to_row(model: Any, data: Dict[str, Any]) -> Any:
+    """
+    用缓存的列值构造数据库模型实例
+
+    返回的实例不属于任何会话，只能用于读取属性，不能修改后提交。
+    """
+    values = {}
+    for column in model.__table__.columns:
+        if column.key not in data:
+            continue
+        value = data[column.key]
+        if value is not None and isinstance(column.type, DateTime):
+            value = datetime.fromisoformat(value)
+        values[column.key] = value
+    return model(**values)
+
+
+class ObjectCache:
+    """两级对象缓存类"""
+
+    def __init__(self, redis_client: Any, capacity: int = 4096, ttl: int = 3600, local_ttl: float = 60):
+        """
+        Args:
+            redis_client: Redis 客户端（需支持 get/set/delete/publish/pubsub）
+            capacity: 本地层容量（条目数），0 表示只使用 Redis 层
+            ttl: Redis 层的过期时间（秒）
+            local_ttl: 本地层的过期时间（秒），限制错过广播时的不一致时长
+        """
+        self.redis = redis_client
+        self.capacity = capacity
+        self.ttl = ttl
+        self.local_ttl = local_ttl
+        self.origin = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._listening = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def make_key(kind: CacheKind, key: Any) -> str:
+        """生成带类型命名空间的缓存键"""
+        return "{}:{}:{}".format(KEY_PREFIX, CacheKind(kind).value, key)
+
+    # ---- 本地层 ----
+
+    def _local_get(self, cache_key: str) -> Optional[Any]:
+        if not self._listening.is_set():
+            return None
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[cache_key]
+                return None
+            self._entries.move_to_end(cache_key)
+            return entry[1]
+
+    def _local_set(self, cache_key: str, value: Any) -> None:
+        if self.capacity <= 0 or not self._listening.is_set():
+            return
+        with self._lock:
+            self._entries[cache_key] = (time.monotonic() + self.local_ttl, value)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def _local_drop(self, cache_keys: Iterable[str]) -> None:
+        with self._lock:
+            for cache_key in cache_keys:
+                self._entries.pop(cache_key, None)
+
+    def clear_local(self) -> None:
+        """清空本地层"""
+        with self._lock:
+            self._entries.clear()
+
+    # ---- 读写 ----
+
+    def get(self, kind: CacheKind, key: Any) -> Optional[Any]:
+        """
+        依次查询本地层和 Redis 层
+
+        Args:
+            kind: 对象类型
+            key: 对象键
+
+        Returns:
+            Optional[Any]: 缓存的值，未命中时返回 None
+        """
+        metrics = get_metrics()
+        kind = CacheKind(kind).value
+        cache_key = self.make_key(kind, key)
+        metrics.incr("object_cache.{}.requests".format(kind))
+
+        value = self._local_get(cache_key)
+        if value is not None:
+            metrics.incr("object_cache.{}.local_hits".format(kind))
+            return value
+
+        try:
+            raw = self.redis.get(cache_key)
+        except Exception as e:
+            logger.warning("读取 Redis 缓存失败: {}".format(str(e)))
+            raw = None
+        if raw:
+            value = json.loads(raw)
+            metrics.incr("object_cache.{}.redis_hits".format(kind))
+            self._local_set(cache_key, value)
+            return value
+
+        metrics.incr("object_cache.{}.misses".format(kind))
+        return None
+
+    def fill(self, kind: CacheKind, key: Any, value: Any) -> bool:
+        """
+        回填缓存（键已存在或处于失效墓碑期时不写入）
+
+        Args:
+            kind: 对象类型
+            key: 对象键
+            value: 可 JSON 序列化的值
+
+        Returns:
+            bool: 是否写入
+        """
+        cache_key = self.make_key(kind, key)
+        try:
+            stored = self.redis.set(cache_key, json.dumps(value, ensure_ascii=False), ex=self.ttl, nx=True)
+        except Exception as e:
+            logger.warning("写入 Redis 缓存失败: {}".format(str(e)))
+            return False
+        if not stored:
+            return False
+        self._local_set(cache_key, value)
+        return True
+
+    def get_or_load(self, kind: CacheKind, key: Any, loader: Callable[[], Optional[Any]]) -> Optional[Any]:
+        """
+        读取缓存，未命中时调用 loader 从数据库加载并回填
+
+        Args:
+            kind: 对象类型
+            key: 对象键
+            loader: 加载函数，返回可 JSON 序列化的值（None 表示不存在，不缓存）
+
+        Returns:
+            Optional[Any]: 缓存或加载的值
+        """
+        value = self.get(kind, key)
+        if value is not None:
+            return value
+        value = loader()
+        if value is not None:
+            self.fill(kind, key, value)
+        return value
+
+    def invalidate(self, keys: Iterable[Tuple[CacheKind, Any]]) -> None:
+        """
+        失效缓存并广播给其他工作进程（应在写入事务提交后调用）
+
+        Args:
+            keys: (对象类型, 对象键) 列表
+        """
+        cache_keys = sorted({self.make_key(kind, key) for kind, key in keys})
+        if not cache_keys:
+            return
+        self._local_drop(cache_keys)
+        get_metrics().incr("object_cache.invalidations", len(cache_keys))
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for cache_key in cache_keys:
+                pipe.set(cache_key, TOMBSTONE, ex=TOMBSTONE_TTL)
+            pipe.publish(INVALIDATION_CHANNEL, json.dumps({"origin": self.origin, "keys": cache_keys}))
+            pipe.execute()
+        except Exception as e:
+            logger.warning("广播缓存失效失败: {}".format(str(e)))
+
+    # ---- 失效广播订阅 ----
+
+    def _handle_message(self, message: Dict[str, Any]) -> None:
+        if message.get("type") != "message":
+            return
+        try:
+            payload = json.loads(message["data"])
+        except (TypeError, ValueError):
+            return
+        if payload.get("origin") != self.origin:
+            self._local_drop(payload.get("keys", []))
+
+    def _listen(self) -> None:
+        while not self._stop.is_set():
+            pubsub = None
+            try:
+                pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                # 订阅中断期间可能错过广播，重新订阅后丢弃本地层
+                self.clear_local()
+                self._listening.set()
+                while not self._stop.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message:
+                        self._handle_message(message)
+            except Exception as e:
+                logger.warning("缓存失效订阅中断: {}".format(str(e)))
+            finally:
+                self._listening.clear()
+                self.clear_local()
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+            self._stop.wait(1.0)
+
+    def start(self, timeout: float = 5.0) -> None:
+        """启动失效广播订阅线程（订阅成功后才启用本地层）"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen, name="object-cache-invalidation", daemon=True)
+        self._thread.start()
+        self._listening.wait(timeout)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """停止订阅线程"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        缓存命中率指标
+
+        Returns:
+            Dict[str, Any]: 总体和各类型的命中率
+        """
+        metrics = get_metrics()
+        result: Dict[str, Any] = {}
+        total_requests = total_hits = 0
+        for kind in CacheKind:
+            requests = metrics.get("object_cache.{}.requests".format(kind.value))
+            local_hits = metrics.get("object_cache.{}.local_hits".format(kind.value))
+            hits = local_hits + metrics.get("object_cache.{}.redis_hits".format(kind.value))
+            total_requests += requests
+            total_hits += hits
+            result[kind.value] = {
+                "requests": requests,
+                "hit_ratio": round(hits / requests, 4) if requests else 0.0,
+                "local_hit_ratio": round(local_hits / requests, 4) if requests else 0.0,
+            }
+        with self._lock:
+            size = len(self._entries)
+        result.update({
+            "requests": total_requests,
+            "hit_ratio": round(total_hits / total_requests, 4) if total_requests else 0.0,
+            "invalidations": metrics.get("object_cache.invalidations"),
+            "local_entries": size,
+            "listening": self._listening.is_set(),
+        })
+        return result
+
+
+# 全局对象缓存实例
+_object_cache: Optional[ObjectCache] = None
+_object_cache_ready = False
+_object_cache_lock = threading.Lock()
+
+
+def _connect_redis():
+    """创建 Redis 客户端并检查连通性"""
+    import redis
+
+    settings = get_settings()
+    client = redis.Redis.from_url(
+        settings.REDIS_URL,
+        db=settings.REDIS_DB,
+        socket_connect_timeout=1,
+        socket_timeout=2,
+        health_check_interval=30
+    )
+    client.ping()
+    return client
+
+
+def get_object_cache() -> Optional[ObjectCache]:
+    """
+    获取全局对象缓存
+
+    CACHE_ENABLED=false 或 Redis 不可用时返回 None（只在首次调用时尝试连接）。
+
+    Returns:
+        Optional[ObjectCache]: 对象缓存实例
+    """
+    global _object_cache, _object_cache_ready
+    if _object_cache_ready:
+        return _object_cache
+    with _object_cache_lock:
+        if _object_cache_ready:
+            return _object_cache
+        settings = get_settings()
+        if settings.CACHE_ENABLED:
+            try:
+                cache = ObjectCache(
+                    _connect_redis(),
+                    capacity=settings.CACHE_LOCAL_SIZE,
+                    ttl=settings.CACHE_TTL,
+                    local_ttl=settings.CACHE_LOCAL_TTL
+                )
+                cache.start()
+                get_metrics().register_collector("object_cache", cache.stats)
+                _object_cache = cache
+                logger.info("对象缓存已启用")
+            except Exception as e:
+                logger.warning("Redis 不可用，对象缓存未启用: {}".format(str(e)))
+        _object_cache_ready = True
+        return _object_cache
+
+
+def stop_object_cache() -> None:
+    """停止对象缓存的订阅线程"""
+    if _object_cache is not None:
+        _object_cache.stop()
+
+
+def invalidate_on_commit(db: Session, kind: CacheKind, *keys: Any) -> None:
+    """
+    登记在会话事务提交后失效的缓存键（外层事务回滚时丢弃）
+
+    在提交前失效会让并发请求把旧数据重新写回缓存，因此写入方只登记，由提交事件统一失效。
+
+    Args:
+        db: 数据库会话
+        kind: 对象类型
+        keys: 对象键
+    """
+    if get_object_cache() is None:
+        return
+    pending = db.info.setdefault(_PENDING_KEY, set())
+    pending.update((CacheKind(kind), key) for key in keys if key is not None)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    cache = _object_cache
+    if pending and cache is not None:
+        cache.invalidate(pending)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_after_rollback(session: Session, transaction) -> None:
+    # 提交时已由 after_commit 取走；外层事务回滚时丢弃（保存点回滚不影响）
+    if transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
@@ -14,6 +14,7 @@ import logging
 
 from app.models.user import User
 from app.models.file import File
+from app.services.file_service import FileService
 
 # 配置日志
 logger = logging.getLogger(__name__)
@@ -44,8 +45,8 @@ class PermissionService:
         Raises:
             HTTPException: 文件不存在或用户无权访问时抛出异常
         """
-        # 查找文件
-        file = db.query(File).filter(File.id == file_id).first()
+        # 查找文件（只读，经对象缓存读取）
+        file = FileService.load_file(db, file_id)
         
         if not file:
             raise HTTPException(
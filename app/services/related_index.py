@@ -0,0 +1,333 @@
+"""
+MindLink 相关笔记向量索引
+
+包含：
+- 笔记向量：分词结果经带符号特征哈希投影到 256 维，词频取对数缩放后归一化
+- 按用户划分的向量文件，所有 uvicorn 工作进程以内存映射（mmap）方式读取
+- 暴力但向量化的 top-k 检索（矩阵向量乘法 + argpartition）
+
+目录结构（位于 RELATED_INDEX_DIR）：
+- user-<用户ID>-d<维度>.vec：定长记录（笔记ID + 向量）的追加文件
+
+笔记每次写入追加一条新记录，同一笔记以最后一条记录为准；删除笔记追加一条
+笔记ID为负数的记录。每个进程在检索前读取文件中新追加的记录，因此任意进程的
+写入对其他进程都是可见的。重建命令按数据库重写各用户的文件，清除被覆盖的旧记录。
+
+依赖 NumPy（已在 pyproject.toml 中声明），未安装时索引不启用，并在首次使用时记录警告。
+"""
+
+import logging
+import os
+import threading
+from collections import Counter, OrderedDict
+from itertools import groupby
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - 未安装 NumPy 时不启用相关笔记
+    np = None
+
+from app.core.config import get_settings
+from app.utils.similarity import feature_hash
+from app.utils.tokenizer import tokenize
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 向量维度（修改后旧文件不再读取，需要执行 manage.py reindex-related 重建）
+VECTOR_DIM = 256
+
+# 标题词元的权重（相对正文）
+TITLE_WEIGHT = 2
+
+# 每个进程保留内存映射的用户数
+MAX_OPEN_USERS = 256
+
+# 向量文件记录：笔记ID（负数表示已删除）+ 向量
+RECORD_DTYPE = np.dtype([("id", "<i8"), ("vec", "<f4", (VECTOR_DIM,))]) if np is not None else None
+
+
+def embed_note(title: str, content: str) -> Optional["np.ndarray"]:
+    """
+    计算笔记的向量
+
+    Args:
+        title: 笔记标题
+        content: 笔记内容
+
+    Returns:
+        Optional[np.ndarray]: 归一化的 float32 向量；没有任何词元时返回 None
+    """
+    counts = Counter(tokenize(content or ""))
+    for token in tokenize(title or ""):
+        counts[token] += TITLE_WEIGHT
+    if not counts:
+        return None
+    hashes = np.array([feature_hash(token) for token in counts], dtype=np.uint64)
+    weights = 1.0 + np.log(np.array(list(counts.values()), dtype=np.float32))
+    signs = np.where(hashes >> np.uint64(63), 1.0, -1.0).astype(np.float32)
+    vector = np.zeros(VECTOR_DIM, dtype=np.float32)
+    np.add.at(vector, (hashes % np.uint64(VECTOR_DIM)).astype(np.intp), signs * weights)
+    norm = float(np.linalg.norm(vector))
+    if norm == 0:
+        return None
+    return vector / norm
+
+
+class _UserVectors:
+    """单个用户的向量文件在本进程中的视图"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.inode: Optional[int] = None
+        self.rows = np.zeros(0, dtype=RECORD_DTYPE)
+        # 每行是否为对应笔记的最新有效记录
+        self.valid = np.zeros(0, dtype=bool)
+        # 笔记ID -> 最新记录所在行
+        self.latest: Dict[int, int] = {}
+
+    def refresh(self) -> None:
+        """文件被重建时重新映射，追加了新记录时回放新记录"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            if self.inode is not None:
+                self.__init__(self.path)
+            return
+        if stat.st_ino != self.inode:
+            self.__init__(self.path)
+            self.inode = stat.st_ino
+        count = stat.st_size // RECORD_DTYPE.itemsize
+        known = len(self.rows)
+        if count <= known:
+            return
+
+        self.rows = np.memmap(self.path, dtype=RECORD_DTYPE, mode="r", shape=(count,))
+        ids = np.asarray(self.rows["id"][known:])
+        valid = np.concatenate([self.valid, ids > 0])
+        for offset, record_id in enumerate(ids.tolist()):
+            note_id = abs(record_id)
+            previous = self.latest.get(note_id)
+            if previous is not None:
+                valid[previous] = False
+            self.latest[note_id] = known + offset
+        self.valid = valid
+
+    def vector(self, note_id: int) -> Optional["np.ndarray"]:
+        row = self.latest.get(note_id)
+        if row is None or not self.valid[row]:
+            return None
+        return np.array(self.rows["vec"][row])
+
+
+class RelatedIndex:
+    """相关笔记向量索引"""
+
+    def __init__(self, index_dir: str):
+        self.index_dir = index_dir
+        self._lock = threading.RLock()
+        self._users: "OrderedDict[int, _UserVectors]" = OrderedDict()
+
+    def _path(self, user_id: int) -> str:
+        return os.path.join(self.index_dir, "user-{}-d{}.vec".format(user_id, VECTOR_DIM))
+
+    def _user(self, user_id: int) -> _UserVectors:
+        """获取并刷新用户的向量视图（需持有锁）"""
+        view = self._users.get(user_id)
+        if view is None:
+            view = self._users[user_id] = _UserVectors(self._path(user_id))
+            while len(self._users) > MAX_OPEN_USERS:
+                self._users.popitem(last=False)
+        else:
+            self._users.move_to_end(user_id)
+        view.refresh()
+        return view
+
+    # ---- 写入 ----
+
+    def _append(self, user_id: int, records: "np.ndarray") -> None:
+        os.makedirs(self.index_dir, exist_ok=True)
+        # O_APPEND 保证多个进程的单次写入不会交错
+        fd = os.open(self._path(user_id), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, records.tobytes())
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _records(documents: Iterable[Tuple[int, str, str]]) -> "np.ndarray":
+        """把 (笔记ID, 标题, 内容) 转换为文件记录，没有词元的笔记记为删除"""
+        documents = list(documents)
+        records = np.zeros(len(documents), dtype=RECORD_DTYPE)
+        for index, (note_id, title, content) in enumerate(documents):
+            vector = embed_note(title, content)
+            if vector is None:
+                records["id"][index] = -note_id
+            else:
+                records["id"][index] = note_id
+                records["vec"][index] = vector
+        return records
+
+    def index_notes(self, documents: Iterable[Tuple[int, int, str, str]]) -> None:
+        """
+        索引（或重新索引）笔记，每个用户一次追加写入
+
+        索引失败只记录日志，不影响笔记写入本身。
+
+        Args:
+            documents: (笔记ID, 用户ID, 标题, 内容) 序列
+        """
+        try:
+            by_user: Dict[int, List[Tuple[int, str, str]]] = {}
+            for note_id, user_id, title, content in documents:
+                by_user.setdefault(user_id, []).append((note_id, title, content))
+            for user_id, items in by_user.items():
+                self._append(user_id, self._records(items))
+        except Exception as e:
+            logger.error("相关笔记索引写入失败: {}".format(str(e)))
+
+    def index_note(self, note_id: int, user_id: int, title: str, content: str) -> None:
+        """索引（或重新索引）一篇笔记"""
+        self.index_notes([(note_id, user_id, title, content)])
+
+    def remove_note(self, note_id: int, user_id: int) -> None:
+        """从索引中删除笔记"""
+        try:
+            records = np.zeros(1, dtype=RECORD_DTYPE)
+            records["id"][0] = -note_id
+            self._append(user_id, records)
+        except Exception as e:
+            logger.error("笔记 {} 相关笔记索引删除失败: {}".format(note_id, str(e)))
+
+    # ---- 检索 ----
+
+    def related(
+        self,
+        user_id: int,
+        note_id: int,
+        limit: int = 10,
+        text: Optional[Tuple[str, str]] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        查找与笔记最相关的其他笔记
+
+        Args:
+            user_id: 用户ID
+            note_id: 笔记ID
+            limit: 最多返回数量
+            text: 笔记尚未索引时用于计算查询向量的 (标题, 内容)
+
+        Returns:
+            List[Tuple[int, float]]: (笔记ID, 余弦相似度) 列表，按相似度降序排列
+        """
+        with self._lock:
+            view = self._user(user_id)
+            query = view.vector(note_id)
+            rows, valid = view.rows, view.valid
+            self_row = view.latest.get(note_id)
+        if query is None and text is not None:
+            query = embed_note(*text)
+        if query is None or not len(rows):
+            return []
+
+        scores = rows["vec"] @ query
+        scores[~valid] = -np.inf
+        if self_row is not None:
+            scores[self_row] = -np.inf
+
+        count = min(limit, len(scores))
+        if count <= 0:
+            return []
+        top = np.argpartition(-scores, count - 1)[:count] if count < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        ids = rows["id"][top]
+        return [
+            (int(record_id), float(score))
+            for record_id, score in zip(ids.tolist(), scores[top].tolist())
+            if score > 0
+        ]
+
+    # ---- 重建 ----
+
+    def rebuild(self, documents: Iterable[Tuple[int, int, str, str]]) -> int:
+        """
+        按笔记集合重写所有用户的向量文件
+
+        重写前记录旧文件的长度，替换时把此后并发追加到旧文件的记录复制到新文件末尾，
+        因此重建期间的写入不会丢失（重复记录以最后一条为准）。
+
+        Args:
+            documents: 按用户ID排序的 (笔记ID, 用户ID, 标题, 内容) 迭代器
+
+        Returns:
+            int: 写入的笔记数量
+        """
+        os.makedirs(self.index_dir, exist_ok=True)
+        suffix = "-d{}.vec".format(VECTOR_DIM)
+        stale = {
+            name: os.path.getsize(os.path.join(self.index_dir, name))
+            for name in os.listdir(self.index_dir)
+            if name.startswith("user-") and name.endswith(suffix)
+        }
+
+        count = 0
+        for user_id, items in groupby(documents, key=lambda document: document[1]):
+            path = self._path(user_id)
+            records = self._records((note_id, title, content) for note_id, _, title, content in items)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(records.tobytes())
+            self._replace(path, tmp_path, stale.pop(os.path.basename(path), 0))
+            count += len(records)
+
+        # 已没有笔记的用户：只保留重建期间新追加的记录
+        for name, size in stale.items():
+            path = os.path.join(self.index_dir, name)
+            tmp_path = path + ".tmp"
+            open(tmp_path, "wb").close()
+            self._replace(path, tmp_path, size)
+
+        logger.info("相关笔记索引重建完成，共 {} 篇笔记".format(count))
+        return count
+
+    @staticmethod
+    def _replace(path: str, tmp_path: str, offset: int) -> None:
+        """把旧文件 offset 之后的记录追加到新文件，再原子替换旧文件"""
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                f.seek(offset)
+                tail = f.read()
+            tail = tail[:len(tail) - len(tail) % RECORD_DTYPE.itemsize]
+            with open(tmp_path, "ab") as f:
+                f.write(tail)
+        os.replace(tmp_path, path)
+
+
+# 全局索引实例
+_related_index: Optional[RelatedIndex] = None
+_related_index_lock = threading.Lock()
+_numpy_missing_logged = False
+
+
+def get_related_index() -> Optional[RelatedIndex]:
+    """
+    获取相关笔记索引实例
+
+    Returns:
+        Optional[RelatedIndex]: 索引实例，未启用或未安装 NumPy 时返回 None
+    """
+    global _related_index, _numpy_missing_logged
+    settings = get_settings()
+    if not settings.RELATED_INDEX_ENABLED:
+        return None
+    if np is None:
+        if not _numpy_missing_logged:
+            _numpy_missing_logged = True
+            logger.warning("未安装 NumPy，相关笔记功能（/notes/{id}/related）已停用")
+        return None
+    if _related_index is None:
+        with _related_index_lock:
+            if _related_index is None:
+                _related_index = RelatedIndex(settings.RELATED_INDEX_DIR)
+    return _related_index
@@ -0,0 +1,274 @@
+"""
+MindLink Markdown 渲染缓存
+
+笔记内容在服务端渲染为 HTML，按 (渲染器版本, 内容) 的哈希缓存：
+- 内存 LRU 层：进程内命中，不需要任何 IO
+- 磁盘层：RENDER_CACHE_DIR 下每个哈希一个文件，跨进程、跨重启共享
+- 渲染在进程池中执行（RENDER_WORKERS=0 时在线程池中执行），不阻塞事件循环
+
+内容相同的笔记和历史版本共享同一份缓存，修改笔记后旧条目自然失效，不需要主动清理；
+磁盘层可以用 manage.py prune-render-cache 按最近访问时间清理。
+原始 HTML 按普通文本转义，链接和图片只允许 http、https、mailto 和相对地址。
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from xml.etree import ElementTree
+
+import markdown
+from markdown.extensions import Extension
+from markdown.treeprocessors import Treeprocessor
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import get_settings
+from app.utils.metrics import metrics
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 渲染器版本：修改扩展或输出规则后递增，使旧缓存失效
+RENDERER_VERSION = 1
+
+# 启用的 Markdown 扩展
+MARKDOWN_EXTENSIONS = ["extra", "sane_lists"]
+
+# 链接和图片允许的地址协议（不含协议的相对地址总是允许）
+_SAFE_SCHEMES = ("http:", "https:", "mailto:")
+
+
+class _SafeUrlProcessor(Treeprocessor):
+    """移除使用不安全协议（如 javascript:）的链接和图片地址"""
+
+    def run(self, root: ElementTree.Element) -> None:
+        for element in root.iter():
+            for attribute in ("href", "src"):
+                value = element.get(attribute)
+                if value is None:
+                    continue
+                # 浏览器会忽略地址中的空白和控制字符（如 "java\tscript:"）
+                scheme = "".join(char for char in value if char > " ").lower().split("/", 1)[0]
+                if ":" in scheme and not scheme.startswith(_SAFE_SCHEMES):
+                    del element.attrib[attribute]
+
+
+class _SafeHtmlExtension(Extension):
+    """把原始 HTML 当作文本转义，并过滤不安全的地址"""
+
+    def extendMarkdown(self, md: markdown.Markdown) -> None:
+        md.preprocessors.deregister("html_block")
+        md.inlinePatterns.deregister("html")
+        md.treeprocessors.register(_SafeUrlProcessor(md), "safe_url", 0)
+
+
+def render_markdown(content: str) -> str:
+    """
+    把 Markdown 渲染为 HTML（在工作进程中执行）
+
+    Args:
+        content: Markdown 文本
+
+    Returns:
+        str: HTML 片段
+    """
+    return markdown.markdown(content or "", extensions=MARKDOWN_EXTENSIONS + [_SafeHtmlExtension()])
+
+
+def render_key(content: str) -> str:
+    """计算渲染缓存键：渲染器版本和内容的 SHA-256"""
+    digest = hashlib.sha256("{}\n".format(RENDERER_VERSION).encode("utf-8"))
+    digest.update((content or "").encode("utf-8"))
+    return digest.hexdigest()
+
+
+class RenderCache:
+    """Markdown 渲染缓存类"""
+
+    def __init__(self, cache_dir: Optional[str] = None, capacity: int = 256, workers: int = 0):
+        """
+        Args:
+            cache_dir: 磁盘层目录，None 表示不使用磁盘层
+            capacity: 内存 LRU 层的容量（条目数），0 表示不使用内存层
+            workers: 渲染进程数，0 表示在调用线程中渲染
+        """
+        self.cache_dir = cache_dir
+        self.capacity = capacity
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    # ---- 内存层 ----
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def _memory_set(self, key: str, value: str) -> None:
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    # ---- 磁盘层 ----
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + ".html")
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        if self.cache_dir is None:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = f.read()
+            # 记录最近访问时间，供按时间清理使用
+            os.utime(path)
+            return value
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning("读取渲染缓存失败: {}".format(str(e)))
+            return None
+
+    def _disk_set(self, key: str, value: str) -> None:
+        if self.cache_dir is None:
+            return
+        path = self._path(key)
+        tmp_path = "{}.{}.tmp".format(path, threading.get_ident())
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(value)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("写入渲染缓存失败: {}".format(str(e)))
+
+    # ---- 渲染 ----
+
+    def _render(self, content: str) -> str:
+        if self.workers <= 0:
+            return render_markdown(content)
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            pool = self._pool
+        return pool.submit(render_markdown, content).result()
+
+    def render(self, content: str) -> str:
+        """
+        读取缓存的 HTML，未命中时渲染并写入缓存（同步，可能阻塞）
+
+        Args:
+            content: Markdown 文本
+
+        Returns:
+            str: HTML 片段
+        """
+        key = render_key(content)
+        value = self._memory_get(key)
+        if value is not None:
+            metrics.incr("render_cache.memory_hits")
+            return value
+
+        value = self._disk_get(key)
+        if value is not None:
+            metrics.incr("render_cache.disk_hits")
+            self._memory_set(key, value)
+            return value
+
+        metrics.incr("render_cache.renders")
+        value = self._render(content)
+        self._memory_set(key, value)
+        self._disk_set(key, value)
+        return value
+
+    async def render_async(self, content: str) -> str:
+        """
+        在事件循环中获取 HTML：内存层命中时直接返回，否则在线程池中读取磁盘层或渲染
+
+        Args:
+            content: Markdown 文本
+
+        Returns:
+            str: HTML 片段
+        """
+        value = self._memory_get(render_key(content))
+        if value is not None:
+            metrics.incr("render_cache.memory_hits")
+            return value
+        return await run_in_threadpool(self.render, content)
+
+    def prune(self, older_than_days: int) -> int:
+        """
+        删除磁盘层中超过指定天数未被访问的条目
+
+        Args:
+            older_than_days: 保留天数
+
+        Returns:
+            int: 删除的文件数
+        """
+        if self.cache_dir is None or not os.path.isdir(self.cache_dir):
+            return 0
+        cutoff = time.time() - older_than_days * 86400
+        count = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        count += 1
+                except FileNotFoundError:
+                    continue
+        return count
+
+    def close(self) -> None:
+        """关闭渲染进程池"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+
+# 全局渲染缓存实例
+_render_cache: Optional[RenderCache] = None
+_render_cache_lock = threading.Lock()
+
+
+def get_render_cache() -> RenderCache:
+    """
+    获取全局渲染缓存
+
+    Returns:
+        RenderCache: 渲染缓存实例
+    """
+    global _render_cache
+    if _render_cache is None:
+        with _render_cache_lock:
+            if _render_cache is None:
+                settings = get_settings()
+                _render_cache = RenderCache(
+                    cache_dir=settings.RENDER_CACHE_DIR or None,
+                    capacity=settings.RENDER_CACHE_SIZE,
+                    workers=settings.RENDER_WORKERS
+                )
+    return _render_cache
+
+
+def stop_render_workers() -> None:
+    """应用关闭时停止渲染进程"""
+    if _render_cache is not None:
+        _render_cache.close()
@@ -0,0 +1,254 @@
+"""
+MindLink 数据库原生全文检索后端
+
+根据数据库方言选择检索实现，把过滤和相关度排序下推到数据库：
+- PostgreSQL：生成列 tsvector + GIN 索引
+- SQLite：FTS5 外部内容表（trigram 分词），由触发器保持同步
+- MySQL：FULLTEXT ... WITH PARSER ngram 索引
+- 其他情况：LIKE 模糊匹配（降级方案）
+"""
+
+import logging
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import column, func, inspect, literal_column, or_, table, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Query, Session
+
+from app.core.config import get_settings
+from app.models.note import Note
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 检索后端不可用时，重新检查可用性的间隔（秒）
+AVAILABILITY_RECHECK_SECONDS = 60
+
+
+class SearchBackend:
+    """检索后端基类（LIKE 模糊匹配）"""
+
+    name = "like"
+
+    def __init__(self):
+        self._available: Optional[bool] = None
+        self._checked_at = 0.0
+
+    def setup(self, connection: Connection) -> None:
+        """创建检索所需的数据库对象（索引、虚拟表、触发器等）"""
+
+    def _check_available(self, db: Session) -> bool:
+        return True
+
+    def is_available(self, db: Session) -> bool:
+        """
+        检查后端在当前数据库中是否可用
+
+        可用结果在进程内缓存；不可用时定期重新检查，以便执行初始化后自动生效。
+        """
+        now = time.monotonic()
+        if self._available or (self._available is False and now - self._checked_at < AVAILABILITY_RECHECK_SECONDS):
+            return self._available
+        try:
+            self._available = self._check_available(db)
+        except Exception as e:
+            logger.warning("检查检索后端 {} 可用性失败: {}".format(self.name, str(e)))
+            self._available = False
+        self._checked_at = now
+        return self._available
+
+    def supports(self, search: str) -> bool:
+        """后端能否处理该查询（例如 n-gram 分词对最短长度有要求）"""
+        return bool(search)
+
+    def apply(self, query: Query, search: str) -> Query:
+        """
+        为笔记查询添加检索条件和相关度排序
+
+        Args:
+            query: 笔记查询
+            search: 搜索关键词
+
+        Returns:
+            Query: 添加了过滤和排序的查询
+        """
+        search_term = f"%{search}%"
+        return query.filter(
+            or_(
+                Note.title.ilike(search_term),
+                Note.content.ilike(search_term)
+            )
+        ).order_by(Note.updated_at.desc())
+
+
+class PostgresSearchBackend(SearchBackend):
+    """PostgreSQL tsvector 检索后端"""
+
+    name = "postgresql"
+
+    def _ts_config(self) -> str:
+        return get_settings().SEARCH_PG_TS_CONFIG
+
+    def setup(self, connection: Connection) -> None:
+        ts_config = self._ts_config()
+        connection.execute(text(
+            "ALTER TABLE notes ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            "GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('{0}', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('{0}', coalesce(content, '')), 'B')"
+            ") STORED".format(ts_config)
+        ))
+        connection.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_notes_search_vector ON notes USING GIN (search_vector)"
+        ))
+
+    def _check_available(self, db: Session) -> bool:
+        columns = inspect(db.get_bind()).get_columns("notes")
+        return any(col["name"] == "search_vector" for col in columns)
+
+    def apply(self, query: Query, search: str) -> Query:
+        ts_query = func.websearch_to_tsquery(self._ts_config(), search)
+        search_vector = literal_column("notes.search_vector")
+        return query.filter(search_vector.op("@@")(ts_query))\
+            .order_by(func.ts_rank_cd(search_vector, ts_query).desc(), Note.id.desc())
+
+
+class SqliteFtsSearchBackend(SearchBackend):
+    """SQLite FTS5 检索后端"""
+
+    name = "sqlite"
+
+    # trigram 分词器要求查询至少包含 3 个字符
+    MIN_QUERY_LENGTH = 3
+
+    _fts = table("notes_fts", column("rowid"), column("rank"))
+
+    def setup(self, connection: Connection) -> None:
+        exists = connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'notes_fts'"
+        )).first()
+        if exists:
+            return
+
+        connection.execute(text(
+            "CREATE VIRTUAL TABLE notes_fts USING fts5("
+            "title, content, content='notes', content_rowid='id', tokenize='trigram')"
+        ))
+        connection.execute(text(
+            "CREATE TRIGGER notes_fts_ai AFTER INSERT ON notes BEGIN "
+            "INSERT INTO notes_fts(rowid, title, content) VALUES (new.id, new.title, new.content); "
+            "END"
+        ))
+        connection.execute(text(
+            "CREATE TRIGGER notes_fts_ad AFTER DELETE ON notes BEGIN "
+            "INSERT INTO notes_fts(notes_fts, rowid, title, content) "
+            "VALUES ('delete', old.id, old.title, old.content); "
+            "END"
+        ))
+        connection.execute(text(
+            "CREATE TRIGGER notes_fts_au AFTER UPDATE OF title, content ON notes BEGIN "
+            "INSERT INTO notes_fts(notes_fts, rowid, title, content) "
+            "VALUES ('delete', old.id, old.title, old.content); "
+            "INSERT INTO notes_fts(rowid, title, content) VALUES (new.id, new.title, new.content); "
+            "END"
+        ))
+        # 为已有笔记建立索引
+        connection.execute(text("INSERT INTO notes_fts(notes_fts) VALUES ('rebuild')"))
+
+    def _check_available(self, db: Session) -> bool:
+        return db.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'notes_fts'"
+        )).first() is not None
+
+    def supports(self, search: str) -> bool:
+        return len(search.strip()) >= self.MIN_QUERY_LENGTH
+
+    def apply(self, query: Query, search: str) -> Query:
+        # 整体作为短语查询：trigram 分词下等价于大小写不敏感的子串匹配
+        phrase = '"{}"'.format(search.strip().replace('"', '""'))
+        return query.join(self._fts, self._fts.c.rowid == Note.id)\
+            .filter(literal_column("notes_fts").op("MATCH")(phrase))\
+            .order_by(self._fts.c.rank, Note.id.desc())
+
+
+class MysqlFulltextSearchBackend(SearchBackend):
+    """MySQL ngram FULLTEXT 检索后端"""
+
+    name = "mysql"
+
+    INDEX_NAME = "ft_notes_title_content"
+
+    # ngram 分词默认 ngram_token_size=2
+    MIN_QUERY_LENGTH = 2
+
+    def _index_exists(self, bind) -> bool:
+        indexes = inspect(bind).get_indexes("notes")
+        return any(index["name"] == self.INDEX_NAME for index in indexes)
+
+    def setup(self, connection: Connection) -> None:
+        if self._index_exists(connection):
+            return
+        connection.execute(text(
+            "ALTER TABLE notes ADD FULLTEXT INDEX {} (title, content) WITH PARSER ngram".format(self.INDEX_NAME)
+        ))
+
+    def _check_available(self, db: Session) -> bool:
+        return self._index_exists(db.get_bind())
+
+    def supports(self, search: str) -> bool:
+        return len(search.strip()) >= self.MIN_QUERY_LENGTH
+
+    def apply(self, query: Query, search: str) -> Query:
+        from sqlalchemy.dialects.mysql import match
+
+        phrase = '"{}"'.format(search.strip().replace('"', " "))
+        relevance = match(Note.title, Note.content, against=phrase).in_boolean_mode()
+        return query.filter(relevance).order_by(relevance.desc(), Note.id.desc())
+
+
+# 后端实例（按方言缓存）
+_like_backend = SearchBackend()
+_backends: Dict[str, SearchBackend] = {
+    "postgresql": PostgresSearchBackend(),
+    "sqlite": SqliteFtsSearchBackend(),
+    "mysql": MysqlFulltextSearchBackend(),
+}
+
+
+def get_search_backend(db: Session, search: str) -> SearchBackend:
+    """
+    为当前数据库和查询选择检索后端
+
+    Args:
+        db: 数据库会话
+        search: 搜索关键词
+
+    Returns:
+        SearchBackend: 可用的原生后端，不可用时返回 LIKE 后端
+    """
+    if get_settings().SEARCH_BACKEND == "like":
+        return _like_backend
+    backend = _backends.get(db.get_bind().dialect.name)
+    if backend is None or not backend.supports(search) or not backend.is_available(db):
+        return _like_backend
+    return backend
+
+
+def setup_search_backends(engine: Engine) -> None:
+    """
+    为当前数据库创建原生全文检索对象
+
+    失败时只记录日志，搜索会降级为 LIKE 模糊匹配。
+    """
+    if get_settings().SEARCH_BACKEND == "like":
+        return
+    backend = _backends.get(engine.dialect.name)
+    if backend is None:
+        return
+    try:
+        with engine.begin() as connection:
+            backend.setup(connection)
+        logger.info("数据库全文检索后端已就绪: {}".format(backend.name))
+    except Exception as e:
+        logger.warning("创建数据库全文检索对象失败，将使用 LIKE 检索: {}".format(str(e)))
@@ -0,0 +1,709 @@
+"""
+MindLink 笔记全文倒排索引
+
+包含：
+- 基于分词器的倒排表（CJK 单字/双字 + 其他文字的单词）
+- BM25 相关度排序
+- 笔记写入时的增量更新（追加写入共享的增量日志）
+- 可被所有 uvicorn 工作进程内存映射（mmap）的只读磁盘段
+
+目录结构（位于 SEARCH_INDEX_DIR）：
+- CURRENT：当前生效的索引代号
+- segment-<代号>.bin：由重建命令生成的只读段文件
+- delta-<代号>.log：段生成之后的增量写入日志（JSON Lines）
+
+每个工作进程在检索前读取增量日志中新追加的内容，因此任意进程的写入
+对其他进程都是可见的；检索耗时只与命中的倒排表长度有关，与语料规模无关。
+
+增量日志超过配置的大小或条目数时，由写入它的进程在后台把段和日志合并为新一代段，
+新一代日志只保留合并之后追加的条目，日志长度和工作进程启动时的回放量因此保持有界。
+合并和重建通过 compact.lock 文件锁互斥，同一时刻只有一个进程生成新段。
+"""
+
+import fcntl
+import json
+import logging
+import math
+import mmap
+import os
+import struct
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from app.core.config import get_settings
+from app.utils.tokenizer import tokenize, tokenize_query
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# BM25 参数
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# 段文件格式
+SEGMENT_MAGIC = b"MLSX"
+SEGMENT_FORMAT_VERSION = 1
+# 魔数、格式版本、词项数、文档数、用户数、各区块偏移（用户表、文档表、词项表、键、倒排表）
+_HEADER = struct.Struct("<4sIIII5Q")
+_USER_ENTRY = struct.Struct("<IIQ")     # user_id, 文档数, 文档总长度
+_DOC_ENTRY = struct.Struct("<III")      # note_id, user_id, 文档长度
+_TERM_ENTRY = struct.Struct("<QIQI")    # 键偏移, 键长度, 倒排表偏移, 倒排表条目数
+_POSTING = struct.Struct("<III")        # note_id, 词频, 文档长度
+_USER_PREFIX = struct.Struct(">I")      # 键前缀：大端 user_id，保证按用户聚集排序
+
+
+def _term_key(user_id: int, term: str) -> bytes:
+    """生成倒排表键：用户ID前缀 + 词项"""
+    return _USER_PREFIX.pack(user_id) + term.encode("utf-8")
+
+
+def analyze_note(title: str, content: str) -> Tuple[Dict[str, int], int]:
+    """
+    分析笔记文本，生成词频表
+
+    Args:
+        title: 笔记标题
+        content: 笔记内容
+
+    Returns:
+        Tuple[Dict[str, int], int]: (词频表, 文档长度)
+    """
+    tokens = tokenize(title or "") + tokenize(content or "")
+    return dict(Counter(tokens)), len(tokens)
+
+
+class IndexSegment:
+    """只读的磁盘索引段（通过 mmap 访问）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # 空文件无法映射
+            self._file.close()
+            raise ValueError("索引段文件为空: {}".format(path))
+
+        (magic, version, self.term_count, self.doc_count, self.user_count,
+         users_off, docs_off, terms_off, keys_off, postings_off) = _HEADER.unpack_from(self._mm, 0)
+        if magic != SEGMENT_MAGIC or version != SEGMENT_FORMAT_VERSION:
+            self.close()
+            raise ValueError("无法识别的索引段文件: {}".format(path))
+
+        self._docs_off = docs_off
+        self._terms_off = terms_off
+        self._keys_off = keys_off
+        self._postings_off = postings_off
+
+        # 用户统计表很小，加载到内存
+        self.user_stats: Dict[int, Tuple[int, int]] = {}
+        for i in range(self.user_count):
+            user_id, doc_count, total_len = _USER_ENTRY.unpack_from(self._mm, users_off + i * _USER_ENTRY.size)
+            self.user_stats[user_id] = (doc_count, total_len)
+
+    def close(self) -> None:
+        """释放映射和文件句柄"""
+        try:
+            self._mm.close()
+        finally:
+            self._file.close()
+
+    def _key_at(self, index: int) -> Tuple[bytes, int, int]:
+        key_off, key_len, post_off, post_count = _TERM_ENTRY.unpack_from(
+            self._mm, self._terms_off + index * _TERM_ENTRY.size
+        )
+        start = self._keys_off + key_off
+        return self._mm[start:start + key_len], post_off, post_count
+
+    def postings(self, user_id: int, term: str) -> List[Tuple[int, int, int]]:
+        """
+        二分查找词项并返回倒排表
+
+        Returns:
+            List[Tuple[int, int, int]]: (note_id, 词频, 文档长度) 列表
+        """
+        target = _term_key(user_id, term)
+        lo, hi = 0, self.term_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key, _, _ = self._key_at(mid)
+            if key < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo >= self.term_count:
+            return []
+        key, post_off, post_count = self._key_at(lo)
+        if key != target:
+            return []
+        start = self._postings_off + post_off
+        return list(_POSTING.iter_unpack(self._mm[start:start + post_count * _POSTING.size]))
+
+    def document(self, note_id: int) -> Optional[Tuple[int, int]]:
+        """
+        查找段内文档
+
+        Returns:
+            Optional[Tuple[int, int]]: (user_id, 文档长度)，不存在时返回 None
+        """
+        lo, hi = 0, self.doc_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            doc_id, user_id, doc_len = _DOC_ENTRY.unpack_from(self._mm, self._docs_off + mid * _DOC_ENTRY.size)
+            if doc_id < note_id:
+                lo = mid + 1
+            elif doc_id > note_id:
+                hi = mid
+            else:
+                return user_id, doc_len
+        return None
+
+    def iter_documents(self) -> Iterator[Tuple[int, int, Dict[str, int], int]]:
+        """
+        从倒排表还原段内的全部文档（用于合并新段）
+
+        Returns:
+            Iterator[Tuple[int, int, Dict[str, int], int]]: (note_id, user_id, 词频表, 文档长度) 迭代器
+        """
+        term_freqs: Dict[int, Dict[str, int]] = {}
+        for i in range(self.term_count):
+            key, post_off, post_count = self._key_at(i)
+            term = key[_USER_PREFIX.size:].decode("utf-8")
+            start = self._postings_off + post_off
+            for note_id, tf, _ in _POSTING.iter_unpack(self._mm[start:start + post_count * _POSTING.size]):
+                term_freqs.setdefault(note_id, {})[term] = tf
+        for i in range(self.doc_count):
+            note_id, user_id, doc_len = _DOC_ENTRY.unpack_from(self._mm, self._docs_off + i * _DOC_ENTRY.size)
+            yield note_id, user_id, term_freqs.pop(note_id, {}), doc_len
+
+
+def write_segment(path: str, documents: Iterable[Tuple[int, int, Dict[str, int], int]]) -> int:
+    """
+    将文档写入新的索引段文件（先写临时文件，再原子替换）
+
+    Args:
+        path: 段文件路径
+        documents: (note_id, user_id, 词频表, 文档长度) 迭代器
+
+    Returns:
+        int: 写入的文档数量
+    """
+    postings: Dict[bytes, List[Tuple[int, int, int]]] = {}
+    docs: List[Tuple[int, int, int]] = []
+    users: Dict[int, List[int]] = {}
+
+    for note_id, user_id, term_freqs, doc_len in documents:
+        docs.append((note_id, user_id, doc_len))
+        stats = users.setdefault(user_id, [0, 0])
+        stats[0] += 1
+        stats[1] += doc_len
+        for term, tf in term_freqs.items():
+            postings.setdefault(_term_key(user_id, term), []).append((note_id, tf, doc_len))
+
+    docs.sort()
+    keys = sorted(postings)
+
+    users_blob = b"".join(_USER_ENTRY.pack(uid, s[0], s[1]) for uid, s in sorted(users.items()))
+    docs_blob = b"".join(_DOC_ENTRY.pack(*doc) for doc in docs)
+
+    term_entries = []
+    key_chunks = []
+    post_chunks = []
+    key_off = 0
+    post_off = 0
+    for key in keys:
+        entries = sorted(postings[key])
+        term_entries.append(_TERM_ENTRY.pack(key_off, len(key), post_off, len(entries)))
+        key_chunks.append(key)
+        key_off += len(key)
+        chunk = b"".join(_POSTING.pack(*entry) for entry in entries)
+        post_chunks.append(chunk)
+        post_off += len(chunk)
+
+    terms_blob = b"".join(term_entries)
+    keys_blob = b"".join(key_chunks)
+
+    users_off = _HEADER.size
+    docs_off = users_off + len(users_blob)
+    terms_off = docs_off + len(docs_blob)
+    keys_off = terms_off + len(terms_blob)
+    postings_off = keys_off + len(keys_blob)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(
+            SEGMENT_MAGIC, SEGMENT_FORMAT_VERSION, len(keys), len(docs), len(users),
+            users_off, docs_off, terms_off, keys_off, postings_off
+        ))
+        f.write(users_blob)
+        f.write(docs_blob)
+        f.write(terms_blob)
+        f.write(keys_blob)
+        for chunk in post_chunks:
+            f.write(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return len(docs)
+
+
+class SearchIndex:
+    """
+    笔记全文索引
+
+    磁盘段提供只读的基础数据，增量日志中的写入在内存中叠加到段之上：
+    被更新或删除的笔记在段中被屏蔽，新版本记录在内存倒排表中。
+    """
+
+    def __init__(self, index_dir: str, compact_log_bytes: int = 0, compact_log_entries: int = 0):
+        """
+        Args:
+            index_dir: 索引目录
+            compact_log_bytes: 增量日志超过该字节数时自动合并（0 表示不按大小合并）
+            compact_log_entries: 增量日志超过该条目数时自动合并（0 表示不按条目数合并）
+        """
+        self.index_dir = index_dir
+        self.compact_log_bytes = compact_log_bytes
+        self.compact_log_entries = compact_log_entries
+        self._lock = threading.RLock()
+        self._generation: Optional[int] = None
+        self._current_mtime: Optional[int] = None
+        self._segment: Optional[IndexSegment] = None
+        self._log_offset = 0
+        self._log_entries = 0
+        self._compact_thread: Optional[threading.Thread] = None
+        self._reset_overlay()
+
+    # ---- 文件路径 ----
+
+    def _current_path(self) -> str:
+        return os.path.join(self.index_dir, "CURRENT")
+
+    def _segment_path(self, generation: int) -> str:
+        return os.path.join(self.index_dir, "segment-{}.bin".format(generation))
+
+    def _log_path(self, generation: int) -> str:
+        return os.path.join(self.index_dir, "delta-{}.log".format(generation))
+
+    def _lock_path(self) -> str:
+        return os.path.join(self.index_dir, "compact.lock")
+
+    def _read_generation(self) -> int:
+        try:
+            with open(self._current_path(), "r", encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    # ---- 内存叠加层 ----
+
+    def _reset_overlay(self) -> None:
+        # note_id -> (user_id, 文档长度, 词频表)
+        self._docs: Dict[int, Tuple[int, int, Dict[str, int]]] = {}
+        # (user_id, 词项) -> {note_id: (词频, 文档长度)}
+        self._postings: Dict[Tuple[int, str], Dict[int, Tuple[int, int]]] = {}
+        # 在段中已被覆盖或删除的笔记
+        self._masked: Set[int] = set()
+        # user_id -> [文档数增量, 总长度增量]
+        self._user_adjust: Dict[int, List[int]] = {}
+
+    def _adjust_user(self, user_id: int, doc_delta: int, len_delta: int) -> None:
+        stats = self._user_adjust.setdefault(user_id, [0, 0])
+        stats[0] += doc_delta
+        stats[1] += len_delta
+
+    def _drop_document(self, note_id: int) -> None:
+        """从叠加层删除文档，或在段中屏蔽它"""
+        if note_id in self._docs:
+            user_id, doc_len, term_freqs = self._docs.pop(note_id)
+            for term in term_freqs:
+                bucket = self._postings.get((user_id, term))
+                if bucket is not None:
+                    bucket.pop(note_id, None)
+                    if not bucket:
+                        del self._postings[(user_id, term)]
+            self._adjust_user(user_id, -1, -doc_len)
+        elif note_id not in self._masked and self._segment is not None:
+            found = self._segment.document(note_id)
+            if found is not None:
+                self._masked.add(note_id)
+                self._adjust_user(found[0], -1, -found[1])
+
+    def _apply(self, entry: dict) -> None:
+        note_id = entry["id"]
+        self._drop_document(note_id)
+        if entry["op"] != "put":
+            return
+        user_id, doc_len, term_freqs = entry["uid"], entry["len"], entry["tf"]
+        self._docs[note_id] = (user_id, doc_len, term_freqs)
+        for term, tf in term_freqs.items():
+            self._postings.setdefault((user_id, term), {})[note_id] = (tf, doc_len)
+        self._adjust_user(user_id, 1, doc_len)
+
+    # ---- 同步 ----
+
+    def _load_generation(self, generation: int) -> None:
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+        segment_path = self._segment_path(generation)
+        if os.path.exists(segment_path):
+            self._segment = IndexSegment(segment_path)
+        self._generation = generation
+        self._log_offset = 0
+        self._log_entries = 0
+        self._reset_overlay()
+
+    def _refresh(self) -> None:
+        """检查是否有新的索引代，并回放增量日志中新追加的条目"""
+        try:
+            current_mtime = os.stat(self._current_path()).st_mtime_ns
+        except FileNotFoundError:
+            current_mtime = None
+        if self._generation is None or current_mtime != self._current_mtime:
+            generation = self._read_generation()
+            if generation != self._generation:
+                self._load_generation(generation)
+            self._current_mtime = current_mtime
+
+        log_path = self._log_path(self._generation)
+        try:
+            size = os.path.getsize(log_path)
+        except FileNotFoundError:
+            return
+        if size <= self._log_offset:
+            return
+
+        with open(log_path, "rb") as f:
+            f.seek(self._log_offset)
+            data = f.read(size - self._log_offset)
+        # 只处理完整的行，末尾未写完的行留到下次
+        end = data.rfind(b"\n")
+        if end < 0:
+            return
+        for line in data[:end].split(b"\n"):
+            if not line:
+                continue
+            try:
+                self._apply(json.loads(line))
+            except (ValueError, KeyError) as e:
+                logger.error("跳过损坏的索引日志条目: {}".format(str(e)))
+            self._log_entries += 1
+        self._log_offset += end + 1
+
+    def is_ready(self) -> bool:
+        """索引是否已通过重建命令生成基础段"""
+        with self._lock:
+            self._refresh()
+            return self._segment is not None
+
+    # ---- 写入 ----
+
+    def _append(self, entry: dict) -> None:
+        self._append_many([entry])
+
+    def _append_many(self, entries: List[dict]) -> None:
+        os.makedirs(self.index_dir, exist_ok=True)
+        with self._lock:
+            self._refresh()
+            data = b"".join(
+                (json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+                for entry in entries
+            )
+            # O_APPEND 保证多个进程的单次写入不会交错
+            fd = os.open(self._log_path(self._generation), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+            self._refresh()
+            if self._needs_compaction():
+                self._schedule_compaction()
+
+    def index_note(self, note_id: int, user_id: int, title: str, content: str) -> None:
+        """
+        索引（或重新索引）一篇笔记
+
+        索引失败只记录日志，不影响笔记写入本身。
+        """
+        try:
+            term_freqs, doc_len = analyze_note(title, content)
+            self._append({"op": "put", "id": note_id, "uid": user_id, "len": doc_len, "tf": term_freqs})
+        except Exception as e:
+            logger.error("笔记 {} 索引失败: {}".format(note_id, str(e)))
+
+    def index_notes(self, documents: Iterable[Tuple[int, int, str, str]]) -> None:
+        """
+        批量索引笔记，所有记录在一次追加写入中完成
+
+        Args:
+            documents: (笔记ID, 用户ID, 标题, 内容) 序列
+        """
+        try:
+            entries = []
+            for note_id, user_id, title, content in documents:
+                term_freqs, doc_len = analyze_note(title, content)
+                entries.append({"op": "put", "id": note_id, "uid": user_id, "len": doc_len, "tf": term_freqs})
+            if entries:
+                self._append_many(entries)
+        except Exception as e:
+            logger.error("批量索引失败: {}".format(str(e)))
+
+    def remove_note(self, note_id: int) -> None:
+        """从索引中删除笔记"""
+        try:
+            self._append({"op": "del", "id": note_id})
+        except Exception as e:
+            logger.error("笔记 {} 索引删除失败: {}".format(note_id, str(e)))
+
+    # ---- 检索 ----
+
+    def _collect_postings(self, user_id: int, term: str) -> Dict[int, Tuple[int, int]]:
+        result: Dict[int, Tuple[int, int]] = {}
+        if self._segment is not None:
+            for note_id, tf, doc_len in self._segment.postings(user_id, term):
+                if note_id not in self._masked:
+                    result[note_id] = (tf, doc_len)
+        result.update(self._postings.get((user_id, term), {}))
+        return result
+
+    def _user_totals(self, user_id: int) -> Tuple[int, int]:
+        doc_count, total_len = 0, 0
+        if self._segment is not None:
+            doc_count, total_len = self._segment.user_stats.get(user_id, (0, 0))
+        adjust = self._user_adjust.get(user_id)
+        if adjust:
+            doc_count += adjust[0]
+            total_len += adjust[1]
+        return doc_count, total_len
+
+    def search(self, user_id: int, query: str, limit: Optional[int] = None) -> Optional[List[Tuple[int, float]]]:
+        """
+        检索用户的笔记
+
+        查询中的所有词项都必须命中（AND 语义），结果按 BM25 分数降序排列。
+
+        Args:
+            user_id: 用户ID
+            query: 查询文本
+            limit: 最大返回数量（None 表示返回全部命中）
+
+        Returns:
+            Optional[List[Tuple[int, float]]]: (note_id, 分数) 列表；
+            索引尚未生成或查询无法分词时返回 None，由调用方降级为模糊匹配
+        """
+        terms = tokenize_query(query)
+        if not terms:
+            return None
+
+        with self._lock:
+            self._refresh()
+            if self._segment is None:
+                return None
+
+            doc_count, total_len = self._user_totals(user_id)
+            if doc_count <= 0:
+                return []
+            avg_len = total_len / doc_count if total_len else 1.0
+
+            term_postings = [self._collect_postings(user_id, term) for term in terms]
+
+        # 从最短的倒排表开始求交集
+        term_postings.sort(key=len)
+        if not term_postings[0]:
+            return []
+        candidates = set(term_postings[0])
+        for postings in term_postings[1:]:
+            candidates.intersection_update(postings)
+            if not candidates:
+                return []
+
+        scores: Dict[int, float] = dict.fromkeys(candidates, 0.0)
+        for postings in term_postings:
+            df = len(postings)
+            idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+            for note_id in candidates:
+                tf, doc_len = postings[note_id]
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_len / avg_len)
+                scores[note_id] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return ranked
+
+    # ---- 合并与重建 ----
+
+    @contextmanager
+    def _exclusive(self, blocking: bool) -> Iterator[bool]:
+        """
+        获取跨进程的段生成锁
+
+        Yields:
+            bool: 是否获得锁（blocking=True 时总是 True）
+        """
+        os.makedirs(self.index_dir, exist_ok=True)
+        with open(self._lock_path(), "a") as f:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _needs_compaction(self) -> bool:
+        if self._segment is None:
+            return False
+        if self.compact_log_bytes and self._log_offset >= self.compact_log_bytes:
+            return True
+        return bool(self.compact_log_entries and self._log_entries >= self.compact_log_entries)
+
+    def _schedule_compaction(self) -> None:
+        """在后台线程中合并，不阻塞触发合并的写入请求"""
+        if self._compact_thread is not None and self._compact_thread.is_alive():
+            return
+        self._compact_thread = threading.Thread(target=self.compact, name="search-index-compactor", daemon=True)
+        self._compact_thread.start()
+
+    def _install_generation(self, old_generation: int, new_generation: int, log_offset: int) -> None:
+        """
+        把旧日志中 log_offset 之后的条目复制到新一代日志，并切换 CURRENT
+
+        log_offset 之前的条目已包含在新段中，不再复制。
+        """
+        old_log = self._log_path(old_generation)
+        new_log = self._log_path(new_generation)
+        copied = self._copy_log(old_log, new_log, log_offset)
+
+        tmp_current = self._current_path() + ".tmp"
+        with open(tmp_current, "w", encoding="utf-8") as f:
+            f.write(str(new_generation))
+        os.replace(tmp_current, self._current_path())
+
+        # 切换前最后一刻追加到旧日志的条目
+        self._copy_log(old_log, new_log, copied)
+
+        for path in (self._segment_path(old_generation), old_log):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def compact(self) -> bool:
+        """
+        把当前段和增量日志合并为新一代段
+
+        其他进程正在合并或重建时直接返回。
+
+        Returns:
+            bool: 是否生成了新段
+        """
+        try:
+            with self._exclusive(blocking=False) as acquired:
+                if not acquired:
+                    return False
+                with self._lock:
+                    self._refresh()
+                    if not self._needs_compaction():
+                        # 其他进程已经完成合并
+                        return False
+                    generation = self._generation
+                    segment = self._segment
+                    log_offset = self._log_offset
+                    overlay = dict(self._docs)
+                    masked = set(self._masked)
+
+                # 持有段生成锁期间代号不会变化，段文件不会被关闭
+                def merged():
+                    for note_id, user_id, term_freqs, doc_len in segment.iter_documents():
+                        if note_id not in masked:
+                            yield note_id, user_id, term_freqs, doc_len
+                    for note_id, (user_id, doc_len, term_freqs) in overlay.items():
+                        yield note_id, user_id, term_freqs, doc_len
+
+                count = write_segment(self._segment_path(generation + 1), merged())
+                self._install_generation(generation, generation + 1, log_offset)
+        except Exception as e:
+            logger.error("搜索索引合并失败: {}".format(str(e)))
+            return False
+
+        logger.info("搜索索引合并完成，代号 {}，共 {} 篇笔记".format(generation + 1, count))
+        return True
+
+    def rebuild(self, documents: Iterable[Tuple[int, int, str, str]]) -> int:
+        """
+        从完整的笔记集合重建索引段
+
+        开始读取笔记前记录旧增量日志的长度：此前的条目对应的写入已提交到数据库，
+        包含在新段中；之后（重建期间并发写入）的条目复制到新一代日志后再切换 CURRENT，
+        因此不会丢失（日志条目可重复回放）。
+
+        Args:
+            documents: (note_id, user_id, 标题, 内容) 迭代器
+
+        Returns:
+            int: 写入段的笔记数量
+        """
+        with self._exclusive(blocking=True):
+            old_generation = self._read_generation()
+            new_generation = old_generation + 1
+            try:
+                log_offset = os.path.getsize(self._log_path(old_generation))
+            except FileNotFoundError:
+                log_offset = 0
+
+            analyzed = (
+                (note_id, user_id) + analyze_note(title, content)
+                for note_id, user_id, title, content in documents
+            )
+            count = write_segment(self._segment_path(new_generation), analyzed)
+            self._install_generation(old_generation, new_generation, log_offset)
+
+        logger.info("搜索索引重建完成，代号 {}，共 {} 篇笔记".format(new_generation, count))
+        return count
+
+    @staticmethod
+    def _copy_log(source: str, target: str, offset: int) -> int:
+        """从 offset 开始复制完整的日志行，返回新的偏移"""
+        if not os.path.exists(source):
+            return offset
+        with open(source, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        end = data.rfind(b"\n")
+        if end < 0:
+            return offset
+        with open(target, "ab") as f:
+            f.write(data[:end + 1])
+        return offset + end + 1
+
+
+# 全局索引实例
+_search_index: Optional[SearchIndex] = None
+_search_index_lock = threading.Lock()
+
+
+def get_search_index() -> Optional[SearchIndex]:
+    """
+    获取全文索引实例
+
+    Returns:
+        Optional[SearchIndex]: 索引实例，未启用时返回 None
+    """
+    global _search_index
+    settings = get_settings()
+    if not settings.SEARCH_INDEX_ENABLED:
+        return None
+    if _search_index is None:
+        with _search_index_lock:
+            if _search_index is None:
+                _search_index = SearchIndex(
+                    settings.SEARCH_INDEX_DIR,
+                    compact_log_bytes=settings.SEARCH_INDEX_COMPACT_LOG_BYTES,
+                    compact_log_entries=settings.SEARCH_INDEX_COMPACT_LOG_ENTRIES,
+                )
+    return _search_index
@@ -0,0 +1,304 @@
+"""
+MindLink 用户统计服务
+
+维护 user_stats 表中的计数：
+- 笔记数量、文件数量、文件总大小、标签使用次数
+- 在创建、删除的同一事务中增量更新（不单独提交）
+- 统计行缺失时按明细表重新计算（懒初始化）
+- 提供对账修复，纠正因历史数据或异常中断造成的偏差
+- 维护标签、文件集合的代数（用于列表接口的 ETag）
+"""
+
+import logging
+from collections import Counter
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.note import Note
+from app.models.file import File
+from app.models.stats import UserStats, UserStatsOut
+from app.models.user import User
+from app.services.object_cache import CacheKind, get_object_cache, invalidate_on_commit
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 按用户维护代数的集合
+GENERATION_COLUMNS = {
+    "tags": UserStats.tags_generation,
+    "files": UserStats.files_generation,
+}
+
+
+class StatsService:
+    """用户统计服务类"""
+
+    @staticmethod
+    def _compute(db: Session, user_id: int) -> Dict:
+        """从明细表计算用户统计（代价与数据量成正比，仅用于初始化和对账）"""
+        note_count = db.query(func.count(Note.id)).filter(Note.user_id == user_id).scalar() or 0
+        file_count, file_bytes = db.query(
+            func.count(File.id), func.coalesce(func.sum(File.file_size), 0)
+        ).filter(File.user_id == user_id).one()
+
+        tag_counts = Counter()
+        for (tags,) in db.query(Note.tags).filter(Note.user_id == user_id):
+            tag_counts.update(set(tags or []))
+
+        return {
+            "note_count": note_count,
+            "file_count": file_count or 0,
+            "file_bytes": int(file_bytes or 0),
+            "tag_counts": dict(tag_counts),
+        }
+
+    @staticmethod
+    def _get_or_create(db: Session, user_id: int, for_update: bool = False) -> Tuple[UserStats, bool]:
+        """获取统计行，不存在时按明细表计算并创建，返回 (统计行, 是否新建)"""
+        query = db.query(UserStats).filter(UserStats.user_id == user_id).populate_existing()
+        if for_update:
+            query = query.with_for_update()
+        stats = query.first()
+        if stats is not None:
+            return stats, False
+
+        # 并发请求可能同时创建统计行，使用保存点处理主键冲突
+        values = StatsService._compute(db, user_id)
+        try:
+            with db.begin_nested():
+                stats = UserStats(user_id=user_id, **values)
+                db.add(stats)
+        except IntegrityError:
+            return query.first(), False
+        return stats, True
+
+    @staticmethod
+    def get_stats(db: Session, user_id: int, for_update: bool = False) -> UserStats:
+        """
+        获取用户统计行（写入路径使用，随调用方事务提交）
+
+        注意：需要在把新增/删除的笔记或文件加入会话之前调用，
+        否则懒初始化计算出的结果会与随后的增量重复计算。
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            for_update: 是否加行锁（配额检查等读-改-写场景使用）
+
+        Returns:
+            UserStats: 用户统计行
+        """
+        stats, _ = StatsService._get_or_create(db, user_id, for_update)
+        return stats
+
+    @staticmethod
+    def read_stats(db: Session, user_id: int) -> UserStats:
+        """
+        获取用户统计行（只读路径使用）
+
+        懒初始化新建的统计行会立即提交，避免之后的每次读取都重新计算。
+        """
+        stats, created = StatsService._get_or_create(db, user_id)
+        if created:
+            db.commit()
+        return stats
+
+    @staticmethod
+    def adjust(
+        db: Session,
+        user_id: int,
+        notes: int = 0,
+        files: int = 0,
+        file_bytes: int = 0,
+        tags_added: Iterable[str] = (),
+        tags_removed: Iterable[str] = ()
+    ) -> None:
+        """
+        增量更新用户统计（随调用方事务一起提交）
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            notes: 笔记数量变化
+            files: 文件数量变化
+            file_bytes: 文件总大小变化（字节）
+            tags_added: 新增使用的标签（每个标签计一次；涉及多篇笔记时传入 Counter）
+            tags_removed: 不再使用的标签（每个标签计一次；涉及多篇笔记时传入 Counter）
+        """
+        tags_added = tags_added if isinstance(tags_added, Counter) else Counter(set(tags_added or ()))
+        tags_removed = tags_removed if isinstance(tags_removed, Counter) else Counter(set(tags_removed or ()))
+        stats = StatsService.get_stats(db, user_id, for_update=bool(tags_added or tags_removed))
+
+        # 数值计数使用原子更新，避免并发请求之间丢失更新
+        if notes or files or file_bytes:
+            values = {
+                UserStats.note_count: UserStats.note_count + notes,
+                UserStats.file_count: UserStats.file_count + files,
+                UserStats.file_bytes: UserStats.file_bytes + file_bytes,
+            }
+            if files or file_bytes:
+                values[UserStats.files_generation] = UserStats.files_generation + 1
+            db.query(UserStats).filter(UserStats.user_id == user_id).update(values, synchronize_session=False)
+
+        # 标签计数为 JSON，在行锁保护下读-改-写
+        if tags_added or tags_removed:
+            tag_counts = Counter(stats.tag_counts or {})
+            tag_counts.update(tags_added)
+            tag_counts.subtract(tags_removed)
+            stats.tag_counts = {tag: count for tag, count in tag_counts.items() if count > 0}
+            stats.tags_generation = UserStats.tags_generation + 1
+            invalidate_on_commit(db, CacheKind.TAGS, user_id)
+
+    @staticmethod
+    def bump_generation(db: Session, user_id: int, collection: str) -> None:
+        """
+        递增集合代数（随调用方事务提交）
+
+        计数不变但集合内容变化时（如修改文件信息）调用，adjust 会自动递增受影响的集合。
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            collection: 集合名称（tags 或 files）
+        """
+        column = GENERATION_COLUMNS[collection]
+        StatsService.get_stats(db, user_id)
+        db.query(UserStats).filter(UserStats.user_id == user_id).update(
+            {column: column + 1}, synchronize_session=False
+        )
+        if collection == "tags":
+            invalidate_on_commit(db, CacheKind.TAGS, user_id)
+
+    @staticmethod
+    def read_generation(db: Session, user_id: int, collection: str) -> int:
+        """
+        读取集合代数（只查询一个整数列，用于 ETag 校验）
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            collection: 集合名称（tags 或 files）
+
+        Returns:
+            int: 集合代数
+        """
+        column = GENERATION_COLUMNS[collection]
+        generation = db.query(column).filter(UserStats.user_id == user_id).scalar()
+        if generation is None:
+            generation = getattr(StatsService.read_stats(db, user_id), column.key)
+        return generation
+
+    @staticmethod
+    def read_tags(db: Session, user_id: int) -> Dict[str, Any]:
+        """
+        读取用户的标签计数和标签代数（优先读取对象缓存）
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+
+        Returns:
+            Dict[str, Any]: {"generation": 标签代数, "tag_counts": {标签: 笔记数}}
+        """
+        def load():
+            stats = StatsService.read_stats(db, user_id)
+            return {"generation": stats.tags_generation, "tag_counts": stats.tag_counts or {}}
+
+        cache = get_object_cache()
+        if cache is None:
+            return load()
+        return cache.get_or_load(CacheKind.TAGS, user_id, load)
+
+    @staticmethod
+    def note_tags_changed(db: Session, user_id: int, old_tags: Optional[Iterable[str]], new_tags: Optional[Iterable[str]]) -> None:
+        """笔记标签变更时更新标签计数"""
+        old_tags, new_tags = set(old_tags or []), set(new_tags or [])
+        if old_tags != new_tags:
+            StatsService.adjust(
+                db, user_id,
+                tags_added=new_tags - old_tags,
+                tags_removed=old_tags - new_tags
+            )
+
+    @staticmethod
+    def get_user_stats(db: Session, user_id: int) -> UserStatsOut:
+        """
+        获取用户统计信息
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+
+        Returns:
+            UserStatsOut: 用户统计信息
+        """
+        stats = StatsService.read_stats(db, user_id)
+        tag_counts = dict(sorted((stats.tag_counts or {}).items()))
+        return UserStatsOut(
+            note_count=stats.note_count,
+            file_count=stats.file_count,
+            file_bytes=stats.file_bytes,
+            tag_count=len(tag_counts),
+            tag_counts=tag_counts,
+            updated_at=stats.updated_at
+        )
+
+    @staticmethod
+    def reconcile_user(db: Session, user_id: int) -> bool:
+        """
+        按明细表重新计算并修正单个用户的统计（不提交）
+
+        Returns:
+            bool: 统计是否存在偏差并已修正
+        """
+        stats = db.query(UserStats).filter(UserStats.user_id == user_id)\
+            .populate_existing().with_for_update().first()
+        values = StatsService._compute(db, user_id)
+        if stats is None:
+            db.add(UserStats(user_id=user_id, **values))
+            return True
+
+        changed = False
+        for field, value in values.items():
+            if getattr(stats, field) != value:
+                logger.warning("用户 {} 的统计 {} 存在偏差: {} -> {}".format(
+                    user_id, field, getattr(stats, field), value
+                ))
+                setattr(stats, field, value)
+                changed = True
+        if changed:
+            for column in GENERATION_COLUMNS.values():
+                setattr(stats, column.key, column + 1)
+            invalidate_on_commit(db, CacheKind.TAGS, user_id)
+        return changed
+
+    @staticmethod
+    def reconcile_all(db: Session, user_id: Optional[int] = None) -> Dict[str, int]:
+        """
+        对账修复所有（或指定）用户的统计，每个用户单独提交
+
+        Args:
+            db: 数据库会话
+            user_id: 只修复指定用户（可选）
+
+        Returns:
+            Dict[str, int]: {"checked": 检查的用户数, "fixed": 修正的用户数}
+        """
+        query = db.query(User.id).order_by(User.id)
+        if user_id is not None:
+            query = query.filter(User.id == user_id)
+        user_ids = [row[0] for row in query.all()]
+
+        fixed = 0
+        for uid in user_ids:
+            try:
+                if StatsService.reconcile_user(db, uid):
+                    fixed += 1
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+        return {"checked": len(user_ids), "fixed": fixed}
@@ -0,0 +1,229 @@
+"""
+MindLink 标题和标签前缀补全
+
+为快速切换器提供按前缀补全笔记标题和标签的内存索引：
+- 每个用户一组有序数组：完整标题、标题中每个单词开头的后缀、标签，查询时用 bisect 定位前缀范围
+- 首次查询时从数据库加载（只读取 id、标题和标签列），笔记写入后由本进程增量更新
+- 按用户 LRU 淘汰，最多保留 SUGGEST_MAX_USERS 个用户
+
+索引位于各工作进程的内存中，其他进程的写入在 SUGGEST_TTL 秒后重新加载时可见。
+前缀匹配不区分大小写。
+"""
+
+import bisect
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.models.note import Note
+from app.utils.metrics import metrics
+
+# 有序数组中大于任何以前缀开头的键的哨兵字符
+_MAX_CHAR = "\U0010ffff"
+
+
+def _normalize(text: str) -> str:
+    """前缀匹配使用的键"""
+    return (text or "").strip().lower()
+
+
+def _word_starts(title: str) -> List[str]:
+    """标题中除开头外每个单词开头的后缀（如 "Python 入门" -> ["入门"]）"""
+    key = _normalize(title)
+    return [
+        key[index:]
+        for index in range(1, len(key))
+        if key[index].isalnum() and not key[index - 1].isalnum()
+    ]
+
+
+def _prefix_range(keys: List[Tuple], prefix: str) -> Iterable[Tuple]:
+    """按顺序产生有序数组中键以 prefix 开头的元素"""
+    start = bisect.bisect_left(keys, (prefix,))
+    end = bisect.bisect_left(keys, (prefix + _MAX_CHAR,), start)
+    for index in range(start, end):
+        yield keys[index]
+
+
+class _UserSuggestions:
+    """单个用户的前缀索引"""
+
+    def __init__(self, notes: Iterable[Tuple[int, str, List[str]]]):
+        self.loaded_at = time.monotonic()
+        self.notes: Dict[int, Tuple[str, List[str]]] = {}
+        self.tag_counts: Counter = Counter()
+        titles, words = [], []
+        for note_id, title, tags in notes:
+            tags = list(dict.fromkeys(tags or []))
+            self.notes[note_id] = (title, tags)
+            self.tag_counts.update(tags)
+            titles.append((_normalize(title), note_id))
+            words.extend((key, note_id) for key in _word_starts(title))
+        # (键, 笔记ID) / (键, 标签)，各自有序
+        self.titles = sorted(titles)
+        self.words = sorted(words)
+        self.tags = sorted((_normalize(tag), tag) for tag in self.tag_counts)
+
+    def put(self, note_id: int, title: str, tags: List[str]) -> None:
+        """新增或更新一篇笔记"""
+        self.remove(note_id)
+        tags = list(dict.fromkeys(tags or []))
+        self.notes[note_id] = (title, tags)
+        bisect.insort(self.titles, (_normalize(title), note_id))
+        for key in _word_starts(title):
+            bisect.insort(self.words, (key, note_id))
+        for tag in tags:
+            if not self.tag_counts[tag]:
+                bisect.insort(self.tags, (_normalize(tag), tag))
+            self.tag_counts[tag] += 1
+
+    def remove(self, note_id: int) -> None:
+        """删除一篇笔记（不存在时忽略）"""
+        entry = self.notes.pop(note_id, None)
+        if entry is None:
+            return
+        title, tags = entry
+        self._discard(self.titles, (_normalize(title), note_id))
+        for key in _word_starts(title):
+            self._discard(self.words, (key, note_id))
+        for tag in tags:
+            self.tag_counts[tag] -= 1
+            if self.tag_counts[tag] <= 0:
+                del self.tag_counts[tag]
+                self._discard(self.tags, (_normalize(tag), tag))
+
+    @staticmethod
+    def _discard(keys: List[Tuple], item: Tuple) -> None:
+        index = bisect.bisect_left(keys, item)
+        if index < len(keys) and keys[index] == item:
+            del keys[index]
+
+    def suggest(self, prefix: str, limit: int) -> Dict[str, List[Dict]]:
+        """
+        按前缀补全
+
+        标题以前缀开头的笔记排在只有其中某个单词以前缀开头的笔记之前，各自按标题排序。
+        """
+        note_ids: List[int] = []
+        for keys in (self.titles, self.words):
+            for _, note_id in _prefix_range(keys, prefix):
+                if len(note_ids) >= limit:
+                    break
+                if note_id not in note_ids:
+                    note_ids.append(note_id)
+        tags = []
+        for _, tag in _prefix_range(self.tags, prefix):
+            if len(tags) >= limit:
+                break
+            tags.append({"tag": tag, "count": self.tag_counts[tag]})
+        return {
+            "notes": [{"id": note_id, "title": self.notes[note_id][0]} for note_id in note_ids],
+            "tags": tags,
+        }
+
+
+class SuggestIndex:
+    """标题和标签前缀补全索引"""
+
+    def __init__(self, max_users: int = 1000, ttl: int = 60):
+        """
+        Args:
+            max_users: 最多保留索引的用户数
+            ttl: 用户索引重新从数据库加载的间隔（秒），0 表示不过期
+        """
+        self.max_users = max_users
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._users: "OrderedDict[int, _UserSuggestions]" = OrderedDict()
+
+    def _fresh(self, user_id: int) -> Optional[_UserSuggestions]:
+        """已加载且未过期的用户索引（需持有锁）"""
+        view = self._users.get(user_id)
+        if view is None:
+            return None
+        if self.ttl and time.monotonic() - view.loaded_at > self.ttl:
+            del self._users[user_id]
+            return None
+        self._users.move_to_end(user_id)
+        return view
+
+    def _load(self, db: Session, user_id: int) -> _UserSuggestions:
+        metrics.incr("suggest.loads")
+        rows = db.query(Note.id, Note.title, Note.tags).filter(Note.user_id == user_id).all()
+        view = _UserSuggestions((row.id, row.title, row.tags) for row in rows)
+        with self._lock:
+            self._users[user_id] = view
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        return view
+
+    def suggest(self, db: Session, user_id: int, prefix: str, limit: int = 10) -> Dict[str, List[Dict]]:
+        """
+        按前缀补全用户的笔记标题和标签
+
+        Args:
+            db: 数据库会话（用户索引未加载或已过期时使用）
+            user_id: 用户ID
+            prefix: 前缀
+            limit: 笔记和标签各自最多返回的数量
+
+        Returns:
+            Dict[str, List[Dict]]: {"notes": [{"id", "title"}], "tags": [{"tag", "count"}]}
+        """
+        prefix = _normalize(prefix)
+        with self._lock:
+            view = self._fresh(user_id)
+            if view is not None:
+                return view.suggest(prefix, limit)
+        view = self._load(db, user_id)
+        with self._lock:
+            return view.suggest(prefix, limit)
+
+    def index_notes(self, notes: Iterable[Tuple[int, int, str, List[str]]]) -> None:
+        """
+        更新笔记的标题和标签（只更新已加载的用户，未加载的用户在首次查询时读取数据库）
+
+        Args:
+            notes: (笔记ID, 用户ID, 标题, 标签) 序列
+        """
+        with self._lock:
+            for note_id, user_id, title, tags in notes:
+                view = self._users.get(user_id)
+                if view is not None:
+                    view.put(note_id, title, tags)
+
+    def index_note(self, note: Note) -> None:
+        """更新一篇笔记"""
+        self.index_notes([(note.id, note.user_id, note.title, note.tags)])
+
+    def remove_note(self, note_id: int, user_id: int) -> None:
+        """删除一篇笔记"""
+        with self._lock:
+            view = self._users.get(user_id)
+            if view is not None:
+                view.remove(note_id)
+
+
+# 全局补全索引实例
+_suggest_index: Optional[SuggestIndex] = None
+_suggest_index_lock = threading.Lock()
+
+
+def get_suggest_index() -> SuggestIndex:
+    """
+    获取全局补全索引
+
+    Returns:
+        SuggestIndex: 补全索引实例
+    """
+    global _suggest_index
+    if _suggest_index is None:
+        with _suggest_index_lock:
+            if _suggest_index is None:
+                settings = get_settings()
+                _suggest_index = SuggestIndex(settings.SUGGEST_MAX_USERS, settings.SUGGEST_TTL)
+    return _suggest_index
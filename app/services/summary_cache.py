@@ -0,0 +1,287 @@
+"""
+MindLink AI 摘要缓存
+
+按 (模型, 提示词, 标题, 内容) 的哈希缓存大模型生成的摘要：
+- 内存 LRU 层：进程内命中，无需访问数据库
+- 持久层：summary_cache 表，跨进程、跨重启共享
+- 请求合并（singleflight）：并发的相同请求只调用一次大模型，其余等待共享结果
+
+恢复历史版本、保存相同内容等场景不再重复调用大模型。
+命中率和节省的上游调用次数通过 /metrics 输出。
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.database import SessionLocal
+from app.models.summary_cache import SummaryCacheEntry
+from app.utils.metrics import get_metrics
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(model: str, *parts: str) -> str:
+    """
+    计算摘要缓存键
+
+    Args:
+        model: 模型名称
+        parts: 影响输出的其他部分（系统提示词、用户提示词、生成参数等）
+
+    Returns:
+        str: SHA-256 十六进制摘要
+    """
+    digest = hashlib.sha256()
+    for part in (model,) + parts:
+        data = str(part).encode("utf-8")
+        # 写入长度前缀，避免不同拆分方式得到相同的键
+        digest.update(len(data).to_bytes(8, "big"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class _InFlightCall:
+    """正在进行中的上游调用"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+
+class SummaryCache:
+    """摘要缓存类"""
+
+    def __init__(
+        self,
+        capacity: int = 1024,
+        session_factory: Optional[Callable[[], Session]] = SessionLocal
+    ):
+        """
+        Args:
+            capacity: 内存 LRU 层的容量（条目数），0 表示不使用内存层
+            session_factory: 持久层使用的会话工厂，None 表示不使用持久层
+        """
+        self.capacity = capacity
+        self.session_factory = session_factory
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._in_flight: Dict[str, _InFlightCall] = {}
+
+    # ---- 内存层 ----
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def _memory_set(self, key: str, value: str) -> None:
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    # ---- 持久层 ----
+
+    def _persistent_get(self, key: str) -> Optional[str]:
+        if self.session_factory is None:
+            return None
+        db = self.session_factory()
+        try:
+            entry = db.query(SummaryCacheEntry.summary)\
+                .filter(SummaryCacheEntry.cache_key == key).first()
+            return entry[0] if entry else None
+        except Exception as e:
+            logger.warning("读取摘要缓存失败: {}".format(str(e)))
+            return None
+        finally:
+            db.close()
+
+    def _persistent_set(self, key: str, model: str, value: str) -> None:
+        if self.session_factory is None:
+            return
+        db = self.session_factory()
+        try:
+            db.add(SummaryCacheEntry(cache_key=key, model=model, summary=value))
+            db.commit()
+        except IntegrityError:
+            # 其他进程已写入相同的键
+            db.rollback()
+        except Exception as e:
+            db.rollback()
+            logger.warning("写入摘要缓存失败: {}".format(str(e)))
+        finally:
+            db.close()
+
+    # ---- 对外接口 ----
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        依次查询内存层和持久层
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            Optional[str]: 缓存的摘要，未命中时返回 None
+        """
+        metrics = get_metrics()
+        metrics.incr("summary_cache.requests")
+
+        value = self._memory_get(key)
+        if value is not None:
+            metrics.incr("summary_cache.memory_hits")
+            return value
+
+        value = self._persistent_get(key)
+        if value is not None:
+            metrics.incr("summary_cache.persistent_hits")
+            self._memory_set(key, value)
+            return value
+
+        metrics.incr("summary_cache.misses")
+        return None
+
+    def set(self, key: str, model: str, value: str) -> None:
+        """写入内存层和持久层"""
+        self._memory_set(key, value)
+        self._persistent_set(key, model, value)
+
+    def get_or_generate(self, key: str, model: str, generate: Callable[[], str]) -> str:
+        """
+        读取缓存，未命中时调用 generate 生成并写入缓存
+
+        并发的相同请求只有一个会调用 generate，其余等待并共享其结果；
+        generate 抛出的异常会传给所有等待者，且不会写入缓存。
+
+        Args:
+            key: 缓存键
+            model: 模型名称
+            generate: 调用上游生成摘要的函数
+
+        Returns:
+            str: 摘要
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            # 等锁期间其他线程可能已完成同一请求
+            value = self._entries.get(key)
+            if value is not None:
+                return value
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = _InFlightCall()
+                self._in_flight[key] = call
+
+        metrics = get_metrics()
+        if not leader:
+            metrics.incr("summary_cache.coalesced")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            metrics.incr("summary_cache.upstream_calls")
+            call.value = generate()
+            self.set(key, model, call.value)
+            return call.value
+        except BaseException as e:
+            metrics.incr("summary_cache.upstream_errors")
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            call.done.set()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        缓存效果指标
+
+        Returns:
+            Dict[str, float]: 命中率、节省的上游调用次数等
+        """
+        metrics = get_metrics()
+        requests = metrics.get("summary_cache.requests")
+        hits = metrics.get("summary_cache.memory_hits") + metrics.get("summary_cache.persistent_hits")
+        coalesced = metrics.get("summary_cache.coalesced")
+        with self._lock:
+            size = len(self._entries)
+        return {
+            "requests": requests,
+            "hit_ratio": round(hits / requests, 4) if requests else 0.0,
+            "memory_hit_ratio": round(metrics.get("summary_cache.memory_hits") / requests, 4) if requests else 0.0,
+            "upstream_calls": metrics.get("summary_cache.upstream_calls"),
+            "upstream_calls_saved": hits + coalesced,
+            "memory_entries": size,
+        }
+
+    def clear_memory(self) -> None:
+        """清空内存层"""
+        with self._lock:
+            self._entries.clear()
+
+
+def prune_summary_cache(db: Session, older_than_days: int) -> int:
+    """
+    删除持久层中早于指定天数的缓存条目
+
+    Args:
+        db: 数据库会话
+        older_than_days: 保留天数
+
+    Returns:
+        int: 删除的条目数
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    count = db.query(SummaryCacheEntry)\
+        .filter(SummaryCacheEntry.created_at < cutoff)\
+        .delete(synchronize_session=False)
+    db.commit()
+    return count
+
+
+# 全局摘要缓存实例
+_summary_cache: Optional[SummaryCache] = None
+_summary_cache_lock = threading.Lock()
+
+
+def get_summary_cache() -> Optional[SummaryCache]:
+    """
+    获取全局摘要缓存（SUMMARY_CACHE_ENABLED=false 时返回 None）
+
+    Returns:
+        Optional[SummaryCache]: 摘要缓存实例
+    """
+    global _summary_cache
+    settings = get_settings()
+    if not settings.SUMMARY_CACHE_ENABLED:
+        return None
+    if _summary_cache is None:
+        with _summary_cache_lock:
+            if _summary_cache is None:
+                _summary_cache = SummaryCache(
+                    capacity=settings.SUMMARY_CACHE_SIZE,
+                    session_factory=SessionLocal if settings.SUMMARY_CACHE_PERSISTENT else None
+                )
+                get_metrics().register_collector("summary_cache", _summary_cache.stats)
+    return _summary_cache
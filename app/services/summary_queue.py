@@ -0,0 +1,410 @@
+"""
+MindLink AI 摘要任务队列
+
+笔记保存时只在同一事务中写入 summary_jobs 任务（summary_status=pending），
+由后台工作线程调用大模型生成摘要，笔记写入不再等待 LLM 响应：
+- 每篇笔记只有一条任务，重复入队只递增 generation，工作线程总是读取最新内容
+- 按优先级取任务：用户编辑（PRIORITY_INTERACTIVE）先于批量导入（PRIORITY_BULK），最后是批量补齐（PRIORITY_BACKFILL）
+- 通过条件 UPDATE 领取任务并设置租约，多进程部署时也不会重复处理；
+  工作线程崩溃后租约过期，任务会被其他工作线程接管
+- 调用大模型期间不持有数据库事务
+- 调用失败时按指数退避重试，超过最大次数后才写入按内容截取的默认摘要，并标记为 failed
+  （failed 的笔记会被 backfill 和下一次修改重新登记）
+"""
+
+import logging
+import os
+import socket
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+
+from sqlalchemy import and_, case, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.database import SessionLocal
+from app.models.note import Note
+from app.models.summary_job import SummaryJob, PRIORITY_INTERACTIVE, PRIORITY_BACKFILL
+from app.services.ai_service import default_note_summary, request_note_summary
+from app.services.object_cache import CacheKind, invalidate_on_commit
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 单次领取时检查的候选任务数量（其他工作线程抢先领取时依次尝试下一个）
+CLAIM_CANDIDATES = 5
+
+
+class SummaryQueue:
+    """AI 摘要任务队列类"""
+
+    @staticmethod
+    def _claimable(now: datetime):
+        """可领取的任务：已到执行时间的排队任务，或租约已过期的处理中任务"""
+        return or_(
+            and_(SummaryJob.status == "queued", SummaryJob.run_after <= now),
+            and_(SummaryJob.status == "running", SummaryJob.locked_until < now)
+        )
+
+    @staticmethod
+    def enqueue(db: Session, note: Note, priority: int = PRIORITY_INTERACTIVE) -> None:
+        """
+        为笔记登记摘要任务（随调用方事务一起提交）
+
+        Args:
+            db: 数据库会话
+            note: 已分配ID的笔记
+            priority: 任务优先级
+        """
+        note.summary_status = "pending"
+        invalidate_on_commit(db, CacheKind.NOTE, note.id)
+        now = datetime.utcnow()
+
+        job_id = db.query(SummaryJob.id).filter(SummaryJob.note_id == note.id).scalar()
+        if job_id is None:
+            try:
+                with db.begin_nested():
+                    db.add(SummaryJob(
+                        note_id=note.id,
+                        status="queued",
+                        priority=priority,
+                        generation=1,
+                        attempts=0,
+                        run_after=now
+                    ))
+                return
+            except IntegrityError:
+                job_id = db.query(SummaryJob.id).filter(SummaryJob.note_id == note.id).scalar()
+
+        SummaryQueue._requeue(db, [job_id], priority, now)
+
+    @staticmethod
+    def enqueue_many(db: Session, notes: List[Note], priority: int = PRIORITY_INTERACTIVE) -> None:
+        """
+        为多篇笔记登记摘要任务（随调用方事务一起提交）
+
+        一次查询已有任务，新任务批量插入，已有任务用一条 UPDATE 重新排队。
+        与其他请求同时为同一笔记创建任务时，提交会因唯一约束失败，由调用方重试。
+
+        Args:
+            db: 数据库会话
+            notes: 已分配ID的笔记
+            priority: 任务优先级
+        """
+        if not notes:
+            return
+        now = datetime.utcnow()
+        for note in notes:
+            note.summary_status = "pending"
+        invalidate_on_commit(db, CacheKind.NOTE, *[note.id for note in notes])
+
+        note_ids = list({note.id for note in notes})
+        existing = dict(
+            db.query(SummaryJob.note_id, SummaryJob.id)
+            .filter(SummaryJob.note_id.in_(note_ids))
+            .all()
+        )
+        db.add_all([
+            SummaryJob(
+                note_id=note_id,
+                status="queued",
+                priority=priority,
+                generation=1,
+                attempts=0,
+                run_after=now
+            )
+            for note_id in note_ids if note_id not in existing
+        ])
+        if existing:
+            SummaryQueue._requeue(db, list(existing.values()), priority, now)
+
+    @staticmethod
+    def _requeue(db: Session, job_ids: List[int], priority: int, now: datetime) -> None:
+        """重新排队已有任务"""
+        # 原子更新，避免覆盖工作线程同时写入的状态；
+        # 处理中的任务保持 running，由工作线程完成时发现 generation 变化后重新排队
+        finished = SummaryJob.status.in_(["done", "failed"])
+        db.query(SummaryJob).filter(SummaryJob.id.in_(job_ids)).update({
+            SummaryJob.generation: SummaryJob.generation + 1,
+            SummaryJob.priority: case(
+                (finished, priority),
+                (SummaryJob.priority > priority, priority),
+                else_=SummaryJob.priority
+            ),
+            SummaryJob.status: case((SummaryJob.status == "running", "running"), else_="queued"),
+            SummaryJob.attempts: 0,
+            SummaryJob.last_error: None,
+            SummaryJob.run_after: now,
+        }, synchronize_session=False)
+
+    @staticmethod
+    def claim(db: Session, worker_id: str) -> Optional[SummaryJob]:
+        """
+        领取一个待处理任务并设置租约
+
+        Args:
+            db: 数据库会话
+            worker_id: 工作线程标识
+
+        Returns:
+            Optional[SummaryJob]: 领取到的任务（已脱离会话的快照），没有可处理任务时返回 None
+        """
+        now = datetime.utcnow()
+        lease = timedelta(seconds=get_settings().SUMMARY_JOB_LEASE_SECONDS)
+
+        candidate_ids = [
+            row[0] for row in db.query(SummaryJob.id)
+            .filter(SummaryQueue._claimable(now))
+            .order_by(SummaryJob.priority, SummaryJob.run_after, SummaryJob.id)
+            .limit(CLAIM_CANDIDATES)
+            .with_for_update(skip_locked=True)
+            .all()
+        ]
+        for job_id in candidate_ids:
+            claimed = db.query(SummaryJob)\
+                .filter(SummaryJob.id == job_id, SummaryQueue._claimable(now))\
+                .update({
+                    SummaryJob.status: "running",
+                    SummaryJob.locked_by: worker_id,
+                    SummaryJob.locked_until: now + lease,
+                }, synchronize_session=False)
+            if claimed == 1:
+                db.commit()
+                job = db.query(SummaryJob).filter(SummaryJob.id == job_id).populate_existing().first()
+                # 领取时的快照（尤其是 generation）不能随之后的提交过期重新加载
+                db.expunge(job)
+                return job
+
+        db.commit()
+        return None
+
+    @staticmethod
+    def _finish(db: Session, job: SummaryJob, generation: int, worker_id: str) -> bool:
+        """
+        标记任务完成；处理期间笔记又被修改时重新排队
+
+        Returns:
+            bool: 处理的是否为最新内容
+        """
+        done = db.query(SummaryJob)\
+            .filter(SummaryJob.id == job.id, SummaryJob.generation == generation, SummaryJob.locked_by == worker_id)\
+            .update({
+                SummaryJob.status: "done",
+                SummaryJob.locked_by: None,
+                SummaryJob.locked_until: None,
+            }, synchronize_session=False)
+        if done == 1:
+            return True
+
+        db.query(SummaryJob)\
+            .filter(SummaryJob.id == job.id, SummaryJob.status == "running", SummaryJob.locked_by == worker_id)\
+            .update({
+                SummaryJob.status: "queued",
+                SummaryJob.locked_by: None,
+                SummaryJob.locked_until: None,
+            }, synchronize_session=False)
+        return False
+
+    @staticmethod
+    def _fail(
+        db: Session,
+        job: SummaryJob,
+        worker_id: str,
+        error: Exception,
+        title: Optional[str] = None,
+        content: Optional[str] = None
+    ) -> None:
+        """记录失败并按指数退避重试，超过最大次数后写入默认摘要并标记为失败"""
+        settings = get_settings()
+        attempts = job.attempts + 1
+        values = {
+            SummaryJob.attempts: attempts,
+            SummaryJob.last_error: str(error)[:2000],
+            SummaryJob.locked_by: None,
+            SummaryJob.locked_until: None,
+        }
+        if attempts >= settings.SUMMARY_MAX_ATTEMPTS:
+            values[SummaryJob.status] = "failed"
+            note_values = {
+                Note.summary_status: "failed",
+                Note.updated_at: Note.updated_at,    # 摘要状态不是内容修改，保持更新时间不变
+            }
+            if content is not None:
+                note_values[Note.summary] = default_note_summary(content, title or "")
+            db.query(Note).filter(Note.id == job.note_id).update(note_values, synchronize_session=False)
+            invalidate_on_commit(db, CacheKind.NOTE, job.note_id)
+        else:
+            values[SummaryJob.status] = "queued"
+            values[SummaryJob.run_after] = datetime.utcnow() + timedelta(
+                seconds=settings.SUMMARY_POLL_INTERVAL * (2 ** attempts)
+            )
+        db.query(SummaryJob)\
+            .filter(SummaryJob.id == job.id, SummaryJob.locked_by == worker_id)\
+            .update(values, synchronize_session=False)
+
+    @staticmethod
+    def process(db: Session, job: SummaryJob, worker_id: str) -> None:
+        """
+        处理已领取的任务
+
+        Args:
+            db: 数据库会话
+            job: 已领取的任务
+            worker_id: 工作线程标识
+        """
+        generation = job.generation
+        title = content = None
+        try:
+            note = db.query(Note).filter(Note.id == job.note_id).first()
+            if note is None:
+                db.query(SummaryJob).filter(SummaryJob.id == job.id).delete(synchronize_session=False)
+                db.commit()
+                return
+            title, content = note.title, note.content
+            # 结束读事务，调用大模型期间不持有数据库连接上的事务
+            db.commit()
+
+            summary = request_note_summary(content, title)
+
+            latest = SummaryQueue._finish(db, job, generation, worker_id)
+            values = {
+                Note.summary: summary,
+                Note.updated_at: Note.updated_at,    # 摘要不是内容修改，保持更新时间不变
+            }
+            if latest:
+                values[Note.summary_status] = "ready"
+            db.query(Note).filter(Note.id == job.note_id).update(values, synchronize_session=False)
+            invalidate_on_commit(db, CacheKind.NOTE, job.note_id)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error("处理摘要任务 {} 失败: {}".format(job.id, str(e)))
+            SummaryQueue._fail(db, job, worker_id, e, title, content)
+            db.commit()
+
+    @staticmethod
+    def run_once(db: Session, worker_id: str) -> bool:
+        """
+        领取并处理一个任务
+
+        Returns:
+            bool: 是否处理了任务
+        """
+        job = SummaryQueue.claim(db, worker_id)
+        if job is None:
+            return False
+        SummaryQueue.process(db, job, worker_id)
+        return True
+
+    @staticmethod
+    def backfill(db: Session, only_missing: bool = True, batch_size: int = 500) -> int:
+        """
+        以低优先级为笔记批量登记摘要任务
+
+        Args:
+            db: 数据库会话
+            only_missing: 只处理没有摘要或摘要失败的笔记
+            batch_size: 每批提交的笔记数量
+
+        Returns:
+            int: 登记的任务数量
+        """
+        query = db.query(Note.id).order_by(Note.id)
+        if only_missing:
+            query = query.filter(or_(Note.summary.is_(None), Note.summary == "", Note.summary_status == "failed"))
+        note_ids = [row[0] for row in query.all()]
+
+        for start in range(0, len(note_ids), batch_size):
+            for note in db.query(Note).filter(Note.id.in_(note_ids[start:start + batch_size])):
+                SummaryQueue.enqueue(db, note, PRIORITY_BACKFILL)
+            db.commit()
+        return len(note_ids)
+
+
+class SummaryWorkerPool:
+    """摘要工作线程池"""
+
+    def __init__(
+        self,
+        workers: int,
+        session_factory: Callable[[], Session] = SessionLocal,
+        poll_interval: Optional[float] = None
+    ):
+        self.workers = workers
+        self.session_factory = session_factory
+        self.poll_interval = poll_interval if poll_interval is not None else get_settings().SUMMARY_POLL_INTERVAL
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._prefix = "{}-{}".format(socket.gethostname(), os.getpid())
+
+    def start(self) -> None:
+        """启动工作线程"""
+        self._stop.clear()
+        for index in range(self.workers):
+            thread = threading.Thread(
+                target=self._run,
+                args=("{}-{}".format(self._prefix, index),),
+                name="summary-worker-{}".format(index),
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        logger.info("摘要工作线程已启动: {} 个".format(self.workers))
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """停止工作线程（等待当前任务完成）"""
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def notify(self) -> None:
+        """有新任务时唤醒空闲的工作线程"""
+        self._wakeup.set()
+
+    def _run(self, worker_id: str) -> None:
+        while not self._stop.is_set():
+            processed = False
+            db = self.session_factory()
+            try:
+                processed = SummaryQueue.run_once(db, worker_id)
+            except Exception as e:
+                logger.error("摘要工作线程 {} 异常: {}".format(worker_id, str(e)))
+            finally:
+                db.close()
+            if not processed:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+
+# 当前进程内的工作线程池
+_worker_pool: Optional[SummaryWorkerPool] = None
+
+
+def start_summary_workers() -> Optional[SummaryWorkerPool]:
+    """按配置在当前进程启动摘要工作线程（SUMMARY_WORKERS=0 时不启动）"""
+    global _worker_pool
+    settings = get_settings()
+    if not settings.SUMMARY_ASYNC_ENABLED or settings.SUMMARY_WORKERS <= 0 or _worker_pool is not None:
+        return _worker_pool
+    _worker_pool = SummaryWorkerPool(settings.SUMMARY_WORKERS)
+    _worker_pool.start()
+    return _worker_pool
+
+
+def stop_summary_workers() -> None:
+    """停止当前进程的摘要工作线程"""
+    global _worker_pool
+    if _worker_pool is not None:
+        _worker_pool.stop()
+        _worker_pool = None
+
+
+def notify_summary_workers() -> None:
+    """通知当前进程的工作线程有新任务（其他进程的工作线程按轮询间隔发现）"""
+    if _worker_pool is not None:
+        _worker_pool.notify()
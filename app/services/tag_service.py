@@ -0,0 +1,147 @@
+"""
+MindLink 标签索引服务
+
+维护 note_tags 倒排表并基于它完成标签筛选：
+- 创建、更新、恢复笔记时按标签差异增删倒排记录（随调用方事务提交）
+- 任一匹配（any）：笔记至少包含一个指定标签
+- 全部匹配（all）：笔记包含全部指定标签
+- 提供按 tags JSON 列重建倒排表的维护操作
+"""
+
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Query, Session
+
+from app.models.note import Note
+from app.models.note_tag import MAX_TAG_LENGTH, NoteTag
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 支持的标签匹配方式
+TAG_MODES = ("any", "all")
+
+
+def _normalize(tags: Optional[Iterable[str]]) -> List[str]:
+    """去重并保持顺序"""
+    return list(dict.fromkeys(tag for tag in (tags or []) if tag))
+
+
+def _indexable(tags: Optional[Iterable[str]]) -> List[str]:
+    """需要写入倒排表的标签（超过列宽的历史标签只保留在 tags 列中）"""
+    return [tag for tag in _normalize(tags) if len(tag) <= MAX_TAG_LENGTH]
+
+
+class TagService:
+    """标签索引服务类"""
+
+    @staticmethod
+    def set_note_tags(
+        db: Session,
+        note: Note,
+        old_tags: Optional[Iterable[str]],
+        new_tags: Optional[Iterable[str]]
+    ) -> None:
+        """
+        按标签差异更新笔记的倒排记录（不提交）
+
+        Args:
+            db: 数据库会话
+            note: 笔记（需已分配ID）
+            old_tags: 修改前的标签
+            new_tags: 修改后的标签
+        """
+        old_set, new_list = set(_indexable(old_tags)), _indexable(new_tags)
+        removed = old_set - set(new_list)
+        if removed:
+            db.query(NoteTag).filter(
+                NoteTag.user_id == note.user_id,
+                NoteTag.tag.in_(removed),
+                NoteTag.note_id == note.id
+            ).delete(synchronize_session=False)
+        db.add_all([
+            NoteTag(user_id=note.user_id, tag=tag, note_id=note.id)
+            for tag in new_list if tag not in old_set
+        ])
+
+    @staticmethod
+    def matching_note_ids(user_id: int, tags: List[str], mode: str = "any"):
+        """
+        构建匹配指定标签的笔记ID子查询
+
+        Args:
+            user_id: 用户ID
+            tags: 标签列表
+            mode: 匹配方式（any 任一匹配，all 全部匹配）
+
+        Returns:
+            Select: 笔记ID子查询
+        """
+        tags = _normalize(tags)
+        query = select(NoteTag.note_id).where(NoteTag.user_id == user_id, NoteTag.tag.in_(tags))
+        if mode == "all":
+            return query.group_by(NoteTag.note_id).having(func.count() == len(tags))
+        return query.distinct()
+
+    @staticmethod
+    def apply_filter(query: Query, user_id: int, tags: Optional[List[str]], mode: str = "any") -> Query:
+        """
+        为笔记查询添加标签筛选条件
+
+        Args:
+            query: 笔记查询
+            user_id: 标签所属用户ID
+            tags: 标签列表（为空时不筛选）
+            mode: 匹配方式（any 任一匹配，all 全部匹配）
+
+        Returns:
+            Query: 添加筛选条件后的查询
+        """
+        if not tags:
+            return query
+        return query.filter(Note.id.in_(TagService.matching_note_ids(user_id, tags, mode)))
+
+    @staticmethod
+    def rebuild(db: Session, batch_size: int = 500) -> Dict[str, int]:
+        """
+        按笔记的 tags 列重建倒排表
+
+        按笔记ID分批替换倒排记录，每批的删除和写入在同一事务中提交；
+        重建期间标签筛选始终可用，中途失败时未处理的批次保留原有记录。
+
+        Args:
+            db: 数据库会话
+            batch_size: 每批处理的笔记数量
+
+        Returns:
+            Dict[str, int]: {"notes": 处理的笔记数, "postings": 写入的倒排记录数}
+        """
+        notes = postings = 0
+        last_id = 0
+        while True:
+            rows = db.query(Note.id, Note.user_id, Note.tags)\
+                .filter(Note.id > last_id)\
+                .order_by(Note.id)\
+                .limit(batch_size)\
+                .all()
+            if not rows:
+                break
+            db.query(NoteTag)\
+                .filter(NoteTag.note_id.in_([row[0] for row in rows]))\
+                .delete(synchronize_session=False)
+            for note_id, user_id, tags in rows:
+                for tag in _indexable(tags):
+                    db.add(NoteTag(user_id=user_id, tag=tag, note_id=note_id))
+                    postings += 1
+            db.commit()
+            notes += len(rows)
+            last_id = rows[-1][0]
+
+        # 清理已不存在的笔记遗留的记录
+        db.query(NoteTag)\
+            .filter(NoteTag.note_id.notin_(select(Note.id)))\
+            .delete(synchronize_session=False)
+        db.commit()
+        return {"notes": notes, "postings": postings}
@@ -16,6 +16,7 @@ from fastapi import HTTPException, status
 from app.models.user import User, UserCreate, UserUpdate, UserOut, UserLogin
 from app.utils.auth import get_password_hash, authenticate_user, generate_tokens
 from app.models.common import SuccessResponse, ErrorResponse
+from app.services.object_cache import CacheKind, invalidate_on_commit
 
 class UserService:
     """用户业务逻辑服务类"""
@@ -243,9 +244,11 @@ class UserService:
                     detail="邮箱已被注册"
                 )
         
-        # 执行更新
+        # 执行更新（认证缓存按用户名保存，新旧用户名都需要失效）
+        invalidate_on_commit(db, CacheKind.USER, db_user.username)
         for field, value in update_data.items():
             setattr(db_user, field, value)
+        invalidate_on_commit(db, CacheKind.USER, db_user.username)
         
         try:
             db.commit()
@@ -298,6 +301,7 @@ class UserService:
         
         try:
             db.delete(db_user)
+            invalidate_on_commit(db, CacheKind.USER, db_user.username)
             db.commit()
             return True
         except Exception:
@@ -346,6 +350,7 @@ class UserService:
             )
         
         db_user.is_active = False
+        invalidate_on_commit(db, CacheKind.USER, db_user.username)
         db.commit()
         db.refresh(db_user)
         
@@ -383,6 +388,7 @@ class UserService:
             )
         
         db_user.is_active = True
+        invalidate_on_commit(db, CacheKind.USER, db_user.username)
         db.commit()
         db.refresh(db_user)
         
@@ -0,0 +1,792 @@
+"""
+MindLink 笔记版本存储服务
+
+笔记版本内容以压缩形式保存：
+- 每 NOTE_VERSION_SNAPSHOT_INTERVAL 个版本保存一次压缩快照（storage=snapshot）
+- 其余版本保存相对最近快照的压缩增量（storage=delta）
+- 读取时透明还原：最多解压一个快照并应用一个增量，代价与历史长度无关
+- 早期未压缩的版本（storage=full）照常读取，可通过 manage.py compress-versions 转换
+"""
+
+import logging
+import os
+import socket
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.config import get_settings
+from app.core.database import SessionLocal
+from app.models.note import Note, NoteVersion
+from app.services.lease_service import LeaseService
+from app.services.object_cache import CacheKind, get_object_cache, invalidate_on_commit
+from app.utils.delta import apply_delta, compress_text, compute_delta, decompress_text, diff_stats
+from app.utils.diff import unified_diff
+from app.utils.metrics import metrics
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 版本号冲突时的最大尝试次数
+VERSION_ALLOCATE_ATTEMPTS = 3
+
+# 版本清理的全局租约名称
+COMPACTION_LEASE = "version-compaction"
+
+
+def encode_content(
+    content: str,
+    version_number: int,
+    base: Optional[Tuple[int, str]],
+    interval: int
+) -> Dict:
+    """
+    决定版本内容的存储方式并编码
+
+    Args:
+        content: 版本内容
+        version_number: 版本号
+        base: 最近的快照 (版本号, 内容)，没有时为 None
+        interval: 快照间隔（版本数）
+
+    Returns:
+        Dict: NoteVersion 的存储相关字段
+    """
+    snapshot = compress_text(content)
+    values = {
+        "content": "",
+        "content_size": len(content.encode("utf-8")),
+        "storage": "snapshot",
+        "base_version": None,
+        "payload": snapshot,
+    }
+    if base is None or interval <= 1 or version_number - base[0] >= interval:
+        return values
+
+    delta = compute_delta(base[1], content)
+    # 改动很大时增量可能比快照还大，此时直接保存快照
+    if len(delta) < len(snapshot):
+        values.update(storage="delta", base_version=base[0], payload=delta)
+    return values
+
+
+class VersionService:
+    """笔记版本存储服务类"""
+
+    @staticmethod
+    def _snapshot_interval() -> int:
+        return get_settings().NOTE_VERSION_SNAPSHOT_INTERVAL
+
+    @staticmethod
+    def allocate_version_number(
+        db: Session,
+        note: Note,
+        count: int = 1,
+        expected_version: Optional[int] = None
+    ) -> int:
+        """
+        原子递增笔记的 current_version 并返回新版本号
+
+        递增在单条 UPDATE 中完成，并锁定笔记行直到事务结束，
+        同一笔记的并发写入因此按顺序得到不同的版本号。
+        指定 expected_version 时递增以 current_version 等于该值为条件（乐观并发控制），
+        条件不成立说明笔记已被其他请求修改，回滚事务并返回 412。
+
+        Args:
+            db: 数据库会话
+            note: 笔记
+            count: 分配的版本号数量（批量写入时使用）
+            expected_version: 要求笔记当前的版本号（可选）
+
+        Returns:
+            int: 分配到的最后一个版本号（分配范围为 number - count + 1 至 number）
+
+        Raises:
+            HTTPException: 笔记的版本号不是 expected_version 时抛出异常
+        """
+        stmt = update(Note)\
+            .where(Note.id == note.id)\
+            .values(current_version=Note.current_version + count)\
+            .execution_options(synchronize_session=False)
+        if expected_version is not None:
+            stmt = stmt.where(Note.current_version == expected_version)
+        if db.get_bind().dialect.update_returning:
+            number = db.execute(stmt.returning(Note.current_version)).scalar_one_or_none()
+        elif db.execute(stmt).rowcount:
+            number = db.query(Note.current_version).filter(Note.id == note.id).scalar()
+        else:
+            number = None
+        if number is None:
+            db.rollback()
+            metrics.incr("notes.version_conflicts")
+            raise HTTPException(
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                detail="笔记已被其他请求修改，请获取最新版本后重试"
+            )
+        set_committed_value(note, "current_version", number)
+        return number
+
+    @staticmethod
+    def sync_counters(db: Session, note_ids: Iterable[int]) -> None:
+        """把笔记的 current_version 同步为已有的最大版本号（计数器落后时使用）"""
+        latest = select(func.coalesce(func.max(NoteVersion.version_number), 0))\
+            .where(NoteVersion.note_id == Note.id)\
+            .scalar_subquery()
+        note_ids = list(note_ids)
+        db.query(Note).filter(Note.id.in_(note_ids)).update(
+            {Note.current_version: latest, Note.updated_at: Note.updated_at},
+            synchronize_session=False
+        )
+        invalidate_on_commit(db, CacheKind.NOTE, *note_ids)
+
+    @staticmethod
+    def latest_bases(db: Session, note_ids: Iterable[int]) -> Dict[int, Tuple[int, str]]:
+        """
+        批量获取笔记最近的快照（或未压缩的历史版本）
+
+        Args:
+            db: 数据库会话
+            note_ids: 笔记ID列表
+
+        Returns:
+            Dict[int, Tuple[int, str]]: {笔记ID: (版本号, 内容)}
+        """
+        note_ids = list(note_ids)
+        if not note_ids:
+            return {}
+        latest = db.query(
+            NoteVersion.note_id,
+            func.max(NoteVersion.version_number).label("version_number")
+        ).filter(
+            NoteVersion.note_id.in_(note_ids),
+            NoteVersion.storage.in_(["snapshot", "full"])
+        ).group_by(NoteVersion.note_id).subquery()
+        rows = db.query(NoteVersion).join(
+            latest,
+            and_(
+                NoteVersion.note_id == latest.c.note_id,
+                NoteVersion.version_number == latest.c.version_number
+            )
+        ).all()
+        return {row.note_id: (row.version_number, VersionService._decode_base(row)) for row in rows}
+
+    @staticmethod
+    def build_version(
+        note: Note,
+        version_number: int,
+        change_description: Optional[str],
+        previous_content: str,
+        base: Optional[Tuple[int, str]],
+        interval: int,
+        summary: Optional[str] = None
+    ) -> NoteVersion:
+        """
+        按已分配的版本号构建版本记录（不访问数据库）
+
+        Args:
+            note: 笔记（使用其当前标题、内容和标签）
+            version_number: 版本号
+            change_description: 变更描述
+            previous_content: 变更前的内容
+            base: 最近的快照 (版本号, 内容)
+            interval: 快照间隔
+            summary: 版本摘要（可选）
+
+        Returns:
+            NoteVersion: 未加入会话的版本记录
+        """
+        lines_added, lines_removed = diff_stats(previous_content, note.content)
+        return NoteVersion(
+            note_id=note.id,
+            title=note.title,
+            summary=summary,
+            tags=note.tags,
+            version_number=version_number,
+            change_description=change_description,
+            lines_added=lines_added,
+            lines_removed=lines_removed,
+            **encode_content(note.content, version_number, base, interval)
+        )
+
+    @staticmethod
+    def create_version(
+        db: Session,
+        note: Note,
+        change_description: Optional[str],
+        previous_content: str = "",
+        summary: Optional[str] = None,
+        expected_version: Optional[int] = None
+    ) -> NoteVersion:
+        """
+        为笔记当前内容分配版本号并创建版本记录（随调用方事务提交）
+
+        版本号与已有版本冲突时（如升级前的笔记计数器尚未同步），
+        先同步计数器再重新分配，不会写入重复的版本。
+
+        Args:
+            db: 数据库会话
+            note: 笔记（使用其当前标题、内容和标签）
+            change_description: 变更描述
+            previous_content: 变更前的内容，用于统计增删行数（初始版本为空）
+            summary: 版本摘要（可选）
+            expected_version: 要求笔记当前的版本号（可选，见 allocate_version_number）
+
+        Returns:
+            NoteVersion: 新建的版本
+
+        Raises:
+            HTTPException: 笔记已被其他请求修改或多次重试仍冲突时抛出异常
+        """
+        interval = VersionService._snapshot_interval()
+        base = VersionService.latest_bases(db, [note.id]).get(note.id) if interval > 1 else None
+
+        for _ in range(VERSION_ALLOCATE_ATTEMPTS):
+            version_number = VersionService.allocate_version_number(db, note, expected_version=expected_version)
+            # 条件只需在第一次分配时校验，之后的重试是在同步落后的计数器
+            expected_version = None
+            version = VersionService.build_version(
+                note, version_number, change_description, previous_content, base, interval, summary
+            )
+            try:
+                with db.begin_nested():
+                    db.add(version)
+                return version
+            except IntegrityError:
+                logger.warning("笔记 {} 的版本号 {} 已存在，同步计数器后重试".format(note.id, version_number))
+                VersionService.sync_counters(db, [note.id])
+
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="版本号分配冲突，请稍后重试"
+        )
+
+    @staticmethod
+    def _decode_base(version: NoteVersion) -> str:
+        """解码快照或未压缩版本的内容"""
+        if version.storage == "snapshot":
+            return decompress_text(version.payload)
+        return version.content
+
+    @staticmethod
+    def _decode(db: Session, version: NoteVersion, bases: Dict[Tuple[int, int], str]) -> str:
+        if version.storage != "delta":
+            return VersionService._decode_base(version)
+
+        key = (version.note_id, version.base_version)
+        base_content = bases.get(key)
+        if base_content is None:
+            base = db.query(NoteVersion)\
+                .filter(
+                    NoteVersion.note_id == version.note_id,
+                    NoteVersion.version_number == version.base_version
+                ).first()
+            if base is None or base.storage == "delta":
+                raise ValueError("版本 {} 的基准快照 {} 缺失".format(version.version_number, version.base_version))
+            base_content = VersionService._decode_base(base)
+            bases[key] = base_content
+        return apply_delta(base_content, version.payload)
+
+    @staticmethod
+    def load_content(db: Session, version: NoteVersion) -> NoteVersion:
+        """
+        还原版本内容并填充到 version.content（不会被当作修改写回数据库）
+
+        Args:
+            db: 数据库会话
+            version: 版本记录
+
+        Returns:
+            NoteVersion: 内容已还原的版本记录
+        """
+        return VersionService.load_contents(db, [version])[0]
+
+    @staticmethod
+    def load_contents(db: Session, versions: Iterable[NoteVersion]) -> List[NoteVersion]:
+        """批量还原版本内容，共享同一快照的版本只解压一次"""
+        bases: Dict[Tuple[int, int], str] = {}
+        versions = list(versions)
+        for version in versions:
+            if version.storage in ("snapshot", "delta"):
+                set_committed_value(version, "content", VersionService._decode(db, version, bases))
+        return versions
+
+    @staticmethod
+    def diff_versions(
+        db: Session,
+        note_id: int,
+        from_version: int,
+        to_version: int,
+        mode: str = "line",
+        context: int = 3
+    ) -> Dict[str, object]:
+        """
+        计算两个版本之间的内容差异（结果按版本记录缓存）
+
+        版本写入后不再修改，缓存键包含两个版本的记录ID：修复版本号后旧键自然失效。
+
+        Args:
+            db: 数据库会话
+            note_id: 笔记ID
+            from_version: 原版本号
+            to_version: 新版本号
+            mode: line（按行）或 word（按单词）
+            context: 每个差异块的上下文行数
+
+        Returns:
+            Dict[str, object]: 差异统计和差异块
+
+        Raises:
+            HTTPException: 版本不存在时抛出异常
+        """
+        rows = dict(
+            db.query(NoteVersion.version_number, NoteVersion.id)
+            .filter(
+                NoteVersion.note_id == note_id,
+                NoteVersion.version_number.in_([from_version, to_version])
+            ).all()
+        )
+        if from_version not in rows or to_version not in rows:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="指定版本不存在"
+            )
+
+        def compute() -> Dict[str, object]:
+            versions = {
+                version.version_number: version
+                for version in VersionService.load_contents(
+                    db, db.query(NoteVersion).filter(NoteVersion.id.in_(rows.values())).all()
+                )
+            }
+            result = unified_diff(versions[from_version].content, versions[to_version].content, context, mode)
+            result["title_changed"] = versions[from_version].title != versions[to_version].title
+            return result
+
+        cache = get_object_cache()
+        if cache is None:
+            result = compute()
+        else:
+            key = "{}:{}:{}:{}:{}".format(note_id, rows[from_version], rows[to_version], mode, context)
+            result = cache.get_or_load(CacheKind.DIFF, key, compute)
+        return dict(result, note_id=note_id, from_version=from_version, to_version=to_version, mode=mode)
+
+    @staticmethod
+    def describe_diff(lines_added: Optional[int], lines_removed: Optional[int]) -> Optional[str]:
+        """
+        生成简短的变更摘要
+
+        Args:
+            lines_added: 新增行数
+            lines_removed: 删除行数
+
+        Returns:
+            Optional[str]: 如 "+3 -1 行"，统计缺失时返回 None
+        """
+        if lines_added is None or lines_removed is None:
+            return None
+        if not lines_added and not lines_removed:
+            return "内容未变化"
+        return "+{} -{} 行".format(lines_added, lines_removed)
+
+    @staticmethod
+    def compress_note_versions(db: Session, note_id: int) -> int:
+        """
+        将笔记的未压缩历史版本转换为快照/增量存储（不提交）
+
+        被已有增量引用为基准的版本始终保存为快照；同时补齐增删行数统计。
+
+        Args:
+            db: 数据库会话
+            note_id: 笔记ID
+
+        Returns:
+            int: 转换的版本数量
+        """
+        interval = VersionService._snapshot_interval()
+        rows = db.query(NoteVersion)\
+            .filter(NoteVersion.note_id == note_id)\
+            .order_by(NoteVersion.version_number)\
+            .all()
+        pinned = {row.base_version for row in rows if row.storage == "delta"}
+
+        converted = 0
+        base: Optional[Tuple[int, str]] = None
+        previous = ""
+        for row in rows:
+            if row.storage == "snapshot":
+                previous = decompress_text(row.payload)
+                base = (row.version_number, previous)
+                continue
+            if row.storage != "full":
+                previous = apply_delta(base[1], row.payload) if base else previous
+                continue
+
+            content = row.content
+            if row.lines_added is None:
+                row.lines_added, row.lines_removed = diff_stats(previous, content)
+            previous = content
+            values = encode_content(
+                content, row.version_number,
+                None if row.version_number in pinned else base,
+                interval
+            )
+            for field, value in values.items():
+                setattr(row, field, value)
+            if values["storage"] == "snapshot":
+                base = (row.version_number, content)
+            converted += 1
+        return converted
+
+    @staticmethod
+    def compress_all(db: Session) -> Dict[str, int]:
+        """
+        转换所有笔记的未压缩历史版本，每篇笔记单独提交
+
+        Returns:
+            Dict[str, int]: {"notes": 处理的笔记数, "versions": 转换的版本数}
+        """
+        note_ids = [
+            row[0] for row in db.query(NoteVersion.note_id)
+            .filter(NoteVersion.storage == "full")
+            .distinct()
+            .order_by(NoteVersion.note_id)
+            .all()
+        ]
+        versions = 0
+        for note_id in note_ids:
+            try:
+                versions += VersionService.compress_note_versions(db, note_id)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+        return {"notes": len(note_ids), "versions": versions}
+
+    @staticmethod
+    def _stored_size(version: NoteVersion) -> int:
+        """版本在数据库中占用的内容字节数（未压缩版本为原文，其余为压缩数据）"""
+        if version.storage == "full":
+            return len(version.content.encode("utf-8"))
+        return len(version.payload or b"")
+
+    @staticmethod
+    def retention_bucket(created_at: Optional[datetime], now: datetime) -> Optional[Tuple[str, object]]:
+        """
+        按保留策略计算版本所属的时间桶（每个桶只保留最后一个版本）
+
+        Args:
+            created_at: 版本创建时间
+            now: 当前时间（UTC）
+
+        Returns:
+            Optional[Tuple[str, object]]: ("hour"/"day", 时间桶)；仍在全部保留期内时返回 None
+        """
+        settings = get_settings()
+        if created_at is None:
+            return None
+        if created_at.tzinfo is not None:
+            created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+        age = now - created_at
+        if age < timedelta(days=settings.VERSION_KEEP_ALL_DAYS):
+            return None
+        if age < timedelta(days=settings.VERSION_KEEP_HOURLY_DAYS):
+            return "hour", created_at.replace(minute=0, second=0, microsecond=0)
+        return "day", created_at.date()
+
+    @staticmethod
+    def compact_note_versions(db: Session, note_id: int, now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        按保留策略清理一篇笔记的历史版本（不提交）
+
+        最新版本和最近的快照（新版本的增量基准）始终保留；基准快照被删除的增量改为相对保留的快照重新编码，
+        增删行数统计改为相对上一个保留的版本。版本号不会重新分配，保留的版本仍可按原版本号读取和恢复。
+
+        Args:
+            db: 数据库会话
+            note_id: 笔记ID
+            now: 当前时间（UTC，默认取当前时间）
+
+        Returns:
+            Dict[str, int]: {"deleted": 删除的版本数, "reencoded": 重新编码的版本数, "bytes": 释放的字节数}
+        """
+        now = now or datetime.utcnow()
+        meta = db.query(
+            NoteVersion.version_number, NoteVersion.created_at, NoteVersion.storage
+        ).filter(NoteVersion.note_id == note_id).order_by(NoteVersion.version_number).all()
+        if not meta:
+            return {"deleted": 0, "reencoded": 0, "bytes": 0}
+
+        keep = {meta[-1].version_number}
+        bases = [row.version_number for row in meta if row.storage in ("snapshot", "full")]
+        if bases:
+            keep.add(bases[-1])
+        latest_in_bucket: Dict[Tuple[str, object], int] = {}
+        for row in meta:
+            bucket = VersionService.retention_bucket(row.created_at, now)
+            if bucket is None:
+                keep.add(row.version_number)
+            else:
+                latest_in_bucket[bucket] = row.version_number
+        keep.update(latest_in_bucket.values())
+        # 只删除本次检查过的版本（期间新写入的版本不受影响）
+        expired = {row.version_number for row in meta} - keep
+        if not expired:
+            return {"deleted": 0, "reencoded": 0, "bytes": 0}
+
+        rows = VersionService.load_contents(
+            db,
+            db.query(NoteVersion)
+            .filter(NoteVersion.note_id == note_id)
+            .order_by(NoteVersion.version_number)
+            .all()
+        )
+        interval = VersionService._snapshot_interval()
+        reclaimed = reencoded = 0
+        deleted: List[NoteVersion] = []
+        base: Optional[Tuple[int, str]] = None
+        previous = ""
+        gap = False
+        for row in rows:
+            if row.version_number in expired:
+                deleted.append(row)
+                reclaimed += VersionService._stored_size(row)
+                gap = True
+                continue
+
+            content = row.content
+            if gap:
+                row.lines_added, row.lines_removed = diff_stats(previous, content)
+                gap = False
+            if row.storage == "delta" and row.base_version in expired:
+                before = VersionService._stored_size(row)
+                values = encode_content(content, row.version_number, base, interval)
+                for field, value in values.items():
+                    setattr(row, field, value)
+                reclaimed += before - VersionService._stored_size(row)
+                reencoded += 1
+            if row.storage in ("snapshot", "full"):
+                base = (row.version_number, content)
+            previous = content
+
+        db.flush()
+        for row in deleted:
+            db.expunge(row)
+        db.query(NoteVersion).filter(
+            NoteVersion.id.in_([row.id for row in deleted])
+        ).delete(synchronize_session=False)
+        return {"deleted": len(deleted), "reencoded": reencoded, "bytes": reclaimed}
+
+    @staticmethod
+    def compact_all(
+        db: Session,
+        batch_size: Optional[int] = None,
+        now: Optional[datetime] = None,
+        renew: Optional[Callable[[], bool]] = None
+    ) -> Dict[str, int]:
+        """
+        按保留策略清理所有笔记的历史版本
+
+        按笔记ID分批扫描有超出全部保留期版本的笔记，每篇笔记单独提交，不会长时间持有锁。
+        单篇笔记清理失败（如与写入并发冲突）时回滚并记录日志，继续处理其他笔记。
+
+        Args:
+            db: 数据库会话
+            batch_size: 每批扫描的笔记数
+            now: 当前时间（UTC，默认取当前时间）
+            renew: 每批开始前调用的租约续期函数，返回 False 时停止
+
+        Returns:
+            Dict[str, int]: {"notes": 清理的笔记数, "deleted": 删除的版本数,
+                "reencoded": 重新编码的版本数, "bytes": 释放的字节数, "failed": 清理失败的笔记数}
+        """
+        now = now or datetime.utcnow()
+        batch_size = batch_size or get_settings().VERSION_COMPACT_BATCH
+        cutoff = now - timedelta(days=get_settings().VERSION_KEEP_ALL_DAYS)
+        result = {"notes": 0, "deleted": 0, "reencoded": 0, "bytes": 0, "failed": 0}
+        last_id = 0
+        while True:
+            if renew is not None and not renew():
+                logger.warning("版本清理租约已失效，停止本轮清理")
+                break
+            note_ids = [
+                row[0] for row in db.query(NoteVersion.note_id)
+                .filter(NoteVersion.note_id > last_id, NoteVersion.created_at < cutoff)
+                .group_by(NoteVersion.note_id)
+                .having(func.count(NoteVersion.id) > 1)
+                .order_by(NoteVersion.note_id)
+                .limit(batch_size)
+                .all()
+            ]
+            if not note_ids:
+                break
+            for note_id in note_ids:
+                try:
+                    counts = VersionService.compact_note_versions(db, note_id, now)
+                    db.commit()
+                except Exception as e:
+                    db.rollback()
+                    logger.error("清理笔记 {} 的历史版本失败: {}".format(note_id, str(e)))
+                    result["failed"] += 1
+                    continue
+                if counts["deleted"]:
+                    result["notes"] += 1
+                for key, value in counts.items():
+                    result[key] += value
+            last_id = note_ids[-1]
+
+        metrics.incr("versions.compaction.deleted", result["deleted"])
+        metrics.incr("versions.compaction.bytes_reclaimed", result["bytes"])
+        metrics.incr("versions.compaction.failed", result["failed"])
+        return result
+
+    @staticmethod
+    def run_compaction(db: Session, holder: str, batch_size: Optional[int] = None) -> Optional[Dict[str, int]]:
+        """
+        持有全局租约时执行一轮版本清理（所有进程中同时只有一个清理在运行）
+
+        Args:
+            db: 数据库会话
+            holder: 进程标识
+            batch_size: 每批扫描的笔记数
+
+        Returns:
+            Optional[Dict[str, int]]: 清理结果；租约由其他进程持有时返回 None
+        """
+        seconds = get_settings().VERSION_COMPACT_LEASE_SECONDS
+        if not LeaseService.acquire(db, COMPACTION_LEASE, holder, seconds):
+            return None
+        try:
+            return VersionService.compact_all(
+                db, batch_size=batch_size,
+                renew=lambda: LeaseService.acquire(db, COMPACTION_LEASE, holder, seconds)
+            )
+        finally:
+            LeaseService.release(db, COMPACTION_LEASE, holder)
+
+    @staticmethod
+    def repair_version_numbers(db: Session) -> Dict[str, int]:
+        """
+        修复历史数据中的重复版本号，并把所有笔记的 current_version 同步为最大版本号
+
+        重复的版本按 (版本号, ID) 顺序重新连续编号，增量引用的基准版本号随之更新。
+        修复后才能创建 (note_id, version_number) 唯一索引。
+
+        Args:
+            db: 数据库会话
+
+        Returns:
+            Dict[str, int]: {"notes": 重新编号的笔记数, "renumbered": 版本号变化的版本数}
+        """
+        note_ids = [
+            row[0] for row in db.query(NoteVersion.note_id)
+            .group_by(NoteVersion.note_id, NoteVersion.version_number)
+            .having(func.count(NoteVersion.id) > 1)
+            .distinct()
+            .all()
+        ]
+        renumbered = 0
+        for note_id in note_ids:
+            rows = db.query(NoteVersion)\
+                .filter(NoteVersion.note_id == note_id)\
+                .order_by(NoteVersion.version_number, NoteVersion.id)\
+                .all()
+            # 旧版本号 -> 新版本号（增量的基准取同号中的快照/原文版本）
+            mapping: Dict[int, int] = {}
+            for number, row in enumerate(rows, start=1):
+                if row.storage != "delta":
+                    mapping.setdefault(row.version_number, number)
+            for number, row in enumerate(rows, start=1):
+                if row.storage == "delta":
+                    row.base_version = mapping.get(row.base_version, row.base_version)
+                if row.version_number != number:
+                    row.version_number = number
+                    renumbered += 1
+            db.commit()
+
+        latest = select(func.coalesce(func.max(NoteVersion.version_number), 0))\
+            .where(NoteVersion.note_id == Note.id)\
+            .scalar_subquery()
+        db.query(Note).update(
+            {Note.current_version: latest, Note.updated_at: Note.updated_at},
+            synchronize_session=False
+        )
+        invalidate_on_commit(db, CacheKind.NOTE, *note_ids)
+        db.commit()
+        return {"notes": len(note_ids), "renumbered": renumbered}
+
+
+class VersionCompactor:
+    """版本保留策略的后台清理线程（多个进程都启动时，通过租约保证同时只有一个在清理）"""
+
+    def __init__(self, interval: float, session_factory: Callable[[], Session] = SessionLocal):
+        self.interval = interval
+        self.session_factory = session_factory
+        self.holder = "{}-{}".format(socket.gethostname(), os.getpid())
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """启动清理线程"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="version-compactor", daemon=True)
+        self._thread.start()
+        logger.info("版本清理线程已启动，间隔 {} 秒".format(self.interval))
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """停止清理线程（等待当前笔记处理完成）"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run_once(self) -> Optional[Dict[str, int]]:
+        """执行一轮清理（其他进程正在清理时跳过，返回 None）"""
+        db = self.session_factory()
+        try:
+            result = VersionService.run_compaction(db, self.holder)
+        finally:
+            db.close()
+        if result is None:
+            logger.debug("其他进程正在清理历史版本，跳过本轮")
+            return None
+        if result["deleted"]:
+            logger.info("版本清理完成：{} 篇笔记删除 {} 个版本，释放 {} 字节".format(
+                result["notes"], result["deleted"], result["bytes"]
+            ))
+        return result
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error("版本清理异常: {}".format(str(e)))
+
+
+# 当前进程内的版本清理线程
+_compactor: Optional[VersionCompactor] = None
+
+
+def start_version_compactor() -> Optional[VersionCompactor]:
+    """按配置在当前进程启动版本清理线程（VERSION_COMPACT_INTERVAL=0 时不启动）"""
+    global _compactor
+    interval = get_settings().VERSION_COMPACT_INTERVAL
+    if interval <= 0 or _compactor is not None:
+        return _compactor
+    _compactor = VersionCompactor(interval)
+    _compactor.start()
+    return _compactor
+
+
+def stop_version_compactor() -> None:
+    """停止当前进程的版本清理线程"""
+    global _compactor
+    if _compactor is not None:
+        _compactor.stop()
+        _compactor = None
@@ -127,6 +127,26 @@ def verify_token(token: str) -> TokenData:
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+def _load_user(db: Session, username: str) -> Optional[User]:
+    """
+    按用户名加载认证用户（优先读取对象缓存）
+
+    缓存命中时返回的用户对象不属于数据库会话，只用于读取 id、权限等属性；缓存中不保存密码哈希。
+    """
+    # 服务包依赖本模块，在函数内导入以避免循环导入
+    from app.services.object_cache import CacheKind, dict_to_row, get_object_cache, row_to_dict
+
+    cache = get_object_cache()
+    if cache is None:
+        return db.query(User).filter(User.username == username).first()
+
+    def load():
+        user = db.query(User).filter(User.username == username).first()
+        return row_to_dict(user, exclude=("hashed_password",)) if user else None
+
+    data = cache.get_or_load(CacheKind.USER, username, load)
+    return dict_to_row(User, data) if data else None
+
 def get_current_user(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
     db: Session = Depends(get_db)
@@ -162,7 +182,7 @@ def get_current_user(
     token = credentials.credentials
     token_data = verify_token(token)
     
-    user = db.query(User).filter(User.username == token_data.username).first()
+    user = _load_user(db, token_data.username)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
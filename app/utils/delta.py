@@ -0,0 +1,104 @@
+"""
+MindLink 文本增量编码工具
+
+以行为单位计算两个文本之间的差异，编码为压缩的增量：
+- 增量由操作列表组成：[i1, i2] 表示复制基准文本的第 i1 至 i2 行，字符串表示插入的文本
+- 序列化为 JSON 后使用 zlib 压缩
+"""
+
+import json
+import zlib
+from difflib import SequenceMatcher
+from typing import List, Tuple, Union
+
+# zlib 压缩级别（6 为速度与压缩率的折中）
+COMPRESSION_LEVEL = 6
+
+DeltaOp = Union[List[int], str]
+
+
+def compress_text(text: str) -> bytes:
+    """压缩文本"""
+    return zlib.compress(text.encode("utf-8"), COMPRESSION_LEVEL)
+
+
+def decompress_text(data: bytes) -> str:
+    """解压文本"""
+    return zlib.decompress(data).decode("utf-8")
+
+
+def compute_delta(base: str, target: str) -> bytes:
+    """
+    计算从 base 到 target 的增量
+
+    Args:
+        base: 基准文本
+        target: 目标文本
+
+    Returns:
+        bytes: 压缩后的增量
+    """
+    base_lines = base.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+
+    ops: List[DeltaOp] = []
+    matcher = SequenceMatcher(None, base_lines, target_lines)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            # 合并相邻的复制操作
+            if ops and isinstance(ops[-1], list) and ops[-1][1] == i1:
+                ops[-1][1] = i2
+            else:
+                ops.append([i1, i2])
+        elif j2 > j1:
+            inserted = "".join(target_lines[j1:j2])
+            if ops and isinstance(ops[-1], str):
+                ops[-1] += inserted
+            else:
+                ops.append(inserted)
+
+    payload = json.dumps(ops, ensure_ascii=False, separators=(",", ":"))
+    return compress_text(payload)
+
+
+def apply_delta(base: str, delta: bytes) -> str:
+    """
+    将增量应用到基准文本
+
+    Args:
+        base: 基准文本（必须与计算增量时使用的相同）
+        delta: compute_delta 生成的增量
+
+    Returns:
+        str: 目标文本
+    """
+    base_lines = base.splitlines(keepends=True)
+    parts = []
+    for op in json.loads(decompress_text(delta)):
+        if isinstance(op, str):
+            parts.append(op)
+        else:
+            parts.extend(base_lines[op[0]:op[1]])
+    return "".join(parts)
+
+
+def diff_stats(base: str, target: str) -> Tuple[int, int]:
+    """
+    统计从 base 到 target 新增和删除的行数
+
+    Args:
+        base: 变更前的文本
+        target: 变更后的文本
+
+    Returns:
+        Tuple[int, int]: (新增行数, 删除行数)
+    """
+    if base == target:
+        return 0, 0
+    added = removed = 0
+    matcher = SequenceMatcher(None, base.splitlines(), target.splitlines())
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != "equal":
+            removed += i2 - i1
+            added += j2 - j1
+    return added, removed
@@ -0,0 +1,297 @@
+"""
+MindLink 文本差异工具
+
+使用 Myers 差异算法的线性空间版本（中间蛇分治）计算两段文本的最短编辑脚本：
+- 先去掉公共前缀/后缀，并剔除只在一侧出现的元素（它们不可能匹配），
+  整体改写和局部修改都只需处理真正有歧义的部分
+- 时间复杂度 O((N+M)·D)，额外空间 O(N+M)，D 为编辑距离
+- 输出按上下文分组的统一格式（unified）差异块，大小与变更量成正比
+- 单词模式在行级差异块内部再按单词比较，给出行内的增删片段
+"""
+
+import re
+from typing import Dict, Hashable, List, Sequence, Tuple
+
+# 操作码：(tag, i1, i2, j1, j2)，语义与 difflib.SequenceMatcher.get_opcodes 相同
+Opcode = Tuple[str, int, int, int, int]
+
+# 单个子问题的编辑距离超过该值时不再求最优解，按正向走得最远的位置拆分（结果仍正确，但不一定最短）
+MAX_EDIT_COST = 128
+
+# 单词模式的切分：拉丁单词、连续空白，其余字符（包括每个汉字）单独成词
+_WORD_RE = re.compile(r"[0-9A-Za-z_]+|\s+|.", re.S)
+
+
+def split_lines(text: str) -> List[str]:
+    """按行切分文本（保留换行符）"""
+    return text.splitlines(keepends=True)
+
+
+def split_words(text: str) -> List[str]:
+    """按单词切分文本，拼接结果与原文相同"""
+    return _WORD_RE.findall(text)
+
+
+def _middle_snake(a: Sequence[int], alo: int, ahi: int, b: Sequence[int], blo: int, bhi: int) -> Tuple[int, int, int, int]:
+    """
+    查找最短编辑路径中间的一段对角线（蛇）
+
+    正向从左上角、反向从右下角同时按编辑距离 d 扩展，两者在某条对角线上重叠时，
+    重叠处的蛇必然位于某条最短路径的中点。
+
+    编辑距离超过 MAX_EDIT_COST 时返回正向走得最远的位置（长度为 0 的蛇），避免病态输入耗时过长。
+
+    Returns:
+        Tuple[int, int, int, int]: 蛇在子问题坐标系中的起点和终点 (x0, y0, x1, y1)
+    """
+    n, m = ahi - alo, bhi - blo
+    delta = n - m
+    odd = delta & 1
+    max_d = (n + m + 1) // 2
+    offset = max_d + 1
+    forward = [0] * (2 * max_d + 3)
+    backward = [0] * (2 * max_d + 3)
+
+    for d in range(max_d + 1):
+        if d > MAX_EDIT_COST:
+            reach = [
+                (2 * x - k, x, x - k)
+                for k in range(-d + 1, d, 2)
+                for x in (forward[offset + k],)
+                if x <= n and 0 <= x - k <= m
+            ]
+            _, x, y = max(reach)
+            return x, y, x, y
+
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and forward[offset + k - 1] < forward[offset + k + 1]):
+                x = forward[offset + k + 1]
+            else:
+                x = forward[offset + k - 1] + 1
+            y = x - k
+            x0, y0 = x, y
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x += 1
+                y += 1
+            forward[offset + k] = x
+            if odd and -(d - 1) <= delta - k <= d - 1 and x + backward[offset + delta - k] >= n:
+                return x0, y0, x, y
+
+        for c in range(-d, d + 1, 2):
+            if c == -d or (c != d and backward[offset + c - 1] < backward[offset + c + 1]):
+                x = backward[offset + c + 1]
+            else:
+                x = backward[offset + c - 1] + 1
+            y = x - c
+            x0, y0 = x, y
+            while x < n and y < m and a[ahi - 1 - x] == b[bhi - 1 - y]:
+                x += 1
+                y += 1
+            backward[offset + c] = x
+            if not odd and -d <= delta - c <= d and x + forward[offset + delta - c] >= n:
+                return n - x, m - y, n - x0, m - y0
+
+    raise AssertionError("未找到中间蛇")
+
+
+def _matching_blocks(a: Sequence[int], b: Sequence[int]) -> List[Tuple[int, int, int]]:
+    """
+    计算两个序列的最长公共子序列，返回匹配块 (i, j, size) 列表（按位置递增）
+    """
+    blocks: List[Tuple[int, int, int]] = []
+
+    def solve(alo: int, ahi: int, blo: int, bhi: int) -> None:
+        prefix = 0
+        while alo + prefix < ahi and blo + prefix < bhi and a[alo + prefix] == b[blo + prefix]:
+            prefix += 1
+        if prefix:
+            blocks.append((alo, blo, prefix))
+            alo += prefix
+            blo += prefix
+
+        suffix = 0
+        while alo < ahi - suffix and blo < bhi - suffix and a[ahi - 1 - suffix] == b[bhi - 1 - suffix]:
+            suffix += 1
+        ahi -= suffix
+        bhi -= suffix
+
+        # 去掉公共前后缀后两侧都非空时编辑距离至少为 2，中间蛇把问题拆成两个更小的子问题
+        if alo < ahi and blo < bhi:
+            x0, y0, x1, y1 = _middle_snake(a, alo, ahi, b, blo, bhi)
+            solve(alo, alo + x0, blo, blo + y0)
+            if x1 > x0:
+                blocks.append((alo + x0, blo + y0, x1 - x0))
+            solve(alo + x1, ahi, blo + y1, bhi)
+
+        if suffix:
+            blocks.append((ahi, bhi, suffix))
+
+    solve(0, len(a), 0, len(b))
+    return blocks
+
+
+def diff_opcodes(a: Sequence[Hashable], b: Sequence[Hashable]) -> List[Opcode]:
+    """
+    计算从 a 到 b 的最短编辑脚本
+
+    Args:
+        a: 原序列
+        b: 新序列
+
+    Returns:
+        List[Opcode]: 覆盖两个序列全部位置的操作码（equal/replace/delete/insert）
+    """
+    # 元素映射为整数，只在两侧都出现的元素参与比较
+    ids: Dict[Hashable, int] = {}
+    a_ids = [ids.setdefault(item, len(ids)) for item in a]
+    in_a = set(a_ids)
+    b_ids = [ids.setdefault(item, len(ids)) for item in b]
+    in_b = set(b_ids)
+    a_index = [i for i, item in enumerate(a_ids) if item in in_b]
+    b_index = [j for j, item in enumerate(b_ids) if item in in_a]
+    a_kept = [a_ids[i] for i in a_index]
+    b_kept = [b_ids[j] for j in b_index]
+
+    # 映射回原序列位置，合并相邻的匹配
+    matches: List[List[int]] = []
+    for i, j, size in _matching_blocks(a_kept, b_kept):
+        for step in range(size):
+            x, y = a_index[i + step], b_index[j + step]
+            if matches and matches[-1][0] + matches[-1][2] == x and matches[-1][1] + matches[-1][2] == y:
+                matches[-1][2] += 1
+            else:
+                matches.append([x, y, 1])
+
+    opcodes: List[Opcode] = []
+    i = j = 0
+    for x, y, size in matches + [[len(a), len(b), 0]]:
+        if i < x and j < y:
+            opcodes.append(("replace", i, x, j, y))
+        elif i < x:
+            opcodes.append(("delete", i, x, j, y))
+        elif j < y:
+            opcodes.append(("insert", i, x, j, y))
+        if size:
+            opcodes.append(("equal", x, x + size, y, y + size))
+        i, j = x + size, y + size
+    return opcodes
+
+
+def group_opcodes(opcodes: List[Opcode], context: int = 3) -> List[List[Opcode]]:
+    """
+    将操作码按变更分组，每组前后保留 context 个未变化的元素
+
+    Args:
+        opcodes: diff_opcodes 的结果
+        context: 上下文行数
+
+    Returns:
+        List[List[Opcode]]: 差异块列表（内容相同时为空）
+    """
+    if not any(tag != "equal" for tag, *_ in opcodes):
+        return []
+    codes = list(opcodes)
+    if codes[0][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = (tag, max(i1, i2 - context), i2, max(j1, j2 - context), j2)
+    if codes[-1][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = (tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context))
+
+    groups: List[List[Opcode]] = []
+    group: List[Opcode] = []
+    for tag, i1, i2, j1, j2 in codes:
+        # 较长的未变化区间拆开两个差异块
+        if tag == "equal" and i2 - i1 > 2 * context:
+            group.append((tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)))
+            groups.append(group)
+            group = []
+            i1, j1 = max(i1, i2 - context), max(j1, j2 - context)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == "equal"):
+        groups.append(group)
+    return groups
+
+
+def _format_range(start: int, stop: int) -> str:
+    """统一格式差异块头中的行范围（与 GNU diff 相同）"""
+    length = stop - start
+    if length == 1:
+        return str(start + 1)
+    if not length:
+        return "{},0".format(start)
+    return "{},{}".format(start + 1, length)
+
+
+def _merge_segment(segments: List[Dict[str, str]], op: str, text: str) -> None:
+    if not text:
+        return
+    if segments and segments[-1]["op"] == op:
+        segments[-1]["text"] += text
+    else:
+        segments.append({"op": op, "text": text})
+
+
+def _word_segments(old: str, new: str) -> List[Dict[str, str]]:
+    """按单词比较一段被替换的文本，返回增删片段"""
+    old_words, new_words = split_words(old), split_words(new)
+    segments: List[Dict[str, str]] = []
+    for tag, i1, i2, j1, j2 in diff_opcodes(old_words, new_words):
+        if tag == "equal":
+            _merge_segment(segments, "equal", "".join(old_words[i1:i2]))
+            continue
+        _merge_segment(segments, "delete", "".join(old_words[i1:i2]))
+        _merge_segment(segments, "insert", "".join(new_words[j1:j2]))
+    return segments
+
+
+def unified_diff(old: str, new: str, context: int = 3, mode: str = "line") -> Dict[str, object]:
+    """
+    计算两段文本的统一格式差异
+
+    Args:
+        old: 原文本
+        new: 新文本
+        context: 每个差异块前后保留的上下文行数
+        mode: line（按行）或 word（行级差异块内按单词比较）
+
+    Returns:
+        Dict[str, object]: lines_added、lines_removed 和差异块列表。
+            每个差异块包含 header（"@@ -1,3 +1,4 @@"）及：
+            - 行模式：lines，带 " "、"-"、"+" 前缀的行，与 header 拼接即为标准统一格式差异
+            - 单词模式：segments，{"op": equal/delete/insert, "text": ...} 片段列表
+    """
+    old_lines, new_lines = split_lines(old), split_lines(new)
+    opcodes = diff_opcodes(old_lines, new_lines)
+    added = sum(j2 - j1 for tag, i1, i2, j1, j2 in opcodes if tag != "equal")
+    removed = sum(i2 - i1 for tag, i1, i2, j1, j2 in opcodes if tag != "equal")
+
+    hunks = []
+    for group in group_opcodes(opcodes, context):
+        first, last = group[0], group[-1]
+        hunk: Dict[str, object] = {
+            "header": "@@ -{} +{} @@".format(
+                _format_range(first[1], last[2]), _format_range(first[3], last[4])
+            ),
+        }
+        if mode == "word":
+            segments: List[Dict[str, str]] = []
+            for tag, i1, i2, j1, j2 in group:
+                if tag == "equal":
+                    _merge_segment(segments, "equal", "".join(old_lines[i1:i2]))
+                else:
+                    for segment in _word_segments("".join(old_lines[i1:i2]), "".join(new_lines[j1:j2])):
+                        _merge_segment(segments, segment["op"], segment["text"])
+            hunk["segments"] = segments
+        else:
+            lines: List[str] = []
+            for tag, i1, i2, j1, j2 in group:
+                if tag == "equal":
+                    lines.extend(" " + line for line in old_lines[i1:i2])
+                    continue
+                lines.extend("-" + line for line in old_lines[i1:i2])
+                lines.extend("+" + line for line in new_lines[j1:j2])
+            hunk["lines"] = lines
+        hunks.append(hunk)
+
+    return {"lines_added": added, "lines_removed": removed, "hunks": hunks}
@@ -0,0 +1,86 @@
+"""
+MindLink 条件请求（ETag）工具
+
+ETag 由行版本号或按用户维护的集合代数生成，而不是对响应体求哈希：
+校验只需读取一个整数列，匹配时直接返回 304，不加载、不序列化数据。
+"""
+
+from typing import Any, List, Optional
+
+from fastapi import Response, status
+
+from app.utils.metrics import metrics
+
+# 条件请求的响应都需要客户端重新验证
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    生成强 ETag
+
+    Args:
+        parts: 组成校验值的部分（如资源类型、ID、版本号）
+
+    Returns:
+        str: 带引号的 ETag
+    """
+    return '"{}"'.format("-".join(str(part) for part in parts))
+
+
+def etag_parts(etag: str) -> List[str]:
+    """拆分 make_etag 生成的 ETag（忽略 W/ 前缀和引号）"""
+    etag = etag.strip()
+    if etag.startswith("W/"):
+        etag = etag[2:]
+    return etag.strip('"').split("-")
+
+
+def variant_etag(etag: str, variant: str) -> str:
+    """为同一资源的其他表示形式（如渲染后的 HTML）生成不同的 ETag"""
+    return '{}-{}"'.format(etag[:-1], variant)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    判断 If-None-Match 请求头是否匹配当前 ETag
+
+    按 RFC 9110 对 If-None-Match 使用弱比较：忽略 W/ 前缀，支持多个值和 *。
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def not_modified(if_none_match: Optional[str], etag: str) -> Optional[Response]:
+    """
+    校验值匹配时返回 304 响应
+
+    Args:
+        if_none_match: If-None-Match 请求头
+        etag: 当前 ETag
+
+    Returns:
+        Optional[Response]: 匹配时返回 304 响应，否则返回 None
+    """
+    if not etag_matches(if_none_match, etag):
+        return None
+    metrics.incr("http.not_modified")
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    )
+
+
+def set_etag(response: Response, etag: str) -> None:
+    """为响应设置 ETag 和缓存控制头"""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
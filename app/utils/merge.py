@@ -0,0 +1,102 @@
+"""
+MindLink 三方合并工具
+
+两个客户端基于同一版本（base）分别修改笔记时，把双方的修改合并到一起：
+- 内容按行合并：分别计算 base -> mine 和 base -> theirs 的差异块，
+  互不重叠（也不相邻）的差异块都应用到 base 上；双方完全相同的修改只应用一次
+- 标签按集合合并：在 theirs 的基础上加入 mine 新增的标签、去掉 mine 删除的标签
+- 其他字段：只有一方修改时取修改后的值，双方改成不同的值时视为冲突
+
+无法自动合并时返回 None，由调用方按冲突处理。
+"""
+
+from typing import Any, List, Optional, Sequence, Tuple
+
+from app.utils.diff import diff_opcodes, split_lines
+
+# 差异块：(base 起始行, base 结束行, 替换后的行)
+_Hunk = Tuple[int, int, List[str]]
+
+
+def _hunks(base: Sequence[str], other: Sequence[str]) -> List[_Hunk]:
+    return [
+        (i1, i2, list(other[j1:j2]))
+        for tag, i1, i2, j1, j2 in diff_opcodes(base, other)
+        if tag != "equal"
+    ]
+
+
+def merge_text(base: str, mine: str, theirs: str) -> Optional[str]:
+    """
+    按行三方合并文本
+
+    Args:
+        base: 双方共同的基准文本
+        mine: 本次提交的文本
+        theirs: 当前已保存的文本
+
+    Returns:
+        Optional[str]: 合并后的文本；双方修改了相同或相邻的行时返回 None
+    """
+    if mine == theirs or theirs == base:
+        return mine
+    if mine == base:
+        return theirs
+
+    base_lines = split_lines(base)
+    pending = sorted(
+        _hunks(base_lines, split_lines(mine)) + _hunks(base_lines, split_lines(theirs)),
+        key=lambda hunk: (hunk[0], hunk[1])
+    )
+    merged: List[_Hunk] = []
+    for hunk in pending:
+        if merged:
+            last = merged[-1]
+            if hunk == last:
+                continue
+            # 重叠或相邻（包括在同一位置插入）的修改无法确定顺序
+            if hunk[0] <= last[1]:
+                return None
+        merged.append(hunk)
+
+    result: List[str] = []
+    position = 0
+    for start, end, lines in merged:
+        result.extend(base_lines[position:start])
+        result.extend(lines)
+        position = end
+    result.extend(base_lines[position:])
+    return "".join(result)
+
+
+def merge_tags(base: Sequence[str], mine: Sequence[str], theirs: Sequence[str]) -> List[str]:
+    """
+    按集合三方合并标签（不会冲突）
+
+    Args:
+        base: 双方共同的基准标签
+        mine: 本次提交的标签
+        theirs: 当前已保存的标签
+
+    Returns:
+        List[str]: 合并后的标签（theirs 的顺序在前，mine 新增的标签在后）
+    """
+    base_set, mine_set = set(base or []), set(mine or [])
+    removed = base_set - mine_set
+    result = [tag for tag in (theirs or []) if tag not in removed]
+    result.extend(tag for tag in (mine or []) if tag not in base_set and tag not in result)
+    return result
+
+
+def merge_value(base: Any, mine: Any, theirs: Any) -> Tuple[bool, Any]:
+    """
+    三方合并单个值
+
+    Returns:
+        Tuple[bool, Any]: (是否合并成功, 合并后的值)
+    """
+    if mine == base or mine == theirs:
+        return True, theirs
+    if theirs == base:
+        return True, mine
+    return False, None
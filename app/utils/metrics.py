@@ -0,0 +1,74 @@
+"""
+MindLink 进程内运行指标
+
+提供线程安全的计数器和按需计算的指标采集函数，由 /metrics 端点输出。
+指标按进程统计，多进程部署时需分别采集各工作进程。
+"""
+
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = defaultdict(int)
+        self._collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def incr(self, name: str, value: int = 1) -> None:
+        """增加计数器"""
+        with self._lock:
+            self._counters[name] += value
+
+    def get(self, name: str) -> int:
+        """读取计数器当前值"""
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def register_collector(self, name: str, collector: Callable[[], Dict[str, Any]]) -> None:
+        """
+        注册指标采集函数（如命中率等派生指标）
+
+        Args:
+            name: 指标分组名称
+            collector: 返回指标字典的函数，输出时调用
+        """
+        with self._lock:
+            self._collectors[name] = collector
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        获取所有指标的快照
+
+        Returns:
+            Dict[str, Any]: {"counters": 计数器, 分组名称: 采集结果, ...}
+        """
+        with self._lock:
+            counters = dict(sorted(self._counters.items()))
+            collectors = dict(self._collectors)
+        result: Dict[str, Any] = {"counters": counters}
+        for name, collector in collectors.items():
+            result[name] = collector()
+        return result
+
+    def reset(self) -> None:
+        """清空计数器（用于测试）"""
+        with self._lock:
+            self._counters.clear()
+
+
+# 全局指标注册表
+metrics = MetricsRegistry()
+
+
+def get_metrics() -> MetricsRegistry:
+    """
+    获取全局指标注册表
+
+    Returns:
+        MetricsRegistry: 指标注册表
+    """
+    return metrics
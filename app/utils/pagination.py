@@ -0,0 +1,147 @@
+"""
+MindLink 键集（游标）分页工具
+
+游标是对上一页最后一行 (排序键, id) 的不透明编码。下一页通过
+WHERE (排序键, id) < (上一页最后的值) 定位，配合 (user_id, 排序键, id)
+复合索引，无论翻到多深，每页的代价都是常数。
+
+排序键直接使用原始列（SQLite 的时间格式由 app.core.database 统一），
+比较条件和 ORDER BY 都能由复合索引满足。
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+
+# 支持的排序方向
+SORT_ORDERS = ("desc", "asc")
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(sort: str, order: str, sort_value: Any, row_id: int) -> str:
+    """
+    编码分页游标
+
+    Args:
+        sort: 排序字段
+        order: 排序方向
+        sort_value: 最后一行的排序键
+        row_id: 最后一行的 ID
+
+    Returns:
+        str: URL 安全的游标字符串
+    """
+    payload = {"s": sort, "o": order, "k": _encode_value(sort_value), "id": row_id}
+    raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, order: str) -> Tuple[Any, int]:
+    """
+    解码分页游标
+
+    Args:
+        cursor: 游标字符串
+        sort: 当前请求的排序字段
+        order: 当前请求的排序方向
+
+    Returns:
+        Tuple[Any, int]: (排序键, ID)
+
+    Raises:
+        HTTPException: 游标无效或与排序参数不一致时抛出异常
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        cursor_sort, cursor_order = payload["s"], payload["o"]
+        sort_value, row_id = _decode_value(payload["k"]), int(payload["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="无效的分页游标"
+        )
+
+    if cursor_sort != sort or cursor_order != order:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="分页游标与排序参数不一致"
+        )
+    return sort_value, row_id
+
+
+def order_by_keyset(query: Query, sort_column, id_column, order: str) -> Query:
+    """按 (排序键, id) 排序，使用复合索引"""
+    if order == "asc":
+        return query.order_by(sort_column.asc(), id_column.asc())
+    return query.order_by(sort_column.desc(), id_column.desc())
+
+
+def keyset_paginate(
+    query: Query,
+    sort_column,
+    id_column,
+    sort: str,
+    order: str,
+    size: int,
+    cursor: Optional[str] = None
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    执行键集分页查询
+
+    多取一行用于判断是否还有下一页，不执行 count()。
+
+    Args:
+        query: 已添加过滤条件的查询
+        sort_column: 排序列
+        id_column: 主键列
+        sort: 排序字段名（写入游标）
+        order: 排序方向（desc 或 asc）
+        size: 每页大小
+        cursor: 上一页返回的游标（None 表示第一页）
+
+    Returns:
+        Tuple[List[Any], Optional[str]]: (当前页数据, 下一页游标)
+    """
+    if cursor:
+        sort_value, last_id = decode_cursor(cursor, sort, order)
+        if order == "asc":
+            query = query.filter(or_(
+                sort_column > sort_value,
+                and_(sort_column == sort_value, id_column > last_id)
+            ))
+        else:
+            query = query.filter(or_(
+                sort_column < sort_value,
+                and_(sort_column == sort_value, id_column < last_id)
+            ))
+
+    rows = order_by_keyset(query, sort_column, id_column, order).limit(size + 1).all()
+    has_more = len(rows) > size
+    rows = rows[:size]
+
+    next_cursor = None
+    if has_more and rows:
+        next_cursor = cursor_for_row(rows[-1], sort_column, sort, order)
+    return rows, next_cursor
+
+
+def cursor_for_row(row: Any, sort_column, sort: str, order: str) -> str:
+    """为某一行生成游标（用于页码分页响应中切换到游标分页）"""
+    return encode_cursor(sort, order, getattr(row, sort_column.key), row.id)
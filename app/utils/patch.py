@@ -0,0 +1,130 @@
+"""
+MindLink 文本补丁工具
+
+把客户端提交的编辑应用到基准文本，支持两种格式：
+- 编辑操作：(offset, delete, insert) 列表，offset 为基准文本中的字符位置（Unicode 码点），
+  按位置升序排列且互不重叠
+- 统一格式差异（unified diff）：与 GNU diff -u 和 GET /notes/{id}/versions/{a}/diff/{b} 的行模式输出相同，
+  上下文行和删除行必须与基准文本逐字一致（不做模糊匹配）
+
+补丁无法应用时抛出 PatchError。
+"""
+
+import re
+from typing import List, Sequence, Tuple
+
+from app.utils.diff import split_lines
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+_NO_NEWLINE = "\\ No newline at end of file"
+
+
+class PatchError(ValueError):
+    """补丁与基准文本不匹配或格式错误"""
+
+
+def apply_ops(text: str, ops: Sequence[Tuple[int, int, str]]) -> str:
+    """
+    应用编辑操作
+
+    Args:
+        text: 基准文本
+        ops: (offset, delete, insert) 列表，位置均相对基准文本
+
+    Returns:
+        str: 编辑后的文本
+
+    Raises:
+        PatchError: 操作越界、重叠或未按位置排列时抛出
+    """
+    parts: List[str] = []
+    position = 0
+    for index, (offset, delete, insert) in enumerate(ops):
+        if offset < position:
+            raise PatchError("第 {} 个编辑操作与前一个操作重叠或未按位置排列".format(index + 1))
+        if offset + delete > len(text):
+            raise PatchError("第 {} 个编辑操作超出内容长度".format(index + 1))
+        parts.append(text[position:offset])
+        parts.append(insert)
+        position = offset + delete
+    parts.append(text[position:])
+    return "".join(parts)
+
+
+def _diff_lines(diff: str) -> List[str]:
+    """按行切分差异文本，并按 "\\ No newline at end of file" 去掉前一行的换行符"""
+    lines: List[str] = []
+    for line in split_lines(diff):
+        if line.rstrip("\r\n") == _NO_NEWLINE:
+            if lines:
+                lines[-1] = lines[-1].rstrip("\r\n")
+            continue
+        lines.append(line)
+    return lines
+
+
+def apply_unified_diff(text: str, diff: str) -> str:
+    """
+    应用统一格式差异
+
+    Args:
+        text: 基准文本
+        diff: 统一格式差异（可以包含 ---/+++ 文件头）
+
+    Returns:
+        str: 编辑后的文本
+
+    Raises:
+        PatchError: 差异格式错误或与基准文本不一致时抛出
+    """
+    source = split_lines(text)
+    lines = _diff_lines(diff)
+    result: List[str] = []
+    position = 0
+    index = 0
+    hunks = 0
+    while index < len(lines):
+        match = _HUNK_HEADER.match(lines[index])
+        if match is None:
+            if hunks or not lines[index].startswith(("---", "+++", "diff ", "index ")):
+                raise PatchError("无法解析差异第 {} 行".format(index + 1))
+            index += 1
+            continue
+        hunks += 1
+        old_start = int(match.group(1))
+        old_count = int(match.group(2)) if match.group(2) is not None else 1
+        new_count = int(match.group(4)) if match.group(4) is not None else 1
+        # 删除范围为空时，起始行号指向插入位置之前的一行
+        start = old_start - 1 if old_count else old_start
+        if start < position or start > len(source):
+            raise PatchError("第 {} 个差异块的位置无效".format(hunks))
+        result.extend(source[position:start])
+        position = start
+
+        index += 1
+        removed = added = 0
+        while index < len(lines) and (removed < old_count or added < new_count):
+            line = lines[index]
+            # 部分工具把空的上下文行输出为空行（省略前导空格）
+            tag, body = (" ", line) if line in ("\n", "\r\n") else (line[:1], line[1:])
+            if tag in (" ", "-"):
+                if position >= len(source) or source[position] != body:
+                    raise PatchError("第 {} 个差异块与当前内容不一致".format(hunks))
+                position += 1
+                removed += 1
+                if tag == " ":
+                    result.append(body)
+                    added += 1
+            elif tag == "+":
+                result.append(body)
+                added += 1
+            else:
+                break
+            index += 1
+        if (removed, added) != (old_count, new_count):
+            raise PatchError("第 {} 个差异块的行数与块头不符".format(hunks))
+
+    if not hunks and diff.strip():
+        raise PatchError("差异中没有差异块")
+    result.extend(source[position:])
+    return "".join(result)
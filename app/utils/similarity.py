@@ -0,0 +1,161 @@
+"""
+MindLink 文本相似度工具
+
+基于 SimHash 的文本指纹：
+- 特征为分词结果（单词、CJK 单字和双字）组成的连续三元组，按出现次数加权
+- 特征哈希使用 blake2b，指纹在不同进程和重启之间保持一致，可以保存到数据库
+- 两个指纹的汉明距离（0-64）近似反映文本变化的程度：修改错字通常只改变几位，重写一半内容会改变十几位以上
+
+基于 MinHash 的近似重复检测：
+- 签名由 128 个哈希函数在特征集合上的最小值组成，两个签名相同位置相等的比例估计特征集合的 Jaccard 相似度
+- 签名分为 16 段（每段 8 个值），任一段完全相同的笔记成为候选，
+  Jaccard 0.8 的笔记对约 95% 成为候选，0.5 以下的几乎不会，查询只需比较候选的签名
+- 安装 NumPy 时签名计算向量化，否则逐个计算，两者结果相同
+"""
+
+import hashlib
+import random
+import struct
+from collections import Counter
+from typing import List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - 未安装 NumPy 时使用纯 Python 实现
+    np = None
+
+from app.utils.tokenizer import tokenize
+
+# 指纹位数
+SIMHASH_BITS = 64
+
+# 特征由多少个连续词元组成
+SHINGLE_SIZE = 3
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> List[str]:
+    """
+    把文本切分为连续词元组成的特征
+
+    Args:
+        text: 文本
+        size: 每个特征包含的词元数
+
+    Returns:
+        List[str]: 特征列表（保留重复；词元不足 size 个时整段作为一个特征）
+    """
+    tokens = tokenize(text)
+    if len(tokens) <= size:
+        return [" ".join(tokens)] if tokens else []
+    return [" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)]
+
+
+def feature_hash(feature: str) -> int:
+    """计算特征的 64 位无符号哈希"""
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(text: str) -> int:
+    """
+    计算文本的 SimHash 指纹
+
+    Args:
+        text: 文本
+
+    Returns:
+        int: 64 位指纹，以有符号整数表示（可直接保存到 BigInteger 列）
+    """
+    weights = [0] * SIMHASH_BITS
+    for feature, count in Counter(shingles(text)).items():
+        value = feature_hash(feature)
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += count if value >> bit & 1 else -count
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint - (1 << SIMHASH_BITS) if fingerprint >= 1 << (SIMHASH_BITS - 1) else fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """计算两个指纹之间不同的位数"""
+    return bin((a ^ b) & ((1 << SIMHASH_BITS) - 1)).count("1")
+
+
+def note_fingerprint(title: str, content: str) -> int:
+    """计算笔记标题和内容的 SimHash 指纹（摘要的输入）"""
+    return simhash("{}\n{}".format(title or "", content or ""))
+
+
+# MinHash 哈希函数个数和 LSH 分段（修改后需要执行 manage.py index-duplicates --all 重建）
+MINHASH_PERMUTATIONS = 128
+LSH_BANDS = 16
+LSH_ROWS = MINHASH_PERMUTATIONS // LSH_BANDS
+
+# 哈希函数 h(x) = (a * x + b) mod p，x 为 32 位特征哈希；a < 2^31、b < 2^32 保证 a * x + b 不超过 64 位
+_MINHASH_PRIME = 4294967291
+_rng = random.Random(20240601)
+_MINHASH_A = [_rng.randrange(1, 1 << 31) for _ in range(MINHASH_PERMUTATIONS)]
+_MINHASH_B = [_rng.randrange(0, 1 << 32) for _ in range(MINHASH_PERMUTATIONS)]
+
+# 向量化计算时每次处理的特征数，限制中间矩阵的内存占用
+_MINHASH_CHUNK = 2048
+
+
+def minhash_signature(text: str) -> Optional[List[int]]:
+    """
+    计算文本的 MinHash 签名
+
+    Args:
+        text: 文本
+
+    Returns:
+        Optional[List[int]]: MINHASH_PERMUTATIONS 个 32 位整数；文本没有任何特征时返回 None
+    """
+    values = [feature_hash(feature) & 0xFFFFFFFF for feature in set(shingles(text))]
+    if not values:
+        return None
+    if np is None:
+        return [min((a * x + b) % _MINHASH_PRIME for x in values) for a, b in zip(_MINHASH_A, _MINHASH_B)]
+
+    a = np.array(_MINHASH_A, dtype=np.uint64)
+    b = np.array(_MINHASH_B, dtype=np.uint64)
+    features = np.array(values, dtype=np.uint64)
+    signature = np.full(MINHASH_PERMUTATIONS, _MINHASH_PRIME, dtype=np.uint64)
+    for start in range(0, len(features), _MINHASH_CHUNK):
+        chunk = features[start:start + _MINHASH_CHUNK, None]
+        np.minimum(signature, ((chunk * a + b) % _MINHASH_PRIME).min(axis=0), out=signature)
+    return signature.tolist()
+
+
+def encode_signature(signature: Sequence[int]) -> bytes:
+    """把签名编码为定长字节串（保存到数据库）"""
+    return struct.pack(">{}I".format(len(signature)), *signature)
+
+
+def decode_signature(data: bytes) -> List[int]:
+    """解码 encode_signature 生成的字节串"""
+    return list(struct.unpack(">{}I".format(len(data) // 4), data))
+
+
+def lsh_buckets(signature: Sequence[int]) -> List[Tuple[int, int]]:
+    """
+    计算签名各段的 LSH 桶
+
+    Args:
+        signature: MinHash 签名
+
+    Returns:
+        List[Tuple[int, int]]: [(段号, 桶值)]，桶值为该段签名的 64 位有符号哈希
+    """
+    buckets = []
+    for band in range(LSH_BANDS):
+        rows = encode_signature(signature[band * LSH_ROWS:(band + 1) * LSH_ROWS])
+        bucket = int.from_bytes(hashlib.blake2b(rows, digest_size=8).digest(), "big", signed=True)
+        buckets.append((band, bucket))
+    return buckets
+
+
+def estimate_jaccard(a: Sequence[int], b: Sequence[int]) -> float:
+    """根据两个签名相同位置相等的比例估计 Jaccard 相似度"""
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
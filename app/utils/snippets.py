@@ -0,0 +1,118 @@
+"""
+MindLink 搜索摘录工具
+
+为搜索结果生成带高亮位置的正文摘录：
+- 使用与全文索引相同的分词器，对正文前 SEARCH_SNIPPET_SCAN_CHARS 个字符做一次扫描，找出查询词元的位置
+- 相邻或重叠的命中（如 CJK 双字词元“知识”“识库”）合并为一个高亮区间
+- 以命中为中心取固定长度的窗口，按窗口内不同词元数和命中数排序，选出互不重叠的若干片段
+
+偏移量按字符（Unicode 码点）计算，高亮区间为 [起始, 结束)，相对于片段文本。
+"""
+
+from typing import Dict, List, Sequence, Set, Tuple
+
+from app.utils.tokenizer import tokenize_query, tokenize_with_offsets
+
+
+def query_terms(query: str) -> Set[str]:
+    """查询的词元集合（与全文索引的查询分词一致）"""
+    return set(tokenize_query(query))
+
+
+def find_matches(text: str, terms: Set[str], scan_chars: int) -> List[Tuple[int, int, str]]:
+    """
+    在文本开头的 scan_chars 个字符内查找查询词元
+
+    Args:
+        text: 文本
+        terms: 查询词元集合
+        scan_chars: 最多扫描的字符数
+
+    Returns:
+        List[Tuple[int, int, str]]: (起始, 结束, 词元) 列表，按位置排序
+    """
+    if not text or not terms:
+        return []
+    return [
+        (start, end, token)
+        for token, start, end in tokenize_with_offsets(text[:scan_chars])
+        if token in terms
+    ]
+
+
+def merge_spans(spans: Sequence[Tuple[int, int]]) -> List[List[int]]:
+    """合并相邻或重叠的区间"""
+    merged: List[List[int]] = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def highlight(text: str, terms: Set[str], scan_chars: int) -> List[List[int]]:
+    """整段文本（如标题）中的高亮区间"""
+    return merge_spans([(start, end) for start, end, _ in find_matches(text, terms, scan_chars)])
+
+
+def build_snippets(
+    text: str,
+    terms: Set[str],
+    count: int,
+    length: int,
+    scan_chars: int
+) -> List[Dict]:
+    """
+    生成正文摘录
+
+    Args:
+        text: 正文
+        terms: 查询词元集合
+        count: 最多返回的片段数
+        length: 每个片段的长度（字符）
+        scan_chars: 最多扫描的字符数
+
+    Returns:
+        List[Dict]: [{"text", "offset", "highlights"}]，按在正文中的位置排列；
+        正文中没有命中时返回开头的一个片段（不含高亮）
+    """
+    if not text or count <= 0:
+        return []
+    matches = find_matches(text, terms, scan_chars)
+    if not matches:
+        return [_snippet(text, 0, min(len(text), length), [])]
+
+    # 以每个命中为中心的候选窗口，按 (不同词元数, 命中数, 越靠前越好) 排序
+    candidates = []
+    for start, end, _ in matches:
+        window_start = max(0, min(start - (length - (end - start)) // 2, len(text) - length))
+        window_end = min(len(text), window_start + length)
+        inside = [match for match in matches if match[0] >= window_start and match[1] <= window_end]
+        candidates.append((len({token for _, _, token in inside}), len(inside), -window_start, window_start, window_end))
+    candidates.sort(reverse=True)
+
+    chosen: List[Tuple[int, int]] = []
+    for _, _, _, window_start, window_end in candidates:
+        if len(chosen) >= count:
+            break
+        if any(window_start < other_end and other_start < window_end for other_start, other_end in chosen):
+            continue
+        chosen.append((window_start, window_end))
+
+    chosen.sort()
+    return [
+        _snippet(text, window_start, window_end, [
+            (start, end) for start, end, _ in matches if start >= window_start and end <= window_end
+        ])
+        for window_start, window_end in chosen
+    ]
+
+
+def _snippet(text: str, start: int, end: int, spans: Sequence[Tuple[int, int]]) -> Dict:
+    """截取片段，换行替换为空格（长度不变，高亮位置仍然有效）"""
+    return {
+        "text": text[start:end].replace("\r", " ").replace("\n", " "),
+        "offset": start,
+        "highlights": [[span_start - start, span_end - start] for span_start, span_end in merge_spans(spans)],
+    }
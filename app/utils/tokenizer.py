@@ -0,0 +1,144 @@
+"""
+MindLink 文本分词工具
+
+供全文索引使用的轻量分词器：
+- 其他文字（拉丁、西里尔、希腊、阿拉伯等）按 Unicode 单词切分并转为小写
+- 中日韩（CJK）连续文本同时生成单字（unigram）与双字（bigram）词元
+- 查询分词只使用双字词元，单个汉字的查询退化为单字词元
+"""
+
+import re
+from typing import Iterator, List, Tuple
+
+# Unicode 单词（任意文字的字母、数字、下划线），CJK 字符已在此之前切分为单独的片段
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# CJK 字符范围：中日韩统一表意文字、扩展 A、兼容表意文字、平假名、片假名、韩文音节
+_CJK_RANGES = (
+    ("\u3040", "\u30ff"),
+    ("\u3400", "\u4dbf"),
+    ("\u4e00", "\u9fff"),
+    ("\uac00", "\ud7af"),
+    ("\uf900", "\ufaff"),
+)
+
+# 单个词元的最大长度，过长的词元（如 base64 片段）不进入索引
+MAX_TOKEN_LENGTH = 64
+
+
+def is_cjk(char: str) -> bool:
+    """判断字符是否为 CJK 字符"""
+    for start, end in _CJK_RANGES:
+        if start <= char <= end:
+            return True
+    return False
+
+
+def _iter_runs(text: str) -> Iterator[Tuple[bool, str, int]]:
+    """
+    将文本切分为连续的 CJK 片段与非 CJK 片段
+
+    Yields:
+        Tuple[bool, str, int]: (是否为 CJK 片段, 片段文本, 片段起始偏移)
+    """
+    start = 0
+    current = None
+    for index, char in enumerate(text):
+        flag = is_cjk(char)
+        if current is None:
+            current = flag
+        elif flag != current:
+            yield current, text[start:index], start
+            start = index
+            current = flag
+    if current is not None:
+        yield current, text[start:], start
+
+
+def _lower_with_positions(text: str) -> Tuple[str, List[int]]:
+    """
+    转为小写，并记录小写文本中每个字符对应的原文位置
+
+    str.lower() 可能改变长度（如 "İ" 转为两个码点），此时需要把偏移映射回原文。
+
+    Returns:
+        Tuple[str, List[int]]: (小写文本, 位置映射)；长度不变时映射为空列表
+    """
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered, []
+    positions: List[int] = []
+    for index, char in enumerate(text):
+        positions.extend([index] * len(char.lower()))
+    return lowered, positions
+
+
+def tokenize_with_offsets(text: str, for_query: bool = False) -> List[Tuple[str, int, int]]:
+    """
+    分词并返回每个词元在原文中的位置
+
+    Args:
+        text: 待分词文本
+        for_query: 是否为查询分词（查询时 CJK 只生成双字词元）
+
+    Returns:
+        List[Tuple[str, int, int]]: (词元, 起始偏移, 结束偏移) 列表
+    """
+    tokens: List[Tuple[str, int, int]] = []
+    if not text:
+        return tokens
+
+    lowered, positions = _lower_with_positions(text)
+    for cjk, run, offset in _iter_runs(lowered):
+        if cjk:
+            if len(run) == 1:
+                tokens.append((run, offset, offset + 1))
+                continue
+            for i in range(len(run)):
+                if not for_query:
+                    tokens.append((run[i], offset + i, offset + i + 1))
+                if i + 1 < len(run):
+                    tokens.append((run[i:i + 2], offset + i, offset + i + 2))
+        else:
+            for match in _WORD_RE.finditer(run):
+                word = match.group(0)
+                if len(word) <= MAX_TOKEN_LENGTH:
+                    tokens.append((word, offset + match.start(), offset + match.end()))
+    if positions:
+        tokens = [(token, positions[start], positions[end - 1] + 1) for token, start, end in tokens]
+    return tokens
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    文档分词
+
+    Args:
+        text: 文档文本
+
+    Returns:
+        List[str]: 词元列表（保留重复，用于统计词频）
+
+    Example:
+        tokenize("FastAPI 知识库") -> ["fastapi", "知", "知识", "识", "识库", "库"]
+    """
+    return [token for token, _, _ in tokenize_with_offsets(text)]
+
+
+def tokenize_query(text: str) -> List[str]:
+    """
+    查询分词（去重并保持顺序）
+
+    Args:
+        text: 查询文本
+
+    Returns:
+        List[str]: 查询词元列表
+    """
+    seen = set()
+    terms = []
+    for token, _, _ in tokenize_with_offsets(text, for_query=True):
+        if token not in seen:
+            seen.add(token)
+            terms.append(token)
+    return terms
@@ -0,0 +1,532 @@
+#!/usr/bin/env python3
+"""
+MindLink 运维管理脚本
+
+提供离线维护命令：
+
+使用示例:
+  python manage.py reindex-search        # 重建笔记全文索引
+  python manage.py backfill-sort-keys    # 补齐分页排序键（updated_at）
+  python manage.py reconcile-stats       # 对账修复用户统计计数
+  python manage.py summary-worker        # 运行 AI 摘要工作进程
+  python manage.py backfill-summaries    # 为缺少摘要的笔记登记摘要任务
+  python manage.py prune-summary-cache   # 清理过期的摘要缓存
+  python manage.py compress-versions     # 将未压缩的历史版本转换为快照/增量存储
+  python manage.py benchmark-versions    # 评估版本存储的空间占用和还原耗时
+  python manage.py repair-versions       # 修复重复版本号并同步笔记的版本计数器
+  python manage.py rebuild-tag-index     # 按笔记标签重建 note_tags 倒排表
+  python manage.py rebuild-link-index    # 按笔记内容重建 note_links 链接表
+"""
+
+import os
+import socket
+import sys
+import argparse
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from app.core.database import SessionLocal
+from app.models import Note
+from app.models.file import File
+
+
+def reindex_search(args) -> bool:
+    """重建笔记全文索引"""
+    from app.services.search_index import get_search_index
+
+    search_index = get_search_index()
+    if search_index is None:
+        print("❌ 全文索引未启用（SEARCH_INDEX_ENABLED=false）")
+        return False
+
+    db = SessionLocal()
+    try:
+        rows = db.query(Note.id, Note.user_id, Note.title, Note.content)\
+            .order_by(Note.id)\
+            .yield_per(args.batch_size)
+        count = search_index.rebuild(
+            (row.id, row.user_id, row.title, row.content) for row in rows
+        )
+    finally:
+        db.close()
+
+    print("✅ 全文索引重建完成，共索引 {} 篇笔记".format(count))
+    print("   索引目录: {}".format(search_index.index_dir))
+    return True
+
+
+def reindex_related(args) -> bool:
+    """重建相关笔记向量索引"""
+    from app.services.related_index import get_related_index
+
+    related_index = get_related_index()
+    if related_index is None:
+        print("❌ 相关笔记索引未启用（RELATED_INDEX_ENABLED=false 或未安装 NumPy）")
+        return False
+
+    db = SessionLocal()
+    try:
+        rows = db.query(Note.id, Note.user_id, Note.title, Note.content)\
+            .order_by(Note.user_id, Note.id)\
+            .yield_per(args.batch_size)
+        count = related_index.rebuild(
+            (row.id, row.user_id, row.title, row.content) for row in rows
+        )
+    finally:
+        db.close()
+
+    print("✅ 相关笔记索引重建完成，共索引 {} 篇笔记".format(count))
+    print("   索引目录: {}".format(related_index.index_dir))
+    return True
+
+
+def backfill_sort_keys(args) -> bool:
+    """
+    补齐分页排序键
+
+    键集分页要求排序键非空；早期数据的 updated_at 可能为 NULL，用 created_at 填充。
+    """
+    db = SessionLocal()
+    try:
+        for model in (Note, File):
+            count = db.query(model)\
+                .filter(model.updated_at.is_(None))\
+                .update({model.updated_at: model.created_at}, synchronize_session=False)
+            db.commit()
+            print("✅ {}: 已补齐 {} 行 updated_at".format(model.__tablename__, count))
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return True
+
+
+def reconcile_stats(args) -> bool:
+    """按明细表对账修复用户统计计数"""
+    from app.services.stats_service import StatsService
+
+    db = SessionLocal()
+    try:
+        result = StatsService.reconcile_all(db, args.user_id)
+    finally:
+        db.close()
+
+    print("✅ 用户统计对账完成，检查 {} 个用户，修正 {} 个".format(result["checked"], result["fixed"]))
+    return True
+
+
+def summary_worker(args) -> bool:
+    """在前台运行 AI 摘要工作线程，直到收到中断信号"""
+    import time
+    from app.services.summary_queue import SummaryWorkerPool
+
+    pool = SummaryWorkerPool(args.workers)
+    pool.start()
+    print("✅ 摘要工作进程已启动，工作线程: {}（Ctrl+C 停止）".format(args.workers))
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("正在停止，等待当前任务完成...")
+    finally:
+        pool.stop()
+    return True
+
+
+def backfill_summaries(args) -> bool:
+    """以低优先级为笔记登记摘要任务"""
+    from app.services.summary_queue import SummaryQueue
+
+    db = SessionLocal()
+    try:
+        count = SummaryQueue.backfill(db, only_missing=not args.all, batch_size=args.batch_size)
+    finally:
+        db.close()
+
+    print("✅ 已登记 {} 个摘要任务（低优先级，不影响用户编辑触发的任务）".format(count))
+    return True
+
+
+def prune_summary_cache(args) -> bool:
+    """清理持久层中过期的摘要缓存"""
+    from app.services.summary_cache import prune_summary_cache as prune
+
+    db = SessionLocal()
+    try:
+        count = prune(db, args.days)
+    finally:
+        db.close()
+
+    print("✅ 已清理 {} 条 {} 天前的摘要缓存".format(count, args.days))
+    return True
+
+
+def prune_render_cache(args) -> bool:
+    """清理磁盘上长期未访问的 Markdown 渲染缓存"""
+    from app.services.render_cache import get_render_cache
+
+    count = get_render_cache().prune(args.days)
+    print("✅ 已清理 {} 个 {} 天内未访问的渲染缓存文件".format(count, args.days))
+    return True
+
+
+def compress_versions(args) -> bool:
+    """将未压缩的历史版本转换为快照/增量存储"""
+    from app.services.version_service import VersionService
+
+    db = SessionLocal()
+    try:
+        result = VersionService.compress_all(db)
+    finally:
+        db.close()
+
+    print("✅ 已转换 {} 篇笔记的 {} 个历史版本".format(result["notes"], result["versions"]))
+    return True
+
+
+def compact_versions(args) -> bool:
+    """按保留策略清理历史版本"""
+    from app.services.version_service import VersionService
+
+    db = SessionLocal()
+    try:
+        result = VersionService.run_compaction(
+            db, "manage-{}-{}".format(socket.gethostname(), os.getpid()), batch_size=args.batch_size
+        )
+    finally:
+        db.close()
+
+    if result is None:
+        print("❌ 其他进程正在清理历史版本，请稍后重试")
+        return False
+    print("✅ 已清理 {} 篇笔记的 {} 个历史版本（重新编码 {} 个），释放 {:.1f} KB".format(
+        result["notes"], result["deleted"], result["reencoded"], result["bytes"] / 1024
+    ))
+    if result["failed"]:
+        print("⚠️  {} 篇笔记清理失败，详见日志".format(result["failed"]))
+    return True
+
+
+def benchmark_versions(args) -> bool:
+    """模拟一篇笔记的连续编辑，统计每个版本的存储大小和还原耗时"""
+    import random
+    import time
+    from app.services.version_service import encode_content
+    from app.utils.delta import apply_delta, decompress_text
+
+    rng = random.Random(42)
+    words = ["note", "link", "idea", "draft", "summary", "version", "markdown", "search", "tag", "file"]
+
+    def random_line() -> str:
+        return " ".join(rng.choice(words) + str(rng.randrange(1000)) for _ in range(10)) + "\n"
+
+    lines = []
+    while sum(len(text) for text in lines) < args.size_kb * 1024:
+        lines.append(random_line())
+
+    base = None
+    rows = []
+    full_bytes = stored_bytes = 0
+    for version_number in range(1, args.edits + 1):
+        # 每次编辑随机修改、插入或删除几行
+        for _ in range(3):
+            index = rng.randrange(len(lines))
+            action = rng.random()
+            if action < 0.6:
+                lines[index] = random_line()
+            elif action < 0.8:
+                lines.insert(index, random_line())
+            elif len(lines) > 1:
+                del lines[index]
+        content = "".join(lines)
+        values = encode_content(content, version_number, base, args.interval)
+        if values["storage"] == "snapshot":
+            base = (version_number, content)
+        rows.append(values)
+        full_bytes += values["content_size"]
+        stored_bytes += len(values["payload"])
+
+    snapshots = {}
+    timings = []
+    for version_number, values in enumerate(rows, start=1):
+        if values["storage"] == "snapshot":
+            snapshots[version_number] = values["payload"]
+        started = time.perf_counter()
+        if values["storage"] == "snapshot":
+            decompress_text(values["payload"])
+        else:
+            apply_delta(decompress_text(snapshots[values["base_version"]]), values["payload"])
+        timings.append(time.perf_counter() - started)
+
+    timings.sort()
+    snapshot_count = sum(1 for values in rows if values["storage"] == "snapshot")
+    print("版本数: {}，快照: {}，增量: {}".format(len(rows), snapshot_count, len(rows) - snapshot_count))
+    print("原文存储: {:.1f} MB（{:.1f} KB/版本）".format(full_bytes / 1024 ** 2, full_bytes / len(rows) / 1024))
+    print("压缩存储: {:.1f} MB（{:.1f} KB/版本，{:.1%}）".format(
+        stored_bytes / 1024 ** 2, stored_bytes / len(rows) / 1024, stored_bytes / full_bytes
+    ))
+    print("还原耗时: p50 {:.2f} ms，p99 {:.2f} ms".format(
+        timings[len(timings) // 2] * 1000, timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1000
+    ))
+    return True
+
+
+def repair_versions(args) -> bool:
+    """修复重复版本号并同步笔记的版本计数器"""
+    from app.core.database import init_db
+    from app.services.version_service import VersionService
+
+    # 先补齐 current_version 列
+    init_db()
+    db = SessionLocal()
+    try:
+        result = VersionService.repair_version_numbers(db)
+    finally:
+        db.close()
+
+    # 重复数据修复后补建 (note_id, version_number) 唯一索引
+    init_db()
+    print("✅ 已重新编号 {} 篇笔记的 {} 个版本，版本计数器已同步".format(result["notes"], result["renumbered"]))
+    return True
+
+
+def rebuild_tag_index(args) -> bool:
+    """按笔记标签重建 note_tags 倒排表"""
+    from app.services.tag_service import TagService
+
+    db = SessionLocal()
+    try:
+        result = TagService.rebuild(db, batch_size=args.batch_size)
+    finally:
+        db.close()
+
+    print("✅ 已为 {} 篇笔记写入 {} 条标签记录".format(result["notes"], result["postings"]))
+    return True
+
+
+def rebuild_link_index(args) -> bool:
+    """按笔记内容重建 note_links 链接表"""
+    from app.services.link_service import LinkService
+
+    db = SessionLocal()
+    try:
+        result = LinkService.rebuild(db, batch_size=args.batch_size)
+    finally:
+        db.close()
+
+    print("✅ 已为 {} 篇笔记写入 {} 条链接".format(result["notes"], result["links"]))
+    return True
+
+
+def index_duplicates(args) -> bool:
+    """为缺少签名的笔记补建近似重复索引"""
+    from app.services.duplicate_service import DuplicateService
+
+    db = SessionLocal()
+    try:
+        count = DuplicateService.backfill(db, rebuild=args.all, batch_size=args.batch_size)
+    finally:
+        db.close()
+
+    print("✅ 已为 {} 篇笔记建立近似重复索引".format(count))
+    return True
+
+
+def find_duplicates(args) -> bool:
+    """列出用户所有近似重复的笔记组"""
+    from app.services.duplicate_service import DuplicateService
+
+    db = SessionLocal()
+    try:
+        groups = DuplicateService.find_user_duplicates(db, args.user_id, args.threshold)
+    finally:
+        db.close()
+
+    for group in groups:
+        print("相似度 ≥ {:.2f}：{}".format(
+            group["similarity"],
+            "、".join("#{} {}".format(note["id"], note["title"]) for note in group["notes"])
+        ))
+    print("✅ 找到 {} 组近似重复笔记".format(len(groups)))
+    return True
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(
+        description="MindLink 运维管理脚本",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    reindex_parser = subparsers.add_parser("reindex-search", help="重建笔记全文索引")
+    reindex_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=500,
+        help="每批读取的笔记数量 (默认: 500)"
+    )
+    reindex_parser.set_defaults(func=reindex_search)
+
+    related_parser = subparsers.add_parser("reindex-related", help="重建相关笔记向量索引")
+    related_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=500,
+        help="每批读取的笔记数量 (默认: 500)"
+    )
+    related_parser.set_defaults(func=reindex_related)
+
+    backfill_parser = subparsers.add_parser("backfill-sort-keys", help="补齐分页排序键（updated_at）")
+    backfill_parser.set_defaults(func=backfill_sort_keys)
+
+    reconcile_parser = subparsers.add_parser("reconcile-stats", help="对账修复用户统计计数")
+    reconcile_parser.add_argument(
+        "--user-id",
+        type=int,
+        default=None,
+        help="只修复指定用户 (默认: 所有用户)"
+    )
+    reconcile_parser.set_defaults(func=reconcile_stats)
+
+    worker_parser = subparsers.add_parser("summary-worker", help="运行 AI 摘要工作进程")
+    worker_parser.add_argument(
+        "--workers",
+        type=int,
+        default=2,
+        help="工作线程数 (默认: 2)"
+    )
+    worker_parser.set_defaults(func=summary_worker)
+
+    summaries_parser = subparsers.add_parser("backfill-summaries", help="为缺少摘要的笔记登记摘要任务")
+    summaries_parser.add_argument(
+        "--all",
+        action="store_true",
+        help="为所有笔记重新生成摘要（默认只处理缺少摘要或生成失败的笔记）"
+    )
+    summaries_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=500,
+        help="每批提交的笔记数量 (默认: 500)"
+    )
+    summaries_parser.set_defaults(func=backfill_summaries)
+
+    prune_cache_parser = subparsers.add_parser("prune-summary-cache", help="清理过期的摘要缓存")
+    prune_cache_parser.add_argument(
+        "--days",
+        type=int,
+        default=90,
+        help="保留最近多少天的缓存 (默认: 90)"
+    )
+    prune_cache_parser.set_defaults(func=prune_summary_cache)
+
+    prune_render_parser = subparsers.add_parser("prune-render-cache", help="清理长期未访问的 Markdown 渲染缓存")
+    prune_render_parser.add_argument(
+        "--days",
+        type=int,
+        default=30,
+        help="保留最近多少天内访问过的缓存 (默认: 30)"
+    )
+    prune_render_parser.set_defaults(func=prune_render_cache)
+
+    compress_parser = subparsers.add_parser("compress-versions", help="将未压缩的历史版本转换为快照/增量存储")
+    compress_parser.set_defaults(func=compress_versions)
+
+    compact_parser = subparsers.add_parser("compact-versions", help="按保留策略清理历史版本")
+    compact_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=None,
+        help="每批扫描的笔记数（默认使用 VERSION_COMPACT_BATCH）",
+    )
+    compact_parser.set_defaults(func=compact_versions)
+
+    benchmark_parser = subparsers.add_parser("benchmark-versions", help="评估版本存储的空间占用和还原耗时")
+    benchmark_parser.add_argument(
+        "--size-kb",
+        type=int,
+        default=200,
+        help="笔记大小（KB）(默认: 200)"
+    )
+    benchmark_parser.add_argument(
+        "--edits",
+        type=int,
+        default=1000,
+        help="编辑次数 (默认: 1000)"
+    )
+    benchmark_parser.add_argument(
+        "--interval",
+        type=int,
+        default=20,
+        help="快照间隔（版本数）(默认: 20)"
+    )
+    benchmark_parser.set_defaults(func=benchmark_versions)
+
+    repair_parser = subparsers.add_parser("repair-versions", help="修复重复版本号并同步笔记的版本计数器")
+    repair_parser.set_defaults(func=repair_versions)
+
+    tag_index_parser = subparsers.add_parser("rebuild-tag-index", help="按笔记标签重建 note_tags 倒排表")
+    tag_index_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=500,
+        help="每批处理的笔记数量 (默认: 500)"
+    )
+    tag_index_parser.set_defaults(func=rebuild_tag_index)
+
+    link_index_parser = subparsers.add_parser("rebuild-link-index", help="按笔记内容重建 note_links 链接表")
+    link_index_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=500,
+        help="每批处理的笔记数量 (默认: 500)"
+    )
+    link_index_parser.set_defaults(func=rebuild_link_index)
+
+    index_duplicates_parser = subparsers.add_parser("index-duplicates", help="为缺少签名的笔记补建近似重复索引")
+    index_duplicates_parser.add_argument(
+        "--all",
+        action="store_true",
+        help="重新计算所有笔记的签名（默认只处理缺少签名的笔记）"
+    )
+    index_duplicates_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=200,
+        help="每批提交的笔记数量 (默认: 200)"
+    )
+    index_duplicates_parser.set_defaults(func=index_duplicates)
+
+    find_duplicates_parser = subparsers.add_parser("find-duplicates", help="列出用户所有近似重复的笔记组")
+    find_duplicates_parser.add_argument(
+        "--user-id",
+        type=int,
+        required=True,
+        help="用户ID"
+    )
+    find_duplicates_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=None,
+        help="相似度阈值 (默认: DUPLICATE_THRESHOLD)"
+    )
+    find_duplicates_parser.set_defaults(func=find_duplicates)
+
+    args = parser.parse_args()
+
+    try:
+        success = args.func(args)
+    except Exception as e:
+        print("❌ 执行失败: {}".format(e))
+        success = False
+
+    sys.exit(0 if success else 1)
+
+
+if __name__ == "__main__":
+    main()
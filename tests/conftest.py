@@ -12,6 +12,7 @@ from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool
 
 from app.main import app
+from app.core.config import get_settings
 from app.core.database import get_db, Base
 from app.models.user import User
 from app.models.note import Note, NoteVersion
@@ -40,6 +41,18 @@ def event_loop():
     loop.close()
 
 
+@pytest.fixture(autouse=True)
+def isolated_index_dirs(tmp_path, monkeypatch):
+    """全文索引、相关笔记索引和渲染缓存使用每个测试独立的临时目录，避免前几次运行的数据影响断言"""
+    settings = get_settings()
+    monkeypatch.setattr(settings, "SEARCH_INDEX_DIR", str(tmp_path / "search_index"))
+    monkeypatch.setattr(settings, "RELATED_INDEX_DIR", str(tmp_path / "related_index"))
+    monkeypatch.setattr(settings, "RENDER_CACHE_DIR", str(tmp_path / "render_cache"))
+    monkeypatch.setattr("app.services.search_index._search_index", None)
+    monkeypatch.setattr("app.services.related_index._related_index", None)
+    monkeypatch.setattr("app.services.render_cache._render_cache", None)
+
+
 @pytest.fixture(scope="function")
 def db() -> Generator[Session, None, None]:
     """测试数据库会话 fixture"""
@@ -0,0 +1,91 @@
+"""
+近似重复检测单元测试
+测试 MinHash 签名、写入时维护的 LSH 索引、单篇查询和按用户分组
+"""
+
+from app.models.note import NoteBatchRequest, NoteCreate, NoteUpdate
+from app.models.note_minhash import NoteLSHBucket, NoteMinHash
+from app.services.duplicate_service import DuplicateService
+from app.services.note_service import NoteService
+from app.utils import similarity
+from app.utils.similarity import LSH_BANDS, estimate_jaccard, minhash_signature
+
+
+ARTICLE = "".join("第 {} 段介绍了分布式系统中的一致性协议和故障恢复方法。\n".format(i) for i in range(30))
+OTHER = "".join("Recipe step {} mixes flour, water and salt before baking.\n".format(i) for i in range(30))
+
+
+def _create(db, user, title, content):
+    return NoteService.create_note(db, NoteCreate(title=title, content=content), user)
+
+
+class TestMinHash:
+    """MinHash 签名测试类"""
+
+    def test_signature_estimates_similarity(self, monkeypatch):
+        """测试签名稳定，相似文本估计值高，无关文本估计值低，NumPy 与纯 Python 结果一致"""
+        signature = minhash_signature(ARTICLE)
+        assert minhash_signature(ARTICLE) == signature
+        assert estimate_jaccard(signature, minhash_signature(ARTICLE + "补充一句。\n")) > 0.9
+        assert estimate_jaccard(signature, minhash_signature(OTHER)) < 0.1
+        assert minhash_signature("") is None
+
+        monkeypatch.setattr(similarity, "np", None)
+        assert minhash_signature(ARTICLE) == signature
+
+
+class TestDuplicateService:
+    """近似重复检测服务测试类"""
+
+    def test_index_maintained_on_write(self, db, test_user):
+        """测试创建、修改和删除笔记时同步维护签名和桶记录"""
+        note = _create(db, test_user, "A", ARTICLE)
+        assert db.query(NoteLSHBucket).filter(NoteLSHBucket.note_id == note.id).count() == LSH_BANDS
+        before = db.get(NoteMinHash, note.id).signature
+
+        NoteService.update_note(db, note.id, NoteUpdate(content=OTHER), test_user)
+        db.expire_all()
+        assert db.get(NoteMinHash, note.id).signature != before
+        assert db.query(NoteLSHBucket).filter(NoteLSHBucket.note_id == note.id).count() == LSH_BANDS
+
+        NoteService.delete_note(db, note.id, test_user)
+        assert db.query(NoteMinHash).filter(NoteMinHash.note_id == note.id).count() == 0
+        assert db.query(NoteLSHBucket).filter(NoteLSHBucket.note_id == note.id).count() == 0
+
+    def test_find_note_duplicates(self, db, test_user):
+        """测试只返回同一用户中相似度达到阈值的笔记"""
+        original = _create(db, test_user, "原文", ARTICLE)
+        copy = _create(db, test_user, "重复导入", ARTICLE + "导入时附加的一行。\n")
+        _create(db, test_user, "无关", OTHER)
+
+        result = NoteService.get_note_duplicates(db, original.id, test_user)
+        assert [item["id"] for item in result] == [copy.id]
+        assert result[0]["title"] == "重复导入"
+        assert result[0]["similarity"] >= 0.8
+
+        assert NoteService.get_note_duplicates(db, original.id, test_user, threshold=1.0) == []
+
+    def test_find_user_duplicate_groups(self, db, test_user):
+        """测试按连通关系分组，批量写入的笔记同样建立索引"""
+        result = NoteService.batch_notes(db, NoteBatchRequest(items=[
+            {"op": "create", "title": "A1", "content": ARTICLE},
+            {"op": "create", "title": "A2", "content": ARTICLE},
+            {"op": "create", "title": "B1", "content": OTHER},
+            {"op": "create", "title": "B2", "content": OTHER + "Serve warm.\n"},
+            {"op": "create", "title": "C", "content": "一篇独立的短笔记，内容与其他笔记无关。"},
+        ]), test_user)
+        ids = [item["note_id"] for item in result["results"]]
+
+        groups = NoteService.get_duplicate_groups(db, test_user)
+        assert sorted([note["id"] for note in group["notes"]] for group in groups) == [ids[0:2], ids[2:4]]
+
+    def test_backfill_indexes_missing_notes(self, db, test_user):
+        """测试为缺少签名的笔记补建索引"""
+        note = _create(db, test_user, "A", ARTICLE)
+        db.query(NoteLSHBucket).delete()
+        db.query(NoteMinHash).delete()
+        db.commit()
+
+        assert DuplicateService.backfill(db, batch_size=1) == 1
+        assert db.query(NoteLSHBucket).filter(NoteLSHBucket.note_id == note.id).count() == LSH_BANDS
+        assert DuplicateService.backfill(db) == 0
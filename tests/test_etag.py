@@ -0,0 +1,74 @@
+"""
+条件请求单元测试
+测试 ETag 比较、笔记行版本和标签/文件集合代数的维护
+"""
+
+import pytest
+from fastapi import HTTPException
+
+from app.models.file import File
+from app.models.note import NoteCreate, NoteUpdate, NoteTagUpdate
+from app.services.file_service import FileService
+from app.services.note_service import NoteService
+from app.services.stats_service import StatsService
+from app.services.summary_queue import SummaryQueue
+from app.utils.etag import etag_matches, make_etag, not_modified
+
+
+class TestEtagMatching:
+    """ETag 比较测试类"""
+
+    def test_if_none_match_forms(self):
+        """测试多个值、弱校验前缀和通配符"""
+        etag = make_etag("note", 1, 3)
+        assert etag == '"note-1-3"'
+        assert etag_matches('"note-1-2", W/"note-1-3"', etag)
+        assert etag_matches("*", etag)
+        assert not etag_matches('"note-1-2"', etag)
+        assert not etag_matches(None, etag)
+        assert not_modified('"note-1-3"', etag).status_code == 304
+        assert not_modified('"note-1-2"', etag) is None
+
+
+class TestEtagValidators:
+    """ETag 校验值测试类"""
+
+    def test_note_etag_changes_on_every_write(self, db, test_user, test_superuser, monkeypatch):
+        """测试笔记修改、改标签和后台摘要写入都会改变 ETag"""
+        monkeypatch.setattr("app.services.summary_queue.request_note_summary", lambda content, title="": "摘要")
+        note = NoteService.create_note(db, NoteCreate(title="A", content="内容"), test_user)
+        seen = [NoteService.get_note_etag(db, note.id, test_user)]
+        assert seen[0] == NoteService.note_etag(NoteService.get_note_by_id(db, note.id, test_user))
+
+        NoteService.update_note(db, note.id, NoteUpdate(content="新内容"), test_user)
+        seen.append(NoteService.get_note_etag(db, note.id, test_user))
+        NoteService.update_note_tags(db, note.id, NoteTagUpdate(tags=["t"]), test_user)
+        seen.append(NoteService.get_note_etag(db, note.id, test_user))
+        assert SummaryQueue.run_once(db, "w1")
+        seen.append(NoteService.get_note_etag(db, note.id, test_user))
+        assert len(set(seen)) == len(seen)
+
+        with pytest.raises(HTTPException) as exc:
+            NoteService.get_note_etag(db, note.id, test_superuser)
+        assert exc.value.status_code == 403
+
+    def test_collection_generations(self, db, test_user):
+        """测试标签代数只随标签计数变化，文件代数随文件增删改变化"""
+        tags_etag = NoteService.get_tags_etag(db, test_user)
+        note = NoteService.create_note(db, NoteCreate(title="A", content="内容"), test_user)
+        assert NoteService.get_tags_etag(db, test_user) == tags_etag
+
+        NoteService.update_note_tags(db, note.id, NoteTagUpdate(tags=["t"]), test_user)
+        assert NoteService.get_tags_etag(db, test_user) != tags_etag
+
+        files_etag = FileService.get_files_etag(db, test_user.id)
+        StatsService.get_stats(db, test_user.id)
+        db.add(File(user_id=test_user.id, filename="a.txt", filepath="/tmp/a.txt", file_size=3, file_type="text/plain"))
+        StatsService.adjust(db, test_user.id, files=1, file_bytes=3)
+        db.commit()
+        after_upload = FileService.get_files_etag(db, test_user.id)
+        assert after_upload != files_etag
+
+        StatsService.bump_generation(db, test_user.id, "files")
+        db.commit()
+        assert FileService.get_files_etag(db, test_user.id) not in (files_etag, after_upload)
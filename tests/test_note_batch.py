@@ -0,0 +1,85 @@
+"""
+笔记批量操作单元测试
+测试批量创建/更新的结果、原子模式、版本号和附带数据的维护
+"""
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.config import get_settings
+from app.models.note import Note, NoteBatchRequest, NoteCreate, NoteVersion
+from app.models.note_tag import NoteTag
+from app.models.summary_job import SummaryJob, PRIORITY_BULK
+from app.services.note_service import NoteService
+from app.services.stats_service import StatsService
+from app.services.version_service import VersionService
+
+
+def _batch(items, atomic=False):
+    return NoteBatchRequest(items=items, atomic=atomic)
+
+
+class TestNoteBatch:
+    """笔记批量操作测试类"""
+
+    def test_creates_and_updates_in_one_batch(self, db, test_user):
+        """测试批量创建和更新按顺序执行，并维护版本、标签、统计和摘要任务"""
+        existing = NoteService.create_note(db, NoteCreate(title="旧", content="a\n", tags=["old"]), test_user)
+
+        result = NoteService.batch_notes(db, _batch([
+            {"op": "create", "title": "新 1", "content": "x\n", "tags": ["imp"]},
+            {"op": "update", "note_id": existing.id, "content": "a\nb\n"},
+            {"op": "create", "title": "新 2", "content": "y\n", "tags": ["imp", "old"]},
+            {"op": "update", "note_id": existing.id, "tags": ["new"], "change_description": "改标签"},
+        ]), test_user)
+
+        assert (result["total"], result["success"], result["failed"]) == (4, 4, 0)
+        assert [r["version_number"] for r in result["results"]] == [1, 2, 1, 3]
+        created_ids = [result["results"][0]["note_id"], result["results"][2]["note_id"]]
+
+        db.expire_all()
+        note = db.query(Note).filter(Note.id == existing.id).one()
+        assert (note.content, note.tags, note.current_version) == ("a\nb\n", ["new"], 3)
+        versions = db.query(NoteVersion).filter(NoteVersion.note_id == existing.id).order_by(NoteVersion.version_number).all()
+        assert [v.change_description for v in versions] == ["初始版本", "更新笔记", "改标签"]
+        assert VersionService.load_content(db, versions[1]).content == "a\nb\n"
+
+        assert sorted(row[0] for row in db.query(NoteTag.tag).filter(NoteTag.note_id == existing.id)) == ["new"]
+        stats = StatsService.get_user_stats(db, test_user.id)
+        assert stats.note_count == 3
+        assert stats.tag_counts == {"imp": 2, "old": 1, "new": 1}
+
+        jobs = db.query(SummaryJob).filter(SummaryJob.note_id.in_(created_ids)).all()
+        assert len(jobs) == 2 and all(job.priority == PRIORITY_BULK for job in jobs)
+
+    def test_invalid_items_are_reported(self, db, test_user, test_superuser):
+        """测试无效项单独报告，原子模式下不执行任何操作"""
+        other = NoteService.create_note(db, NoteCreate(title="别人的", content="c"), test_superuser)
+        items = [
+            {"op": "create", "title": "有效", "content": "内容"},
+            {"op": "create", "title": "缺内容"},
+            {"op": "update", "note_id": other.id, "content": "改"},
+            {"op": "update", "note_id": 999999, "content": "改"},
+        ]
+
+        result = NoteService.batch_notes(db, _batch(items, atomic=True), test_user)
+        assert (result["success"], [f["index"] for f in result["failed_items"]]) == (0, [1, 2, 3])
+        assert db.query(Note).filter(Note.user_id == test_user.id).count() == 0
+
+        result = NoteService.batch_notes(db, _batch(items), test_user)
+        assert (result["success"], result["failed"]) == (1, 3)
+        assert db.query(Note).filter(Note.user_id == test_user.id).count() == 1
+
+    def test_batch_size_limit(self, db, test_user, monkeypatch):
+        """测试超过单次操作上限时拒绝请求"""
+        monkeypatch.setattr(get_settings(), "NOTE_BATCH_MAX_ITEMS", 2)
+        with pytest.raises(HTTPException) as exc:
+            NoteService.batch_notes(db, _batch([{"op": "create", "title": "t", "content": "c"}] * 3), test_user)
+        assert exc.value.status_code == 400
+
+    def test_stale_version_counter_is_retried(self, db, test_user, test_note):
+        """测试版本计数器落后时同步后重试整批"""
+        result = NoteService.batch_notes(db, _batch([
+            {"op": "update", "note_id": test_note.id, "content": "新内容"},
+        ]), test_user)
+        assert result["results"][0]["version_number"] == 2
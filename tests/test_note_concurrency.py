@@ -0,0 +1,117 @@
+"""
+笔记并发修改单元测试
+测试三方合并、base_version 和 If-Match 条件更新、条件递增版本号以及接口返回的 ETag
+"""
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.core.database import get_db
+from app.main import app
+from app.models.note import NoteCreate, NotePatch, NotePatchOp, NoteTagUpdate, NoteUpdate
+from app.services.note_service import NoteService
+from app.services.version_service import VersionService
+from app.utils.auth import get_current_user
+from app.utils.merge import merge_tags, merge_text, merge_value
+
+BASE = "第一行\n第二行\n第三行\n第四行\n"
+
+
+class TestMerge:
+    """三方合并测试类"""
+
+    def test_merge_text(self):
+        """测试不重叠的修改合并，相同修改只应用一次，重叠或相邻的修改冲突"""
+        mine = BASE.replace("第一行", "第 1 行")
+        theirs = BASE.replace("第四行", "第 4 行")
+        assert merge_text(BASE, mine, theirs) == "第 1 行\n第二行\n第三行\n第 4 行\n"
+        assert merge_text(BASE, mine, mine) == mine
+        assert merge_text(BASE, BASE, theirs) == theirs
+        assert merge_text(BASE, mine + "末行\n", BASE.replace("第三行", "第 3 行") + "末行\n") \
+            == "第 1 行\n第二行\n第 3 行\n第四行\n末行\n"
+        assert merge_text(BASE, mine, BASE.replace("第一行", "1")) is None
+        assert merge_text(BASE, mine, BASE.replace("第二行", "2")) is None
+
+    def test_merge_tags_and_value(self):
+        """测试标签按集合合并，单个值只有一方修改时取修改后的值"""
+        assert merge_tags(["a", "b"], ["a", "c"], ["b", "d"]) == ["d", "c"]
+        assert merge_value("旧", "旧", "新") == (True, "新")
+        assert merge_value("旧", "我的", "旧") == (True, "我的")
+        assert merge_value("旧", "我的", "新")[0] is False
+
+
+class TestConditionalUpdate:
+    """条件更新测试类"""
+
+    def test_stale_update_merged(self, db, test_user):
+        """测试基于旧版本的更新与此后的修改合并，冲突时返回 412 且不修改笔记"""
+        note = NoteService.create_note(db, NoteCreate(title="草稿", content=BASE, tags=["a"]), test_user)
+        base = note.current_version
+        NoteService.update_note(db, note.id, NoteUpdate(content=BASE.replace("第四行", "第 4 行")), test_user)
+
+        note = NoteService.update_note(db, note.id, NoteUpdate(
+            content=BASE.replace("第一行", "第 1 行"), title="定稿", base_version=base
+        ), test_user)
+        assert note.content == "第 1 行\n第二行\n第三行\n第 4 行\n"
+        assert (note.title, note.current_version) == ("定稿", base + 2)
+
+        with pytest.raises(HTTPException) as exc:
+            NoteService.update_note(db, note.id, NoteUpdate(
+                content=BASE.replace("第四行", "4"), base_version=base
+            ), test_user)
+        assert exc.value.status_code == 412
+        db.refresh(note)
+        assert note.current_version == base + 2
+
+        note = NoteService.update_note_tags(db, note.id, NoteTagUpdate(tags=["b"], base_version=base), test_user)
+        assert sorted(note.tags) == ["b"]
+
+    def test_if_match(self, db, test_user):
+        """测试 If-Match 携带当前 ETag 时更新成功，ETag 不匹配或版本已变化的恢复返回 412"""
+        note = NoteService.create_note(db, NoteCreate(title="日志", content="abc"), test_user)
+        etag = NoteService.get_note_etag(db, note.id, test_user)
+        note = NoteService.update_note(db, note.id, NoteUpdate(title="日志 2"), test_user, etag)
+        assert NoteService.get_note_etag(db, note.id, test_user) != etag
+
+        for if_match in ('"other-1-2"', etag):
+            with pytest.raises(HTTPException) as exc:
+                NoteService.restore_note_version(db, note.id, 1, test_user, if_match)
+            assert exc.value.status_code == 412
+        note = NoteService.restore_note_version(db, note.id, 1, test_user, "*")
+        assert note.title == "日志"
+
+    def test_allocate_version_conflict(self, db, test_user):
+        """测试条件递增版本号：当前版本号与预期不符时返回 412"""
+        note = NoteService.create_note(db, NoteCreate(title="日志", content="abc"), test_user)
+        current = note.current_version
+        with pytest.raises(HTTPException) as exc:
+            VersionService.allocate_version_number(db, note, expected_version=current - 1)
+        assert exc.value.status_code == 412
+        assert VersionService.allocate_version_number(db, note, expected_version=current) == current + 1
+
+    def test_stale_patch_merged(self, db, test_user):
+        """测试基于旧版本的补丁应用到基准内容后与当前内容合并"""
+        note = NoteService.create_note(db, NoteCreate(title="日志", content=BASE), test_user)
+        base = note.current_version
+        NoteService.update_note(db, note.id, NoteUpdate(content=BASE + "第五行\n"), test_user)
+        note = NoteService.patch_note(db, note.id, NotePatch(
+            base_version=base, ops=[NotePatchOp(offset=0, delete=3, insert="首行")]
+        ), test_user)
+        assert note.content == "首行\n第二行\n第三行\n第四行\n第五行\n"
+
+    def test_endpoint_etag(self, db, test_user):
+        """测试更新接口返回新的 ETag，使用旧 ETag 且修改冲突时返回 412"""
+        note = NoteService.create_note(db, NoteCreate(title="日志", content="abc"), test_user)
+        app.dependency_overrides[get_db] = lambda: db
+        app.dependency_overrides[get_current_user] = lambda: test_user
+        try:
+            client = TestClient(app, base_url="http://localhost")
+            etag = client.get("/notes/{}".format(note.id)).headers["etag"]
+            response = client.put("/notes/{}".format(note.id), json={"content": "abd"}, headers={"If-Match": etag})
+            assert response.status_code == 200
+            assert response.headers["etag"] not in (None, etag)
+            response = client.put("/notes/{}".format(note.id), json={"content": "x"}, headers={"If-Match": etag})
+            assert response.status_code == 412
+        finally:
+            app.dependency_overrides.clear()
@@ -0,0 +1,98 @@
+"""
+笔记链接单元测试
+测试链接提取、写入时的增量维护、反向链接、链接关系图以及重建
+"""
+
+from fastapi.testclient import TestClient
+
+from app.core.database import get_db
+from app.main import app
+from app.models.note import NoteBatchItem, NoteBatchRequest, NoteCreate, NoteUpdate
+from app.models.note_link import NoteLink
+from app.services.link_service import LinkService, extract_links
+from app.services.note_service import NoteService
+from app.utils.auth import get_current_user
+
+
+def _links(db, note_id):
+    return sorted(title for (title,) in db.query(NoteLink.dst_title).filter(NoteLink.src_note_id == note_id))
+
+
+def _titles(items):
+    return [item["title"] for item in items]
+
+
+class TestExtractLinks:
+    """链接提取测试类"""
+
+    def test_extract_links(self):
+        """测试别名和小节语法、去重以及忽略代码中的链接"""
+        content = "见 [[索引原理]] 和 [[ 查询优化 |优化]]、[[索引原理#B+ 树]]\n`[[行内]]`\n```\n[[代码块]]\n```\n[[]] [[跨\n行]]"
+        assert extract_links(content) == ["索引原理", "查询优化"]
+        assert extract_links("没有链接") == []
+
+
+class TestNoteLinks:
+    """链接维护和查询测试类"""
+
+    def test_links_follow_writes(self, db, test_user):
+        """测试创建、修改、恢复和批量写入时按差异维护链接，删除笔记时删除出链"""
+        note = NoteService.create_note(db, NoteCreate(title="A", content="[[B]] [[C]]"), test_user)
+        assert _links(db, note.id) == ["B", "C"]
+
+        NoteService.update_note(db, note.id, NoteUpdate(content="[[C]] [[D]]"), test_user)
+        assert _links(db, note.id) == ["C", "D"]
+
+        NoteService.restore_note_version(db, note.id, 1, test_user)
+        assert _links(db, note.id) == ["B", "C"]
+
+        NoteService.batch_notes(db, NoteBatchRequest(items=[
+            NoteBatchItem(op="update", note_id=note.id, content="[[E]]"),
+            NoteBatchItem(op="create", title="B", content="[[A]]"),
+        ]), test_user)
+        assert _links(db, note.id) == ["E"]
+
+        NoteService.delete_note(db, note.id, test_user)
+        assert _links(db, note.id) == []
+
+    def test_backlinks_and_graph(self, db, test_user):
+        """测试反向链接按标题解析（目标稍后创建或改名后生效），关系图按层扩展"""
+        hub = NoteService.create_note(db, NoteCreate(title="索引", content="[[B 树]] [[未创建]]"), test_user)
+        first = NoteService.create_note(db, NoteCreate(title="查询优化", content="参见 [[索引]]"), test_user)
+        NoteService.create_note(db, NoteCreate(title="其他", content="[[查询优化]]"), test_user)
+        NoteService.create_note(db, NoteCreate(title="自引用", content="[[自引用]]"), test_user)
+        tree = NoteService.create_note(db, NoteCreate(title="B 树", content="正文"), test_user)
+
+        assert _titles(NoteService.get_backlinks(db, hub.id, test_user)) == ["查询优化"]
+        assert NoteService.get_backlinks(db, tree.id, test_user) == [{"id": hub.id, "title": "索引"}]
+
+        graph = NoteService.get_link_graph(db, hub.id, test_user)
+        assert sorted(_titles(graph["nodes"])) == ["B 树", "查询优化", "索引"]
+        assert graph["edges"] == sorted([
+            {"source": hub.id, "target": tree.id}, {"source": first.id, "target": hub.id}
+        ], key=lambda edge: (edge["source"], edge["target"]))
+        assert graph["missing"] == ["未创建"]
+        assert "其他" in _titles(NoteService.get_link_graph(db, hub.id, test_user, depth=2)["nodes"])
+
+        NoteService.update_note(db, hub.id, NoteUpdate(title="索引原理"), test_user)
+        assert NoteService.get_backlinks(db, hub.id, test_user) == []
+
+    def test_rebuild_and_endpoints(self, db, test_user):
+        """测试按内容重建链接表以及反向链接和关系图接口"""
+        target = NoteService.create_note(db, NoteCreate(title="目标", content="正文"), test_user)
+        source = NoteService.create_note(db, NoteCreate(title="来源", content="[[目标]]"), test_user)
+        db.query(NoteLink).delete()
+        db.commit()
+        assert LinkService.rebuild(db, batch_size=1) == {"notes": 2, "links": 1}
+
+        app.dependency_overrides[get_db] = lambda: db
+        app.dependency_overrides[get_current_user] = lambda: test_user
+        try:
+            client = TestClient(app, base_url="http://localhost")
+            data = client.get("/notes/{}/backlinks".format(target.id)).json()["data"]
+            assert data["results"] == [{"id": source.id, "title": "来源"}]
+            data = client.get("/notes/{}/graph".format(source.id)).json()["data"]
+            assert data["edges"] == [{"source": source.id, "target": target.id}]
+            assert client.get("/notes/999999/backlinks").status_code == 404
+        finally:
+            app.dependency_overrides.clear()
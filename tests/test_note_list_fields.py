@@ -0,0 +1,70 @@
+"""
+笔记列表字段投影单元测试
+测试列表和搜索默认不加载正文、fields 参数选择返回字段
+"""
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from app.models.note import NoteCreate, NoteListItemOut, NoteQueryParams
+from app.services.note_service import NoteService
+
+
+@pytest.fixture
+def statements(db):
+    """记录测试期间执行的 SQL 语句"""
+    captured = []
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        captured.append(statement)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", before_execute)
+    yield captured
+    event.remove(engine, "before_cursor_execute", before_execute)
+
+
+def _note_selects(statements):
+    return [s for s in statements if s.lstrip().upper().startswith("SELECT") and "FROM notes" in s]
+
+
+class TestNoteListFields:
+    """笔记列表字段投影测试类"""
+
+    def test_default_list_skips_content(self, db, test_user, statements):
+        """测试默认列表视图不返回也不查询正文"""
+        NoteService.create_note(db, NoteCreate(title="A", content="很长的正文" * 100, tags=["t"]), test_user)
+        statements.clear()
+
+        result = NoteService.get_notes(db, test_user, NoteQueryParams())
+        item = result.items[0]
+        assert isinstance(item, NoteListItemOut)
+        assert (item.title, item.tags) == ("A", ["t"])
+        assert "content" not in item.model_dump()
+        assert all("notes.content" not in s for s in _note_selects(statements))
+
+    def test_fields_selects_columns(self, db, test_user, statements):
+        """测试 fields 参数只返回指定字段，并可按需加载正文"""
+        for title in ["A", "B", "C"]:
+            NoteService.create_note(db, NoteCreate(title=title, content="正文 " + title), test_user)
+
+        statements.clear()
+        first = NoteService.get_notes(db, test_user, NoteQueryParams(fields=["title"], sort="title", order="asc", size=2))
+        assert first.items == [{"id": first.items[0]["id"], "title": "A"}, {"id": first.items[1]["id"], "title": "B"}]
+        assert all("notes.content" not in s for s in _note_selects(statements))
+
+        rest = NoteService.get_notes(db, test_user, NoteQueryParams(
+            fields=["content"], sort="title", order="asc", size=2, cursor=first.pagination.next_cursor
+        ))
+        assert [item["content"] for item in rest.items] == ["正文 C"]
+
+        results = NoteService.search_notes(db, test_user, "正文", fields=["title", "updated_at"])
+        assert sorted(r["title"] for r in results) == ["A", "B", "C"]
+        assert set(results[0]) == {"id", "title", "updated_at"}
+
+    def test_unknown_field_is_rejected(self, db, test_user):
+        """测试不支持的字段返回 400"""
+        with pytest.raises(HTTPException) as exc:
+            NoteService.get_notes(db, test_user, NoteQueryParams(fields=["title", "password"]))
+        assert exc.value.status_code == 400
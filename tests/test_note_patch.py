@@ -0,0 +1,107 @@
+"""
+笔记补丁更新单元测试
+测试编辑操作和统一格式差异的应用、版本校验以及 PATCH 接口
+"""
+
+import difflib
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.core.database import get_db
+from app.main import app
+from app.models.note import NoteCreate, NotePatch, NotePatchOp
+from app.services.note_service import NoteService
+from app.utils.auth import get_current_user
+from app.utils.patch import PatchError, apply_ops, apply_unified_diff
+
+
+def _diff(old, new, context=3):
+    return "".join(difflib.unified_diff(old.splitlines(True), new.splitlines(True), "a", "b", n=context))
+
+
+class TestApplyPatch:
+    """补丁应用测试类"""
+
+    def test_apply_ops(self):
+        """测试按基准内容的字符位置应用多个编辑操作"""
+        assert apply_ops("你好，世界！", [(0, 2, "Hello"), (3, 2, "World"), (6, 0, "!!")]) == "Hello，World！!!"
+        assert apply_ops("abc", []) == "abc"
+        with pytest.raises(PatchError):
+            apply_ops("abc", [(2, 0, "x"), (1, 0, "y")])
+        with pytest.raises(PatchError):
+            apply_ops("abc", [(2, 2, "")])
+
+    def test_apply_unified_diff(self):
+        """测试应用多个差异块、在开头和末尾插入以及处理末尾没有换行符的文本"""
+        old = "".join("第 {} 行\n".format(i) for i in range(1, 21))
+        new = "开头\n" + old.replace("第 3 行", "第三行").replace("第 15 行\n", "") + "结尾"
+        assert apply_unified_diff(old, _diff(old, new)) == new
+        assert apply_unified_diff(old, _diff(old, new, context=0)) == new
+        assert apply_unified_diff(new, "--- a\n+++ b\n@@ -21 +21 @@\n-结尾\n\\ No newline at end of file\n+结束\n") \
+            == new[:-2] + "结束\n"
+        assert apply_unified_diff(old, "") == old
+
+    def test_mismatched_diff_rejected(self):
+        """测试上下文不一致或格式错误的差异被拒绝"""
+        old = "a\nb\nc\n"
+        with pytest.raises(PatchError):
+            apply_unified_diff(old, "@@ -2 +2 @@\n-x\n+y\n")
+        with pytest.raises(PatchError):
+            apply_unified_diff(old, "@@ -1,3 +1,3 @@\n a\n-b\n+B\n")
+        with pytest.raises(PatchError):
+            apply_unified_diff(old, "不是差异")
+
+
+class TestPatchNote:
+    """补丁更新测试类"""
+
+    def test_patch_with_ops_and_diff(self, db, test_user):
+        """测试按编辑操作和差异更新笔记，每次创建新版本"""
+        note = NoteService.create_note(db, NoteCreate(title="会议记录", content="第一行\n第二行\n"), test_user)
+        base = note.current_version
+
+        note = NoteService.patch_note(db, note.id, NotePatch(
+            base_version=base, ops=[NotePatchOp(offset=4, delete=3, insert="第 2 行")], title="周会记录"
+        ), test_user)
+        assert (note.title, note.content, note.current_version) == ("周会记录", "第一行\n第 2 行\n", base + 1)
+
+        note = NoteService.patch_note(db, note.id, NotePatch(
+            base_version=note.current_version, diff=_diff(note.content, note.content + "第三行\n")
+        ), test_user)
+        assert note.content == "第一行\n第 2 行\n第三行\n"
+        assert note.current_version == base + 2
+
+    def test_stale_base_and_bad_patch(self, db, test_user):
+        """测试基准版本无效的补丁返回 412，无法应用的补丁返回 422，同时提供两种格式返回 400"""
+        note = NoteService.create_note(db, NoteCreate(title="日志", content="abc"), test_user)
+        cases = [
+            (NotePatch(base_version=note.current_version + 1, ops=[]), 412),
+            (NotePatch(base_version=note.current_version, ops=[NotePatchOp(offset=5, insert="x")]), 422),
+            (NotePatch(base_version=note.current_version, ops=[], diff=""), 400),
+        ]
+        for patch, status_code in cases:
+            with pytest.raises(HTTPException) as exc:
+                NoteService.patch_note(db, note.id, patch, test_user)
+            assert exc.value.status_code == status_code
+        assert note.content == "abc"
+
+    def test_endpoint(self, db, test_user):
+        """测试 PATCH 接口返回不含正文的笔记信息"""
+        note = NoteService.create_note(db, NoteCreate(title="日志", content="abc"), test_user)
+        base = note.current_version
+        app.dependency_overrides[get_db] = lambda: db
+        app.dependency_overrides[get_current_user] = lambda: test_user
+        try:
+            client = TestClient(app, base_url="http://localhost")
+            response = client.patch("/notes/{}".format(note.id), json={
+                "base_version": base, "ops": [{"offset": 3, "insert": "d"}]
+            })
+            assert response.status_code == 200
+            data = response.json()["data"]
+            assert "content" not in data and data["current_version"] == base + 1
+            db.refresh(note)
+            assert note.content == "abcd"
+        finally:
+            app.dependency_overrides.clear()
@@ -0,0 +1,213 @@
+"""
+对象缓存单元测试
+使用内存中的 Redis 替身测试两级读取、提交后失效、跨进程失效广播和服务层集成
+"""
+
+import queue
+import threading
+import time
+
+import pytest
+
+from app.models.note import NoteCreate, NoteUpdate, NoteTagUpdate
+from app.services import object_cache as object_cache_module
+from app.services.note_service import NoteService
+from app.services.object_cache import CacheKind, ObjectCache, invalidate_on_commit
+from app.services.stats_service import StatsService
+from app.utils.auth import _load_user
+from app.utils.metrics import get_metrics
+
+
+class FakeRedis:
+    """Redis 替身：支持缓存读写、过期、流水线和发布订阅（多个客户端共享同一份数据）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+        self._subscribers = []
+
+    def get(self, name):
+        with self._lock:
+            entry = self._data.get(name)
+            if entry is None or (entry[1] is not None and entry[1] < time.monotonic()):
+                return None
+            return entry[0]
+
+    def set(self, name, value, ex=None, nx=False):
+        with self._lock:
+            current = self._data.get(name)
+            if nx and current is not None and (current[1] is None or current[1] >= time.monotonic()):
+                return None
+            value = value.encode("utf-8") if isinstance(value, str) else value
+            self._data[name] = (value, time.monotonic() + ex if ex else None)
+            return True
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = [q for ch, q in self._subscribers if ch == channel]
+        for q in subscribers:
+            q.put({"type": "message", "channel": channel, "data": message})
+        return len(subscribers)
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return _FakePubSub(self)
+
+
+class _FakePipeline:
+    def __init__(self, redis):
+        self._redis = redis
+        self._calls = []
+
+    def set(self, *args, **kwargs):
+        self._calls.append((self._redis.set, args, kwargs))
+
+    def publish(self, *args):
+        self._calls.append((self._redis.publish, args, {}))
+
+    def execute(self):
+        return [func(*args, **kwargs) for func, args, kwargs in self._calls]
+
+
+class _FakePubSub:
+    def __init__(self, redis):
+        self._redis = redis
+        self._queue = queue.Queue()
+
+    def subscribe(self, channel):
+        with self._redis._lock:
+            self._redis._subscribers.append((channel, self._queue))
+
+    def get_message(self, timeout=0.0):
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        with self._redis._lock:
+            self._redis._subscribers = [s for s in self._redis._subscribers if s[1] is not self._queue]
+
+
+def _wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def redis():
+    get_metrics().reset()
+    return FakeRedis()
+
+
+@pytest.fixture
+def workers(redis):
+    """两个共享同一 Redis 的工作进程缓存"""
+    caches = [ObjectCache(redis, capacity=16, ttl=60), ObjectCache(redis, capacity=16, ttl=60)]
+    for cache in caches:
+        cache.start()
+    yield caches
+    for cache in caches:
+        cache.stop()
+
+
+@pytest.fixture
+def cache(workers, monkeypatch):
+    """把第一个工作进程的缓存设为全局对象缓存"""
+    monkeypatch.setattr(object_cache_module, "_object_cache", workers[0])
+    monkeypatch.setattr(object_cache_module, "_object_cache_ready", True)
+    return workers[0]
+
+
+class TestObjectCache:
+    """对象缓存测试类"""
+
+    def test_tiers_and_hit_ratio(self, workers):
+        """测试本地层、Redis 层命中和按类型统计的命中率"""
+        first, second = workers
+        loads = []
+        loader = lambda: loads.append(1) or {"title": "A"}
+
+        assert first.get_or_load(CacheKind.NOTE, 1, loader) == {"title": "A"}
+        assert first.get_or_load(CacheKind.NOTE, 1, loader) == {"title": "A"}
+        assert second.get_or_load(CacheKind.NOTE, 1, loader) == {"title": "A"}
+        assert len(loads) == 1
+
+        stats = first.stats()
+        assert stats["note"]["requests"] == 3
+        assert stats["note"]["hit_ratio"] == round(2 / 3, 4)
+        assert stats["note"]["local_hit_ratio"] == round(1 / 3, 4)
+        assert get_metrics().get("object_cache.note.redis_hits") == 1
+
+    def test_invalidation_is_broadcast(self, workers):
+        """测试一个工作进程失效后，其他进程的本地副本被删除，且失效前读到的旧值无法回填"""
+        first, second = workers
+        first.fill(CacheKind.TAGS, 7, {"generation": 1})
+        assert second.get(CacheKind.TAGS, 7) == {"generation": 1}
+
+        first.invalidate([(CacheKind.TAGS, 7)])
+        assert _wait_for(lambda: second.make_key(CacheKind.TAGS, 7) not in second._entries)
+        assert second.get(CacheKind.TAGS, 7) is None
+        assert second.fill(CacheKind.TAGS, 7, {"generation": 1}) is False
+
+    def test_pending_invalidations_follow_transaction(self, db, cache):
+        """测试登记的失效在提交后执行，外层事务回滚时丢弃"""
+        cache.fill(CacheKind.NOTE, 1, {"title": "A"})
+        cache.fill(CacheKind.NOTE, 2, {"title": "B"})
+        db.connection()
+
+        invalidate_on_commit(db, CacheKind.NOTE, 1)
+        db.rollback()
+        db.commit()
+        assert cache.get(CacheKind.NOTE, 1) == {"title": "A"}
+
+        db.connection()
+        invalidate_on_commit(db, CacheKind.NOTE, 2)
+        assert cache.get(CacheKind.NOTE, 2) == {"title": "B"}
+        db.commit()
+        assert cache.get(CacheKind.NOTE, 2) is None
+
+
+class TestObjectCacheServices:
+    """对象缓存服务层集成测试类"""
+
+    def test_note_detail_cached_and_invalidated(self, db, test_user, test_note, cache, monkeypatch):
+        """测试笔记详情和 ETag 从缓存读取，修改笔记后失效"""
+        note = test_note
+        out, etag = NoteService.get_note_out(db, note.id, test_user)
+        assert out.content == note.content
+
+        # 缓存命中时不访问数据库
+        with monkeypatch.context() as m:
+            m.setattr(db, "query", None)
+            assert NoteService.get_note_out(db, note.id, test_user) == (out, etag)
+            assert NoteService.get_note_etag(db, note.id, test_user) == etag
+
+        NoteService.update_note(db, note.id, NoteUpdate(content="第二版"), test_user)
+        assert cache.get(CacheKind.NOTE, note.id) is None
+        out, new_etag = NoteService.get_note_out(db, note.id, test_user)
+        assert (out.content, out.current_version) == ("第二版", 2)
+        assert new_etag != etag
+
+    def test_tags_and_user_cached_and_invalidated(self, db, test_user, cache):
+        """测试标签计数和认证用户的缓存及失效"""
+        assert NoteService.get_user_tags(db, test_user) == []
+        assert cache.get(CacheKind.TAGS, test_user.id)["tag_counts"] == {}
+
+        note = NoteService.create_note(db, NoteCreate(title="A", content="内容", tags=["a"]), test_user)
+        assert cache.get(CacheKind.TAGS, test_user.id) is None
+        assert NoteService.get_user_tags(db, test_user) == ["a"]
+
+        NoteService.update_note_tags(db, note.id, NoteTagUpdate(tags=["b"]), test_user)
+        assert NoteService.get_user_tags(db, test_user) == ["b"]
+        assert StatsService.read_tags(db, test_user.id)["tag_counts"] == {"b": 1}
+
+        user = _load_user(db, test_user.username)
+        assert (user.id, user.hashed_password) == (test_user.id, None)
+        assert cache.get(CacheKind.USER, test_user.username)["id"] == test_user.id
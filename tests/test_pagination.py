@@ -0,0 +1,108 @@
+"""
+键集分页单元测试
+测试游标编码、翻页完整性和参数校验
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event, text
+
+from app.core.database import _normalize_sqlite_timestamps
+from app.models.note import Note
+from app.utils.pagination import decode_cursor, encode_cursor, keyset_paginate
+
+
+class TestCursor:
+    """游标编解码测试类"""
+
+    def test_round_trip(self):
+        """测试游标编码后可以还原排序键和 ID"""
+        updated_at = datetime(2024, 1, 2, 3, 4, 5)
+        cursor = encode_cursor("updated_at", "desc", updated_at, 42)
+        assert decode_cursor(cursor, "updated_at", "desc") == (updated_at, 42)
+
+    def test_invalid_cursor(self):
+        """测试无效游标返回 400"""
+        with pytest.raises(HTTPException) as exc_info:
+            decode_cursor("not-a-cursor", "updated_at", "desc")
+        assert exc_info.value.status_code == 400
+
+    def test_sort_mismatch(self):
+        """测试游标与排序参数不一致时返回 400"""
+        cursor = encode_cursor("title", "asc", "a", 1)
+        with pytest.raises(HTTPException) as exc_info:
+            decode_cursor(cursor, "title", "desc")
+        assert exc_info.value.status_code == 400
+
+
+class TestKeysetPaginate:
+    """键集分页测试类"""
+
+    @pytest.mark.parametrize("order", ["desc", "asc"])
+    def test_pages_cover_all_rows_once(self, db, test_user, order):
+        """测试排序键重复、混有数据库默认时间戳时逐页遍历不重复、不遗漏"""
+        base = datetime(2024, 1, 1)
+        db.add_all([
+            Note(
+                title="笔记 {}".format(i),
+                content="内容",
+                tags=[],
+                user_id=test_user.id,
+                updated_at=base + timedelta(minutes=i // 3)
+            )
+            for i in range(10)
+        ])
+        # 使用数据库默认时间戳的笔记
+        db.add_all([
+            Note(title="默认时间 {}".format(i), content="内容", tags=[], user_id=test_user.id)
+            for i in range(3)
+        ])
+        db.commit()
+
+        query = db.query(Note).filter(Note.user_id == test_user.id)
+        seen, cursor = [], None
+        while True:
+            rows, cursor = keyset_paginate(
+                query, Note.updated_at, Note.id, "updated_at", order, 4, cursor
+            )
+            seen.extend(note.id for note in rows)
+            if cursor is None:
+                break
+
+        expected = query.order_by(Note.updated_at, Note.id).all()
+        expected_ids = [note.id for note in expected]
+        if order == "desc":
+            expected_ids.reverse()
+        assert seen == expected_ids
+
+    def test_sqlite_timestamps_use_index(self, db, test_user):
+        """测试 SQLite 历史时间值补齐为统一格式，键集分页的比较和排序由复合索引完成"""
+        db.add(Note(title="旧笔记", content="内容", tags=[], user_id=test_user.id))
+        db.commit()
+        db.execute(text("UPDATE notes SET updated_at = '2024-01-01 00:00:00'"))
+        db.commit()
+        _normalize_sqlite_timestamps(db.get_bind())
+        assert db.execute(text("SELECT updated_at FROM notes")).scalar() == "2024-01-01 00:00:00.000000"
+
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        engine = db.get_bind()
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            cursor = encode_cursor("updated_at", "desc", datetime(2025, 1, 1), 1)
+            keyset_paginate(db.query(Note.id).filter(Note.user_id == test_user.id),
+                            Note.updated_at, Note.id, "updated_at", "desc", 10, cursor)
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+
+        statement, parameters = statements[-1]
+        plan = " ".join(str(row[-1]) for row in db.connection().exec_driver_sql(
+            "EXPLAIN QUERY PLAN " + statement, parameters
+        ))
+        assert "ix_notes_user_updated_id" in plan
+        assert "TEMP B-TREE" not in plan
@@ -0,0 +1,92 @@
+"""
+相关笔记向量索引单元测试
+测试向量相似度排序、增量写入和删除、多进程可见性、重建以及服务接入
+"""
+
+import pytest
+
+from app.models.note import NoteCreate, NoteUpdate
+from app.services import related_index as related_module
+from app.services.note_service import NoteService
+from app.services.related_index import RelatedIndex
+
+
+DATABASE = "数据库索引使用 B+ 树组织数据，查询时按索引查找可以减少磁盘读取。"
+DATABASE_2 = "为数据库的查询条件建立合适的索引，磁盘读取次数明显减少，查询更快。"
+COOKING = "红烧肉需要先焯水，再加入冰糖炒糖色，最后小火慢炖一个小时。"
+
+
+def _ids(ranked):
+    return [note_id for note_id, _ in ranked]
+
+
+class TestRelatedIndex:
+    """相关笔记索引测试类"""
+
+    def test_ranks_by_content_similarity(self, tmp_path):
+        """测试按相似度排序、排除自身并只返回同一用户的笔记"""
+        index = RelatedIndex(str(tmp_path))
+        index.index_notes([
+            (1, 1, "索引原理", DATABASE),
+            (2, 1, "查询优化", DATABASE_2),
+            (3, 1, "菜谱", COOKING),
+            (4, 2, "索引", DATABASE),
+        ])
+        ranked = index.related(1, 1, limit=5)
+        assert _ids(ranked)[0] == 2
+        assert 1 not in _ids(ranked) and 4 not in _ids(ranked)
+        assert ranked == sorted(ranked, key=lambda item: -item[1])
+        assert index.related(1, 1, limit=1) == ranked[:1]
+
+    def test_updates_and_removals_visible_to_other_processes(self, tmp_path):
+        """测试一个实例追加的更新和删除对共享目录的其他实例可见"""
+        writer, reader = RelatedIndex(str(tmp_path)), RelatedIndex(str(tmp_path))
+        writer.index_notes([(1, 1, "索引原理", DATABASE), (2, 1, "查询优化", DATABASE_2), (3, 1, "菜谱", COOKING)])
+        assert _ids(reader.related(1, 1))[0] == 2
+
+        writer.index_note(3, 1, "索引原理", DATABASE)
+        assert _ids(reader.related(1, 1))[0] == 3
+        writer.remove_note(3, 1)
+        writer.remove_note(2, 1)
+        assert 3 not in _ids(reader.related(1, 1)) and 2 not in _ids(reader.related(1, 1))
+
+    def test_unindexed_note_uses_text(self, tmp_path):
+        """测试笔记尚未索引时使用传入的文本计算查询向量"""
+        index = RelatedIndex(str(tmp_path))
+        index.index_notes([(2, 1, "查询优化", DATABASE_2), (3, 1, "菜谱", COOKING)])
+        assert index.related(1, 9, text=("索引原理", DATABASE))[0][0] == 2
+        assert index.related(1, 9) == []
+
+    def test_rebuild_drops_superseded_records(self, tmp_path):
+        """测试重建后只保留每篇笔记一条记录，已打开的实例读取新文件"""
+        index = RelatedIndex(str(tmp_path))
+        for _ in range(3):
+            index.index_notes([(1, 1, "索引原理", DATABASE), (2, 1, "查询优化", DATABASE_2)])
+        index.index_note(5, 3, "菜谱", COOKING)
+        assert index.related(1, 1)
+
+        assert index.rebuild([(1, 1, "索引原理", DATABASE), (3, 1, "菜谱", COOKING)]) == 2
+        assert len(index._user(1).rows) == 2
+        assert 2 not in _ids(index.related(1, 1))
+        assert index.related(3, 5) == [] and len(index._user(3).rows) == 0
+
+
+class TestRelatedNotesService:
+    """相关笔记服务接入测试类"""
+
+    @pytest.fixture(autouse=True)
+    def _index(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(related_module, "_related_index", RelatedIndex(str(tmp_path)))
+
+    def test_notes_indexed_on_write(self, db, test_user):
+        """测试创建、修改和删除笔记时同步更新相关笔记索引"""
+        first = NoteService.create_note(db, NoteCreate(title="索引原理", content=DATABASE), test_user)
+        second = NoteService.create_note(db, NoteCreate(title="菜谱", content=COOKING), test_user)
+
+        NoteService.update_note(db, second.id, NoteUpdate(title="查询优化", content=DATABASE_2), test_user)
+        related = NoteService.get_related_notes(db, first.id, test_user)
+        assert related[0]["id"] == second.id
+        assert related[0]["title"] == "查询优化"
+
+        NoteService.delete_note(db, second.id, test_user)
+        assert second.id not in [item["id"] for item in NoteService.get_related_notes(db, first.id, test_user)]
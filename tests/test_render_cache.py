@@ -0,0 +1,109 @@
+"""
+Markdown 渲染缓存单元测试
+测试渲染输出的安全处理、内存层和磁盘层命中、渲染进程池以及 format=html 接口
+"""
+
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.database import get_db
+from app.main import app
+from app.services import render_cache as render_module
+from app.services.render_cache import RenderCache, render_key, render_markdown
+from app.utils.auth import get_current_user
+from app.utils.metrics import get_metrics
+
+
+class TestRenderMarkdown:
+    """Markdown 渲染测试类"""
+
+    def test_renders_extra_syntax(self):
+        """测试标题、表格和代码渲染"""
+        html = render_markdown("# 标题\n\n| a | b |\n|---|---|\n| 1 | 2 |\n\n`code`")
+        assert "<h1>标题</h1>" in html
+        assert "<td>1</td>" in html
+        assert "<code>code</code>" in html
+
+    def test_raw_html_and_unsafe_urls_removed(self):
+        """测试原始 HTML 被转义，不安全协议的地址被移除"""
+        html = render_markdown("<script>alert(1)</script>\n\n[a](javascript:alert(1)) [b](java\tscript:x) [c](https://x.org) [d](/notes/1)")
+        assert "<script>" not in html and "&lt;script&gt;" in html
+        assert "javascript" not in html and "script:x" not in html
+        assert 'href="https://x.org"' in html and 'href="/notes/1"' in html
+
+
+class TestRenderCache:
+    """渲染缓存测试类"""
+
+    @pytest.fixture(autouse=True)
+    def _metrics(self):
+        get_metrics().reset()
+        yield
+        get_metrics().reset()
+
+    def test_memory_and_disk_layers(self, tmp_path):
+        """测试首次渲染后由内存层命中，新进程由磁盘层命中"""
+        cache = RenderCache(str(tmp_path), capacity=8)
+        html = cache.render("# 标题")
+        assert cache.render("# 标题") == html
+        assert os.path.exists(os.path.join(str(tmp_path), render_key("# 标题")[:2], render_key("# 标题") + ".html"))
+
+        other = RenderCache(str(tmp_path), capacity=8)
+        assert other.render("# 标题") == html
+        metrics = get_metrics()
+        assert (metrics.get("render_cache.renders"), metrics.get("render_cache.memory_hits"),
+                metrics.get("render_cache.disk_hits")) == (1, 1, 1)
+
+    def test_renders_in_worker_process(self, tmp_path):
+        """测试渲染进程池返回与直接渲染相同的结果"""
+        cache = RenderCache(None, capacity=0, workers=1)
+        try:
+            assert cache.render("*强调*") == render_markdown("*强调*")
+        finally:
+            cache.close()
+
+    def test_prune_removes_stale_files(self, tmp_path):
+        """测试按最近访问时间清理磁盘层"""
+        cache = RenderCache(str(tmp_path), capacity=0)
+        cache.render("旧内容")
+        cache.render("新内容")
+        old_path = cache._path(render_key("旧内容"))
+        os.utime(old_path, (0, 0))
+
+        assert cache.prune(1) == 1
+        assert not os.path.exists(old_path)
+        assert os.path.exists(cache._path(render_key("新内容")))
+
+
+class TestHtmlFormat:
+    """format=html 接口测试类"""
+
+    @pytest.fixture
+    def api(self, db, test_user, tmp_path, monkeypatch):
+        """不启动后台任务的测试客户端，直接使用测试用户"""
+        monkeypatch.setattr(render_module, "_render_cache", RenderCache(str(tmp_path), capacity=8))
+        app.dependency_overrides[get_db] = lambda: db
+        app.dependency_overrides[get_current_user] = lambda: test_user
+        yield TestClient(app, base_url="http://localhost")
+        app.dependency_overrides.clear()
+
+    def test_note_and_version_html(self, api, test_note):
+        """测试笔记详情和历史版本返回渲染后的 HTML，HTML 响应使用不同的 ETag"""
+        plain = api.get("/notes/{}".format(test_note.id))
+        html = api.get("/notes/{}".format(test_note.id), params={"format": "html"})
+        assert plain.json()["data"]["content_html"] is None
+        assert html.json()["data"]["content_html"].startswith("<h1>测试内容</h1>")
+        assert html.headers["etag"] != plain.headers["etag"]
+        assert api.get(
+            "/notes/{}".format(test_note.id), params={"format": "html"},
+            headers={"If-None-Match": html.headers["etag"]}
+        ).status_code == 304
+        assert api.get(
+            "/notes/{}".format(test_note.id), params={"format": "html"},
+            headers={"If-None-Match": plain.headers["etag"]}
+        ).status_code == 200
+
+        version = api.get("/notes/{}/versions/1".format(test_note.id), params={"format": "html"})
+        assert version.json()["data"]["content_html"] == html.json()["data"]["content_html"]
@@ -0,0 +1,205 @@
+"""
+全文索引单元测试
+测试分词、BM25 排序、增量更新和多进程可见性
+"""
+
+import pytest
+from sqlalchemy import text
+
+from app.services.search_index import SearchIndex
+from app.utils.tokenizer import tokenize, tokenize_query, tokenize_with_offsets
+
+
+class TestTokenizer:
+    """分词器测试类"""
+
+    def test_latin_words_lowercased(self):
+        """测试拉丁单词切分和小写化"""
+        assert tokenize("FastAPI and SQLAlchemy 2.0") == ["fastapi", "and", "sqlalchemy", "2", "0"]
+
+    def test_non_ascii_words(self):
+        """测试带重音的拉丁单词和西里尔单词作为完整词元"""
+        assert tokenize("Café Привет, мир") == ["café", "привет", "мир"]
+        assert tokenize("naïve 笔记") == ["naïve", "笔", "笔记", "记"]
+
+    def test_cjk_unigram_and_bigram(self):
+        """测试 CJK 文本生成单字和双字词元"""
+        assert tokenize("知识库") == ["知", "知识", "识", "识库", "库"]
+
+    def test_query_uses_bigrams(self):
+        """测试查询分词只使用双字词元"""
+        assert tokenize_query("知识库") == ["知识", "识库"]
+        assert tokenize_query("知") == ["知"]
+        assert tokenize_query("笔记 笔记 Python") == ["笔记", "python"]
+
+    def test_offsets_refer_to_original_text(self):
+        """测试小写化改变长度（如 "İ"）时，偏移仍指向原文位置"""
+        text = "İstanbul 的 Python 笔记"
+        spans = {token: text[start:end] for token, start, end in tokenize_with_offsets(text)}
+        assert spans["python"] == "Python"
+        assert spans["笔记"] == "笔记"
+
+
+@pytest.fixture
+def search_index(tmp_path):
+    """已完成重建的索引 fixture"""
+    index = SearchIndex(str(tmp_path))
+    index.rebuild([
+        (1, 1, "Python 入门", "Python 是一门编程语言"),
+        (2, 1, "FastAPI 教程", "FastAPI 基于 Python 构建 Web 服务"),
+        (3, 1, "读书笔记", "今天读了一本关于知识管理的书"),
+        (4, 2, "Python 技巧", "其他用户的 Python 笔记"),
+    ])
+    return index
+
+
+class TestSearchIndex:
+    """全文索引测试类"""
+
+    def test_not_ready_before_rebuild(self, tmp_path):
+        """测试索引未重建时返回 None 以便降级"""
+        index = SearchIndex(str(tmp_path))
+        assert not index.is_ready()
+        assert index.search(1, "python") is None
+
+    def test_search_is_scoped_to_user(self, search_index):
+        """测试检索结果只包含当前用户的笔记"""
+        ids = [note_id for note_id, _ in search_index.search(1, "python")]
+        assert sorted(ids) == [1, 2]
+        assert [note_id for note_id, _ in search_index.search(2, "python")] == [4]
+
+    def test_bm25_ranks_higher_term_frequency_first(self, search_index):
+        """测试词频更高的笔记排在前面"""
+        ranked = search_index.search(1, "python")
+        assert ranked[0][0] == 1
+        assert ranked[0][1] > ranked[1][1]
+
+    def test_all_terms_must_match(self, search_index):
+        """测试多个词项为 AND 语义"""
+        assert [note_id for note_id, _ in search_index.search(1, "python fastapi")] == [2]
+        assert search_index.search(1, "python 知识") == []
+
+    def test_cjk_search(self, search_index):
+        """测试中文检索"""
+        assert [note_id for note_id, _ in search_index.search(1, "知识管理")] == [3]
+
+    def test_incremental_update_and_delete(self, search_index):
+        """测试增量更新覆盖段中的旧内容"""
+        search_index.index_note(3, 1, "读书笔记", "改为记录 Rust 学习")
+        assert search_index.search(1, "知识管理") == []
+        assert [note_id for note_id, _ in search_index.search(1, "rust")] == [3]
+
+        search_index.index_note(5, 1, "新笔记", "Rust 所有权")
+        assert sorted(note_id for note_id, _ in search_index.search(1, "rust")) == [3, 5]
+
+        search_index.remove_note(3)
+        assert [note_id for note_id, _ in search_index.search(1, "rust")] == [5]
+
+    def test_writes_visible_to_other_instances(self, tmp_path, search_index):
+        """测试其他进程（实例）能看到增量日志中的写入"""
+        other = SearchIndex(str(tmp_path))
+        assert other.search(1, "rust") == []
+
+        search_index.index_note(6, 1, "Rust", "Rust 笔记")
+        assert [note_id for note_id, _ in other.search(1, "rust")] == [6]
+
+    def test_rebuild_keeps_pending_log_entries(self, tmp_path, search_index):
+        """测试重建期间并发写入的条目保留到新一代日志"""
+        def documents():
+            yield 1, 1, "Python 入门", "Python 是一门编程语言"
+            search_index.index_note(7, 1, "Go 语言", "Go 并发")
+
+        search_index.rebuild(documents())
+
+        other = SearchIndex(str(tmp_path))
+        assert [note_id for note_id, _ in other.search(1, "go")] == [7]
+        assert [note_id for note_id, _ in other.search(1, "python")] == [1]
+
+    def test_rebuild_drops_merged_log_entries(self, tmp_path, search_index):
+        """测试重建开始前的日志条目已包含在新段中，不再复制到新一代日志"""
+        search_index.index_note(7, 1, "Go 语言", "Go 并发")
+        search_index.rebuild([(1, 1, "Python 入门", "Python 是一门编程语言"), (7, 1, "Go 语言", "Go 并发")])
+
+        assert not (tmp_path / "delta-2.log").exists()
+        other = SearchIndex(str(tmp_path))
+        assert [note_id for note_id, _ in other.search(1, "go")] == [7]
+
+    def test_log_compacted_after_threshold(self, tmp_path, search_index):
+        """测试增量日志超过条目数阈值后自动合并为新段"""
+        index = SearchIndex(str(tmp_path), compact_log_entries=3)
+        index.index_note(3, 1, "读书笔记", "改为记录 Rust 学习")
+        index.index_note(5, 1, "新笔记", "Rust 所有权")
+        index.remove_note(2)
+        index._compact_thread.join()
+
+        assert (tmp_path / "CURRENT").read_text() == "2"
+        assert not (tmp_path / "delta-1.log").exists()
+        assert not (tmp_path / "delta-2.log").exists()
+
+        other = SearchIndex(str(tmp_path))
+        assert sorted(note_id for note_id, _ in other.search(1, "rust")) == [3, 5]
+        assert [note_id for note_id, _ in other.search(1, "python")] == [1]
+        assert other.search(1, "知识管理") == []
+        assert [note_id for note_id, _ in other.search(2, "python")] == [4]
+
+        # 合并后的写入记录在新一代日志中
+        other.index_note(8, 1, "Rust", "Rust 宏")
+        assert sorted(note_id for note_id, _ in index.search(1, "rust")) == [3, 5, 8]
+
+
+class TestNoteSearch:
+    """笔记列表搜索测试类"""
+
+    def test_user_filter_applies_to_search(self, db, test_user, test_superuser, tmp_path, monkeypatch):
+        """测试超级用户按用户筛选时返回该用户的笔记，关键词搜索与不搜索范围一致"""
+        from app.models.note import NoteCreate, NoteQueryParams
+        from app.services.note_service import NoteService
+
+        index = SearchIndex(str(tmp_path))
+        monkeypatch.setattr("app.services.note_service.get_search_index", lambda: index)
+        notes = [
+            NoteService.create_note(db, NoteCreate(title="Python 入门", content="内容"), test_superuser),
+            NoteService.create_note(db, NoteCreate(title="Python 技巧", content="内容"), test_user),
+            NoteService.create_note(db, NoteCreate(title="Python 进阶", content="内容", tags=["py"]), test_user),
+        ]
+        index.rebuild([(note.id, note.user_id, note.title, note.content) for note in notes])
+
+        def ids(**params):
+            result = NoteService.get_notes(db, test_superuser, NoteQueryParams(user_id=test_user.id, **params))
+            return sorted(item.id for item in result.items)
+
+        expected = sorted(note.id for note in notes[1:])
+        assert ids() == expected
+        assert ids(search="python") == expected
+        assert ids(search="python", tags=["py"]) == ids(tags=["py"]) == [notes[2].id]
+        assert NoteService.get_notes(db, test_superuser, NoteQueryParams(user_id=test_user.id)).pagination.total == 2
+
+
+class TestSqliteFtsBackend:
+    """SQLite FTS5 检索后端测试类"""
+
+    def test_fts_search_ranks_and_tracks_updates(self, db, test_user):
+        """测试 FTS5 表由触发器同步并参与检索"""
+        from app.models.note import Note
+        from app.services.search_backends import SqliteFtsSearchBackend
+
+        backend = SqliteFtsSearchBackend()
+        backend.setup(db.connection())
+        try:
+            first = Note(title="FastAPI 教程", content="FastAPI 与 FastAPI 依赖注入", tags=[], user_id=test_user.id)
+            second = Note(title="读书笔记", content="提到了 fastapi", tags=[], user_id=test_user.id)
+            db.add_all([first, second])
+            db.commit()
+
+            assert backend.is_available(db)
+            query = db.query(Note).filter(Note.user_id == test_user.id)
+            assert [note.id for note in backend.apply(query, "fastapi").all()] == [first.id, second.id]
+
+            second.content = "改为记录 Rust"
+            db.commit()
+            assert [note.id for note in backend.apply(query, "fastapi").all()] == [first.id]
+            assert not backend.supports("py")
+        finally:
+            db.rollback()
+            db.execute(text("DROP TABLE IF EXISTS notes_fts"))
+            db.commit()
@@ -0,0 +1,81 @@
+"""
+搜索摘录单元测试
+测试命中位置、高亮区间合并、摘录窗口选择以及搜索结果附带摘录
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.database import get_db
+from app.main import app
+from app.models.note import NoteCreate
+from app.services.note_service import NoteService
+from app.utils.auth import get_current_user
+from app.utils.snippets import build_snippets, highlight, query_terms
+
+
+def _highlighted(snippet):
+    return [snippet["text"][start:end] for start, end in snippet["highlights"]]
+
+
+class TestSnippets:
+    """摘录生成测试类"""
+
+    def test_cjk_bigrams_merge_into_one_highlight(self):
+        """测试 CJK 双字词元的相邻命中合并为一个高亮区间，英文不区分大小写"""
+        terms = query_terms("知识库 python")
+        assert highlight("我的知识库", terms, 1000) == [[2, 5]]
+        assert highlight("PYTHON 笔记", terms, 1000) == [[0, 6]]
+        assert highlight("知道书库", terms, 1000) == []
+        assert highlight("İİ PYTHON", terms, 1000) == [[3, 9]]
+
+    def test_picks_windows_covering_most_terms(self):
+        """测试优先选择覆盖不同查询词最多的窗口，结果按位置排列且互不重叠"""
+        text = "Python 入门。" + "无关内容。" * 40 + "用知识库整理 Python 笔记。" + "其他" * 60 + "知识库"
+        snippets = build_snippets(text, query_terms("知识库 python"), 2, 30, 10000)
+
+        assert len(snippets) == 2
+        assert snippets[0]["offset"] < snippets[1]["offset"]
+        assert snippets[0]["offset"] + 30 <= snippets[1]["offset"]
+        both = [snippet for snippet in snippets if sorted(_highlighted(snippet)) == ["Python", "知识库"]]
+        assert len(both) == 1
+        for snippet in snippets:
+            start = snippet["offset"]
+            assert snippet["text"] == text[start:start + len(snippet["text"])].replace("\n", " ")
+
+    def test_scan_is_bounded(self):
+        """测试只扫描正文开头，未命中时返回开头的摘录"""
+        text = "开头\n第二行" + "填充" * 100 + "知识库"
+        snippets = build_snippets(text, query_terms("知识库"), 2, 10, 50)
+        assert snippets == [{"text": "开头 第二行填充填充", "offset": 0, "highlights": []}]
+        assert build_snippets("", query_terms("知识库"), 2, 10, 50) == []
+
+
+class TestSearchSnippets:
+    """搜索结果摘录测试类"""
+
+    @pytest.fixture
+    def api(self, db, test_user):
+        """不启动后台任务的测试客户端，直接使用测试用户"""
+        app.dependency_overrides[get_db] = lambda: db
+        app.dependency_overrides[get_current_user] = lambda: test_user
+        yield TestClient(app, base_url="http://localhost")
+        app.dependency_overrides.clear()
+
+    def test_results_carry_snippets_without_content(self, api, db, test_user):
+        """测试搜索结果附带标题高亮和摘录但不含正文，fields 视图同样附带，snippets=0 时不生成"""
+        NoteService.create_note(db, NoteCreate(
+            title="数据库索引", content="# 笔记\n" + "背景介绍。" * 50 + "B+ 树索引减少磁盘读取。"
+        ), test_user)
+
+        result = api.get("/notes/search", params={"query": "索引"}).json()["data"]["results"][0]
+        assert "content" not in result
+        assert result["title_highlights"] == [[3, 5]]
+        assert [_highlighted(snippet) for snippet in result["snippets"]] == [["索引"]]
+
+        result = api.get("/notes/search", params={"query": "索引", "fields": "title", "snippets": 1}).json()
+        item = result["data"]["results"][0]
+        assert set(item) == {"id", "title", "title_highlights", "snippets"}
+
+        item = api.get("/notes/search", params={"query": "索引", "snippets": 0}).json()["data"]["results"][0]
+        assert "snippets" not in item and "content" not in item
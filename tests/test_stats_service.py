@@ -0,0 +1,59 @@
+"""
+用户统计服务单元测试
+测试计数的增量维护、懒初始化和对账修复
+"""
+
+from app.models.note import Note, NoteCreate, NoteTagUpdate
+from app.models.stats import UserStats
+from app.services.note_service import NoteService
+from app.services.stats_service import StatsService
+
+
+class TestStatsService:
+    """用户统计服务测试类"""
+
+    def test_counts_follow_note_lifecycle(self, db, test_user):
+        """测试创建、改标签、删除笔记时同步维护计数"""
+        first = NoteService.create_note(db, NoteCreate(title="A", content="内容", tags=["python", "web"]), test_user)
+        NoteService.create_note(db, NoteCreate(title="B", content="内容", tags=["python"]), test_user)
+
+        stats = StatsService.get_user_stats(db, test_user.id)
+        assert stats.note_count == 2
+        assert stats.tag_counts == {"python": 2, "web": 1}
+
+        NoteService.update_note_tags(db, first.id, NoteTagUpdate(tags=["rust"]), test_user)
+        assert StatsService.get_user_stats(db, test_user.id).tag_counts == {"python": 1, "rust": 1}
+        assert NoteService.get_user_tags(db, test_user) == ["python", "rust"]
+
+        NoteService.delete_note(db, first.id, test_user)
+        stats = StatsService.get_user_stats(db, test_user.id)
+        assert stats.note_count == 1
+        assert stats.tag_counts == {"python": 1}
+
+    def test_lazy_initialization_from_existing_rows(self, db, test_user):
+        """测试统计行缺失时按已有数据计算"""
+        db.add_all([
+            Note(title="旧笔记 {}".format(i), content="内容", tags=["a"], user_id=test_user.id)
+            for i in range(3)
+        ])
+        db.commit()
+
+        stats = StatsService.get_user_stats(db, test_user.id)
+        assert stats.note_count == 3
+        assert stats.tag_counts == {"a": 3}
+        assert db.query(UserStats).filter(UserStats.user_id == test_user.id).count() == 1
+
+    def test_reconcile_fixes_drift(self, db, test_user):
+        """测试对账修复纠正偏差的计数"""
+        NoteService.create_note(db, NoteCreate(title="A", content="内容", tags=["x"]), test_user)
+        db.query(UserStats).filter(UserStats.user_id == test_user.id).update({
+            UserStats.note_count: 10,
+            UserStats.tag_counts: {}
+        })
+        db.commit()
+
+        assert StatsService.reconcile_all(db) == {"checked": 1, "fixed": 1}
+        stats = StatsService.get_user_stats(db, test_user.id)
+        assert stats.note_count == 1
+        assert stats.tag_counts == {"x": 1}
+        assert StatsService.reconcile_all(db) == {"checked": 1, "fixed": 0}
@@ -0,0 +1,116 @@
+"""
+标题和标签前缀补全单元测试
+测试前缀匹配与排序、增量更新、过期重新加载、用户淘汰以及接口
+"""
+
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.database import get_db
+from app.main import app
+from app.models.note import NoteCreate, NoteTagUpdate, NoteUpdate
+from app.services import suggest_index as suggest_module
+from app.services.note_service import NoteService
+from app.services.suggest_index import SuggestIndex, _UserSuggestions
+from app.utils.auth import get_current_user
+from app.utils.metrics import get_metrics
+
+
+def _titles(result):
+    return [note["title"] for note in result["notes"]]
+
+
+class TestUserSuggestions:
+    """单用户前缀索引测试类"""
+
+    def test_prefix_matching_and_order(self):
+        """测试标题开头匹配排在单词开头匹配之前，不区分大小写，标签附带笔记数"""
+        view = _UserSuggestions([
+            (1, "Python 入门", ["编程", "Python"]),
+            (2, "学习 Python", ["编程"]),
+            (3, "pytest 用法", []),
+            (4, "数据库索引", ["数据库"]),
+        ])
+        assert _titles(view.suggest("py", 10)) == ["pytest 用法", "Python 入门", "学习 Python"]
+        assert _titles(view.suggest("py", 2)) == ["pytest 用法", "Python 入门"]
+        assert _titles(view.suggest("入门", 10)) == ["Python 入门"]
+        assert _titles(view.suggest("库", 10)) == []
+        assert view.suggest("编", 10)["tags"] == [{"tag": "编程", "count": 2}]
+
+    def test_incremental_updates(self):
+        """测试新增、修改和删除笔记后索引与重新构建的结果一致"""
+        view = _UserSuggestions([(1, "Python 入门", ["编程"]), (2, "学习 Python", ["编程"])])
+        view.put(3, "Go 入门", ["编程", "Go"])
+        view.put(1, "Rust 入门", ["Rust"])
+        view.remove(2)
+        view.remove(9)
+
+        rebuilt = _UserSuggestions([(1, "Rust 入门", ["Rust"]), (3, "Go 入门", ["编程", "Go"])])
+        assert (view.titles, view.words, view.tags) == (rebuilt.titles, rebuilt.words, rebuilt.tags)
+        assert view.suggest("编", 10)["tags"] == [{"tag": "编程", "count": 1}]
+        assert _titles(view.suggest("py", 10)) == []
+
+    def test_lookup_latency(self):
+        """测试两万篇笔记时单次补全在毫秒级完成"""
+        view = _UserSuggestions((i, "笔记 {} note-{}".format(i, i), ["tag{}".format(i % 100)]) for i in range(20000))
+        start = time.perf_counter()
+        for prefix in ("note-1", "笔记", "tag", "n"):
+            for _ in range(100):
+                view.suggest(prefix, 10)
+        assert (time.perf_counter() - start) / 400 < 0.001
+
+
+class TestSuggestIndex:
+    """补全索引测试类"""
+
+    @pytest.fixture(autouse=True)
+    def _index(self, monkeypatch):
+        get_metrics().reset()
+        monkeypatch.setattr(suggest_module, "_suggest_index", SuggestIndex(max_users=2, ttl=60))
+        yield
+        get_metrics().reset()
+
+    def test_loads_lazily_and_follows_writes(self, db, test_user):
+        """测试首次查询时加载，之后的创建、修改、标签更新和删除直接更新内存索引"""
+        note = NoteService.create_note(db, NoteCreate(title="Python 入门", content="正文", tags=["编程"]), test_user)
+        assert _titles(NoteService.suggest_notes(db, test_user, "py")) == ["Python 入门"]
+
+        other = NoteService.create_note(db, NoteCreate(title="Pytest 用法", content="正文"), test_user)
+        NoteService.update_note(db, note.id, NoteUpdate(title="Rust 入门"), test_user)
+        NoteService.update_note_tags(db, other.id, NoteTagUpdate(tags=["测试"]), test_user)
+        assert _titles(NoteService.suggest_notes(db, test_user, "py")) == ["Pytest 用法"]
+        assert NoteService.suggest_notes(db, test_user, "测")["tags"] == [{"tag": "测试", "count": 1}]
+
+        NoteService.delete_note(db, other.id, test_user)
+        assert NoteService.suggest_notes(db, test_user, "py")["notes"] == []
+        assert get_metrics().get("suggest.loads") == 1
+
+    def test_expired_and_evicted_users_reload(self, db, test_user):
+        """测试过期或被淘汰的用户在下次查询时重新加载"""
+        index = suggest_module.get_suggest_index()
+        NoteService.create_note(db, NoteCreate(title="Python 入门", content="正文"), test_user)
+        index.suggest(db, test_user.id, "py")
+        index.suggest(db, 1001, "py")
+        index.suggest(db, 1002, "py")
+        assert list(index._users) == [1001, 1002]
+
+        index.suggest(db, test_user.id, "py")
+        index._users[test_user.id].loaded_at -= 61
+        assert _titles(index.suggest(db, test_user.id, "py")) == ["Python 入门"]
+        assert get_metrics().get("suggest.loads") == 5
+
+    def test_endpoint(self, db, test_user):
+        """测试补全接口"""
+        NoteService.create_note(db, NoteCreate(title="Python 入门", content="正文", tags=["Python"]), test_user)
+        app.dependency_overrides[get_db] = lambda: db
+        app.dependency_overrides[get_current_user] = lambda: test_user
+        try:
+            client = TestClient(app, base_url="http://localhost")
+            data = client.get("/notes/suggest", params={"prefix": "PY"}).json()["data"]
+            assert data["notes"][0]["title"] == "Python 入门"
+            assert data["tags"] == [{"tag": "Python", "count": 1}]
+            assert client.get("/notes/suggest", params={"prefix": ""}).status_code == 422
+        finally:
+            app.dependency_overrides.clear()
@@ -0,0 +1,112 @@
+"""
+AI 摘要缓存单元测试
+测试 LRU 内存层、持久层、请求合并和 AIService 集成
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.ai_service import AIService
+from app.services.summary_cache import SummaryCache, make_cache_key
+from app.utils.metrics import get_metrics
+from tests.conftest import TestingSessionLocal
+
+
+class TestSummaryCache:
+    """摘要缓存测试类"""
+
+    def test_cache_key_depends_on_all_parts(self):
+        """测试缓存键随模型和内容变化，且不受拆分方式影响"""
+        key = make_cache_key("model-a", "标题", "内容")
+        assert key == make_cache_key("model-a", "标题", "内容")
+        assert key != make_cache_key("model-b", "标题", "内容")
+        assert make_cache_key("m", "ab", "c") != make_cache_key("m", "a", "bc")
+
+    def test_memory_lru_eviction(self):
+        """测试内存层按最近使用淘汰"""
+        cache = SummaryCache(capacity=2, session_factory=None)
+        cache.set("a", "m", "A")
+        cache.set("b", "m", "B")
+        assert cache.get("a") == "A"
+        cache.set("c", "m", "C")
+        assert cache.get("b") is None
+        assert cache.get("a") == "A"
+        assert cache.get("c") == "C"
+
+    def test_persistent_tier_survives_restart(self, db):
+        """测试持久层在内存层清空后仍能命中"""
+        cache = SummaryCache(capacity=10, session_factory=TestingSessionLocal)
+        calls = []
+        assert cache.get_or_generate("k", "m", lambda: calls.append(1) or "摘要") == "摘要"
+
+        restarted = SummaryCache(capacity=10, session_factory=TestingSessionLocal)
+        assert restarted.get_or_generate("k", "m", lambda: calls.append(1) or "新摘要") == "摘要"
+        assert len(calls) == 1
+
+    def test_concurrent_requests_share_one_upstream_call(self):
+        """测试并发的相同请求只调用一次上游"""
+        cache = SummaryCache(capacity=10, session_factory=None)
+        calls = []
+        started = threading.Event()
+
+        def slow_generate():
+            calls.append(1)
+            started.set()
+            time.sleep(0.2)
+            return "摘要"
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get_or_generate("k", "m", slow_generate)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results == ["摘要"] * 5
+        assert len(calls) == 1
+
+    def test_errors_are_not_cached(self):
+        """测试上游失败时不写入缓存"""
+        cache = SummaryCache(capacity=10, session_factory=None)
+
+        def broken():
+            raise RuntimeError("上游错误")
+
+        with pytest.raises(RuntimeError):
+            cache.get_or_generate("k", "m", broken)
+        assert cache.get_or_generate("k", "m", lambda: "摘要") == "摘要"
+
+
+class TestAIServiceCache:
+    """AIService 摘要缓存集成测试类"""
+
+    def test_same_content_calls_llm_once(self, monkeypatch):
+        """测试相同内容只调用一次大模型，并记录节省的调用次数"""
+        cache = SummaryCache(capacity=10, session_factory=None)
+        monkeypatch.setattr("app.services.ai_service.get_summary_cache", lambda: cache)
+        get_metrics().reset()
+
+        calls = []
+
+        def create(**kwargs):
+            calls.append(kwargs)
+            message = SimpleNamespace(content="这是摘要")
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+        service = AIService()
+        service.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+        assert service.generate_note_summary("内容", "标题") == "这是摘要"
+        assert service.generate_note_summary("内容", "标题") == "这是摘要"
+        service.generate_note_summary("其他内容", "标题")
+
+        assert len(calls) == 2
+        stats = cache.stats()
+        assert stats["upstream_calls"] == 2
+        assert stats["upstream_calls_saved"] == 1
@@ -0,0 +1,117 @@
+"""
+摘要重新生成门限单元测试
+测试 SimHash 指纹、小修改沿用原摘要、累计修改重新生成以及无变化的更新不创建版本
+"""
+
+import pytest
+
+from app.core.config import get_settings
+from app.models.note import NoteBatchRequest, NoteCreate, NoteTagUpdate, NoteUpdate, NoteVersion
+from app.models.summary_job import SummaryJob
+from app.services.note_service import NoteService
+from app.services.summary_queue import SummaryQueue
+from app.utils.similarity import hamming_distance, simhash
+
+
+BODY = "".join("第 {} 段记录了项目的进展和下一步计划。\n".format(i) for i in range(40))
+
+
+@pytest.fixture(autouse=True)
+def fake_summary(monkeypatch):
+    """使用确定的摘要函数代替大模型调用"""
+    monkeypatch.setattr(
+        "app.services.summary_queue.request_note_summary",
+        lambda content, title="": "摘要:" + content[-8:]
+    )
+    monkeypatch.setattr(get_settings(), "SUMMARY_CHANGE_THRESHOLD", 8)
+
+
+def _generation(db, note_id):
+    job = db.query(SummaryJob).filter(SummaryJob.note_id == note_id).one()
+    return job.generation
+
+
+def _versions(db, note_id):
+    return db.query(NoteVersion).filter(NoteVersion.note_id == note_id).count()
+
+
+class TestSimilarity:
+    """文本指纹测试类"""
+
+    def test_distance_grows_with_change(self):
+        """测试指纹稳定，且汉明距离随修改程度增大"""
+        base = simhash(BODY)
+        assert simhash(BODY) == base
+        assert -(1 << 63) <= base < 1 << 63
+        typo = hamming_distance(base, simhash(BODY.replace("第 3 段", "第 3 断")))
+        rewrite = hamming_distance(base, simhash("完全不同的一篇关于烹饪和旅行的文章。" * 10))
+        assert typo < 8 < rewrite
+
+
+class TestSummaryGate:
+    """摘要门限测试类"""
+
+    def test_minor_edit_keeps_summary(self, db, test_user):
+        """测试修改错字不重新生成摘要，但仍创建版本"""
+        note = NoteService.create_note(db, NoteCreate(title="周报", content=BODY), test_user)
+        SummaryQueue.run_once(db, "w1")
+
+        note = NoteService.update_note(db, note.id, NoteUpdate(content=BODY.replace("第 3 段", "第 3 断")), test_user)
+        assert note.summary_status == "ready"
+        assert _generation(db, note.id) == 1
+        assert note.current_version == 2
+        assert not SummaryQueue.run_once(db, "w1")
+
+    def test_large_or_cumulative_edits_resummarize(self, db, test_user):
+        """测试大幅修改立即重新生成，多次小修改累计超过阈值后重新生成"""
+        note = NoteService.create_note(db, NoteCreate(title="周报", content=BODY), test_user)
+        SummaryQueue.run_once(db, "w1")
+
+        content = BODY
+        for i in range(40):
+            content = content.replace("第 {} 段记录了".format(i), "第 {} 段写下了".format(i))
+            note = NoteService.update_note(db, note.id, NoteUpdate(content=content), test_user)
+            if note.summary_status == "pending":
+                break
+        assert 0 < i < 39
+        assert _generation(db, note.id) == 2
+
+        SummaryQueue.run_once(db, "w1")
+        note = NoteService.update_note(db, note.id, NoteUpdate(content="完全不同的一篇关于烹饪和旅行的文章。"), test_user)
+        assert note.summary_status == "pending"
+
+    def test_threshold_zero_always_resummarizes(self, db, test_user, monkeypatch):
+        """测试阈值为 0 时每次修改都重新生成"""
+        monkeypatch.setattr(get_settings(), "SUMMARY_CHANGE_THRESHOLD", 0)
+        note = NoteService.create_note(db, NoteCreate(title="周报", content=BODY), test_user)
+        SummaryQueue.run_once(db, "w1")
+
+        note = NoteService.update_note(db, note.id, NoteUpdate(content=BODY + "。"), test_user)
+        assert note.summary_status == "pending"
+
+    def test_noop_update_creates_no_version(self, db, test_user):
+        """测试与当前值相同的更新（包括标签更新）不写入、不创建版本"""
+        note = NoteService.create_note(db, NoteCreate(title="周报", content=BODY, tags=["a"]), test_user)
+        row_version = note.row_version
+
+        note = NoteService.update_note(db, note.id, NoteUpdate(title="周报", content=BODY, tags=["a"]), test_user)
+        assert (note.current_version, note.row_version) == (1, row_version)
+        assert _versions(db, note.id) == 1
+
+        note = NoteService.update_note_tags(db, note.id, NoteTagUpdate(tags=["a"]), test_user)
+        assert (note.current_version, note.row_version) == (1, row_version)
+        assert _versions(db, note.id) == 1
+
+    def test_noop_batch_items_skipped(self, db, test_user):
+        """测试批量操作中没有变化的更新项不占用版本号"""
+        note = NoteService.create_note(db, NoteCreate(title="周报", content=BODY), test_user)
+
+        result = NoteService.batch_notes(db, NoteBatchRequest(items=[
+            {"op": "update", "note_id": note.id, "content": BODY},
+            {"op": "update", "note_id": note.id, "content": BODY + "新增\n"},
+            {"op": "update", "note_id": note.id, "content": BODY + "新增\n", "tags": ["b"]},
+        ]), test_user)
+
+        assert result["success"] == 3
+        assert [r["version_number"] for r in result["results"]] == [None, 2, 3]
+        assert _versions(db, note.id) == 3
@@ -0,0 +1,106 @@
+"""
+AI 摘要任务队列单元测试
+测试任务去重、优先级、处理期间再次修改和失败重试
+"""
+
+import pytest
+
+from app.models.note import NoteCreate, NoteUpdate
+from app.models.summary_job import SummaryJob, PRIORITY_BACKFILL
+from app.services import ai_service
+from app.services.note_service import NoteService
+from app.services.summary_queue import SummaryQueue
+
+
+@pytest.fixture(autouse=True)
+def fake_summary(monkeypatch):
+    """使用确定的摘要函数代替大模型调用"""
+    monkeypatch.setattr(
+        "app.services.summary_queue.request_note_summary",
+        lambda content, title="": "摘要:" + content
+    )
+
+
+class TestSummaryQueue:
+    """摘要任务队列测试类"""
+
+    def test_note_saved_pending_then_summarized(self, db, test_user):
+        """测试笔记保存后摘要为 pending，由工作线程生成后变为 ready"""
+        note = NoteService.create_note(db, NoteCreate(title="A", content="第一版"), test_user)
+        assert note.summary_status == "pending"
+        updated_at = note.updated_at
+
+        assert SummaryQueue.run_once(db, "w1")
+        db.refresh(note)
+        assert note.summary == "摘要:第一版"
+        assert note.summary_status == "ready"
+        assert note.updated_at == updated_at
+        assert not SummaryQueue.run_once(db, "w1")
+
+    def test_jobs_deduplicated_per_note(self, db, test_user):
+        """测试多次修改只保留一个任务，并使用最新内容"""
+        note = NoteService.create_note(db, NoteCreate(title="A", content="第一版"), test_user)
+        NoteService.update_note(db, note.id, NoteUpdate(content="第二版"), test_user)
+        NoteService.update_note(db, note.id, NoteUpdate(content="第三版"), test_user)
+
+        jobs = db.query(SummaryJob).filter(SummaryJob.note_id == note.id).all()
+        assert len(jobs) == 1
+        assert jobs[0].generation == 3
+
+        assert SummaryQueue.run_once(db, "w1")
+        assert not SummaryQueue.run_once(db, "w1")
+        db.refresh(note)
+        assert note.summary == "摘要:第三版"
+
+    def test_interactive_jobs_before_backfill(self, db, test_user):
+        """测试用户编辑触发的任务优先于批量补齐"""
+        old = NoteService.create_note(db, NoteCreate(title="旧", content="旧笔记"), test_user)
+        SummaryQueue.run_once(db, "w1")
+        SummaryQueue.backfill(db, only_missing=False)
+        new = NoteService.create_note(db, NoteCreate(title="新", content="新笔记"), test_user)
+
+        job = SummaryQueue.claim(db, "w1")
+        assert job.note_id == new.id
+        assert db.query(SummaryJob).filter(SummaryJob.note_id == old.id).one().priority == PRIORITY_BACKFILL
+
+    def test_edit_during_processing_requeues(self, db, test_user):
+        """测试处理期间笔记被修改时任务重新排队"""
+        note = NoteService.create_note(db, NoteCreate(title="A", content="第一版"), test_user)
+        job = SummaryQueue.claim(db, "w1")
+        NoteService.update_note(db, note.id, NoteUpdate(content="第二版"), test_user)
+
+        SummaryQueue.process(db, job, "w1")
+        db.refresh(note)
+        assert note.summary_status == "pending"
+
+        assert SummaryQueue.run_once(db, "w1")
+        db.refresh(note)
+        assert note.summary == "摘要:第二版"
+        assert note.summary_status == "ready"
+
+    def test_failure_retries_then_fails(self, db, test_user, monkeypatch):
+        """测试大模型调用失败后退避重试，超过最大次数写入默认摘要并标记为失败"""
+        class BrokenCompletions:
+            def create(self, **kwargs):
+                raise RuntimeError("LLM 不可用")
+
+        broken_client = type("Client", (), {"chat": type("Chat", (), {"completions": BrokenCompletions()})()})()
+        monkeypatch.setattr(ai_service.get_ai_service(), "client", broken_client)
+        monkeypatch.setattr("app.services.summary_queue.request_note_summary", ai_service.request_note_summary)
+        monkeypatch.setattr("app.services.summary_queue.get_settings", lambda: type(
+            "S", (), {"SUMMARY_MAX_ATTEMPTS": 2, "SUMMARY_POLL_INTERVAL": 0, "SUMMARY_JOB_LEASE_SECONDS": 60}
+        )())
+        note = NoteService.create_note(db, NoteCreate(title="A", content="内容"), test_user)
+
+        assert SummaryQueue.run_once(db, "w1")
+        job = db.query(SummaryJob).filter(SummaryJob.note_id == note.id).populate_existing().one()
+        assert job.status == "queued" and job.attempts == 1
+        assert "LLM 不可用" in job.last_error
+        db.refresh(note)
+        assert note.summary_status == "pending"
+
+        assert SummaryQueue.run_once(db, "w1")
+        db.refresh(note)
+        assert note.summary_status == "failed"
+        assert note.summary == "A：内容"
+        assert not SummaryQueue.run_once(db, "w1")
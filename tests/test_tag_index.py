@@ -0,0 +1,90 @@
+"""
+标签索引单元测试
+测试 note_tags 倒排表的维护、任一/全部匹配筛选和重建
+"""
+
+import pytest
+from pydantic import ValidationError
+
+from app.models.note import Note, NoteCreate, NoteUpdate, NoteTagUpdate, NoteQueryParams
+from app.models.note_tag import MAX_TAG_LENGTH, NoteTag
+from app.services.note_service import NoteService
+from app.services.tag_service import TagService
+
+
+def _postings(db, note_id):
+    return sorted(row[0] for row in db.query(NoteTag.tag).filter(NoteTag.note_id == note_id))
+
+
+def _titles(db, user, tags, mode):
+    result = NoteService.get_notes(db, user, NoteQueryParams(tags=tags, tag_mode=mode, sort="title", order="asc"))
+    return [note.title for note in result.items]
+
+
+class TestTagIndex:
+    """标签索引测试类"""
+
+    def test_postings_follow_tag_changes(self, db, test_user):
+        """测试创建、修改、恢复和删除笔记时同步维护倒排记录"""
+        note = NoteService.create_note(db, NoteCreate(title="A", content="内容", tags=["a", "b", "a"]), test_user)
+        assert _postings(db, note.id) == ["a", "b"]
+
+        NoteService.update_note(db, note.id, NoteUpdate(tags=["b", "c"]), test_user)
+        assert _postings(db, note.id) == ["b", "c"]
+
+        NoteService.update_note_tags(db, note.id, NoteTagUpdate(tags=[]), test_user)
+        assert _postings(db, note.id) == []
+
+        NoteService.restore_note_version(db, note.id, 2, test_user)
+        assert _postings(db, note.id) == ["b", "c"]
+
+        NoteService.delete_note(db, note.id, test_user)
+        assert db.query(NoteTag).count() == 0
+
+    def test_any_and_all_filters(self, db, test_user):
+        """测试任一匹配和全部匹配筛选"""
+        NoteService.create_note(db, NoteCreate(title="A", content="内容", tags=["python", "web"]), test_user)
+        NoteService.create_note(db, NoteCreate(title="B", content="内容", tags=["python"]), test_user)
+        NoteService.create_note(db, NoteCreate(title="C", content="内容", tags=["rust"]), test_user)
+
+        assert _titles(db, test_user, ["python", "rust"], "any") == ["A", "B", "C"]
+        assert _titles(db, test_user, ["web", "rust"], "any") == ["A", "C"]
+        assert _titles(db, test_user, ["python", "web"], "all") == ["A"]
+        assert _titles(db, test_user, ["python", "rust"], "all") == []
+        assert NoteService.get_notes(db, test_user, NoteQueryParams(tags=["python"])).pagination.total == 2
+        assert NoteService.get_user_tag_counts(db, test_user) == {"python": 2, "rust": 1, "web": 1}
+
+    def test_rebuild_from_note_tags(self, db, test_user):
+        """测试按笔记的 tags 列分批替换倒排记录"""
+        old = Note(title="旧笔记 1", content="内容", tags=["x", "y"], user_id=test_user.id)
+        db.add_all([old, Note(title="旧笔记 2", content="内容", tags=["y"], user_id=test_user.id)])
+        db.commit()
+        # 已有的过期记录被替换，已不存在的笔记遗留的记录被清理
+        db.add_all([
+            NoteTag(user_id=test_user.id, tag="x", note_id=old.id),
+            NoteTag(user_id=test_user.id, tag="过期", note_id=old.id),
+            NoteTag(user_id=test_user.id, tag="y", note_id=old.id + 100),
+        ])
+        db.commit()
+
+        assert TagService.rebuild(db, batch_size=1) == {"notes": 2, "postings": 3}
+        assert _titles(db, test_user, ["y"], "any") == ["旧笔记 1", "旧笔记 2"]
+        assert _titles(db, test_user, ["x", "y"], "all") == ["旧笔记 1"]
+        assert db.query(NoteTag).count() == 3
+
+    def test_tag_length_limited(self, db, test_user):
+        """测试请求中的标签长度受列宽限制，历史数据中过长的标签不写入倒排表"""
+        longest, too_long = "长" * MAX_TAG_LENGTH, "长" * (MAX_TAG_LENGTH + 1)
+        for build in (
+            lambda tags: NoteCreate(title="A", content="内容", tags=tags),
+            lambda tags: NoteUpdate(tags=tags),
+            lambda tags: NoteTagUpdate(tags=tags),
+        ):
+            with pytest.raises(ValidationError):
+                build(["ok", too_long])
+        note = NoteService.create_note(db, NoteCreate(title="A", content="内容", tags=[longest]), test_user)
+        assert _postings(db, note.id) == [longest]
+
+        db.add(Note(title="旧笔记", content="内容", tags=[too_long, "z"], user_id=test_user.id))
+        db.commit()
+        assert TagService.rebuild(db) == {"notes": 2, "postings": 2}
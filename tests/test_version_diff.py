@@ -0,0 +1,132 @@
+"""
+版本差异单元测试
+测试 Myers 差异算法、统一格式输出和版本差异接口
+"""
+
+import difflib
+import random
+
+import pytest
+from fastapi import HTTPException
+
+from app.models.note import NoteCreate, NoteUpdate
+from app.services import object_cache as object_cache_module
+from app.services.note_service import NoteService
+from app.services.object_cache import ObjectCache
+from app.services.version_service import VersionService
+from app.utils import diff as diff_module
+from app.utils.diff import diff_opcodes, unified_diff
+from app.utils.metrics import get_metrics
+from tests.test_object_cache import FakeRedis
+
+
+def _lcs_length(a, b):
+    table = [[0] * (len(b) + 1) for _ in range(len(a) + 1)]
+    for i, x in enumerate(a):
+        for j, y in enumerate(b):
+            table[i + 1][j + 1] = table[i][j] + 1 if x == y else max(table[i][j + 1], table[i + 1][j])
+    return table[-1][-1]
+
+
+def _check_script(a, b, opcodes):
+    """检查操作码连续覆盖两个序列，且应用后得到 b；返回匹配的元素数"""
+    i = j = matched = 0
+    rebuilt = []
+    for tag, i1, i2, j1, j2 in opcodes:
+        assert (i1, j1) == (i, j)
+        if tag == "equal":
+            assert a[i1:i2] == b[j1:j2]
+            matched += i2 - i1
+        rebuilt.extend(b[j1:j2])
+        i, j = i2, j2
+    assert (i, j, rebuilt) == (len(a), len(b), list(b))
+    return matched
+
+
+class TestDiffEngine:
+    """差异算法测试类"""
+
+    def test_edit_script_is_minimal(self):
+        """测试编辑脚本正确且保留最长公共子序列"""
+        rng = random.Random(7)
+        for _ in range(500):
+            a = [rng.choice("abcd") for _ in range(rng.randint(0, 30))]
+            b = [rng.choice("abcde") for _ in range(rng.randint(0, 30))]
+            assert _check_script(a, b, diff_opcodes(a, b)) == _lcs_length(a, b)
+
+    def test_expensive_inputs_fall_back(self, monkeypatch):
+        """测试编辑距离超过上限时仍返回正确（不一定最短）的编辑脚本"""
+        monkeypatch.setattr(diff_module, "MAX_EDIT_COST", 2)
+        rng = random.Random(11)
+        for _ in range(200):
+            a = [rng.choice("abcd") for _ in range(rng.randint(0, 40))]
+            b = [rng.choice("abcd") for _ in range(rng.randint(0, 40))]
+            _check_script(a, b, diff_opcodes(a, b))
+
+    def test_unified_output_matches_difflib(self):
+        """测试行模式输出与标准统一格式一致，且只包含变更附近的行"""
+        old = "".join("line {}\n".format(i) for i in range(1000))
+        new = old.replace("line 10\n", "line ten\n").replace("line 900\n", "")
+        result = unified_diff(old, new)
+
+        assert (result["lines_added"], result["lines_removed"]) == (1, 2)
+        rendered = [line for hunk in result["hunks"] for line in [hunk["header"] + "\n"] + hunk["lines"]]
+        expected = list(difflib.unified_diff(old.splitlines(True), new.splitlines(True)))[2:]
+        assert rendered == expected
+        assert unified_diff(old, old)["hunks"] == []
+
+    def test_word_mode(self):
+        """测试单词模式在变更行内给出增删片段（中文按字比较）"""
+        result = unified_diff("标题\n今天天气很好\nfoo bar baz\n", "标题\n今天天气不好\nfoo qux baz\n", context=0, mode="word")
+        assert result["hunks"] == [{
+            "header": "@@ -2,2 +2,2 @@",
+            "segments": [
+                {"op": "equal", "text": "今天天气"},
+                {"op": "delete", "text": "很"},
+                {"op": "insert", "text": "不"},
+                {"op": "equal", "text": "好\nfoo "},
+                {"op": "delete", "text": "bar"},
+                {"op": "insert", "text": "qux"},
+                {"op": "equal", "text": " baz\n"},
+            ],
+        }]
+
+
+class TestVersionDiff:
+    """版本差异接口测试类"""
+
+    def test_diff_between_versions(self, db, test_user, test_superuser):
+        """测试比较任意两个版本，并检查版本和权限"""
+        note = NoteService.create_note(db, NoteCreate(title="A", content="a\nb\nc\n"), test_user)
+        NoteService.update_note(db, note.id, NoteUpdate(content="a\nB\nc\n"), test_user)
+        NoteService.update_note(db, note.id, NoteUpdate(title="B", content="a\nB\nc\nd\n"), test_user)
+
+        diff = NoteService.get_version_diff(db, note.id, 1, 3, test_user)
+        assert (diff.lines_added, diff.lines_removed, diff.title_changed) == (2, 1, True)
+        assert diff.hunks[0].lines == [" a\n", "-b\n", "+B\n", " c\n", "+d\n"]
+
+        reverse = NoteService.get_version_diff(db, note.id, 2, 1, test_user, mode="word")
+        assert [s.model_dump() for s in reverse.hunks[0].segments][1:3] == [
+            {"op": "delete", "text": "B"}, {"op": "insert", "text": "b"}
+        ]
+
+        with pytest.raises(HTTPException) as exc:
+            NoteService.get_version_diff(db, note.id, 1, 9, test_user)
+        assert exc.value.status_code == 404
+        with pytest.raises(HTTPException) as exc:
+            NoteService.get_version_diff(db, note.id, 1, 2, test_superuser)
+        assert exc.value.status_code == 403
+
+    def test_diff_is_cached(self, db, test_user, monkeypatch):
+        """测试差异结果按版本记录缓存，命中时不再计算"""
+        get_metrics().reset()
+        cache = ObjectCache(FakeRedis(), capacity=0)
+        monkeypatch.setattr(object_cache_module, "_object_cache", cache)
+        monkeypatch.setattr(object_cache_module, "_object_cache_ready", True)
+        note = NoteService.create_note(db, NoteCreate(title="A", content="a\n"), test_user)
+        NoteService.update_note(db, note.id, NoteUpdate(content="b\n"), test_user)
+
+        first = VersionService.diff_versions(db, note.id, 1, 2)
+        monkeypatch.setattr("app.services.version_service.unified_diff", None)
+        assert VersionService.diff_versions(db, note.id, 1, 2) == first
+        assert cache.stats()["diff"]["hit_ratio"] == 0.5
@@ -0,0 +1,139 @@
+"""
+版本保留策略单元测试
+测试按时间桶清理历史版本、增量重新编码、清理后的读取和恢复以及清理租约
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.config import get_settings
+from app.models.note import NoteCreate, NoteUpdate, NoteVersion
+from app.services.note_service import NoteService
+from app.models.job_lease import JobLease
+from app.services.lease_service import LeaseService
+from app.services.version_service import COMPACTION_LEASE, VersionService
+
+
+NOW = datetime(2024, 6, 30, 12, 0, 0)
+
+# 足够长的公共正文，使小改动保存为增量
+BODY = "".join("第 {} 行正文内容\n".format(i) for i in range(200))
+
+
+def _age_versions(db, note_id, created):
+    """把版本的创建时间改为指定时间 {版本号: 时间}"""
+    for version in db.query(NoteVersion).filter(NoteVersion.note_id == note_id):
+        version.created_at = created[version.version_number]
+    db.commit()
+
+
+def _contents(db, note_id):
+    versions = db.query(NoteVersion).filter(NoteVersion.note_id == note_id).order_by(NoteVersion.version_number).all()
+    return {v.version_number: v.content for v in VersionService.load_contents(db, versions)}
+
+
+class TestVersionRetention:
+    """版本保留策略测试类"""
+
+    @pytest.fixture(autouse=True)
+    def _policy(self, monkeypatch):
+        settings = get_settings()
+        monkeypatch.setattr(settings, "NOTE_VERSION_SNAPSHOT_INTERVAL", 3)
+        monkeypatch.setattr(settings, "VERSION_KEEP_ALL_DAYS", 7)
+        monkeypatch.setattr(settings, "VERSION_KEEP_HOURLY_DAYS", 30)
+
+    def test_buckets(self):
+        """测试全部保留期、按小时和按天的时间桶"""
+        assert VersionService.retention_bucket(NOW - timedelta(days=6), NOW) is None
+        assert VersionService.retention_bucket(datetime(2024, 6, 10, 8, 45), NOW) == ("hour", datetime(2024, 6, 10, 8))
+        assert VersionService.retention_bucket(datetime(2024, 1, 2, 8, 45), NOW) == ("day", datetime(2024, 1, 2).date())
+
+    def test_compaction_keeps_remaining_versions_readable(self, db, test_user):
+        """测试清理后保留的版本内容不变、可以恢复，新版本照常写入"""
+        note = NoteService.create_note(db, NoteCreate(title="A", content=BODY + "v1\n"), test_user)
+        for number in range(2, 9):
+            content = BODY + "".join("v{}\n".format(i) for i in range(1, number + 1))
+            NoteService.update_note(db, note.id, NoteUpdate(content=content), test_user)
+        day = datetime(2024, 1, 2, 9)
+        _age_versions(db, note.id, {
+            1: day, 2: day + timedelta(hours=1), 3: day + timedelta(hours=2),    # 同一天：只保留 3
+            4: datetime(2024, 6, 10, 8, 5), 5: datetime(2024, 6, 10, 8, 50),     # 同一小时：只保留 5
+            6: datetime(2024, 6, 10, 9, 0),
+            7: NOW - timedelta(days=1), 8: NOW - timedelta(hours=1),            # 全部保留期内
+        })
+        before = _contents(db, note.id)
+        # 快照间隔为 3：1、4、7 是快照，保留的 3、5、6 的基准都将被删除
+        assert db.query(NoteVersion).filter(NoteVersion.note_id == note.id, NoteVersion.version_number == 3).one().base_version == 1
+
+        result = VersionService.compact_all(db, batch_size=1, now=NOW)
+        assert (result["notes"], result["deleted"], result["reencoded"]) == (1, 3, 3)
+        assert result["bytes"] > 0
+
+        db.expire_all()
+        after = _contents(db, note.id)
+        assert sorted(after) == [3, 5, 6, 7, 8]
+        assert all(after[number] == before[number] for number in after)
+        v5 = db.query(NoteVersion).filter(NoteVersion.note_id == note.id, NoteVersion.version_number == 5).one()
+        assert (v5.lines_added, v5.lines_removed, v5.storage, v5.base_version) == (2, 0, "delta", 3)
+
+        with pytest.raises(HTTPException) as exc:
+            NoteService.get_note_version(db, note.id, 2, test_user)
+        assert exc.value.status_code == 404
+        restored = NoteService.restore_note_version(db, note.id, 3, test_user)
+        assert (restored.content, restored.current_version) == (before[3], 9)
+        assert _contents(db, note.id)[9] == before[3]
+
+        # 再次执行没有可清理的版本
+        assert VersionService.compact_all(db, now=NOW)["deleted"] == 0
+
+    def test_latest_and_base_snapshot_are_kept(self, db, test_user):
+        """测试最新版本和最近的快照即使超出保留期也不会删除"""
+        note = NoteService.create_note(db, NoteCreate(title="A", content=BODY), test_user)
+        NoteService.update_note(db, note.id, NoteUpdate(content=BODY + "b\n"), test_user)
+        day = datetime(2024, 1, 2, 9)
+        _age_versions(db, note.id, {1: day, 2: day + timedelta(minutes=5)})
+
+        counts = VersionService.compact_note_versions(db, note.id, NOW)
+        db.commit()
+        assert counts["deleted"] == 0
+        assert sorted(_contents(db, note.id)) == [1, 2]
+
+    def test_failed_note_does_not_stop_round(self, db, test_user, monkeypatch):
+        """测试单篇笔记清理失败时回滚并继续处理其他笔记"""
+        day = datetime(2024, 1, 2, 9)
+        notes = []
+        for title in ("A", "B"):
+            note = NoteService.create_note(db, NoteCreate(title=title, content=BODY), test_user)
+            NoteService.update_note(db, note.id, NoteUpdate(content=BODY + "b\n"), test_user)
+            NoteService.update_note(db, note.id, NoteUpdate(content=BODY + "c\n"), test_user)
+            _age_versions(db, note.id, {1: day, 2: day + timedelta(minutes=5), 3: day + timedelta(minutes=10)})
+            notes.append(note)
+
+        compact = VersionService.compact_note_versions
+
+        def flaky(db, note_id, now=None):
+            if note_id == notes[0].id:
+                raise RuntimeError("并发修改")
+            return compact(db, note_id, now)
+
+        monkeypatch.setattr(VersionService, "compact_note_versions", staticmethod(flaky))
+        result = VersionService.compact_all(db, now=NOW)
+        assert (result["failed"], result["notes"]) == (1, 1)
+        assert sorted(_contents(db, notes[0].id)) == [1, 2, 3]
+        assert sorted(_contents(db, notes[1].id)) == [1, 3]
+
+    def test_compaction_lease_is_exclusive(self, db, test_user):
+        """测试同一时间只有一个进程持有清理租约，结束后释放，过期后可被接管"""
+        assert LeaseService.acquire(db, COMPACTION_LEASE, "worker-a", 60)
+        assert LeaseService.acquire(db, COMPACTION_LEASE, "worker-a", 60)
+        assert not LeaseService.acquire(db, COMPACTION_LEASE, "worker-b", 60)
+        assert VersionService.run_compaction(db, "worker-b") is None
+
+        LeaseService.release(db, COMPACTION_LEASE, "worker-a")
+        assert VersionService.run_compaction(db, "worker-b")["deleted"] == 0
+        assert db.query(JobLease.holder).filter(JobLease.name == COMPACTION_LEASE).scalar() is None
+
+        assert LeaseService.acquire(db, COMPACTION_LEASE, "worker-a", -1)
+        assert LeaseService.acquire(db, COMPACTION_LEASE, "worker-b", 60)
@@ -0,0 +1,186 @@
+"""
+笔记版本存储单元测试
+测试增量编码、周期快照、透明还原和历史数据转换
+"""
+
+import threading
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import get_settings
+from app.models.note import Note, NoteCreate, NoteUpdate, NoteVersion
+from app.services.note_service import NoteService
+from app.services.version_service import VersionService
+from app.utils.delta import apply_delta, compute_delta
+from tests.conftest import SQLALCHEMY_DATABASE_URL
+
+
+def _versions(db, note_id):
+    return db.query(NoteVersion)\
+        .filter(NoteVersion.note_id == note_id)\
+        .order_by(NoteVersion.version_number)\
+        .all()
+
+
+class TestDelta:
+    """增量编码测试类"""
+
+    def test_round_trip(self):
+        """测试增量应用后得到目标文本"""
+        base = "第一行\n第二行\n第三行\n"
+        cases = [
+            "第一行\n第二行（修改）\n第三行\n",
+            "新开头\n" + base + "结尾没有换行",
+            "",
+            base,
+        ]
+        for target in cases:
+            assert apply_delta(base, compute_delta(base, target)) == target
+        assert apply_delta("", compute_delta("", base)) == base
+
+
+class TestVersionStorage:
+    """版本存储测试类"""
+
+    def test_snapshot_every_interval(self, db, test_user, monkeypatch):
+        """测试每隔固定版本数保存快照，其余版本保存相对快照的增量"""
+        monkeypatch.setattr(get_settings(), "NOTE_VERSION_SNAPSHOT_INTERVAL", 3)
+        lines = ["第 {} 行内容，用于测试增量存储\n".format(i) for i in range(50)]
+        note = NoteService.create_note(db, NoteCreate(title="长笔记", content="".join(lines)), test_user)
+        for i in range(6):
+            lines[i] = "修改后的第 {} 行\n".format(i)
+            NoteService.update_note(db, note.id, NoteUpdate(content="".join(lines)), test_user)
+
+        versions = _versions(db, note.id)
+        assert [v.storage for v in versions] == ["snapshot", "delta", "delta"] * 2 + ["snapshot"]
+        assert [v.base_version for v in versions] == [None, 1, 1, None, 4, 4, None]
+        assert all(v.content == "" for v in versions)
+
+    def test_get_note_version_reconstructs_content(self, db, test_user, monkeypatch):
+        """测试读取和恢复历史版本时透明还原内容"""
+        monkeypatch.setattr(get_settings(), "NOTE_VERSION_SNAPSHOT_INTERVAL", 5)
+        contents = ["".join("版本 {} 第 {} 行\n".format(n if i == n else 0, i) for i in range(30)) for n in range(4)]
+        note = NoteService.create_note(db, NoteCreate(title="笔记", content=contents[0]), test_user)
+        for content in contents[1:]:
+            NoteService.update_note(db, note.id, NoteUpdate(content=content), test_user)
+        db.expire_all()
+
+        for number, content in enumerate(contents, start=1):
+            assert NoteService.get_note_version(db, note.id, number, test_user).content == content
+        history = VersionService.load_contents(db, _versions(db, note.id))
+        assert [v.content for v in history] == contents
+
+        restored = NoteService.restore_note_version(db, note.id, 2, test_user)
+        assert restored.content == contents[1]
+        assert NoteService.get_note_version(db, note.id, 5, test_user).content == contents[1]
+
+    def test_compress_legacy_versions(self, db, test_user, monkeypatch):
+        """测试历史未压缩版本转换后内容不变，且被引用的基准保持为快照"""
+        monkeypatch.setattr(get_settings(), "NOTE_VERSION_SNAPSHOT_INTERVAL", 10)
+        note = Note(title="旧笔记", content="内容 3\n", tags=[], user_id=test_user.id)
+        db.add(note)
+        db.commit()
+        contents = ["公共行\n" * 20 + "内容 {}\n".format(i) for i in range(1, 4)]
+        for number, content in enumerate(contents, start=1):
+            db.add(NoteVersion(note_id=note.id, title="旧笔记", content=content, tags=[], version_number=number))
+        db.commit()
+        # 新版本已以增量形式引用了历史版本 3
+        note.content = contents[2] + "新增行\n"
+        VersionService.create_version(db, note, "更新笔记", previous_content=contents[2])
+        db.commit()
+        assert _versions(db, note.id)[-1].base_version == 3
+
+        assert VersionService.compress_all(db) == {"notes": 1, "versions": 3}
+        versions = _versions(db, note.id)
+        assert [v.storage for v in versions] == ["snapshot", "delta", "snapshot", "delta"]
+        assert all(v.content_size for v in versions)
+        assert [(v.lines_added, v.lines_removed) for v in versions] == [(21, 0), (1, 1), (1, 1), (1, 0)]
+        db.expire_all()
+        expected = contents + [contents[2] + "新增行\n"]
+        assert [v.content for v in VersionService.load_contents(db, _versions(db, note.id))] == expected
+        assert VersionService.compress_all(db) == {"notes": 0, "versions": 0}
+
+
+class TestVersionHistory:
+    """版本历史列表测试类"""
+
+    def test_history_returns_paginated_metadata(self, db, test_user):
+        """测试版本历史按版本号倒序分页，只包含元数据和变更摘要"""
+        note = NoteService.create_note(db, NoteCreate(title="笔记", content="a\nb\n"), test_user)
+        NoteService.update_note(db, note.id, NoteUpdate(content="a\nc\nd\n"), test_user)
+        NoteService.update_note(db, note.id, NoteUpdate(title="新标题"), test_user)
+
+        first = NoteService.get_note_versions(db, note.id, test_user, page=1, size=2)
+        assert first.pagination.total == 3
+        assert [v.version_number for v in first.items] == [3, 2]
+        assert [v.diff_summary for v in first.items] == ["内容未变化", "+2 -1 行"]
+        assert first.items[1].size == len("a\nc\nd\n")
+        assert "content" not in first.items[0].model_dump()
+
+        rest = NoteService.get_note_versions(db, note.id, test_user, size=2, cursor=first.pagination.next_cursor)
+        assert [v.version_number for v in rest.items] == [1]
+        assert rest.items[0].diff_summary == "+2 -0 行"
+        assert rest.has_more is False
+
+
+class TestVersionNumbering:
+    """版本号分配测试类"""
+
+    def test_concurrent_writers_get_distinct_versions(self, db, test_user):
+        """测试多个并发写入同一笔记时版本号连续且不重复"""
+        note = NoteService.create_note(db, NoteCreate(title="笔记", content="初始内容"), test_user)
+        workers, edits = 4, 5
+        errors = []
+        # 测试会话共用一个连接，并发写入需要每个线程使用独立连接
+        engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False, "timeout": 30})
+        WorkerSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        def worker(index):
+            session = WorkerSession()
+            try:
+                for edit in range(edits):
+                    content = "写入者 {} 第 {} 次修改".format(index, edit)
+                    NoteService.update_note(session, note.id, NoteUpdate(content=content), test_user)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                session.close()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+
+        assert errors == []
+        numbers = [v.version_number for v in _versions(db, note.id)]
+        assert numbers == list(range(1, workers * edits + 2))
+        db.refresh(note)
+        assert note.current_version == workers * edits + 1
+
+    def test_stale_counter_is_resynced(self, db, test_user, test_note):
+        """测试计数器落后于已有版本时同步后重试，而不是写入重复版本"""
+        assert test_note.current_version == 0
+        NoteService.update_note(db, test_note.id, NoteUpdate(content="新内容"), test_user)
+
+        assert [v.version_number for v in _versions(db, test_note.id)] == [1, 2]
+        db.refresh(test_note)
+        assert test_note.current_version == 2
+
+    def test_repair_renumbers_duplicates(self, db, test_user):
+        """测试修复命令重新编号重复版本并同步计数器"""
+        note = Note(title="旧笔记", content="c", tags=[], user_id=test_user.id)
+        db.add(note)
+        db.commit()
+        for number, content in [(1, "a"), (2, "b"), (2, "c")]:
+            db.add(NoteVersion(note_id=note.id, title="旧笔记", content=content, tags=[], version_number=number))
+        # 唯一索引生效时无法写入重复数据，这里直接删除索引模拟升级前的数据库
+        db.execute(text("DROP INDEX ux_note_versions_note_version"))
+        db.commit()
+
+        assert VersionService.repair_version_numbers(db) == {"notes": 1, "renumbered": 1}
+        assert [(v.version_number, v.content) for v in _versions(db, note.id)] == [(1, "a"), (2, "b"), (3, "c")]
+        db.refresh(note)
+        assert note.current_version == 3